@@ -0,0 +1,68 @@
+import random
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.ai_companion.services.ai_service_v2 import TransformerEmbedding
+
+_WORDS = (
+    "budget invoice supplier purchase order warehouse stock issue receipt policy approval "
+    "maintenance spare part bearing valve pump motor cable service contract capex asset "
+    "depreciation payroll overtime allowance tax ledger journal reconciliation variance"
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure embedding throughput: one text per forward pass (the previous behaviour), "
+        "length-bucketed batches, and batches served from a warm content-hash cache."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", type=str, default=None, help="Model name or local path (default: AI_CONFIG EMBEDDING_MODEL).")
+        parser.add_argument("--texts", type=int, default=500)
+        parser.add_argument("--batch-size", type=int, default=32)
+        parser.add_argument("--threads", type=int, default=0)
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        model_name = options["model"] or getattr(settings, "AI_CONFIG", {}).get("EMBEDDING_MODEL")
+        if not model_name:
+            raise CommandError("No embedding model configured; pass --model.")
+
+        rng = random.Random(options["seed"])
+        # Short item descriptions up to paragraph-sized policy chunks
+        texts = [
+            " ".join(rng.choice(_WORDS) for _ in range(rng.choice((4, 8, 16, 48, 160))))
+            for _ in range(options["texts"])
+        ]
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            try:
+                sequential = TransformerEmbedding(model_name, batch_size=1, num_threads=options["threads"] or None)
+                batched = TransformerEmbedding(
+                    model_name,
+                    batch_size=options["batch_size"],
+                    num_threads=options["threads"] or None,
+                    cache_dir=cache_dir,
+                )
+            except Exception as exc:
+                raise CommandError(f"Failed to load embedding model {model_name}: {exc}") from exc
+
+            scenarios = [
+                ("before: one text per call", lambda: [sequential.embed_query(text) for text in texts]),
+                ("after: batched, cold cache", lambda: batched.embed_documents(texts)),
+                ("after: batched, warm cache", lambda: batched.embed_documents(texts)),
+            ]
+            self.stdout.write(f"{len(texts)} texts, model {model_name}, batch size {options['batch_size']}")
+            self.stdout.write(f"{'scenario':<30}{'seconds':>10}{'texts/s':>12}{'ms/text':>10}")
+            for label, run in scenarios:
+                started = time.perf_counter()
+                run()
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{label:<30}{elapsed:>10.3f}{len(texts) / elapsed:>12.1f}{elapsed / len(texts) * 1000:>10.3f}"
+                )
+        self.stdout.write(self.style.SUCCESS("Benchmark finished."))
@@ -51,7 +51,7 @@ class Command(BaseCommand):
             ]
 
             index_name = str(options.get("company_id") or "global")
-            ai_service_v2.index_documents_from_list(documents, index_name=index_name)
+            ai_service_v2.index_documents_from_list(documents, index_name=index_name, collection="knowledge_base")
 
             self.stdout.write(
                 self.style.SUCCESS(
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import hashlib
 import logging
-import os
+import re
 from pathlib import Path
 from threading import Lock
 from typing import Dict, Iterable, List, Optional
@@ -10,11 +10,14 @@ from typing import Dict, Iterable, List, Optional
 from django.conf import settings
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
+import numpy as np
 import torch
 from transformers import AutoModel, AutoModelForCausalLM, AutoTokenizer, pipeline
 
+from .embedding_cache import EmbeddingCache
+from .vector_index import IncrementalIndex, IndexDiff
+
 logger = logging.getLogger(__name__)
 
 SUPPORTED_EXTENSIONS = {".md", ".rst", ".txt"}
@@ -24,10 +27,31 @@ SUPPORTED_EXTENSIONS = {".md", ".rst", ".txt"}
 
 
 class TransformerEmbedding(Embeddings):
-    """Simple embedding wrapper compatible with LangChain vector stores."""
-
-    def __init__(self, model_name: str):
+    """
+    Embedding wrapper compatible with LangChain vector stores.
+
+    Texts are tokenized once, sorted by token length and run through the
+    model in batches of similar length, so padding stays small; pooling is
+    masked, which keeps a text's vector identical whether it was embedded
+    alone or in a batch. With ``cache_dir`` set, vectors are stored by
+    content hash (see ``EmbeddingCache``) and unchanged texts are never
+    embedded twice.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        *,
+        batch_size: int = 32,
+        num_threads: Optional[int] = None,
+        max_length: int = 512,
+        cache_dir: Optional[str] = None,
+    ):
         self.model_name = model_name
+        self.batch_size = max(1, int(batch_size))
+        self.max_length = max_length
+        if num_threads:
+            torch.set_num_threads(int(num_threads))
         try:
             self.tokenizer = AutoTokenizer.from_pretrained(model_name)
         except Exception as exc:
@@ -39,25 +63,62 @@ class TransformerEmbedding(Embeddings):
             self.tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=False)
         self.model = AutoModel.from_pretrained(model_name)
         self.model.eval()
+        self.cache: Optional[EmbeddingCache] = None
+        if cache_dir:
+            slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name).strip("_") or "model"
+            self.cache = EmbeddingCache(
+                Path(cache_dir) / slug,
+                dim=self.model.config.hidden_size,
+                namespace=f"{model_name}:{max_length}",
+            )
 
-    def _embed_text(self, text: str) -> List[float]:
-        inputs = self.tokenizer(
-            text,
-            truncation=True,
-            padding=True,
-            max_length=512,
-            return_tensors="pt",
-        )
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            embeddings = outputs.last_hidden_state.mean(dim=1)
-        return embeddings[0].cpu().tolist()
+    def _embed_batch(self, encodings: List[Dict[str, List[int]]]) -> np.ndarray:
+        inputs = self.tokenizer.pad(encodings, padding=True, return_tensors="pt")
+        with torch.inference_mode():
+            hidden = self.model(**inputs).last_hidden_state
+            mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+        return pooled.to(torch.float32).cpu().numpy()
+
+    def _embed_uncached(self, texts: List[str]) -> np.ndarray:
+        vectors = np.empty((len(texts), self.model.config.hidden_size), dtype=np.float32)
+        if not texts:
+            return vectors
+        encoded = self.tokenizer(list(texts), truncation=True, max_length=self.max_length)
+        keys = [key for key in ("input_ids", "attention_mask", "token_type_ids") if key in encoded]
+        order = sorted(range(len(texts)), key=lambda index: len(encoded["input_ids"][index]))
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            vectors[batch] = self._embed_batch([{key: encoded[key][index] for key in keys} for index in batch])
+        return vectors
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """Vectors of ``texts`` as a float32 ``(len(texts), dim)`` array."""
+        texts = list(texts)
+        if self.cache is None:
+            return self._embed_uncached(texts)
+
+        digests = [self.cache.digest(text) for text in texts]
+        found = self.cache.get_many(digests)
+        missing: Dict[bytes, str] = {}
+        for digest, text in zip(digests, texts):
+            if digest not in found:
+                missing.setdefault(digest, text)
+        if missing:
+            fresh = self._embed_uncached(list(missing.values()))
+            self.cache.put_many(list(missing), fresh)
+            found.update(zip(missing, fresh))
+
+        vectors = np.empty((len(texts), self.model.config.hidden_size), dtype=np.float32)
+        for index, digest in enumerate(digests):
+            vectors[index] = found[digest]
+        return vectors
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        return [self._embed_text(text) for text in texts]
+        return self.embed_array(texts).tolist()
 
     def embed_query(self, text: str) -> List[float]:
-        return self._embed_text(text)
+        return self.embed_array([text])[0].tolist()
 
 
 def _iter_documents(source_directory: str) -> Iterable[Document]:
@@ -199,7 +260,13 @@ class AIServiceV2:
             return False
 
         try:
-            self.embeddings = TransformerEmbedding(model_name=embedding_model)
+            cache_dir = cfg.get("EMBEDDING_CACHE_PATH")
+            self.embeddings = TransformerEmbedding(
+                model_name=embedding_model,
+                batch_size=self._coerce_int(cfg.get("EMBEDDING_BATCH_SIZE"), 32, 1, 1024),
+                num_threads=cfg.get("EMBEDDING_THREADS") or None,
+                cache_dir=cache_dir if cache_dir is not None else str(Path(persist_dir) / "embedding_cache"),
+            )
             self.index_root = Path(persist_dir)
             self.index_root.mkdir(parents=True, exist_ok=True)
             self._load_vector_store("global")
@@ -278,39 +345,56 @@ class AIServiceV2:
                 logger.error("AI models not loaded; cannot index documents.")
             return
 
+        if not Path(source_directory).exists():
+            # Never read a missing directory as "every file was deleted"
+            logger.warning("AI document path %s does not exist", source_directory)
+            return
         documents = list(_iter_documents(source_directory))
-        self.index_documents_from_list(documents, index_name=index_name)
-
-    def index_documents_from_list(self, documents: List[Document], index_name: str = "global"):
+        self.index_documents_from_list(documents, index_name=index_name, collection=f"files:{source_directory}")
+
+    def index_documents_from_list(
+        self,
+        documents: List[Document],
+        index_name: str = "global",
+        *,
+        collection: Optional[str] = None,
+    ) -> Optional[IndexDiff]:
+        """
+        Bring ``documents`` into the index incrementally (see ``IncrementalIndex``).
+
+        With ``collection``, ``documents`` is the complete set for that
+        collection and indexed documents of it that are missing are removed.
+        """
         if not self._should_load_embeddings:
             logger.info("Skipping in-memory document indexing because AI mode '%s' disables embeddings.", self._mode)
-            return
+            return None
         if not self._ensure_ready(require_generator=False):
             if not self._enabled:
                 logger.info("AI service disabled; skipping document indexing request.")
             else:
                 logger.error("AI models not loaded; cannot index documents.")
-            return
+            return None
 
-        if not documents:
+        if not documents and collection is None:
             logger.warning("No documents found to index.")
-            return
+            return None
+        if self.index_root is None:
+            logger.error("Vector store root is not configured; cannot index documents.")
+            return None
 
-        splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        chunks = splitter.split_documents(documents)
-
-        store = self.vector_stores.get(index_name)
-        if store is None:
-            store = FAISS.from_documents(chunks, self.embeddings)
-        else:
-            store.add_documents(chunks)
-        self.vector_stores[index_name] = store
-
-        if self.index_root:
-            index_path = self._index_path(index_name)
-            os.makedirs(index_path.parent, exist_ok=True)
-            store.save_local(str(index_path))
-        logger.info("Indexed %s document chunks into '%s'.", len(chunks), index_name)
+        store, diff = IncrementalIndex(self._index_path(index_name), self.embeddings).sync(
+            documents, collection=collection
+        )
+        if store is not None:
+            self.vector_stores[index_name] = store
+        logger.info(
+            "Indexed '%s': %s chunks added, %s removed, %s documents unchanged.",
+            index_name,
+            diff.added,
+            diff.removed,
+            diff.unchanged,
+        )
+        return diff
 
     def chat(self, message: str, **kwargs) -> Dict:
         if self._mode == "mock":
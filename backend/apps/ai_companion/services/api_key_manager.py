@@ -6,10 +6,20 @@ import time
 from typing import Optional, Tuple
 
 from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 
+from .rate_limiter import DailyQuotaLimiter, RateLimiter
+
 logger = logging.getLogger(__name__)
 
+KEY_LIST_CACHE_KEY = "ai:gemini_keys"
+KEY_LIST_CACHE_TIMEOUT = 300
+
+# Limits are per key (``minute_limit``/``daily_limit``) and passed on each check
+MINUTE_LIMITER = RateLimiter(prefix="gemini:minute", limit=15, window_seconds=60)
+DAILY_LIMITER = DailyQuotaLimiter(prefix="gemini:day", limit=1500)
+
 
 class APIKeyManager:
     """
@@ -18,12 +28,31 @@ class APIKeyManager:
     """
 
     @staticmethod
-    def get_available_key():
+    def _candidate_keys():
+        """Keys that may be selected, by priority; cached until a key is saved or deleted."""
+        from apps.ai_companion.models import GeminiAPIKey
+
+        keys = cache.get(KEY_LIST_CACHE_KEY)
+        if keys is None:
+            keys = list(GeminiAPIKey.objects.filter(status__in=["active", "rate_limited"]).order_by("priority"))
+            cache.set(KEY_LIST_CACHE_KEY, keys, KEY_LIST_CACHE_TIMEOUT)
+        return keys
+
+    @staticmethod
+    def invalidate_keys():
+        cache.delete(KEY_LIST_CACHE_KEY)
+
+    @staticmethod
+    def get_available_key(reserve: bool = True):
         """
         Get an available API key with automatic rotation.
         Returns (api_key, key_object) or (None, None) if no keys available.
+
+        With ``reserve`` (the default) the request is counted against the
+        key's per-minute and daily limits; otherwise the limits are only
+        inspected.
         """
-        from apps.ai_companion.models import GeminiAPIKey, AIConfiguration
+        from apps.ai_companion.models import AIConfiguration
 
         # Check if document processing is enabled
         config = AIConfiguration.get_config()
@@ -31,23 +60,31 @@ class APIKeyManager:
             logger.warning("Document processing is disabled in AI configuration")
             return None, None
 
-        # Get all keys ordered by priority
-        keys = GeminiAPIKey.objects.filter(status="active").order_by("priority")
-
-        for key in keys:
-            if key.is_available():
-                # Check rate limits
-                if key.requests_today >= key.daily_limit:
-                    logger.warning(f"Key {key.name} hit daily limit")
-                    key.mark_rate_limited(minutes=config.rate_limit_cooldown_minutes)
-                    continue
-
-                if key.requests_this_minute >= key.minute_limit:
-                    logger.warning(f"Key {key.name} hit per-minute limit")
-                    key.mark_rate_limited(minutes=1)
-                    continue
-
-                return key.api_key, key
+        now = timezone.now()
+        for key in APIKeyManager._candidate_keys():
+            if key.rate_limited_until and key.rate_limited_until > now:
+                continue
+            if not reserve:
+                if (
+                    MINUTE_LIMITER.peek(identity=key.pk, limit=key.minute_limit).allowed
+                    and DAILY_LIMITER.peek(identity=key.pk, limit=key.daily_limit).allowed
+                ):
+                    return key.api_key, key
+                continue
+
+            if not MINUTE_LIMITER.check(identity=key.pk, limit=key.minute_limit).allowed:
+                logger.debug(f"Key {key.name} hit per-minute limit")
+                continue
+            if not DAILY_LIMITER.check(identity=key.pk, limit=key.daily_limit).allowed:
+                MINUTE_LIMITER.release(identity=key.pk)
+                logger.warning(f"Key {key.name} hit daily limit")
+                key.mark_rate_limited(minutes=config.rate_limit_cooldown_minutes)
+                continue
+
+            if key.status == "rate_limited":
+                # Cooldown expired; is_available() puts the key back to active
+                key.is_available()
+            return key.api_key, key
 
         # No available keys - try fallback to .env
         env_key = getattr(settings, 'GOOGLE_GEMINI_API_KEY', None)
@@ -58,6 +95,30 @@ class APIKeyManager:
         logger.error("No API keys available!")
         return None, None
 
+    @staticmethod
+    def sync_usage_counters():
+        """
+        Copy the limiter counts into ``requests_this_minute``/``requests_today``.
+
+        The stored counters are only a report for the admin; selection reads
+        the limiters. Returns the number of keys updated.
+        """
+        from apps.ai_companion.models import GeminiAPIKey
+
+        now = timezone.now()
+        changed = []
+        for key in GeminiAPIKey.objects.only("id", "requests_today", "requests_this_minute", "last_used_at"):
+            this_minute = MINUTE_LIMITER.count(identity=key.pk)
+            today = DAILY_LIMITER.count(identity=key.pk)
+            if (this_minute, today) == (key.requests_this_minute, key.requests_today):
+                continue
+            key.requests_this_minute, key.requests_today = this_minute, today
+            if this_minute:
+                key.last_used_at = now
+            changed.append(key)
+        GeminiAPIKey.objects.bulk_update(changed, ["requests_this_minute", "requests_today", "last_used_at"])
+        return len(changed)
+
     @staticmethod
     def log_usage(key_obj, operation: str, success: bool, error_message: str = "",
                   response_time_ms: Optional[int] = None, user=None, company=None,
@@ -79,10 +140,6 @@ class APIKeyManager:
                 metadata=metadata or {}
             )
 
-        # Update key usage counters
-        if key_obj and success:
-            key_obj.increment_usage()
-
     @staticmethod
     def handle_rate_limit_error(key_obj, error_message: str):
         """Handle rate limit errors."""
@@ -0,0 +1,118 @@
+"""
+Persistent content-hash → vector cache for embedding models.
+
+Vectors live in a memory-mapped float32 file (``vectors.f32``, one row per
+entry) next to a file of fixed-size SHA-256 digests (``keys.bin``) in the
+same row order. Lookups hash the text and read the row straight from the
+map, so unchanged texts are never sent through the model again, across
+processes and restarts.
+
+Appends are serialized with an exclusive file lock and write the vectors
+before the keys; on open, rows without a matching key (an interrupted
+append) are truncated away. Other processes pick up appended rows the next
+time they miss.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from .file_lock import exclusive_file_lock
+
+DIGEST_SIZE = hashlib.sha256().digest_size
+
+
+class EmbeddingCache:
+    """Append-only on-disk embedding store keyed by text digest."""
+
+    def __init__(self, directory, dim: int, *, namespace: str = ""):
+        self.directory = Path(directory)
+        self.dim = int(dim)
+        self.namespace = namespace
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._vectors_path = self.directory / "vectors.f32"
+        self._keys_path = self.directory / "keys.bin"
+        self._lock_path = self.directory / ".lock"
+        self._rows: Dict[bytes, int] = {}
+        self._map: Optional[np.memmap] = None
+        self._lock = Lock()
+        with self._file_lock():
+            self._repair()
+            self._refresh()
+
+    def digest(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.namespace}\0{text}".encode("utf-8")).digest()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get_many(self, digests: Iterable[bytes]) -> Dict[bytes, np.ndarray]:
+        """Cached vectors for ``digests``; missing digests are left out."""
+        digests = list(digests)
+        with self._lock:
+            if any(digest not in self._rows for digest in digests):
+                # Another process may have appended them since we last looked
+                self._refresh()
+            found = {digest: self._rows[digest] for digest in digests if digest in self._rows}
+            if not found:
+                return {}
+            rows = np.fromiter(found.values(), dtype=np.int64, count=len(found))
+            vectors = np.array(self._map[rows], dtype=np.float32)
+        return dict(zip(found.keys(), vectors))
+
+    def put_many(self, digests: Sequence[bytes], vectors: np.ndarray) -> None:
+        """Append vectors for digests that are not stored yet."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(digests), self.dim)
+        with self._lock, self._file_lock():
+            self._refresh()
+            fresh: List[int] = []
+            seen = set()
+            for index, digest in enumerate(digests):
+                if digest not in self._rows and digest not in seen:
+                    seen.add(digest)
+                    fresh.append(index)
+            if not fresh:
+                return
+            with open(self._vectors_path, "ab") as handle:
+                handle.write(vectors[fresh].tobytes())
+                handle.flush()
+                os.fsync(handle.fileno())
+            with open(self._keys_path, "ab") as handle:
+                handle.write(b"".join(digests[index] for index in fresh))
+                handle.flush()
+            self._refresh()
+
+    def _file_lock(self):
+        return exclusive_file_lock(self._lock_path)
+
+    def _row_bytes(self) -> int:
+        return self.dim * np.dtype(np.float32).itemsize
+
+    def _repair(self) -> None:
+        """Drop trailing rows an interrupted append left without a key or vector."""
+        self._vectors_path.touch(exist_ok=True)
+        self._keys_path.touch(exist_ok=True)
+        vector_rows = self._vectors_path.stat().st_size // self._row_bytes()
+        key_rows = self._keys_path.stat().st_size // DIGEST_SIZE
+        rows = min(vector_rows, key_rows)
+        if self._vectors_path.stat().st_size != rows * self._row_bytes():
+            os.truncate(self._vectors_path, rows * self._row_bytes())
+        if self._keys_path.stat().st_size != rows * DIGEST_SIZE:
+            os.truncate(self._keys_path, rows * DIGEST_SIZE)
+
+    def _refresh(self) -> None:
+        key_rows = self._keys_path.stat().st_size // DIGEST_SIZE
+        if key_rows == len(self._rows) and (self._map is not None or key_rows == 0):
+            return
+        with open(self._keys_path, "rb") as handle:
+            handle.seek(len(self._rows) * DIGEST_SIZE)
+            data = handle.read((key_rows - len(self._rows)) * DIGEST_SIZE)
+        start = len(self._rows)
+        for offset in range(0, len(data), DIGEST_SIZE):
+            self._rows.setdefault(data[offset:offset + DIGEST_SIZE], start + offset // DIGEST_SIZE)
+        self._map = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(key_rows, self.dim))
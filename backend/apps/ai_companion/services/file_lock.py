@@ -0,0 +1,52 @@
+"""
+Cross-process exclusive file lock for the on-disk AI stores.
+
+Uses ``flock`` on Unix and ``msvcrt.locking`` on Windows. Where neither is
+available the lock is a no-op and only in-process locking applies.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:  # Unix
+    msvcrt = None
+
+
+def _acquire(handle) -> None:
+    if fcntl is not None:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+    elif msvcrt is not None:
+        handle.seek(0)
+        while True:
+            try:
+                # LK_LOCK retries for about ten seconds before giving up
+                msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+
+
+def _release(handle) -> None:
+    if fcntl is not None:
+        fcntl.flock(handle, fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def exclusive_file_lock(path):
+    """Hold an exclusive lock on ``path`` (created if missing) for the block."""
+    with open(path, "a") as handle:
+        _acquire(handle)
+        try:
+            yield
+        finally:
+            _release(handle)
@@ -12,6 +12,7 @@ from .ai_service_v2 import ai_service_v2
 
 
 PolicyIngestionResult = Tuple[int, int]
+POLICY_COLLECTION = "policies"
 
 
 def _definition_title(definition: MetadataDefinition) -> str:
@@ -178,9 +179,11 @@ def ingest_policy_corpus_for_company(*, company) -> PolicyIngestionResult:
     definitions = _policy_definitions_for_company(company)
     documents = _documents_from_definitions(definitions, company)
 
-    if documents and ai_service_v2.embeddings:
+    if ai_service_v2.embeddings:
+        # The manifest makes this a diff: unchanged policies are skipped and
+        # deleted or deactivated ones are removed from the index.
         index_name = str(getattr(company, "id", "global"))
-        ai_service_v2.index_documents_from_list(documents, index_name=index_name)
+        ai_service_v2.index_documents_from_list(documents, index_name=index_name, collection=POLICY_COLLECTION)
 
     guardrails_created = _sync_guardrail_tests(company=company, definitions=definitions)
     return len(documents), guardrails_created
@@ -1,7 +1,28 @@
+"""
+Sliding-window rate limiting on atomic counters.
+
+Each identity has one counter per fixed window (``window_seconds`` long,
+aligned on the epoch). A hit increments the current window's counter and is
+allowed when that count, plus the previous window's count weighted by how
+much of the previous window still overlaps the sliding window, stays within
+the limit. Because the increment is atomic and returns the new value,
+concurrent hits can never overshoot the limit; a rejected hit is given back
+with a decrement.
+
+The previous window is closed, so its count is read once per process and
+window and remembered; a check is then a single increment in the common
+case.
+
+``DailyQuotaLimiter`` is the calendar-day variant for provider quotas that
+reset at midnight: one counter per date, nothing carried over.
+"""
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass
-from datetime import timedelta
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from threading import Lock
+from typing import Callable, Dict, Optional, Tuple
 
 from django.core.cache import cache
 from django.utils import timezone
@@ -14,14 +35,79 @@ class RateLimitState:
     reset_at: timezone.datetime
 
 
+class CacheCounterStore:
+    """Counters in Django's cache; ``incr`` is atomic on Redis, Memcached and the local-memory cache."""
+
+    def incr(self, key: str, *, timeout: int) -> int:
+        try:
+            return cache.incr(key)
+        except ValueError:
+            if cache.add(key, 1, timeout):
+                return 1
+            # Another process created the counter in between
+            return cache.incr(key)
+
+    def decr(self, key: str) -> None:
+        try:
+            cache.decr(key)
+        except ValueError:
+            pass
+
+    def get(self, key: str) -> int:
+        return int(cache.get(key) or 0)
+
+
+class LocalCounterStore:
+    """In-process counters with the same semantics, for tests and single-process use."""
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._values: Dict[str, Tuple[int, float]] = {}
+        self._lock = Lock()
+
+    def _live(self, key: str) -> Optional[Tuple[int, float]]:
+        entry = self._values.get(key)
+        if entry is not None and entry[1] <= self.clock():
+            del self._values[key]
+            return None
+        return entry
+
+    def incr(self, key: str, *, timeout: int) -> int:
+        with self._lock:
+            entry = self._live(key)
+            value, expires_at = entry if entry else (0, self.clock() + timeout)
+            self._values[key] = (value + 1, expires_at)
+            return value + 1
+
+    def decr(self, key: str) -> None:
+        with self._lock:
+            entry = self._live(key)
+            if entry:
+                self._values[key] = (entry[0] - 1, entry[1])
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            entry = self._live(key)
+            return entry[0] if entry else 0
+
+
 class RateLimiter:
     """
-    Lightweight per-identity rate limiter backed by Django's cache.
-    Designed for small bursts (e.g. conversational actions) without adding
-    a new dependency.
+    Per-identity sliding-window rate limiter.
+
+    Counters live in Django's cache by default; pass a ``LocalCounterStore``
+    (and a ``clock``) to run without a shared cache.
     """
 
-    def __init__(self, *, prefix: str, limit: int, window_seconds: int):
+    def __init__(
+        self,
+        *,
+        prefix: str,
+        limit: int,
+        window_seconds: int,
+        store=None,
+        clock: Optional[Callable[[], float]] = None,
+    ):
         if limit <= 0:
             raise ValueError("limit must be positive")
         if window_seconds <= 0:
@@ -29,37 +115,109 @@ class RateLimiter:
         self.prefix = prefix
         self.limit = limit
         self.window_seconds = window_seconds
+        self.store = store if store is not None else CacheCounterStore()
+        self.clock = clock or getattr(self.store, "clock", time.time)
+        self._previous: Dict[str | int, Tuple[int, int]] = {}
+
+    def _cache_key(self, identity: str | int, window: int) -> str:
+        return f"ai:rl:{self.prefix}:{identity}:{window}"
+
+    def _previous_count(self, identity: str | int, window: int) -> int:
+        remembered = self._previous.get(identity)
+        if remembered is not None and remembered[0] == window - 1:
+            return remembered[1]
+        count = self.store.get(self._cache_key(identity, window - 1))
+        self._previous[identity] = (window - 1, count)
+        return count
+
+    def _timestamp(self, seconds: float) -> datetime:
+        return datetime.fromtimestamp(seconds, tz=dt_timezone.utc)
 
-    def _cache_key(self, identity: str | int) -> str:
-        return f"ai:rl:{self.prefix}:{identity}"
+    def _window(self, now: float) -> Tuple[int, float]:
+        window = int(now // self.window_seconds)
+        overlap = 1 - (now - window * self.window_seconds) / self.window_seconds
+        return window, overlap
 
-    def check(self, *, identity: str | int) -> RateLimitState:
+    def _window_end(self, window: int) -> float:
+        return (window + 1) * self.window_seconds
+
+    def _counter_timeout(self, window: int, now: float) -> int:
+        # The counter is still read as the previous window during the next one
+        return self.window_seconds * 2
+
+    def _retry_at(self, window: int, previous: int, count: int, limit: int) -> datetime:
+        """When the weighted previous window has decayed enough to admit one more hit."""
+        window_start = window * self.window_seconds
+        if previous and count < limit:
+            return self._timestamp(window_start + self.window_seconds * (1 - (limit - count - 1) / previous))
+        return self._timestamp(self._window_end(window))
+
+    def check(self, *, identity: str | int, limit: Optional[int] = None) -> RateLimitState:
         """
         Atomically mark a hit for the supplied identity and return the resulting status.
+
+        ``limit`` overrides the limiter's default for this identity.
         """
-        now = timezone.now()
-        cache_key = self._cache_key(identity)
-        record = cache.get(cache_key)
-
-        if not record or record.get("reset_at") <= now:
-            reset_at = now + timedelta(seconds=self.window_seconds)
-            cache.set(
-                cache_key,
-                {"count": 1, "reset_at": reset_at},
-                timeout=self.window_seconds,
-            )
-            return RateLimitState(True, max(self.limit - 1, 0), reset_at)
-
-        count = int(record.get("count", 0))
-        reset_at = record["reset_at"]
-        if count >= self.limit:
-            return RateLimitState(False, 0, reset_at)
-
-        count += 1
-        remaining = max(self.limit - count, 0)
-        cache.set(
-            cache_key,
-            {"count": count, "reset_at": reset_at},
-            timeout=max(int((reset_at - now).total_seconds()), 1),
-        )
-        return RateLimitState(True, remaining, reset_at)
+        limit = self.limit if limit is None else limit
+        now = self.clock()
+        window, overlap = self._window(now)
+        key = self._cache_key(identity, window)
+        count = self.store.incr(key, timeout=self._counter_timeout(window, now))
+        previous = self._previous_count(identity, window)
+        used = previous * overlap + count
+        if used > limit:
+            self.store.decr(key)
+            return RateLimitState(False, 0, self._retry_at(window, previous, count - 1, limit))
+        reset_at = self._timestamp(self._window_end(window))
+        return RateLimitState(True, max(int(limit - used), 0), reset_at)
+
+    def peek(self, *, identity: str | int, limit: Optional[int] = None) -> RateLimitState:
+        """The status a hit would get now, without recording one."""
+        limit = self.limit if limit is None else limit
+        window, overlap = self._window(self.clock())
+        count = self.store.get(self._cache_key(identity, window))
+        previous = self._previous_count(identity, window)
+        used = previous * overlap + count
+        if used + 1 > limit:
+            return RateLimitState(False, 0, self._retry_at(window, previous, count, limit))
+        reset_at = self._timestamp(self._window_end(window))
+        return RateLimitState(True, max(int(limit - used), 0), reset_at)
+
+    def release(self, *, identity: str | int) -> None:
+        """Give back a hit recorded by ``check`` in the current window."""
+        window, _ = self._window(self.clock())
+        self.store.decr(self._cache_key(identity, window))
+
+    def count(self, *, identity: str | int) -> int:
+        """Hits recorded in the current window."""
+        window, _ = self._window(self.clock())
+        return self.store.get(self._cache_key(identity, window))
+
+
+class DailyQuotaLimiter(RateLimiter):
+    """
+    Per-identity quota per calendar day in the current time zone.
+
+    Counters are keyed by date (``...:YYYY-MM-DD``) and expire at the next
+    midnight, so the full limit is available again at the start of each day
+    rather than 24 hours after each hit.
+    """
+
+    def __init__(self, *, prefix: str, limit: int, store=None, clock: Optional[Callable[[], float]] = None):
+        super().__init__(prefix=prefix, limit=limit, window_seconds=24 * 60 * 60, store=store, clock=clock)
+
+    def _cache_key(self, identity: str | int, window: int) -> str:
+        return f"ai:rl:{self.prefix}:{identity}:{date.fromordinal(window).isoformat()}"
+
+    def _previous_count(self, identity: str | int, window: int) -> int:
+        return 0
+
+    def _window(self, now: float) -> Tuple[int, float]:
+        return timezone.localtime(self._timestamp(now)).date().toordinal(), 0.0
+
+    def _window_end(self, window: int) -> float:
+        midnight = datetime.combine(date.fromordinal(window) + timedelta(days=1), datetime.min.time())
+        return timezone.make_aware(midnight).timestamp()
+
+    def _counter_timeout(self, window: int, now: float) -> int:
+        return max(int(self._window_end(window) - now), 1)
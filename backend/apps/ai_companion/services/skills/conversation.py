@@ -68,7 +68,7 @@ class ConversationSkill(BaseSkill):
 
             # Check if we have Gemini API keys available
             from apps.ai_companion.services.api_key_manager import APIKeyManager
-            has_gemini_keys = APIKeyManager.get_available_key() is not None
+            has_gemini_keys = APIKeyManager.get_available_key(reserve=False)[0] is not None
 
             response_text = None
 
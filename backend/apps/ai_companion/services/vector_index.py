@@ -0,0 +1,196 @@
+"""
+Incremental maintenance of the FAISS vector indexes.
+
+Every indexed document is identified by a key (its ``document_key``
+metadata, else its ``source`` plus ``definition_id``) and fingerprinted by a
+hash of its content and metadata. A manifest stored inside the index folder
+records, per document key, the fingerprint, the collection it was ingested
+with and the ids of its chunks. Syncing a batch of documents then:
+
+* skips documents whose fingerprint is unchanged (no split, no embedding);
+* re-splits changed documents, deletes chunks that disappeared and adds only
+  chunks that are new (chunk ids hash the key and the chunk text, so chunks
+  that merely moved keep their ids);
+* with a ``collection``, deletes documents of that collection that are no
+  longer in the batch.
+
+The index and its manifest are written to a temporary folder and swapped in
+with renames, under a file lock, so readers never load a half-written index.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from .file_lock import exclusive_file_lock
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def document_key(document: Document) -> str:
+    metadata = document.metadata or {}
+    if metadata.get("document_key"):
+        return str(metadata["document_key"])
+    parts = [str(metadata[name]) for name in ("source", "definition_id") if metadata.get(name) is not None]
+    if parts:
+        return ":".join(parts)
+    return f"content:{hashlib.sha256(document.page_content.encode('utf-8')).hexdigest()}"
+
+
+def document_fingerprint(document: Document) -> str:
+    payload = json.dumps(document.metadata or {}, sort_keys=True, default=str)
+    return hashlib.sha256(f"{payload}\0{document.page_content}".encode("utf-8")).hexdigest()
+
+
+def chunk_ids(key: str, chunks: Iterable[Document]) -> List[str]:
+    """Stable ids: the same text in the same document keeps its id wherever it moves."""
+    ids: List[str] = []
+    seen: Dict[str, int] = {}
+    for chunk in chunks:
+        digest = hashlib.sha256(f"{key}\0{chunk.page_content}".encode("utf-8")).hexdigest()
+        occurrence = seen.get(digest, 0)
+        seen[digest] = occurrence + 1
+        ids.append(digest if occurrence == 0 else f"{digest}-{occurrence}")
+    return ids
+
+
+@dataclass
+class IndexDiff:
+    added: int = 0
+    removed: int = 0
+    unchanged: int = 0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.removed)
+
+
+class IncrementalIndex:
+    """One FAISS index folder and its manifest."""
+
+    def __init__(self, path, embeddings: Embeddings, *, chunk_size: int = 1000, chunk_overlap: int = 200):
+        self.path = Path(path)
+        self.embeddings = embeddings
+        self.splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+    @property
+    def _previous_path(self) -> Path:
+        return self.path.with_name(f"{self.path.name}.old")
+
+    def _lock(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        return exclusive_file_lock(self.path.parent / f".{self.path.name}.lock")
+
+    def load(self) -> Tuple[Optional[FAISS], Dict[str, dict]]:
+        """The stored index and its manifest documents (empty when there is no index)."""
+        if not self.path.exists() and self._previous_path.exists():
+            # A save was interrupted between the two renames
+            os.replace(self._previous_path, self.path)
+        if not self.path.exists():
+            return None, {}
+        store = FAISS.load_local(str(self.path), self.embeddings, allow_dangerous_deserialization=True)
+        manifest_path = self.path / MANIFEST_NAME
+        if manifest_path.exists():
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            return store, manifest.get("documents", {})
+        return store, self._manifest_from_docstore(store)
+
+    @staticmethod
+    def _manifest_from_docstore(store: FAISS) -> Dict[str, dict]:
+        """
+        Manifest for an index built before manifests existed.
+
+        Chunks are grouped by document key; without a fingerprint each
+        document counts as changed on its next sync and is re-chunked.
+        """
+        documents: Dict[str, dict] = {}
+        for docstore_id in store.index_to_docstore_id.values():
+            chunk = store.docstore.search(docstore_id)
+            if not isinstance(chunk, Document):
+                continue
+            entry = documents.setdefault(document_key(chunk), {"fingerprint": None, "collection": None, "chunks": []})
+            entry["chunks"].append(docstore_id)
+        return documents
+
+    def sync(self, documents: Iterable[Document], *, collection: Optional[str] = None) -> Tuple[Optional[FAISS], IndexDiff]:
+        """Apply the difference between ``documents`` and the stored index, then save it."""
+        with self._lock():
+            store, manifest = self.load()
+            diff = IndexDiff()
+            to_add: List[Document] = []
+            add_ids: List[str] = []
+            to_remove: List[str] = []
+            seen_keys = set()
+            relabelled = False
+
+            for document in documents:
+                key = document_key(document)
+                if key in seen_keys:
+                    continue
+                seen_keys.add(key)
+                fingerprint = document_fingerprint(document)
+                entry = manifest.get(key)
+                if entry and entry.get("fingerprint") == fingerprint:
+                    if collection and entry.get("collection") != collection:
+                        entry["collection"] = collection
+                        relabelled = True
+                    diff.unchanged += 1
+                    continue
+
+                chunks = self.splitter.split_documents([document])
+                ids = chunk_ids(key, chunks)
+                old_ids = set(entry["chunks"]) if entry else set()
+                for chunk, chunk_id in zip(chunks, ids):
+                    if chunk_id not in old_ids:
+                        to_add.append(chunk)
+                        add_ids.append(chunk_id)
+                to_remove.extend(old_ids.difference(ids))
+                manifest[key] = {"fingerprint": fingerprint, "collection": collection, "chunks": ids}
+
+            if collection is not None:
+                for key in [key for key, entry in manifest.items() if entry.get("collection") == collection]:
+                    if key not in seen_keys:
+                        to_remove.extend(manifest.pop(key)["chunks"])
+
+            if store is not None and to_remove:
+                store.delete(to_remove)
+            if to_add:
+                if store is None:
+                    store = FAISS.from_documents(to_add, self.embeddings, ids=add_ids)
+                else:
+                    store.add_documents(to_add, ids=add_ids)
+            diff.added, diff.removed = len(add_ids), len(to_remove)
+
+            if store is not None and (diff.changed or relabelled or not (self.path / MANIFEST_NAME).exists()):
+                self._save(store, manifest)
+            return store, diff
+
+    def _save(self, store: FAISS, manifest: Dict[str, dict]) -> None:
+        staging = self.path.with_name(f"{self.path.name}.tmp-{os.getpid()}")
+        shutil.rmtree(staging, ignore_errors=True)
+        store.save_local(str(staging))
+        with open(staging / MANIFEST_NAME, "w", encoding="utf-8") as handle:
+            json.dump({"version": MANIFEST_VERSION, "documents": manifest}, handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+
+        previous = self._previous_path
+        shutil.rmtree(previous, ignore_errors=True)
+        if self.path.exists():
+            os.replace(self.path, previous)
+        os.replace(staging, self.path)
+        shutil.rmtree(previous, ignore_errors=True)
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import GeminiAPIKey
+
+
+@receiver(post_save, sender=GeminiAPIKey)
+@receiver(post_delete, sender=GeminiAPIKey)
+def invalidate_api_key_list(sender, **kwargs):
+    # Local import: the services package pulls in the orchestrator's optional dependencies
+    from .services.api_key_manager import APIKeyManager
+
+    APIKeyManager.invalidate_keys()
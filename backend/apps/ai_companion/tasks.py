@@ -830,24 +830,20 @@ def reset_api_key_daily_counters():
 @shared_task(name="apps.ai_companion.tasks.reset_api_key_minute_counters")
 def reset_api_key_minute_counters():
     """
-    Reset per-minute request counters for all Gemini API keys.
+    Refresh the per-minute and daily request counters of all Gemini API keys
+    from the rate limiters, which count requests as keys are handed out.
     Should run every minute.
     """
     try:
-        from .models import GeminiAPIKey
+        from .services.api_key_manager import APIKeyManager
 
-        keys = GeminiAPIKey.objects.all()
-        reset_count = 0
+        updated = APIKeyManager.sync_usage_counters()
 
-        for key in keys:
-            key.reset_minute_counter()
-            reset_count += 1
-
-        logger.debug(f"AI Companion: Reset minute counters for {reset_count} API key(s)")
-        return {"status": "ok", "keys_reset": reset_count}
+        logger.debug(f"AI Companion: Refreshed request counters for {updated} API key(s)")
+        return {"status": "ok", "keys_updated": updated}
 
     except Exception as exc:
-        logger.exception("AI Companion: Failed to reset minute counters: %s", exc)
+        logger.exception("AI Companion: Failed to refresh minute counters: %s", exc)
         return {"status": "error", "error": str(exc)}
 
 
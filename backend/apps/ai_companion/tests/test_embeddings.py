@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import importlib
+import shutil
+import sys
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from transformers import BertConfig, BertModel, BertTokenizer
+
+from apps.ai_companion.services.ai_service_v2 import TransformerEmbedding
+from apps.ai_companion.services import file_lock
+from apps.ai_companion.services.embedding_cache import EmbeddingCache
+
+
+class TransformerEmbeddingTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # A tiny randomly initialised BERT, so the tests run offline
+        cls.model_dir = tempfile.mkdtemp()
+        vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + [f"w{i}" for i in range(50)]
+        vocab_file = Path(cls.model_dir) / "vocab.txt"
+        vocab_file.write_text("\n".join(vocab))
+        BertTokenizer(str(vocab_file)).save_pretrained(cls.model_dir)
+        config = BertConfig(
+            vocab_size=len(vocab), hidden_size=16, num_hidden_layers=1, num_attention_heads=2, intermediate_size=32
+        )
+        BertModel(config).save_pretrained(cls.model_dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.model_dir, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, True)
+        self.texts = [" ".join(f"w{(i + j) % 50}" for j in range(1 + i % 12)) for i in range(40)]
+
+    def _count_forward_passes(self, embedding):
+        calls = []
+        handle = embedding.model.register_forward_hook(lambda *args: calls.append(1))
+        self.addCleanup(handle.remove)
+        return calls
+
+    def test_batched_vectors_match_single_text_vectors(self):
+        single = TransformerEmbedding(self.model_dir, batch_size=1)
+        batched = TransformerEmbedding(self.model_dir, batch_size=8)
+        calls = self._count_forward_passes(batched)
+
+        expected = np.array([single.embed_query(text) for text in self.texts])
+        vectors = np.array(batched.embed_documents(self.texts))
+
+        self.assertEqual(len(calls), 5)
+        np.testing.assert_allclose(vectors, expected, atol=1e-5)
+
+    def test_cached_texts_are_not_embedded_again(self):
+        first = TransformerEmbedding(self.model_dir, batch_size=8, cache_dir=self.cache_dir)
+        calls = self._count_forward_passes(first)
+        vectors = first.embed_array(self.texts + self.texts[:5])
+        self.assertEqual(len(calls), 5)
+
+        # A new process reuses the vectors on disk
+        second = TransformerEmbedding(self.model_dir, batch_size=8, cache_dir=self.cache_dir)
+        calls = self._count_forward_passes(second)
+        np.testing.assert_array_equal(second.embed_array(self.texts), vectors[:40])
+        self.assertEqual(calls, [])
+
+        second.embed_array(self.texts + ["w1 w2 w3 w4 w5 w6 w7 w8 w9 w10 w11 w12 w13"])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(second.cache), 41)
+
+    def test_interrupted_append_is_truncated_on_open(self):
+        cache = EmbeddingCache(self.cache_dir, dim=4)
+        digests = [cache.digest(text) for text in ("a", "b")]
+        cache.put_many(digests, np.arange(8, dtype=np.float32).reshape(2, 4))
+        with open(Path(self.cache_dir) / "vectors.f32", "ab") as handle:
+            handle.write(np.ones(6, dtype=np.float32).tobytes())
+
+        reopened = EmbeddingCache(self.cache_dir, dim=4)
+        reopened.put_many([reopened.digest("c")], np.full((1, 4), 9, dtype=np.float32))
+
+        found = reopened.get_many([reopened.digest(text) for text in ("a", "b", "c")])
+        np.testing.assert_array_equal(found[reopened.digest("b")], [4, 5, 6, 7])
+        np.testing.assert_array_equal(found[reopened.digest("c")], [9, 9, 9, 9])
+
+    def test_cache_works_without_a_posix_file_lock(self):
+        # As on Windows without msvcrt locking: the module must import and fall back
+        with mock.patch.dict(sys.modules, {"fcntl": None, "msvcrt": None}):
+            importlib.reload(file_lock)
+        self.addCleanup(importlib.reload, file_lock)
+        self.assertIsNone(file_lock.fcntl)
+
+        cache = EmbeddingCache(self.cache_dir, dim=2)
+        cache.put_many([cache.digest("a")], np.ones((1, 2), dtype=np.float32))
+        self.assertEqual(len(cache.get_many([cache.digest("a")])), 1)
+
+    def test_benchmark_command_reports_throughput(self):
+        out = StringIO()
+        call_command("benchmark_embeddings", model=self.model_dir, texts=20, batch_size=8, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn("before: one text per call", output)
+        self.assertIn("after: batched, warm cache", output)
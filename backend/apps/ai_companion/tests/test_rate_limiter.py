@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from apps.ai_companion.models import GeminiAPIKey
+from apps.ai_companion.services import api_key_manager
+from apps.ai_companion.services.api_key_manager import APIKeyManager
+from apps.ai_companion.services.rate_limiter import DailyQuotaLimiter, LocalCounterStore, RateLimiter
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class RateLimiterTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock(600.0)
+        self.limiter = RateLimiter(prefix="t", limit=3, window_seconds=60, store=LocalCounterStore(self.clock))
+
+    def test_hits_beyond_limit_are_rejected_and_not_counted(self):
+        states = [self.limiter.check(identity=1) for _ in range(5)]
+
+        self.assertEqual([state.allowed for state in states], [True, True, True, False, False])
+        self.assertEqual([state.remaining for state in states[:3]], [2, 1, 0])
+        self.assertEqual(self.limiter.count(identity=1), 3)
+        self.assertTrue(self.limiter.check(identity=2).allowed)
+
+    def test_previous_window_is_weighted_by_overlap(self):
+        for _ in range(3):
+            self.limiter.check(identity=1)
+
+        # Half of the previous window still overlaps: 1.5 hits carried over
+        self.clock.now = 690.0
+        self.assertTrue(self.limiter.check(identity=1).allowed)
+        rejected = self.limiter.check(identity=1)
+        self.assertFalse(rejected.allowed)
+        self.assertEqual(rejected.reset_at.timestamp(), 700.0)
+
+        self.clock.now = 700.0
+        self.assertTrue(self.limiter.peek(identity=1).allowed)
+        self.assertEqual(self.limiter.count(identity=1), 1)
+
+    def test_concurrent_hits_never_overshoot(self):
+        cache.clear()
+        limiter = RateLimiter(prefix="concurrent", limit=50, window_seconds=3600)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            states = list(pool.map(lambda _: limiter.check(identity="shared"), range(200)))
+
+        self.assertEqual(sum(state.allowed for state in states), 50)
+        self.assertEqual(limiter.count(identity="shared"), 50)
+
+    @override_settings(TIME_ZONE="Asia/Dhaka")
+    def test_daily_quota_resets_at_local_midnight(self):
+        # 2026-03-01 23:00 in Dhaka
+        clock = FakeClock(1772384400.0)
+        store = LocalCounterStore(clock)
+        limiter = DailyQuotaLimiter(prefix="day", limit=2, store=store, clock=clock)
+
+        self.assertTrue(limiter.check(identity=1).allowed)
+        self.assertTrue(limiter.check(identity=1).allowed)
+        rejected = limiter.check(identity=1)
+        self.assertFalse(rejected.allowed)
+        self.assertEqual(rejected.reset_at.timestamp(), 1772388000.0)
+        self.assertEqual(store.get("ai:rl:day:1:2026-03-01"), 2)
+
+        # A minute past midnight the whole quota is back, not only a weighted share
+        clock.now = 1772388060.0
+        self.assertTrue(limiter.check(identity=1).allowed)
+        self.assertTrue(limiter.check(identity=1).allowed)
+        self.assertEqual(limiter.count(identity=1), 2)
+        self.assertEqual(store.get("ai:rl:day:1:2026-03-01"), 0)
+
+
+@override_settings(GOOGLE_GEMINI_API_KEY="")
+class APIKeySelectionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.clock = FakeClock()
+        store = LocalCounterStore(self.clock)
+        for name, limiter in (
+            ("MINUTE_LIMITER", RateLimiter(prefix="m", limit=15, window_seconds=60, store=store)),
+            ("DAILY_LIMITER", DailyQuotaLimiter(prefix="d", limit=1500, store=store)),
+        ):
+            patcher = mock.patch.object(api_key_manager, name, limiter)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.primary = GeminiAPIKey.objects.create(name="Primary", api_key="key-primary", priority=0, minute_limit=2)
+        self.backup = GeminiAPIKey.objects.create(name="Backup", api_key="key-backup", priority=1, daily_limit=3)
+
+    def test_keys_rotate_on_limits_without_reading_or_writing_keys(self):
+        APIKeyManager.get_available_key()
+        # Only the configuration lookup hits the database once the key list is cached
+        with self.assertNumQueries(1):
+            selected = [APIKeyManager.get_available_key()[0]]
+        # ...plus marking the backup key once its daily limit is spent
+        with self.assertNumQueries(5):
+            selected += [APIKeyManager.get_available_key()[0] for _ in range(4)]
+
+        self.assertEqual(selected, ["key-primary", "key-backup", "key-backup", "key-backup", None])
+        self.primary.refresh_from_db()
+        self.assertEqual(self.primary.requests_this_minute, 0)
+
+    def test_exhausted_daily_limit_marks_key_and_refreshes_list(self):
+        self.clock.now += 59
+        for _ in range(6):
+            APIKeyManager.get_available_key()
+        self.backup.refresh_from_db()
+        self.assertEqual(self.backup.status, "rate_limited")
+
+        # The primary key's minute window rolls over; the backup key stays cooling down
+        self.clock.now += 120
+        self.assertEqual(APIKeyManager.get_available_key()[0], "key-primary")
+        self.assertEqual(APIKeyManager.get_available_key(reserve=False)[0], "key-primary")
+        self.assertEqual(APIKeyManager.get_available_key()[0], "key-primary")
+        self.assertEqual(APIKeyManager.get_available_key()[0], None)
+
+    def test_usage_counters_are_synced_from_limiters(self):
+        for _ in range(3):
+            APIKeyManager.get_available_key()
+
+        self.assertEqual(APIKeyManager.sync_usage_counters(), 2)
+
+        self.primary.refresh_from_db()
+        self.backup.refresh_from_db()
+        self.assertEqual((self.primary.requests_this_minute, self.primary.requests_today), (2, 2))
+        self.assertEqual((self.backup.requests_this_minute, self.backup.requests_today), (1, 1))
+        self.assertIsNotNone(self.primary.last_used_at)
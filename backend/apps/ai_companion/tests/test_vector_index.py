@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.test import SimpleTestCase
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from apps.ai_companion.services.vector_index import MANIFEST_NAME, IncrementalIndex
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    embedded: list = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+def _policy(definition_id, text):
+    return Document(page_content=text, metadata={"source": "metadata", "definition_id": definition_id})
+
+
+class IncrementalIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.embeddings = CountingEmbedding(size=8, embedded=[])
+        self.index = IncrementalIndex(self.root / "7" / "faiss", self.embeddings, chunk_size=40, chunk_overlap=0)
+
+    def _stored_texts(self):
+        store = FAISS.load_local(str(self.index.path), self.embeddings, allow_dangerous_deserialization=True)
+        return sorted(doc.page_content for doc in store.docstore._dict.values())
+
+    def test_only_changed_chunks_are_embedded(self):
+        travel = "Travel policy. Economy class only. Receipts within 30 days."
+        self.index.sync([_policy(1, travel), _policy(2, "Leave policy. Twenty days per year.")], collection="policies")
+        first_pass = len(self.embeddings.embedded)
+        self.embeddings.embedded.clear()
+
+        _, diff = self.index.sync(
+            [_policy(1, travel.replace("30 days", "14 days")), _policy(2, "Leave policy. Twenty days per year.")],
+            collection="policies",
+        )
+
+        self.assertGreater(first_pass, 2)
+        self.assertEqual(diff.unchanged, 1)
+        self.assertEqual((diff.added, diff.removed), (1, 1))
+        self.assertEqual(self.embeddings.embedded, ["Receipts within 14 days."])
+        self.assertNotIn("Receipts within 30 days.", self._stored_texts())
+
+    def test_unchanged_corpus_does_not_rewrite_the_index(self):
+        documents = [_policy(1, "Travel policy. Economy class only.")]
+        self.index.sync(documents, collection="policies")
+        saved_at = (self.index.path / MANIFEST_NAME).stat().st_mtime_ns
+        self.embeddings.embedded.clear()
+
+        _, diff = self.index.sync(documents, collection="policies")
+
+        self.assertFalse(diff.changed)
+        self.assertEqual(self.embeddings.embedded, [])
+        self.assertEqual((self.index.path / MANIFEST_NAME).stat().st_mtime_ns, saved_at)
+
+    def test_missing_documents_are_removed_within_their_collection(self):
+        self.index.sync([_policy(1, "Travel policy."), _policy(2, "Leave policy.")], collection="policies")
+        self.index.sync([Document(page_content="How to raise a PR.", metadata={"source": "Guide"})], collection="kb")
+
+        _, diff = self.index.sync([_policy(2, "Leave policy.")], collection="policies")
+
+        self.assertEqual(diff.removed, 1)
+        self.assertEqual(self._stored_texts(), ["How to raise a PR.", "Leave policy."])
+        manifest = json.loads((self.index.path / MANIFEST_NAME).read_text())
+        self.assertEqual(sorted(manifest["documents"]), ["Guide", "metadata:2"])
+
+    def test_moving_an_unchanged_document_to_another_collection_is_saved(self):
+        self.index.sync([_policy(1, "Travel policy.")], collection="drafts")
+
+        _, diff = self.index.sync([_policy(1, "Travel policy.")], collection="policies")
+
+        self.assertFalse(diff.changed)
+        manifest = json.loads((self.index.path / MANIFEST_NAME).read_text())
+        self.assertEqual(manifest["documents"]["metadata:1"]["collection"], "policies")
+        # No longer removed when its old collection is synced without it
+        self.index.sync([], collection="drafts")
+        self.assertEqual(self._stored_texts(), ["Travel policy."])
+
+    def test_index_without_manifest_is_adopted(self):
+        legacy = FAISS.from_documents([_policy(1, "Travel policy.")], self.embeddings)
+        legacy.save_local(str(self.index.path))
+
+        _, diff = self.index.sync([_policy(1, "Travel policy.")], collection="policies")
+
+        self.assertEqual((diff.added, diff.removed), (1, 1))
+        self.assertEqual(self._stored_texts(), ["Travel policy."])
+
+    def test_interrupted_swap_recovers_previous_index(self):
+        self.index.sync([_policy(1, "Travel policy.")])
+        self.index.path.rename(self.index.path.with_name("faiss.old"))
+
+        store, manifest = self.index.load()
+
+        self.assertIsNotNone(store)
+        self.assertEqual(list(manifest), ["metadata:1"])
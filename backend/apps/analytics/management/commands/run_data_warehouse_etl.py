@@ -19,6 +19,16 @@ class Command(BaseCommand):
             type=int,
             help='Optional company ID(s) to restrict the ETL run. Repeatable.',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Companies synced in parallel (default: ANALYTICS_ETL_WORKERS).',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Reload the daily facts from scratch instead of since the last high-water mark.',
+        )
 
     def handle(self, *args, **options):
         period = options['period']
@@ -31,7 +41,7 @@ class Command(BaseCommand):
             if missing:
                 raise CommandError(f"Companies not found or inactive: {', '.join(str(x) for x in missing)}")
 
-        result = run_warehouse_etl(period=period, companies=companies)
+        result = run_warehouse_etl(period=period, companies=companies, workers=options['workers'], full=options['full'])
         processed = result.get('processed_companies', 0)
         errors = result.get('errors', [])
 
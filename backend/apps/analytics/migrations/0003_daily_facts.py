@@ -0,0 +1,75 @@
+# Generated by Django 4.2.13 on 2026-10-16 22:21
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_rename_analytics__company_07286d_idx_dw_cashflow_company_5ba919_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WarehouseWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('company_id', models.IntegerField()),
+                ('source', models.CharField(choices=[('sales', 'Sales orders'), ('cash', 'Payments'), ('invoices', 'Invoices')], max_length=20)),
+                ('high_water_mark', models.DateTimeField(blank=True, null=True)),
+                ('state', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'dw_watermark',
+                'unique_together': {('company_id', 'source')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesProductDailyFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('company_id', models.IntegerField()),
+                ('product_id', models.IntegerField()),
+                ('product_name', models.CharField(blank=True, max_length=255)),
+                ('sales_total', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=20)),
+            ],
+            options={
+                'db_table': 'dw_fact_sales_product_daily',
+                'unique_together': {('company_id', 'day', 'product_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesCustomerDailyFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('company_id', models.IntegerField()),
+                ('customer_id', models.IntegerField()),
+                ('customer_name', models.CharField(blank=True, max_length=255)),
+                ('order_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=20)),
+            ],
+            options={
+                'db_table': 'dw_fact_sales_customer_daily',
+                'unique_together': {('company_id', 'day', 'customer_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CashDailyFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('company_id', models.IntegerField()),
+                ('payment_method', models.CharField(max_length=20)),
+                ('cash_in', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=20)),
+                ('cash_out', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=20)),
+            ],
+            options={
+                'db_table': 'dw_fact_cash_daily',
+                'unique_together': {('company_id', 'day', 'payment_method')},
+            },
+        ),
+    ]
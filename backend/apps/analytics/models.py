@@ -86,3 +86,77 @@ class CashflowSnapshot(models.Model):
 
     def __str__(self):
         return f"Cashflow Snapshot {self.snapshot_date} ({self.period})"
+
+
+class WarehouseWatermark(models.Model):
+    """
+    High-water mark of the source rows already loaded into the daily facts.
+    """
+    SOURCE_CHOICES = [
+        ('sales', 'Sales orders'),
+        ('cash', 'Payments'),
+        ('invoices', 'Invoices'),
+    ]
+
+    company_id = models.IntegerField()
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    high_water_mark = models.DateTimeField(null=True, blank=True)
+    state = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = 'analytics'
+        db_table = 'dw_watermark'
+        unique_together = ('company_id', 'source')
+
+    def __str__(self):
+        return f"{self.source} @ {self.high_water_mark}"
+
+
+class SalesCustomerDailyFact(models.Model):
+    day = models.DateField()
+    company_id = models.IntegerField()
+    customer_id = models.IntegerField()
+    customer_name = models.CharField(max_length=255, blank=True)
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal('0'))
+
+    class Meta:
+        app_label = 'analytics'
+        db_table = 'dw_fact_sales_customer_daily'
+        unique_together = ('company_id', 'day', 'customer_id')
+
+    def __str__(self):
+        return f"Customer {self.customer_id} sales {self.day}"
+
+
+class SalesProductDailyFact(models.Model):
+    day = models.DateField()
+    company_id = models.IntegerField()
+    product_id = models.IntegerField()
+    product_name = models.CharField(max_length=255, blank=True)
+    sales_total = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal('0'))
+
+    class Meta:
+        app_label = 'analytics'
+        db_table = 'dw_fact_sales_product_daily'
+        unique_together = ('company_id', 'day', 'product_id')
+
+    def __str__(self):
+        return f"Product {self.product_id} sales {self.day}"
+
+
+class CashDailyFact(models.Model):
+    day = models.DateField()
+    company_id = models.IntegerField()
+    payment_method = models.CharField(max_length=20)
+    cash_in = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal('0'))
+    cash_out = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal('0'))
+
+    class Meta:
+        app_label = 'analytics'
+        db_table = 'dw_fact_cash_daily'
+        unique_together = ('company_id', 'day', 'payment_method')
+
+    def __str__(self):
+        return f"{self.payment_method} cash {self.day}"
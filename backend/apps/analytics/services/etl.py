@@ -1,20 +1,23 @@
 from __future__ import annotations
 
 import logging
-from collections import defaultdict
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import date, timedelta
 from decimal import Decimal, ROUND_HALF_UP
 from typing import Iterable
 
+from django.conf import settings
+from django.core.cache import cache
 from django.db import connections, transaction
-from django.db.models import Case, DecimalField, F, Q, Sum, When
-from django.db.models.functions import TruncDate
+from django.db.models import Case, Count, DecimalField, F, Max, Q, Sum, When
 from django.utils import timezone
 
 from apps.companies.models import Company
 from apps.finance.models import Invoice, Payment
-from apps.sales.models import SalesOrder
+from apps.sales.models import SalesOrder, SalesOrderLine
 from apps.analytics import models as warehouse_models
 
 logger = logging.getLogger(__name__)
@@ -28,6 +31,21 @@ PERIOD_DAY_MAPPING = {
     '90d': 90,
 }
 
+# Snapshots the nightly run rolls up from the daily facts
+ROLLUP_PERIODS = ('7d', '30d', '90d', 'quarter')
+
+CASH_STATUSES = ['POSTED', 'RECONCILED']
+FACT_BATCH_SIZE = 1000
+ETL_WORKERS = 4
+# Rows changed this long before a high-water mark are re-read on the next load
+WATERMARK_OVERLAP = timedelta(minutes=10)
+# Fact loads of one company are serialized: the nightly, weekly and dashboard
+# runs would otherwise delete and insert the same days concurrently
+FACT_LOAD_LOCK_KEY = 'analytics:etl:facts:{company_id}'
+FACT_LOAD_LOCK_TTL = 60 * 60
+FACT_LOAD_LOCK_WAIT = 15 * 60
+FACT_LOAD_LOCK_POLL = 1
+
 
 def get_warehouse_alias(fallback: str = 'default') -> str:
     return 'data_warehouse' if 'data_warehouse' in connections.databases else fallback
@@ -90,226 +108,289 @@ def _serialize_timeseries(rows: Iterable[dict], date_key: str = 'date', value_ke
     return series
 
 
-def sync_company_snapshot(company: Company, period: str = '30d', snapshot_date: date | None = None) -> dict:
+def _source_changes(queryset, mark: warehouse_models.WarehouseWatermark | None, date_field: str | None = None):
     """
-    Build analytics snapshots for a single company and persist them
-    into the data warehouse schema.
+    Rows of ``queryset`` changed since ``mark`` and the new high-water mark.
+
+    Rows changed up to ``WATERMARK_OVERLAP`` before the mark are read again,
+    so rows committed late by long transactions are not skipped; reloading a
+    day is idempotent. Returns ``(days, high_water_mark)`` where ``days`` is
+    the set of affected ``date_field`` values, ``None`` meaning every day (no
+    mark yet, or any change when there is no ``date_field``), or an empty set
+    when nothing changed.
     """
-    snapshot_at = snapshot_date or timezone.now().date()
-    pr = resolve_period(period, reference=snapshot_at)
+    since = mark.high_water_mark if mark else None
+    changed = queryset.filter(updated_at__gt=since - WATERMARK_OVERLAP) if since else queryset
+    high_water_mark = changed.aggregate(last=Max('updated_at'))['last']
+    if since is None:
+        return None, high_water_mark
+    if high_water_mark is None:
+        return set(), since
+    if date_field is None:
+        return None, max(high_water_mark, since)
+    days = set(changed.order_by().values_list(date_field, flat=True).distinct())
+    return days, max(high_water_mark, since)
+
+
+def _load_sales_facts(company: Company, warehouse_db: str, days: set | None) -> int:
+    orders = SalesOrder.objects.filter(company=company)
+    lines = SalesOrderLine.objects.filter(order__company=company)
+    customer_facts = warehouse_models.SalesCustomerDailyFact.objects.using(warehouse_db).filter(company_id=company.id)
+    product_facts = warehouse_models.SalesProductDailyFact.objects.using(warehouse_db).filter(company_id=company.id)
+    if days is not None:
+        orders = orders.filter(order_date__in=days)
+        lines = lines.filter(order__order_date__in=days)
+        customer_facts = customer_facts.filter(day__in=days)
+        product_facts = product_facts.filter(day__in=days)
+
+    customer_rows = [
+        warehouse_models.SalesCustomerDailyFact(
+            company_id=company.id, day=day, customer_id=customer_id, customer_name=name or '',
+            order_count=count, revenue=decimal_or_zero(revenue),
+        )
+        for day, customer_id, name, count, revenue in orders.order_by().values('order_date', 'customer_id').annotate(
+            count=Count('id'), revenue=Sum('total_amount'),
+        ).values_list('order_date', 'customer_id', 'customer__name', 'count', 'revenue')
+    ]
+    product_rows = [
+        warehouse_models.SalesProductDailyFact(
+            company_id=company.id, day=day, product_id=product_id, product_name=name or '',
+            sales_total=decimal_or_zero(total),
+        )
+        for day, product_id, name, total in lines.order_by().values('order__order_date', 'product_id').annotate(
+            total=Sum('line_total'),
+        ).values_list('order__order_date', 'product_id', 'product__name', 'total')
+    ]
+    customer_facts.delete()
+    product_facts.delete()
+    warehouse_models.SalesCustomerDailyFact.objects.using(warehouse_db).bulk_create(customer_rows, batch_size=FACT_BATCH_SIZE)
+    warehouse_models.SalesProductDailyFact.objects.using(warehouse_db).bulk_create(product_rows, batch_size=FACT_BATCH_SIZE)
+    return len(customer_rows) + len(product_rows)
+
+
+def _load_cash_facts(company: Company, warehouse_db: str, days: set | None) -> int:
+    payments = Payment.objects.filter(company=company, status__in=CASH_STATUSES)
+    facts = warehouse_models.CashDailyFact.objects.using(warehouse_db).filter(company_id=company.id)
+    if days is not None:
+        payments = payments.filter(payment_date__in=days)
+        facts = facts.filter(day__in=days)
+
+    money = DecimalField(max_digits=20, decimal_places=2)
+    rows = [
+        warehouse_models.CashDailyFact(
+            company_id=company.id, day=day, payment_method=method,
+            cash_in=decimal_or_zero(inbound), cash_out=decimal_or_zero(outbound),
+        )
+        for day, method, inbound, outbound in payments.order_by().values('payment_date', 'payment_method').annotate(
+            inbound=Sum(Case(When(payment_type='RECEIPT', then=F('amount')), default=Decimal('0'), output_field=money)),
+            outbound=Sum(Case(When(payment_type='PAYMENT', then=F('amount')), default=Decimal('0'), output_field=money)),
+        ).values_list('payment_date', 'payment_method', 'inbound', 'outbound')
+    ]
+    facts.delete()
+    warehouse_models.CashDailyFact.objects.using(warehouse_db).bulk_create(rows, batch_size=FACT_BATCH_SIZE)
+    return len(rows)
+
 
-    sales_orders = SalesOrder.objects.filter(
-        company=company,
-        order_date__range=(pr.start, pr.end),
+def _open_balances(company: Company) -> dict:
+    balances = Invoice.objects.filter(company=company, status__in=['POSTED', 'PARTIAL']).aggregate(
+        receivables_due=Sum('total_amount', filter=Q(invoice_type='AR')),
+        receivables_paid=Sum('paid_amount', filter=Q(invoice_type='AR')),
+        payables_due=Sum('total_amount', filter=Q(invoice_type='AP')),
+        payables_paid=Sum('paid_amount', filter=Q(invoice_type='AP')),
     )
+    return {
+        'receivables_balance': str(decimal_or_zero(balances['receivables_due']) - decimal_or_zero(balances['receivables_paid'])),
+        'payables_balance': str(decimal_or_zero(balances['payables_due']) - decimal_or_zero(balances['payables_paid'])),
+    }
 
-    total_orders = sales_orders.count()
-    revenue = decimal_or_zero(sales_orders.aggregate(total=Sum('total_amount'))['total'])
-    avg_order_value = revenue / total_orders if total_orders else Decimal('0')
 
-    db_alias = sales_orders.db
-    vendor = connections[db_alias].vendor
+@contextmanager
+def _fact_load_lock(company: Company):
+    """Hold the company's fact load lock, waiting up to FACT_LOAD_LOCK_WAIT for another run to finish."""
+    key = FACT_LOAD_LOCK_KEY.format(company_id=company.id)
+    deadline = time.monotonic() + FACT_LOAD_LOCK_WAIT
+    while not cache.add(key, timezone.now().isoformat(), FACT_LOAD_LOCK_TTL):
+        if time.monotonic() >= deadline:
+            raise RuntimeError(f"Facts of company {company.code} are still being loaded by another run.")
+        time.sleep(FACT_LOAD_LOCK_POLL)
+    try:
+        yield
+    finally:
+        cache.delete(key)
 
-    if vendor == 'sqlite':
-        sales_trend_qs = (
-            sales_orders
-            .values('order_date')
-            .annotate(total=Sum('total_amount'))
-            .order_by('order_date')
-        )
-        sales_trend = _serialize_timeseries(sales_trend_qs, date_key='order_date', value_keys=['total'])
-    else:
-        sales_trend_qs = (
-            sales_orders
-            .annotate(day=TruncDate('order_date'))
-            .values('day')
-            .annotate(total=Sum('total_amount'))
-            .order_by('day')
-        )
-        sales_trend = _serialize_timeseries(sales_trend_qs, date_key='day', value_keys=['total'])
 
-    top_customers_qs = sales_orders.values('customer_id').annotate(
-        customer_name=F('customer__name'),
-        total=Sum('total_amount'),
-    ).order_by('-total')[:5]
-    top_customers = [
-        {
-            'customer_id': row['customer_id'],
-            'name': row['customer_name'] or 'Unknown',
-            'total': float(row['total'] or 0),
-        }
-        for row in top_customers_qs
-    ]
+def load_company_facts(company: Company, full: bool = False) -> dict:
+    """
+    Bring a company's daily facts up to date with its OLTP rows.
 
-    top_products_qs = sales_orders.values(
-        'lines__product_id',
-        'lines__product__name',
-    ).annotate(
-        total=Sum('lines__line_total'),
-    ).order_by('-total')[:5]
-    top_products = [
-        {
-            'product_id': row['lines__product_id'],
-            'name': row['lines__product__name'] or 'Unnamed Product',
-            'total': float(row['total'] or 0),
-        }
-        for row in top_products_qs
-    ]
+    Only the days of sales orders and payments changed since the last load
+    are reloaded, and open invoice balances are re-read only when an invoice
+    changed. Rows that were deleted or re-dated, and order lines edited
+    without saving their order, are missed by that; ``full`` reloads
+    everything and is scheduled weekly (``populate-data-warehouse-full``).
 
-    payments = Payment.objects.filter(
-        company=company,
-        payment_date__range=(pr.start, pr.end),
-        status__in=['POSTED', 'RECONCILED'],
-    )
+    The load runs under the company's fact load lock and reads the
+    watermarks once it holds it, so an overlapping run waits and then only
+    loads what changed after this one.
 
-    cash_in = decimal_or_zero(
-        payments.filter(payment_type='RECEIPT').aggregate(total=Sum('amount'))['total']
-    )
-    cash_out = decimal_or_zero(
-        payments.filter(payment_type='PAYMENT').aggregate(total=Sum('amount'))['total']
+    Returns:
+        Dict with the fact rows written and the open invoice balances
+    """
+    warehouse_db = get_warehouse_alias(company._state.db or 'default')
+    with _fact_load_lock(company):
+        marks = {
+            mark.source: mark
+            for mark in warehouse_models.WarehouseWatermark.objects.using(warehouse_db).filter(company_id=company.id)
+        }
+        if full:
+            marks = {}
+
+        sales_days, sales_mark = _source_changes(SalesOrder.objects.filter(company=company), marks.get('sales'), 'order_date')
+        cash_days, cash_mark = _source_changes(Payment.objects.filter(company=company), marks.get('cash'), 'payment_date')
+        invoices_changed, invoices_mark = _source_changes(Invoice.objects.filter(company=company), marks.get('invoices'))
+        if 'invoices' in marks and invoices_changed == set():
+            balances = marks['invoices'].state
+        else:
+            balances = _open_balances(company)
+
+        processed = 0
+        with transaction.atomic(using=warehouse_db):
+            if sales_days is None or sales_days:
+                processed += _load_sales_facts(company, warehouse_db, sales_days)
+            if cash_days is None or cash_days:
+                processed += _load_cash_facts(company, warehouse_db, cash_days)
+            for source, high_water_mark, state in (
+                ('sales', sales_mark, {}),
+                ('cash', cash_mark, {}),
+                ('invoices', invoices_mark, balances),
+            ):
+                warehouse_models.WarehouseWatermark.objects.using(warehouse_db).update_or_create(
+                    company_id=company.id,
+                    source=source,
+                    defaults={'high_water_mark': high_water_mark, 'state': state},
+                )
+
+    return {'processed_records': processed, 'balances': balances}
+
+
+def _rollup_snapshot(company: Company, pr: PeriodRange, snapshot_at: date, balances: dict, warehouse_db: str) -> int:
+    window = {'company_id': company.id, 'day__range': (pr.start, pr.end)}
+    customer_facts = warehouse_models.SalesCustomerDailyFact.objects.using(warehouse_db).filter(**window).order_by()
+    product_facts = warehouse_models.SalesProductDailyFact.objects.using(warehouse_db).filter(**window).order_by()
+    cash_facts = warehouse_models.CashDailyFact.objects.using(warehouse_db).filter(**window).order_by()
+
+    totals = customer_facts.aggregate(orders=Sum('order_count'), revenue=Sum('revenue'))
+    total_orders = totals['orders'] or 0
+    revenue = decimal_or_zero(totals['revenue'])
+    avg_order_value = revenue / total_orders if total_orders else Decimal('0')
+    sales_trend = _serialize_timeseries(
+        customer_facts.values('day').annotate(total=Sum('revenue')).order_by('day'),
+        date_key='day',
+        value_keys=['total'],
     )
-    net_cash = cash_in - cash_out
-
-    cash_trend_daily = defaultdict(lambda: {'cash_in': Decimal('0'), 'cash_out': Decimal('0')})
-    payments_vendor = connections[payments.db].vendor
+    top_customers = [
+        {'customer_id': customer_id, 'name': name or 'Unknown', 'total': float(total or 0)}
+        for customer_id, name, total in customer_facts.values('customer_id').annotate(
+            name=Max('customer_name'), total=Sum('revenue'),
+        ).order_by('-total').values_list('customer_id', 'name', 'total')[:5]
+    ]
+    top_products = [
+        {'product_id': product_id, 'name': name or 'Unnamed Product', 'total': float(total or 0)}
+        for product_id, name, total in product_facts.values('product_id').annotate(
+            name=Max('product_name'), total=Sum('sales_total'),
+        ).order_by('-total').values_list('product_id', 'name', 'total')[:5]
+    ]
 
-    if payments_vendor == 'sqlite':
-        payments_annotated = (
-            payments
-            .values('payment_date', 'payment_type')
-            .annotate(total=Sum('amount'))
-            .order_by('payment_date')
-        )
-    else:
-        payments_annotated = (
-            payments
-            .annotate(day=TruncDate('payment_date'))
-            .values('day', 'payment_type')
-            .annotate(total=Sum('amount'))
-            .order_by('day')
-        )
-    for row in payments_annotated:
-        day_key = row.get('day') or row.get('payment_date')
-        bucket = cash_trend_daily[day_key]
-        amount = decimal_or_zero(row['total'])
-        if row['payment_type'] == 'RECEIPT':
-            bucket['cash_in'] += amount
-        else:
-            bucket['cash_out'] += amount
+    cash = cash_facts.aggregate(cash_in=Sum('cash_in'), cash_out=Sum('cash_out'))
+    cash_in = decimal_or_zero(cash['cash_in'])
+    cash_out = decimal_or_zero(cash['cash_out'])
     cash_trend = [
         {
             'date': day.strftime('%Y-%m-%d'),
-            'cash_in': float(data['cash_in']),
-            'cash_out': float(data['cash_out']),
-            'net': float(data['cash_in'] - data['cash_out']),
+            'cash_in': float(inbound or 0),
+            'cash_out': float(outbound or 0),
+            'net': float(decimal_or_zero(inbound) - decimal_or_zero(outbound)),
         }
-        for day, data in sorted(cash_trend_daily.items())
+        for day, inbound, outbound in cash_facts.values('day').annotate(
+            inbound=Sum('cash_in'), outbound=Sum('cash_out'),
+        ).order_by('day').values_list('day', 'inbound', 'outbound')
     ]
-
-    balance_fields = ['POSTED', 'PARTIAL']
-    receivables = Invoice.objects.filter(
-        company=company,
-        invoice_type='AR',
-        status__in=balance_fields,
-    ).aggregate(
-        due=Sum('total_amount'),
-        paid=Sum('paid_amount'),
-    )
-    payables = Invoice.objects.filter(
-        company=company,
-        invoice_type='AP',
-        status__in=balance_fields,
-    ).aggregate(
-        due=Sum('total_amount'),
-        paid=Sum('paid_amount'),
-    )
-
-    receivables_balance = decimal_or_zero(receivables['due']) - decimal_or_zero(receivables['paid'])
-    payables_balance = decimal_or_zero(payables['due']) - decimal_or_zero(payables['paid'])
-
-    payment_method_summary = payments.values('payment_method').annotate(
-        inbound=Sum(
-            Case(
-                When(payment_type='RECEIPT', then=F('amount')),
-                default=Decimal('0'),
-                output_field=DecimalField(max_digits=20, decimal_places=2),
-            )
-        ),
-        outbound=Sum(
-            Case(
-                When(payment_type='PAYMENT', then=F('amount')),
-                default=Decimal('0'),
-                output_field=DecimalField(max_digits=20, decimal_places=2),
-            )
-        ),
-    )
     bank_balances = [
         {
-            'method': row['payment_method'],
-            'cash_in': float(row['inbound'] or 0),
-            'cash_out': float(row['outbound'] or 0),
-            'net': float(decimal_or_zero(row['inbound']) - decimal_or_zero(row['outbound'])),
+            'method': method,
+            'cash_in': float(inbound or 0),
+            'cash_out': float(outbound or 0),
+            'net': float(decimal_or_zero(inbound) - decimal_or_zero(outbound)),
         }
-        for row in payment_method_summary
+        for method, inbound, outbound in cash_facts.values('payment_method').annotate(
+            inbound=Sum('cash_in'), outbound=Sum('cash_out'),
+        ).values_list('payment_method', 'inbound', 'outbound')
     ]
 
-    warehouse_db = get_warehouse_alias(company._state.db or 'default')
-    defaults_sales = {
-        'timeframe_start': pr.start,
-        'timeframe_end': pr.end,
-        'total_orders': total_orders,
-        'total_revenue': _format_money(revenue),
-        'avg_order_value': _format_money(avg_order_value),
-        'sales_trend': sales_trend,
-        'top_customers': top_customers,
-        'top_products': top_products,
-        'metadata': {
-            'period_label': pr.label,
-            'generated_at': timezone.now().isoformat(),
-        },
+    metadata = {
+        'period_label': pr.label,
+        'generated_at': timezone.now().isoformat(),
     }
-
-    defaults_cash = {
-        'timeframe_start': pr.start,
-        'timeframe_end': pr.end,
-        'cash_in': _format_money(cash_in),
-        'cash_out': _format_money(cash_out),
-        'net_cash': _format_money(net_cash),
-        'cash_trend': cash_trend,
-        'receivables_balance': _format_money(receivables_balance),
-        'payables_balance': _format_money(payables_balance),
-        'bank_balances': bank_balances,
-        'metadata': {
-            'period_label': pr.label,
-            'generated_at': timezone.now().isoformat(),
+    company_fields = {'company_code': company.code, 'company_name': company.name}
+    warehouse_models.SalesPerformanceSnapshot.objects.using(warehouse_db).update_or_create(
+        snapshot_date=snapshot_at,
+        period=pr.label,
+        company_id=company.id,
+        defaults={
+            'timeframe_start': pr.start,
+            'timeframe_end': pr.end,
+            'total_orders': total_orders,
+            'total_revenue': _format_money(revenue),
+            'avg_order_value': _format_money(avg_order_value),
+            'sales_trend': sales_trend,
+            'top_customers': top_customers,
+            'top_products': top_products,
+            'metadata': metadata,
+            **company_fields,
         },
-    }
+    )
+    warehouse_models.CashflowSnapshot.objects.using(warehouse_db).update_or_create(
+        snapshot_date=snapshot_at,
+        period=pr.label,
+        company_id=company.id,
+        defaults={
+            'timeframe_start': pr.start,
+            'timeframe_end': pr.end,
+            'cash_in': _format_money(cash_in),
+            'cash_out': _format_money(cash_out),
+            'net_cash': _format_money(cash_in - cash_out),
+            'cash_trend': cash_trend,
+            'receivables_balance': _format_money(decimal_or_zero(balances.get('receivables_balance'))),
+            'payables_balance': _format_money(decimal_or_zero(balances.get('payables_balance'))),
+            'bank_balances': bank_balances,
+            'metadata': metadata,
+            **company_fields,
+        },
+    )
+    return 2
 
-    processed = 0
-    with transaction.atomic(using=warehouse_db):
-        warehouse_models.SalesPerformanceSnapshot.objects.using(warehouse_db).update_or_create(
-            snapshot_date=snapshot_at,
-            period=pr.label,
-            company_id=company.id,
-            defaults={
-                **defaults_sales,
-                'company_code': company.code,
-                'company_name': company.name,
-            },
-        )
-        processed += 1
 
-        warehouse_models.CashflowSnapshot.objects.using(warehouse_db).update_or_create(
-            snapshot_date=snapshot_at,
-            period=pr.label,
-            company_id=company.id,
-            defaults={
-                **defaults_cash,
-                'company_code': company.code,
-                'company_name': company.name,
-            },
-        )
-        processed += 1
+def sync_company_snapshots(
+    company: Company,
+    periods: Iterable[str] = ROLLUP_PERIODS,
+    snapshot_date: date | None = None,
+    full: bool = False,
+) -> dict:
+    """
+    Load a company's daily facts incrementally, then roll them up into
+    one sales and one cash flow snapshot per period.
+    """
+    snapshot_at = snapshot_date or timezone.now().date()
+    warehouse_db = get_warehouse_alias(company._state.db or 'default')
+    facts = load_company_facts(company, full=full)
+
+    labels = []
+    processed = facts['processed_records']
+    with transaction.atomic(using=warehouse_db):
+        for period in periods:
+            pr = resolve_period(period, reference=snapshot_at)
+            processed += _rollup_snapshot(company, pr, snapshot_at, facts['balances'], warehouse_db)
+            labels.append(pr.label)
 
         warehouse_models.WarehouseRunLog.objects.using(warehouse_db).create(
             company_id=company.id,
@@ -318,44 +399,78 @@ def sync_company_snapshot(company: Company, period: str = '30d', snapshot_date:
             run_type='adhoc' if snapshot_date else 'nightly',
             status='SUCCESS',
             processed_records=processed,
-            message=f'ETL complete for period {pr.label}',
+            message=f"ETL complete for period {', '.join(labels)}",
         )
 
     return {
         'company_id': company.id,
         'company_code': company.code,
-        'period': pr.label,
+        'period': labels[0] if len(labels) == 1 else labels,
         'processed_records': processed,
         'snapshot_date': snapshot_at,
     }
 
 
-def run_warehouse_etl(period: str = '30d', companies: Iterable[Company] | None = None) -> dict:
+def sync_company_snapshot(company: Company, period: str = '30d', snapshot_date: date | None = None) -> dict:
+    """
+    Build analytics snapshots for a single company and persist them
+    into the data warehouse schema.
+    """
+    return sync_company_snapshots(company, periods=[period], snapshot_date=snapshot_date)
+
+
+def _sync_company(company: Company, periods: list, full: bool) -> dict:
+    try:
+        return sync_company_snapshots(company=company, periods=periods, full=full)
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.exception("Warehouse ETL failed for company %s", company.id)
+        warehouse_db = get_warehouse_alias(company._state.db or 'default')
+        warehouse_models.WarehouseRunLog.objects.using(warehouse_db).create(
+            company_id=company.id,
+            company_code=company.code,
+            company_name=company.name,
+            run_type='nightly',
+            status='FAILED',
+            processed_records=0,
+            message=str(exc),
+        )
+        return {'company_id': company.id, 'error': str(exc)}
+
+
+def _sync_company_in_thread(company: Company, periods: list, full: bool) -> dict:
+    try:
+        return _sync_company(company, periods, full)
+    finally:
+        # Worker threads open their own connections; don't leave them behind
+        connections.close_all()
+
+
+def run_warehouse_etl(
+    period: str = '30d',
+    companies: Iterable[Company] | None = None,
+    periods: Iterable[str] | None = None,
+    workers: int | None = None,
+    full: bool = False,
+) -> dict:
     """
     Run the nightly ETL sync across all active companies.
+
+    Companies are synced in parallel on ``workers`` threads (default
+    ``ANALYTICS_ETL_WORKERS``); each loads its facts once and builds a
+    snapshot for every period in ``periods`` (default: just ``period``).
     """
-    companies_qs = companies or Company.objects.filter(is_active=True)
-    results = []
-    errors = []
-
-    for company in companies_qs:
-        try:
-            result = sync_company_snapshot(company=company, period=period)
-            results.append(result)
-        except Exception as exc:  # pylint: disable=broad-except
-            logger.exception("Warehouse ETL failed for company %s", company.id)
-            warehouse_db = get_warehouse_alias(company._state.db or 'default')
-            warehouse_models.WarehouseRunLog.objects.using(warehouse_db).create(
-                company_id=company.id,
-                company_code=company.code,
-                company_name=company.name,
-                run_type='nightly',
-                status='FAILED',
-                processed_records=0,
-                message=str(exc),
-            )
-            errors.append({'company_id': company.id, 'error': str(exc)})
+    companies = list(companies or Company.objects.filter(is_active=True))
+    periods = list(periods or [period])
+    workers = min(workers or getattr(settings, 'ANALYTICS_ETL_WORKERS', ETL_WORKERS), len(companies))
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            outcomes = list(executor.map(lambda company: _sync_company_in_thread(company, periods, full), companies))
+    else:
+        outcomes = [_sync_company(company, periods, full) for company in companies]
 
+    results = [outcome for outcome in outcomes if 'error' not in outcome]
+    errors = [outcome for outcome in outcomes if 'error' in outcome]
     return {
         'success': len(errors) == 0,
         'processed_companies': len(results),
@@ -1,11 +1,15 @@
 from celery import shared_task
 
-from .services.etl import run_warehouse_etl
+from .services.etl import ROLLUP_PERIODS, run_warehouse_etl
 
 
 @shared_task(name='apps.analytics.tasks.populate_data_warehouse')
-def populate_data_warehouse(period: str = '30d'):
+def populate_data_warehouse(period: str | None = None, full: bool = False):
     """
     Nightly ETL job that refreshes the analytics warehouse.
+
+    Without a period every rollup period (7d, 30d, 90d, quarter) is built.
+    Nightly runs are incremental; the weekly ``full`` run reloads every fact
+    so deleted or re-dated rows and order-line-only edits don't linger.
     """
-    return run_warehouse_etl(period=period)
+    return run_warehouse_etl(periods=[period] if period else ROLLUP_PERIODS, full=full)
@@ -0,0 +1,202 @@
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.analytics.models import CashflowSnapshot, SalesCustomerDailyFact, SalesPerformanceSnapshot
+from apps.analytics.services.etl import (
+    FACT_LOAD_LOCK_KEY,
+    load_company_facts,
+    run_warehouse_etl,
+    sync_company_snapshot,
+    sync_company_snapshots,
+)
+from apps.analytics.tasks import populate_data_warehouse
+from apps.companies.models import Company, CompanyGroup
+from apps.finance.models import Account, AccountType, Invoice, Payment
+from apps.inventory.models import UnitOfMeasure, Warehouse
+from apps.sales.models import Customer, Product, ProductCategory, SalesOrder, SalesOrderLine
+
+
+class IncrementalWarehouseEtlTests(TestCase):
+    TODAY = date(2026, 6, 30)
+
+    def setUp(self):
+        self.group = CompanyGroup.objects.create(name="DW Group", db_name="cg_dw_test")
+        self.company = Company.objects.create(name="DW Co", code="DWCO", company_group=self.group)
+        receivable = Account.objects.create(
+            company_group=self.group, company=self.company, code="DW-1200", name="Receivable",
+            account_type=AccountType.ASSET,
+        )
+        sales = Account.objects.create(
+            company_group=self.group, company=self.company, code="DW-4100", name="Sales",
+            account_type=AccountType.REVENUE,
+        )
+        self.acme, self.beta = [
+            Customer.objects.create(company=self.company, code=code, name=name, receivable_account=receivable)
+            for code, name in (("DW-C1", "Acme"), ("DW-C2", "Beta"))
+        ]
+        uom = UnitOfMeasure.objects.create(company=self.company, code="DW-EA", name="Each")
+        category = ProductCategory.objects.create(company=self.company, code="DW-CAT", name="Goods")
+        self.widget, self.gadget = [
+            Product.objects.create(
+                company=self.company, code=code, name=code, category=category, uom=uom, sales_account=sales
+            )
+            for code in ("DW-WIDGET", "DW-GADGET")
+        ]
+        self.warehouse = Warehouse.objects.create(company=self.company, code="DW-WH", name="Main")
+
+    def _order(self, customer, day, lines):
+        order = SalesOrder.objects.create(
+            company=self.company, customer=customer, order_date=day, delivery_date=day,
+            shipping_address="-", total_amount=sum(total for _, total in lines),
+        )
+        for number, (product, total) in enumerate(lines, start=1):
+            SalesOrderLine.objects.create(
+                order=order, line_number=number, quantity=1, unit_price=total, line_total=total,
+                product=product, warehouse=self.warehouse,
+            )
+        return order
+
+    def _payment(self, day, payment_type, method, amount, status="POSTED"):
+        return Payment.objects.create(
+            company=self.company, payment_date=day, payment_type=payment_type, payment_method=method,
+            amount=Decimal(amount), partner_type="customer", partner_id=self.acme.id, status=status,
+        )
+
+    def _age(self, queryset, days):
+        queryset.update(updated_at=timezone.now() - timedelta(days=days))
+
+    def _snapshot(self, period):
+        sales = SalesPerformanceSnapshot.objects.get(company_id=self.company.id, period=period)
+        cash = CashflowSnapshot.objects.get(company_id=self.company.id, period=period)
+        return sales, cash
+
+    def _content(self, period):
+        sales, cash = self._snapshot(period)
+        return (
+            sales.total_orders, sales.total_revenue, sales.sales_trend, sales.top_customers, sales.top_products,
+            cash.cash_in, cash.cash_out, cash.cash_trend, cash.bank_balances, cash.receivables_balance,
+        )
+
+    def test_rolls_up_every_period_from_one_fact_load(self):
+        self._order(self.acme, date(2026, 6, 29), [(self.widget, Decimal("100")), (self.gadget, Decimal("50"))])
+        self._order(self.beta, date(2026, 6, 29), [(self.widget, Decimal("20"))])
+        self._order(self.acme, date(2026, 5, 1), [(self.gadget, Decimal("400"))])
+        self._payment(date(2026, 6, 29), "RECEIPT", "BANK", "120")
+        self._payment(date(2026, 6, 28), "PAYMENT", "CASH", "30")
+        self._payment(date(2026, 6, 28), "RECEIPT", "CASH", "999", status="DRAFT")
+        Invoice.objects.create(
+            company_group=self.group, company=self.company, invoice_number="DW-INV-1", invoice_type="AR",
+            partner_type="customer", partner_id=self.acme.id, invoice_date=date(2026, 6, 1),
+            due_date=date(2026, 6, 30), subtotal=Decimal("500"), total_amount=Decimal("500"),
+            paid_amount=Decimal("120"), status="POSTED",
+        )
+
+        result = sync_company_snapshots(self.company, snapshot_date=self.TODAY)
+
+        self.assertEqual(result['period'], ['7d', '30d', '90d', 'quarter'])
+        week, week_cash = self._snapshot('7d')
+        self.assertEqual((week.total_orders, week.total_revenue, week.avg_order_value), (2, Decimal("170.00"), Decimal("85.00")))
+        self.assertEqual(week.sales_trend, [{'date': '2026-06-29', 'total': 170.0}])
+        self.assertEqual(
+            week.top_customers,
+            [{'customer_id': self.acme.id, 'name': 'Acme', 'total': 150.0}, {'customer_id': self.beta.id, 'name': 'Beta', 'total': 20.0}],
+        )
+        self.assertEqual(week.top_products[0], {'product_id': self.widget.id, 'name': 'DW-WIDGET', 'total': 120.0})
+        self.assertEqual((week_cash.cash_in, week_cash.cash_out, week_cash.net_cash), (Decimal("120.00"), Decimal("30.00"), Decimal("90.00")))
+        self.assertEqual(
+            week_cash.cash_trend,
+            [
+                {'date': '2026-06-28', 'cash_in': 0.0, 'cash_out': 30.0, 'net': -30.0},
+                {'date': '2026-06-29', 'cash_in': 120.0, 'cash_out': 0.0, 'net': 120.0},
+            ],
+        )
+        self.assertEqual(week_cash.receivables_balance, Decimal("380.00"))
+        quarter, _ = self._snapshot('quarter')
+        self.assertEqual((quarter.total_orders, quarter.total_revenue), (3, Decimal("570.00")))
+
+    def test_incremental_load_matches_a_full_reload(self):
+        kept = self._order(self.acme, date(2026, 6, 10), [(self.widget, Decimal("100"))])
+        changed = self._order(self.beta, date(2026, 6, 20), [(self.gadget, Decimal("60"))])
+        self._payment(date(2026, 6, 20), "RECEIPT", "BANK", "60")
+        self._age(SalesOrder.objects.filter(id=kept.id), 2)
+        self._age(SalesOrder.objects.filter(id=changed.id), 1)
+        self._age(Payment.objects.all(), 1)
+        sync_company_snapshot(self.company, '30d', snapshot_date=self.TODAY)
+        kept_fact = SalesCustomerDailyFact.objects.get(company_id=self.company.id, day=date(2026, 6, 10))
+
+        changed.total_amount = Decimal("75")
+        changed.save()
+        self._order(self.acme, date(2026, 6, 25), [(self.widget, Decimal("10"))])
+        self._payment(date(2026, 6, 25), "PAYMENT", "CASH", "5")
+        sync_company_snapshot(self.company, '30d', snapshot_date=self.TODAY)
+        incremental = self._content('30d')
+
+        # Only the changed days were reloaded
+        self.assertEqual(SalesCustomerDailyFact.objects.get(company_id=self.company.id, day=date(2026, 6, 10)).id, kept_fact.id)
+        self.assertEqual(incremental[:2], (3, Decimal("185.00")))
+
+        sync_company_snapshots(self.company, ['30d'], snapshot_date=self.TODAY, full=True)
+        self.assertEqual(self._content('30d'), incremental)
+
+    def test_fact_loads_of_a_company_wait_for_each_other(self):
+        self._order(self.acme, date(2026, 6, 29), [(self.widget, Decimal("100"))])
+        key = FACT_LOAD_LOCK_KEY.format(company_id=self.company.id)
+        self.addCleanup(cache.delete, key)
+        cache.add(key, "nightly", 60)
+
+        with mock.patch("apps.analytics.services.etl.FACT_LOAD_LOCK_WAIT", 0):
+            with self.assertRaisesMessage(RuntimeError, "still being loaded by another run"):
+                load_company_facts(self.company)
+        self.assertFalse(SalesCustomerDailyFact.objects.filter(company_id=self.company.id).exists())
+
+        # The other run finishes while this one waits
+        with mock.patch("apps.analytics.services.etl.time.sleep", side_effect=lambda _: cache.delete(key)) as sleep:
+            result = load_company_facts(self.company)
+
+        sleep.assert_called_once()
+        self.assertEqual(result['processed_records'], 2)
+        self.assertIsNone(cache.get(key))
+
+    def test_companies_are_synced_in_parallel(self):
+        other = Company.objects.create(name="DW Other", code="DWOT", company_group=self.group)
+        threads = {}
+
+        def sync(company, periods, full):
+            threads[company.id] = threading.current_thread().name
+            return {'company_id': company.id, 'period': periods}
+
+        # Worker threads have their own connections, which cannot see this test's transaction
+        with mock.patch("apps.analytics.services.etl.sync_company_snapshots", side_effect=sync):
+            result = run_warehouse_etl(companies=[self.company, other], periods=['7d', '90d'], workers=2)
+
+        self.assertTrue(result['success'])
+        self.assertEqual([r['company_id'] for r in result['results']], [self.company.id, other.id])
+        self.assertEqual(result['results'][0]['period'], ['7d', '90d'])
+        self.assertNotIn(threading.current_thread().name, threads.values())
+
+    def test_weekly_full_run_drops_facts_of_re_dated_orders(self):
+        order = self._order(self.acme, date(2026, 6, 10), [(self.widget, Decimal("100"))])
+        sync_company_snapshot(self.company, '30d', snapshot_date=self.TODAY)
+
+        order.order_date = date(2026, 6, 12)
+        order.save()
+        sync_company_snapshot(self.company, '30d', snapshot_date=self.TODAY)
+        # The incremental load only sees the order's new day
+        self.assertEqual(self._snapshot('30d')[0].total_revenue, Decimal("200.00"))
+
+        with mock.patch("apps.analytics.tasks.run_warehouse_etl") as etl:
+            populate_data_warehouse(full=True)
+        self.assertTrue(etl.call_args.kwargs['full'])
+        schedule = settings.CELERY_BEAT_SCHEDULE['populate-data-warehouse-full']
+        self.assertEqual(schedule['kwargs'], {'full': True})
+
+        sync_company_snapshots(self.company, ['30d'], snapshot_date=self.TODAY, full=True)
+        self.assertEqual(self._snapshot('30d')[0].total_revenue, Decimal("100.00"))
+        self.assertFalse(SalesCustomerDailyFact.objects.filter(company_id=self.company.id, day=date(2026, 6, 10)).exists())
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.budgeting.services import BudgetUsageService
+from apps.companies.models import Company
+
+
+class Command(BaseCommand):
+    help = "Verify budget line and budget totals against BudgetUsage/BudgetCommitment rows (optionally fix them)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company-id', type=int, help='Limit to one company')
+        parser.add_argument('--fix', action='store_true', help='Overwrite drifted totals with the recomputed values')
+
+    def handle(self, *args, **options):
+        company = None
+        if options.get('company_id'):
+            company = Company.objects.filter(id=options['company_id']).first()
+            if not company:
+                raise CommandError(f"Company {options['company_id']} not found")
+
+        result = BudgetUsageService.reconcile(company=company, fix=options['fix'])
+        for drift in result['drifted_lines']:
+            details = ", ".join(
+                f"{field} {diff['stored']} != {diff['expected']}" for field, diff in drift['diffs'].items()
+            )
+            self.stdout.write(self.style.WARNING(f"Line {drift['line_id']} (budget {drift['budget_id']}): {details}"))
+        for drift in result['drifted_budgets']:
+            self.stdout.write(self.style.WARNING(
+                f"Budget {drift['budget_id']}: consumed {drift['stored']} != {drift['expected']}"
+            ))
+
+        action = "fixed" if options['fix'] else "found"
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {result['lines_checked']} line(s); {action} {len(result['drifted_lines'])} drifted line(s) "
+            f"and {len(result['drifted_budgets'])} drifted budget(s)."
+        ))
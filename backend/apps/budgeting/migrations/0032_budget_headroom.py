@@ -0,0 +1,73 @@
+# Generated by Django 4.2.13 on 2026-10-16 20:53
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_headroom(apps, schema_editor):
+    Budget = apps.get_model('budgeting', 'Budget')
+    BudgetLine = apps.get_model('budgeting', 'BudgetLine')
+    BudgetHeadroom = apps.get_model('budgeting', 'BudgetHeadroom')
+
+    budgets = Budget.objects.in_bulk()
+    totals = ('value_limit', 'consumed_value', 'committed_value')
+    groups = (
+        BudgetLine.objects.order_by()
+        .values('budget_id', 'procurement_class')
+        .annotate(**{field: Coalesce(Sum(field), Decimal('0')) for field in totals})
+    )
+    BudgetHeadroom.objects.bulk_create(
+        (
+            BudgetHeadroom(
+                budget_id=group['budget_id'],
+                company_id=budgets[group['budget_id']].company_id,
+                cost_center_id=budgets[group['budget_id']].cost_center_id,
+                procurement_class=group['procurement_class'],
+                period_start=budgets[group['budget_id']].period_start,
+                period_end=budgets[group['budget_id']].period_end,
+                budget_status=budgets[group['budget_id']].status,
+                **{field: group[field] for field in totals},
+            )
+            for group in groups.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0009_company_currency_business_type_and_fy_cleanup'),
+        ('budgeting', '0031_unified_item_production'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetHeadroom',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('procurement_class', models.CharField(choices=[('stock_item', 'Stock Item'), ('service_item', 'Service / Expense'), ('capex_item', 'Capex Item')], max_length=20)),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('budget_status', models.CharField(max_length=50)),
+                ('value_limit', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=20)),
+                ('consumed_value', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=20)),
+                ('committed_value', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('budget', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='headroom', to='budgeting.budget')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='budget_headroom', to='companies.company')),
+                ('cost_center', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='budget_headroom', to='budgeting.costcenter')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['cost_center', 'period_start', 'period_end'], name='budget_headroom_lookup_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='budgetheadroom',
+            constraint=models.UniqueConstraint(fields=('budget', 'procurement_class'), name='unique_budget_headroom_class'),
+        ),
+        migrations.RunPython(backfill_headroom, migrations.RunPython.noop),
+    ]
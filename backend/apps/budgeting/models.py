@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import threading
 from decimal import Decimal
 
 from django.conf import settings
-from django.db import models
-from django.db.models import Q
+from django.db import models, transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Q, Subquery, Value, When
 from django.db.models import Sum
+from django.db.models.functions import Coalesce, Greatest
 from django.utils import timezone
 
 from apps.companies.models import Company, CompanyGroup, Branch, Department
@@ -100,6 +102,27 @@ class CostCenter(models.Model):
         self.save(update_fields=["kpi_snapshot", "updated_at"])
 
 
+def _key_filter(key, fields: tuple) -> Q:
+    return Q(**dict(zip(fields, key if len(fields) > 1 else (key,))))
+
+
+def _delta_case(deltas: dict, *, max_digits: int, decimal_places: int, fields: tuple = ("pk",)):
+    """
+    Per-row delta for a bulk ``UPDATE ... SET column = column + delta``.
+
+    ``deltas`` is keyed by the values of ``fields`` (a tuple of values when
+    several fields identify a row).
+    """
+    output_field = DecimalField(max_digits=max_digits, decimal_places=decimal_places)
+    if len(deltas) == 1:
+        return Value(next(iter(deltas.values())), output_field=output_field)
+    return Case(
+        *[When(_key_filter(key, fields), then=Value(delta)) for key, delta in deltas.items()],
+        default=Value(Decimal("0")),
+        output_field=output_field,
+    )
+
+
 class Budget(models.Model):
     # Revised workflow statuses aligned with Budget-Module-Final-Requirements.md
     STATUS_PENDING_NAME_APPROVAL = "pending_name_approval"
@@ -870,37 +893,100 @@ class BudgetLine(models.Model):
         return self.remaining_quantity - (self.committed_quantity or Decimal("0"))
 
     def record_usage(self, quantity: Decimal, amount: Decimal, *, commit: bool = True):
+        """
+        Add a usage to the consumed totals.
+
+        With ``commit`` the line and its budget are updated with F-expression
+        deltas, so concurrent usages against the same line never overwrite
+        each other. The returned totals are this instance's view; the
+        database row is authoritative.
+        """
+        quantity = quantity or Decimal("0")
+        amount = amount or Decimal("0")
         self.consumed_quantity = (self.consumed_quantity or Decimal("0")) + quantity
         self.consumed_value = (self.consumed_value or Decimal("0")) + amount
         if commit:
-            self.save(update_fields=["consumed_quantity", "consumed_value", "updated_at"])
-            self.budget.recalculate_totals(commit=True)
+            BudgetLine.apply_usage_deltas([(self, quantity, amount)])
         return self.consumed_quantity, self.consumed_value
 
+    @staticmethod
+    def apply_usage_deltas(deltas) -> None:
+        """
+        Add consumed quantity/value deltas to lines and their budgets.
+
+        ``deltas`` is an iterable of ``(line, quantity, amount)``. One UPDATE
+        each for the lines, the budgets and their headroom, whatever the
+        number of entries. Budget ``amount`` is kept equal to the sum of its line
+        limits, as ``Budget.recalculate_totals`` does.
+        """
+        line_deltas: dict[int, list[Decimal]] = {}
+        budget_deltas: dict[int, Decimal] = {}
+        headroom_deltas: dict[tuple, Decimal] = {}
+        for line, quantity, amount in deltas:
+            totals = line_deltas.setdefault(line.pk, [Decimal("0"), Decimal("0")])
+            totals[0] += quantity or Decimal("0")
+            totals[1] += amount or Decimal("0")
+            budget_deltas[line.budget_id] = budget_deltas.get(line.budget_id, Decimal("0")) + (amount or Decimal("0"))
+            key = (line.budget_id, line.procurement_class)
+            headroom_deltas[key] = headroom_deltas.get(key, Decimal("0")) + (amount or Decimal("0"))
+        if not line_deltas:
+            return
+
+        now = timezone.now()
+        BudgetLine.objects.filter(pk__in=line_deltas).update(
+            consumed_quantity=F("consumed_quantity") + _delta_case(
+                {pk: qty for pk, (qty, _) in line_deltas.items()}, max_digits=15, decimal_places=3
+            ),
+            consumed_value=F("consumed_value") + _delta_case(
+                {pk: value for pk, (_, value) in line_deltas.items()}, max_digits=20, decimal_places=2
+            ),
+            updated_at=now,
+        )
+        line_limits = (
+            BudgetLine.objects.filter(budget=OuterRef("pk"))
+            .order_by()
+            .values("budget")
+            .annotate(total=Sum("value_limit"))
+            .values("total")
+        )
+        Budget.objects.filter(pk__in=budget_deltas).update(
+            consumed=F("consumed") + _delta_case(budget_deltas, max_digits=20, decimal_places=2),
+            amount=Coalesce(Subquery(line_limits), Value(Decimal("0.00")), output_field=DecimalField()),
+            updated_at=now,
+        )
+        BudgetHeadroom.apply_deltas("consumed_value", headroom_deltas)
+
+    @staticmethod
+    def apply_commitment_deltas(deltas: dict) -> None:
+        """Add ``{line_id: (quantity, value)}`` deltas to committed totals in one UPDATE."""
+        deltas = {pk: delta for pk, delta in deltas.items() if pk and any(delta)}
+        if not deltas:
+            return
+        BudgetLine.objects.filter(pk__in=deltas).update(
+            committed_quantity=F("committed_quantity") + _delta_case(
+                {pk: qty for pk, (qty, _) in deltas.items()}, max_digits=15, decimal_places=3
+            ),
+            committed_value=F("committed_value") + _delta_case(
+                {pk: value for pk, (_, value) in deltas.items()}, max_digits=20, decimal_places=2
+            ),
+            updated_at=timezone.now(),
+        )
+        headroom_deltas: dict[tuple, Decimal] = {}
+        for pk, budget_id, procurement_class in BudgetLine.objects.filter(pk__in=deltas).values_list(
+            "pk", "budget_id", "procurement_class"
+        ):
+            key = (budget_id, procurement_class)
+            headroom_deltas[key] = headroom_deltas.get(key, Decimal("0")) + deltas[pk][1]
+        BudgetHeadroom.apply_deltas("committed_value", headroom_deltas)
+
     def recalculate_commitments(self, commit: bool = True) -> tuple[Decimal, Decimal]:
+        """Committed totals from scratch: the outstanding remainder of every active commitment."""
         totals = self.commitments.filter(
             status__in=BudgetCommitment.ACTIVE_STATUSES  # type: ignore[name-defined]
-        ).aggregate(
-            committed_qty=Sum("committed_quantity") or Decimal("0"),
-            committed_val=Sum("committed_value") or Decimal("0"),
-            consumed_qty=Sum("consumed_quantity") or Decimal("0"),
-            consumed_val=Sum("consumed_value") or Decimal("0"),
-            released_qty=Sum("released_quantity") or Decimal("0"),
-            released_val=Sum("released_value") or Decimal("0"),
-        )
+        ).aggregate(**BudgetCommitment.outstanding_aggregates())
 
-        committed_qty = totals.get("committed_qty") or Decimal("0")
-        committed_val = totals.get("committed_val") or Decimal("0")
-        consumed_qty = totals.get("consumed_qty") or Decimal("0")
-        consumed_val = totals.get("consumed_val") or Decimal("0")
-        released_qty = totals.get("released_qty") or Decimal("0")
-        released_val = totals.get("released_val") or Decimal("0")
-
-        outstanding_qty = committed_qty - consumed_qty - released_qty
-        outstanding_val = committed_val - consumed_val - released_val
-
-        self.committed_quantity = max(outstanding_qty, Decimal("0"))
-        self.committed_value = max(outstanding_val, Decimal("0"))
+        self.committed_quantity = totals.get("outstanding_qty") or Decimal("0")
+        self.committed_value = totals.get("outstanding_val") or Decimal("0")
 
         if commit:
             self.save(update_fields=["committed_quantity", "committed_value", "updated_at"])
@@ -1033,18 +1119,79 @@ class BudgetCommitment(models.Model):
         released = self.released_value or Decimal("0")
         return max(committed - consumed - released, Decimal("0"))
 
+    @staticmethod
+    def outstanding_aggregates() -> dict:
+        """Aggregates of the outstanding (committed - consumed - released, floored at 0) quantity and value."""
+        zero = Value(Decimal("0"))
+        return {
+            "outstanding_qty": Sum(Greatest(
+                F("committed_quantity") - F("consumed_quantity") - F("released_quantity"), zero,
+                output_field=DecimalField(max_digits=15, decimal_places=3),
+            )),
+            "outstanding_val": Sum(Greatest(
+                F("committed_value") - F("consumed_value") - F("released_value"), zero,
+                output_field=DecimalField(max_digits=20, decimal_places=2),
+            )),
+        }
+
+    OUTSTANDING_FIELDS = (
+        "budget_line_id", "status",
+        "committed_quantity", "consumed_quantity", "released_quantity",
+        "committed_value", "consumed_value", "released_value",
+    )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if set(cls.OUTSTANDING_FIELDS).issubset(field_names):
+            instance._tracked_outstanding = instance._outstanding()
+        return instance
+
+    def _stored_outstanding(self) -> tuple:
+        """Contribution as last saved: the snapshot taken on load, else read from the row."""
+        if self._state.adding:
+            return (None, Decimal("0"), Decimal("0"))
+        tracked = getattr(self, "_tracked_outstanding", None)
+        if tracked is None:
+            stored = BudgetCommitment.objects.filter(pk=self.pk).only(*self.OUTSTANDING_FIELDS).first()
+            tracked = stored._outstanding() if stored else (None, Decimal("0"), Decimal("0"))
+        return tracked
+
+    def _outstanding(self) -> tuple:
+        """(line id, quantity, value) this commitment contributes to its line's committed totals."""
+        if self.status not in self.ACTIVE_STATUSES:
+            return (self.budget_line_id, Decimal("0"), Decimal("0"))
+        return (self.budget_line_id, self.remaining_quantity, self.remaining_value)
+
+    def _apply_outstanding_change(self, before: tuple, after: tuple) -> None:
+        deltas: dict[int, list[Decimal]] = {}
+        for (line_id, qty, value), sign in ((before, -1), (after, 1)):
+            delta = deltas.setdefault(line_id, [Decimal("0"), Decimal("0")])
+            delta[0] += sign * qty
+            delta[1] += sign * value
+        BudgetLine.apply_commitment_deltas({pk: tuple(delta) for pk, delta in deltas.items()})
+        # Keep a loaded line in step with the row
+        if BudgetCommitment.budget_line.is_cached(self) and self.budget_line_id in deltas:
+            qty, value = deltas[self.budget_line_id]
+            self.budget_line.committed_quantity = (self.budget_line.committed_quantity or Decimal("0")) + qty
+            self.budget_line.committed_value = (self.budget_line.committed_value or Decimal("0")) + value
+
     def save(self, *args, **kwargs):
         if not self.company_id and self.budget_line_id:
             self.company = self.budget_line.budget.company
         if not self.cost_center_id and self.budget_line_id:
             self.cost_center = self.budget_line.budget.cost_center
+        before = self._stored_outstanding()
         super().save(*args, **kwargs)
-        self.budget_line.recalculate_commitments(commit=True)
+        after = self._outstanding()
+        self._apply_outstanding_change(before, after)
+        self._tracked_outstanding = after
 
     def delete(self, *args, **kwargs):
-        budget_line = self.budget_line
-        super().delete(*args, **kwargs)
-        budget_line.recalculate_commitments(commit=True)
+        before = self._stored_outstanding()
+        result = super().delete(*args, **kwargs)
+        self._apply_outstanding_change(before, (None, Decimal("0"), Decimal("0")))
+        return result
 
     def mark_converted(self, *, timestamp=None):
         self.status = self.Status.CONVERTED
@@ -1191,6 +1338,134 @@ class BudgetConsumptionSnapshot(models.Model):
         ]
 
 
+_headroom_rebuilds = threading.local()
+
+
+class BudgetHeadroom(models.Model):
+    """
+    Materialized spend headroom of a budget per procurement class.
+
+    Each row holds the summed limits and consumed/committed values of the
+    budget's lines of one class, plus the budget fields availability checks
+    filter on, so a check is a single indexed lookup by cost center and date.
+    Usage and commitment deltas are added in the same transaction as the line
+    update; line and budget edits rebuild the budget's rows on commit (see
+    ``signals``).
+    """
+
+    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, related_name="headroom")
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name="budget_headroom")
+    cost_center = models.ForeignKey(
+        CostCenter, on_delete=models.CASCADE, null=True, blank=True, related_name="budget_headroom"
+    )
+    procurement_class = models.CharField(max_length=20, choices=BudgetLine.ProcurementClass.choices)
+    period_start = models.DateField()
+    period_end = models.DateField()
+    budget_status = models.CharField(max_length=50)
+    value_limit = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal("0"))
+    consumed_value = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal("0"))
+    committed_value = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal("0"))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    KEY_FIELDS = ("budget_id", "procurement_class")
+    TOTAL_FIELDS = ("value_limit", "consumed_value", "committed_value")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["budget", "procurement_class"], name="unique_budget_headroom_class"),
+        ]
+        indexes = [
+            models.Index(fields=["cost_center", "period_start", "period_end"], name="budget_headroom_lookup_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.budget_id} · {self.procurement_class}"
+
+    @property
+    def available_value(self) -> Decimal:
+        return self.value_limit - self.consumed_value - self.committed_value
+
+    @classmethod
+    def apply_deltas(cls, field: str, deltas: dict) -> None:
+        """Add ``{(budget_id, procurement_class): delta}`` to ``field`` in one UPDATE."""
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        match = Q()
+        for key in deltas:
+            match |= _key_filter(key, cls.KEY_FIELDS)
+        cls.objects.filter(match).update(
+            **{field: F(field) + _delta_case(deltas, max_digits=20, decimal_places=2, fields=cls.KEY_FIELDS)},
+            updated_at=timezone.now(),
+        )
+
+    @classmethod
+    def rebuild_on_commit(cls, budget_id) -> None:
+        """Rebuild a budget's rows once the current transaction commits, once per budget."""
+        pending = _headroom_rebuilds.__dict__.setdefault("budget_ids", set())
+        pending.add(budget_id)
+
+        def flush():
+            budget_ids = set(pending)
+            pending.difference_update(budget_ids)
+            cls.rebuild(budget_ids)
+
+        transaction.on_commit(flush)
+
+    @classmethod
+    def rebuild(cls, budget_ids) -> None:
+        """
+        Recompute the rows of ``budget_ids`` from their lines.
+
+        Existing rows are locked first and updated in place, so a concurrent
+        delta waits for the rebuild and is then added to the new totals.
+        """
+        budget_ids = set(budget_ids)
+        if not budget_ids:
+            return
+        zero = Value(Decimal("0"))
+        with transaction.atomic():
+            existing = {
+                (budget_id, procurement_class): pk
+                for pk, budget_id, procurement_class in cls.objects.select_for_update()
+                .filter(budget_id__in=budget_ids)
+                .values_list("pk", "budget_id", "procurement_class")
+            }
+            budgets = Budget.objects.filter(pk__in=budget_ids).in_bulk()
+            groups = (
+                BudgetLine.objects.filter(budget_id__in=budgets)
+                .order_by()
+                .values("budget_id", "procurement_class")
+                .annotate(**{field: Coalesce(Sum(field), zero) for field in cls.TOTAL_FIELDS})
+            )
+            rows = [
+                cls(
+                    budget_id=group["budget_id"],
+                    company_id=budgets[group["budget_id"]].company_id,
+                    cost_center_id=budgets[group["budget_id"]].cost_center_id,
+                    procurement_class=group["procurement_class"],
+                    period_start=budgets[group["budget_id"]].period_start,
+                    period_end=budgets[group["budget_id"]].period_end,
+                    budget_status=budgets[group["budget_id"]].status,
+                    **{field: group[field] for field in cls.TOTAL_FIELDS},
+                )
+                for group in groups
+            ]
+            for row in rows:
+                existing.pop((row.budget_id, row.procurement_class), None)
+            if existing:
+                cls.objects.filter(pk__in=existing.values()).delete()
+            cls.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=["budget", "procurement_class"],
+                update_fields=[
+                    "company", "cost_center", "period_start", "period_end", "budget_status",
+                    *cls.TOTAL_FIELDS, "updated_at",
+                ],
+            )
+
+
 class BudgetItemCategory(models.Model):
     """Top-level item category for budgeting, shared within a company group."""
     company = models.ForeignKey(Company, on_delete=models.PROTECT, null=True, blank=True, related_name='budget_item_categories')
@@ -3,8 +3,9 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Optional
 
-from django.db import models
-from django.db.models import Sum
+from django.db import models, transaction
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from datetime import timedelta
 from decimal import Decimal
@@ -20,7 +21,16 @@ from apps.security.models import (
     SecUserDirectPermission,
 )
 
-from .models import Budget, BudgetApproval, CostCenter, BudgetLine, BudgetVarianceAudit
+from .models import (
+    Budget,
+    BudgetApproval,
+    BudgetCommitment,
+    BudgetHeadroom,
+    BudgetUsage,
+    CostCenter,
+    BudgetLine,
+    BudgetVarianceAudit,
+)
 from apps.procurement.models import PurchaseOrderLine
 from apps.inventory.models import Product
 from .models import BudgetItemCode
@@ -1728,3 +1738,179 @@ class BudgetCloningService:
             apply_adjustment_factor=adjustment_factor,
             user=user
         )
+
+
+class BudgetUsageService:
+    """Batch recording of budget usage and reconciliation of the denormalized totals."""
+
+    LINE_TOTALS = ("consumed_quantity", "consumed_value", "committed_quantity", "committed_value")
+
+    @staticmethod
+    def record_usages(usages, *, batch_size: int = 500) -> list[BudgetUsage]:
+        """
+        Insert many usage events and apply them to line and budget totals.
+
+        One ``bulk_create`` plus one UPDATE each for the lines, the budgets
+        and their headroom, instead of two saves and an aggregate per event.
+        """
+        usages = list(usages)
+        if not usages:
+            return []
+
+        missing = {usage.budget_line_id for usage in usages if not BudgetUsage.budget_line.is_cached(usage)}
+        lines = BudgetLine.objects.only("id", "budget_id", "procurement_class").in_bulk(missing) if missing else {}
+        with transaction.atomic():
+            created = BudgetUsage.objects.bulk_create(usages, batch_size=batch_size)
+            BudgetLine.apply_usage_deltas(
+                (lines.get(usage.budget_line_id) or usage.budget_line, usage.quantity, usage.amount)
+                for usage in created
+            )
+        return created
+
+    @classmethod
+    def reconcile(cls, *, company=None, fix: bool = False) -> dict:
+        """
+        Compare line and budget totals with the usage and commitment rows.
+
+        Line consumed totals must equal the sum of their ``BudgetUsage``
+        rows, committed totals the outstanding remainder of their active
+        commitments, and budget ``consumed`` the sum of its lines. Drifted
+        rows are reported and, with ``fix``, corrected; the materialized
+        headroom is then rebuilt from the corrected lines.
+        """
+        zero = Value(Decimal("0"))
+        usage = BudgetUsage.objects.filter(budget_line=OuterRef("pk")).order_by().values("budget_line")
+        commitments = (
+            BudgetCommitment.objects.filter(budget_line=OuterRef("pk"), status__in=BudgetCommitment.ACTIVE_STATUSES)
+            .order_by()
+            .values("budget_line")
+            .annotate(**BudgetCommitment.outstanding_aggregates())
+        )
+        lines = BudgetLine.objects.all()
+        budgets = Budget.objects.all()
+        if company is not None:
+            lines = lines.filter(budget__company=company)
+            budgets = budgets.filter(company=company)
+
+        expected_lines = lines.annotate(
+            expected_consumed_quantity=Coalesce(Subquery(usage.annotate(total=Sum("quantity")).values("total")), zero),
+            expected_consumed_value=Coalesce(Subquery(usage.annotate(total=Sum("amount")).values("total")), zero),
+            expected_committed_quantity=Coalesce(Subquery(commitments.values("outstanding_qty")), zero),
+            expected_committed_value=Coalesce(Subquery(commitments.values("outstanding_val")), zero),
+        ).values("id", "budget_id", *cls.LINE_TOTALS, *[f"expected_{field}" for field in cls.LINE_TOTALS])
+
+        drifted_lines = []
+        lines_checked = 0
+        for row in expected_lines.iterator(chunk_size=2000):
+            lines_checked += 1
+            diffs = {
+                field: {"stored": row[field], "expected": row[f"expected_{field}"]}
+                for field in cls.LINE_TOTALS
+                if row[field] != row[f"expected_{field}"]
+            }
+            if diffs:
+                drifted_lines.append({"line_id": row["id"], "budget_id": row["budget_id"], "diffs": diffs})
+
+        with transaction.atomic():
+            if fix:
+                for drift in drifted_lines:
+                    BudgetLine.objects.filter(pk=drift["line_id"]).update(
+                        **{field: diff["expected"] for field, diff in drift["diffs"].items()}
+                    )
+
+            drifted_budgets = [
+                {"budget_id": row["id"], "stored": row["consumed"], "expected": row["expected"]}
+                for row in budgets.annotate(expected=Coalesce(Sum("lines__consumed_value"), zero)).values(
+                    "id", "consumed", "expected"
+                )
+                if row["consumed"] != row["expected"]
+            ]
+            if fix:
+                for drift in drifted_budgets:
+                    Budget.objects.filter(pk=drift["budget_id"]).update(consumed=drift["expected"])
+                BudgetHeadroom.rebuild(budgets.values_list("pk", flat=True))
+
+        return {
+            "lines_checked": lines_checked,
+            "drifted_lines": drifted_lines,
+            "drifted_budgets": drifted_budgets,
+            "fixed": fix,
+        }
+
+
+class BudgetHeadroomService:
+    """Budget availability checks against the materialized ``BudgetHeadroom`` rows."""
+
+    LIVE_STATUSES = (Budget.STATUS_ACTIVE, Budget.STATUS_APPROVED)
+
+    @classmethod
+    def totals(cls, cost_center_ids, *, on_date=None, company=None) -> dict:
+        """
+        Headroom of the budgets live on ``on_date`` for the given cost centers.
+
+        Returns ``{(cost_center_id, procurement_class): totals}`` with the
+        limit, consumed and committed values, plus a ``(cost_center_id, None)``
+        entry summing every class. Cost centers without a live budget are
+        absent. One indexed query whatever the number of cost centers.
+        """
+        on_date = on_date or timezone.now().date()
+        rows = BudgetHeadroom.objects.filter(
+            cost_center_id__in=set(cost_center_ids),
+            period_start__lte=on_date,
+            period_end__gte=on_date,
+            budget_status__in=cls.LIVE_STATUSES,
+        )
+        if company is not None:
+            rows = rows.filter(company=company)
+
+        totals: dict[tuple, dict] = {}
+        for row in rows.values_list("cost_center_id", "procurement_class", *BudgetHeadroom.TOTAL_FIELDS):
+            cost_center_id, procurement_class, *values = row
+            for key in ((cost_center_id, procurement_class), (cost_center_id, None)):
+                entry = totals.setdefault(key, dict.fromkeys(BudgetHeadroom.TOTAL_FIELDS, Decimal("0")))
+                for field, value in zip(BudgetHeadroom.TOTAL_FIELDS, values):
+                    entry[field] += value
+        return totals
+
+    @classmethod
+    def check_many(cls, lines, *, on_date=None, company=None) -> list[dict]:
+        """
+        Check many requested amounts at once, e.g. every line of a requisition.
+
+        ``lines`` are dicts with ``cost_center``, ``amount`` and an optional
+        ``procurement_class``. Lines drawing on the same cost center and class
+        are checked against their running total, so a requisition cannot pass
+        line by line while exceeding the headroom as a whole. Available means
+        limit minus consumed minus committed, as ``BudgetLine.available_value``.
+        """
+        lines = list(lines)
+        totals = cls.totals([line["cost_center"] for line in lines], on_date=on_date, company=company)
+        requested: dict[tuple, Decimal] = {}
+        results = []
+        for line in lines:
+            key = (line["cost_center"], line.get("procurement_class") or None)
+            amount = Decimal(line["amount"])
+            requested[key] = requested.get(key, Decimal("0")) + amount
+            result = {
+                "cost_center": key[0],
+                "procurement_class": key[1],
+                "requested": amount,
+                "requested_total": requested[key],
+            }
+            headroom = totals.get(key)
+            if headroom is None:
+                result.update(
+                    available=False,
+                    available_amount=Decimal("0"),
+                    committed_amount=Decimal("0"),
+                    reason="No active budget found",
+                )
+            else:
+                available = headroom["value_limit"] - headroom["consumed_value"] - headroom["committed_value"]
+                result.update(
+                    available=available >= requested[key],
+                    available_amount=available,
+                    committed_amount=headroom["committed_value"],
+                )
+            results.append(result)
+        return results
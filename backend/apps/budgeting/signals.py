@@ -1,8 +1,11 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-from .models import Budget
+from apps.inventory.models import UnitOfMeasure
+
+from .models import Budget, BudgetHeadroom, BudgetItemCode, BudgetLine
 from .services import BudgetNotificationService
+from .similarity import item_code_index, scope_for_record, uom_index
 
 
 @receiver(post_save, sender=Budget)
@@ -15,3 +18,36 @@ def budget_status_notifications(sender, instance: Budget, created: bool, **kwarg
             BudgetNotificationService.notify_budget_active(instance)
         except Exception:
             pass
+
+
+HEADROOM_BUDGET_FIELDS = {"company", "cost_center", "period_start", "period_end", "status"}
+HEADROOM_LINE_FIELDS = {"budget", "procurement_class", "value_limit", "consumed_value", "committed_value"}
+
+
+def _affects_headroom(update_fields, fields) -> bool:
+    return update_fields is None or bool(fields.intersection(update_fields))
+
+
+@receiver(post_save, sender=Budget)
+def budget_headroom_on_budget_save(sender, instance: Budget, update_fields=None, **kwargs):
+    if _affects_headroom(update_fields, HEADROOM_BUDGET_FIELDS):
+        BudgetHeadroom.rebuild_on_commit(instance.pk)
+
+
+@receiver(post_save, sender=BudgetLine)
+@receiver(post_delete, sender=BudgetLine)
+def budget_headroom_on_line_change(sender, instance: BudgetLine, update_fields=None, **kwargs):
+    if _affects_headroom(update_fields, HEADROOM_LINE_FIELDS):
+        BudgetHeadroom.rebuild_on_commit(instance.budget_id)
+
+
+@receiver(post_save, sender=BudgetItemCode)
+@receiver(post_delete, sender=BudgetItemCode)
+def item_code_similarity_index(sender, instance: BudgetItemCode, created=False, **kwargs):
+    item_code_index.record_changed(scope_for_record(instance), instance.pk, deleted=kwargs.get("signal") is post_delete)
+
+
+@receiver(post_save, sender=UnitOfMeasure)
+@receiver(post_delete, sender=UnitOfMeasure)
+def uom_similarity_index(sender, instance: UnitOfMeasure, created=False, **kwargs):
+    uom_index.record_changed(scope_for_record(instance), instance.pk, deleted=kwargs.get("signal") is post_delete)
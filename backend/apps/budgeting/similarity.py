@@ -0,0 +1,310 @@
+"""
+Similarity indexes for duplicate detection when creating item codes and UoMs.
+
+Each company group (or company, when it has no group) gets an in-process
+index of its records: L2-normalized embedding vectors for a NumPy top-k
+search, and character-trigram postings for the fuzzy fallback. Creating a
+record therefore costs one query embedding and two array operations instead
+of embedding and scanning a candidate list on every POST.
+
+Indexes are built lazily on first use and kept in step by the save/delete
+signals (see ``signals``): once the transaction commits, the shared version
+in the cache is bumped and the local index is patched in place. A process
+whose index is behind the shared version rebuilds it on its next lookup;
+with the embedding cache, a rebuild only embeds texts it has never seen.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from apps.companies.models import Company
+from apps.inventory.models import UnitOfMeasure
+
+from .models import BudgetItemCode
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "similarity_index:{name}:{scope}"
+Scope = Tuple[str, int]
+
+
+def _normalize(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def trigrams(text: str) -> frozenset:
+    text = _normalize(text)
+    if not text:
+        return frozenset()
+    padded = f"  {text} "
+    return frozenset(padded[index:index + 3] for index in range(len(padded) - 2))
+
+
+def record_text(record: dict) -> str:
+    return f"{(record.get('code') or '').strip()} {(record.get('name') or '').strip()}".strip()
+
+
+def similarity_embeddings():
+    """The AI service embedding model, or ``None`` when it is unavailable."""
+    try:
+        from apps.ai_companion.services.ai_service_v2 import ai_service_v2  # local import
+
+        if getattr(ai_service_v2, "embeddings", None) is None and hasattr(ai_service_v2, "_ensure_ready"):
+            ai_service_v2._ensure_ready(require_generator=False)
+        return getattr(ai_service_v2, "embeddings", None)
+    except Exception:
+        return None
+
+
+def _embed(embeddings, texts: List[str]) -> np.ndarray:
+    if hasattr(embeddings, "embed_array"):
+        vectors = embeddings.embed_array(texts)
+    else:
+        vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    vectors = np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class SimilarityIndex:
+    """Vectors and trigram postings of one scope's records, updatable in place."""
+
+    def __init__(self, fields: Sequence[str], *, version=None, dim: Optional[int] = None):
+        self.fields = tuple(fields)
+        self.version = version
+        self.records: List[Optional[dict]] = []
+        self.positions: Dict[int, int] = {}
+        self.postings: Dict[str, Dict[str, List[int]]] = {field: {} for field in self.fields}
+        self.gram_counts: Dict[str, List[int]] = {field: [] for field in self.fields}
+        self.has_vectors = dim is not None
+        self._vectors = np.zeros((16, dim or 1), dtype=np.float32)
+        self._alive = np.zeros(16, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def _grow(self, size: int) -> None:
+        if size <= len(self._alive):
+            return
+        capacity = max(size, len(self._alive) * 2)
+        vectors = np.zeros((capacity, self._vectors.shape[1]), dtype=np.float32)
+        vectors[:len(self._vectors)] = self._vectors
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:len(self._alive)] = self._alive
+        self._vectors, self._alive = vectors, alive
+
+    def upsert(self, record: dict, vector: Optional[np.ndarray] = None) -> None:
+        self.remove(record["id"])
+        position = len(self.records)
+        self._grow(position + 1)
+        self.records.append(record)
+        self.positions[record["id"]] = position
+        self._alive[position] = True
+        if self.has_vectors and vector is not None:
+            self._vectors[position] = vector
+        for field in self.fields:
+            grams = trigrams(record.get(field) or "")
+            self.gram_counts[field].append(len(grams))
+            postings = self.postings[field]
+            for gram in grams:
+                postings.setdefault(gram, []).append(position)
+
+    def remove(self, record_id) -> None:
+        position = self.positions.pop(record_id, None)
+        if position is not None:
+            # Postings keep the dead position; it is masked out at query time
+            self.records[position] = None
+            self._alive[position] = False
+
+    @property
+    def dead(self) -> int:
+        return len(self.records) - len(self.positions)
+
+    def _results(self, scores: np.ndarray, threshold: float, limit: int) -> List[Tuple[float, dict]]:
+        if limit <= 0:
+            return []
+        scores = np.where(self._alive[:len(scores)], scores, -np.inf)
+        candidates = np.flatnonzero(scores >= threshold)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        ordered = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(float(scores[position]), self.records[position]) for position in ordered]
+
+    def nearest(self, vector: np.ndarray, *, threshold: float, limit: int) -> List[Tuple[float, dict]]:
+        """Records whose cosine similarity to ``vector`` (normalized) is at least ``threshold``."""
+        if not self.has_vectors or not self.records:
+            return []
+        scores = self._vectors[:len(self.records)] @ vector
+        return self._results(scores, threshold, limit)
+
+    def fuzzy(self, query: Dict[str, str], *, threshold: float, limit: int) -> List[Tuple[float, dict]]:
+        """
+        Records ranked by trigram Dice similarity, the best over ``query``'s fields.
+
+        Only postings of the query's trigrams are read; records sharing no
+        trigram are never visited.
+        """
+        size = len(self.records)
+        if not size:
+            return []
+        best = np.zeros(size, dtype=np.float32)
+        for field, text in query.items():
+            grams = trigrams(text)
+            if not grams or field not in self.postings:
+                continue
+            postings = self.postings[field]
+            hits = [postings[gram] for gram in grams if gram in postings]
+            if not hits:
+                continue
+            shared = np.bincount(np.concatenate([np.asarray(hit, dtype=np.int64) for hit in hits]), minlength=size)
+            counts = np.asarray(self.gram_counts[field], dtype=np.float32)
+            best = np.maximum(best, 2 * shared / (len(grams) + counts))
+        return self._results(best, threshold, limit)
+
+
+class SimilarityIndexRegistry:
+    """Lazily built, signal-maintained ``SimilarityIndex`` per scope for one model."""
+
+    def __init__(self, name: str, queryset: Callable[[Scope], Iterable[dict]], *, fields=("code", "name")):
+        self.name = name
+        self.queryset = queryset
+        self.fields = fields
+        self._indexes: Dict[Scope, SimilarityIndex] = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def scope_for_company(company) -> Optional[Scope]:
+        if company is None:
+            return None
+        group_id = getattr(company, "company_group_id", None)
+        return ("group", group_id) if group_id else ("company", company.pk)
+
+    def _version_key(self, scope: Scope) -> str:
+        return VERSION_KEY.format(name=self.name, scope=f"{scope[0]}:{scope[1]}")
+
+    def _shared_version(self, scope: Scope):
+        key = self._version_key(scope)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, time.time_ns() // 1000, None)
+            version = cache.get(key)
+        return version
+
+    def get(self, scope: Scope, embeddings=None) -> SimilarityIndex:
+        version = self._shared_version(scope)
+        with self._lock:
+            index = self._indexes.get(scope)
+            if index is None or index.version != version or (embeddings is not None and not index.has_vectors):
+                index = self._build(scope, version, embeddings)
+                self._indexes[scope] = index
+            return index
+
+    def _build(self, scope: Scope, version, embeddings) -> SimilarityIndex:
+        records = list(self.queryset(scope))
+        vectors = None
+        if embeddings is not None and records:
+            try:
+                vectors = _embed(embeddings, [record_text(record) for record in records])
+            except Exception as exc:
+                logger.warning("Embedding %s records for %s failed: %s", self.name, scope, exc)
+        index = SimilarityIndex(self.fields, version=version, dim=vectors.shape[1] if vectors is not None else None)
+        for position, record in enumerate(records):
+            index.upsert(record, vectors[position] if vectors is not None else None)
+        return index
+
+    def similar(
+        self,
+        company,
+        *,
+        query: Dict[str, str],
+        embeddings=None,
+        embedding_threshold: float,
+        fuzzy_threshold: float,
+        limit: int,
+    ) -> List[dict]:
+        """Nearest records by embedding; the trigram index when that finds nothing."""
+        scope = self.scope_for_company(company)
+        if scope is None:
+            return []
+        index = self.get(scope, embeddings)
+        matches: List[Tuple[float, dict]] = []
+        text = record_text(query)
+        if embeddings is not None and index.has_vectors and text:
+            try:
+                matches = index.nearest(_embed(embeddings, [text])[0], threshold=embedding_threshold, limit=limit)
+            except Exception as exc:
+                logger.warning("Embedding similarity for %s failed: %s", self.name, exc)
+        if not matches:
+            matches = index.fuzzy(
+                {field: value for field, value in query.items() if value}, threshold=fuzzy_threshold, limit=limit
+            )
+        return [record for _, record in matches]
+
+    def record_changed(self, scope: Optional[Scope], record_id, *, deleted: bool = False) -> None:
+        """Apply a saved or deleted record to the index once the transaction commits."""
+        if scope is not None:
+            transaction.on_commit(lambda: self._apply(scope, record_id, deleted))
+
+    def _apply(self, scope: Scope, record_id, deleted: bool) -> None:
+        key = self._version_key(scope)
+        try:
+            version = cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns() // 1000, None)
+            version = None
+        with self._lock:
+            index = self._indexes.get(scope)
+            if index is None:
+                return
+            if version is None or index.version is None or version != index.version + 1 or index.dead > max(64, len(index)):
+                # Another process changed the scope too, or too many dead slots; rebuild on next use
+                self._indexes.pop(scope, None)
+                return
+            record = None if deleted else self.queryset(scope).filter(pk=record_id).first()
+            if record is None:
+                index.remove(record_id)
+            else:
+                vector = None
+                if index.has_vectors:
+                    embeddings = similarity_embeddings()
+                    if embeddings is None:
+                        self._indexes.pop(scope, None)
+                        return
+                    vector = _embed(embeddings, [record_text(record)])[0]
+                index.upsert(record, vector)
+            index.version = version
+
+
+def scope_for_record(instance) -> Optional[Scope]:
+    """Scope of a record with ``company`` and ``company_group`` (derived from the company on save)."""
+    if not instance.company_id:
+        return None
+    group_id = instance.company_group_id
+    if group_id is None:
+        group_id = Company.objects.filter(pk=instance.company_id).values_list("company_group_id", flat=True).first()
+    return ("group", group_id) if group_id else ("company", instance.company_id)
+
+
+def _company_filter(scope: Scope) -> dict:
+    kind, pk = scope
+    return {"company__company_group_id": pk} if kind == "group" else {"company_id": pk}
+
+
+item_code_index = SimilarityIndexRegistry(
+    "budget_item_code",
+    lambda scope: BudgetItemCode.objects.filter(**_company_filter(scope)).values(
+        "id", "code", "name", uom_name=F("uom__name")
+    ),
+)
+uom_index = SimilarityIndexRegistry(
+    "unit_of_measure",
+    lambda scope: UnitOfMeasure.objects.filter(**_company_filter(scope)).values("id", "code", "name"),
+)
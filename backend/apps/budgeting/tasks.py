@@ -0,0 +1,29 @@
+import logging
+
+from celery import shared_task
+
+from .services import BudgetUsageService
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name="apps.budgeting.tasks.reconcile_budget_totals")
+def reconcile_budget_totals(fix: bool = False):
+    """Verify denormalized budget line/budget totals against usage and commitment rows."""
+    result = BudgetUsageService.reconcile(fix=fix)
+    drifted_lines = result["drifted_lines"]
+    drifted_budgets = result["drifted_budgets"]
+    if drifted_lines or drifted_budgets:
+        logger.warning(
+            "Budgeting: %s line(s) and %s budget(s) drifted from their usage/commitment rows (fixed=%s)",
+            len(drifted_lines),
+            len(drifted_budgets),
+            fix,
+        )
+    return {
+        "status": "ok",
+        "lines_checked": result["lines_checked"],
+        "drifted_lines": [drift["line_id"] for drift in drifted_lines],
+        "drifted_budgets": [drift["budget_id"] for drift in drifted_budgets],
+        "fixed": fix,
+    }
@@ -1,17 +1,29 @@
+from datetime import timedelta
 from decimal import Decimal
+from unittest import mock
 
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from apps.budgeting.models import (
     Budget,
+    BudgetCommitment,
+    BudgetHeadroom,
+    BudgetItemCode,
     BudgetLine,
     BudgetOverrideRequest,
     BudgetUsage,
     CostCenter,
 )
+from apps.budgeting.services import BudgetHeadroomService, BudgetUsageService
+from apps.budgeting.similarity import item_code_index
+from apps.budgeting.views import BudgetItemCodeViewSet
 from apps.companies.models import Company, CompanyGroup
+from apps.inventory.models import UnitOfMeasure
 from apps.users.models import User
 
 
@@ -88,6 +100,327 @@ class BudgetingModelTests(TestCase):
         self.assertIsNotNone(override.approved_at)
 
 
+
+class BudgetTotalsTests(TestCase):
+    def setUp(self):
+        self.group = CompanyGroup.objects.create(name="Totals Group", db_name="cg_totals")
+        self.company = Company.objects.create(
+            company_group=self.group,
+            code="BTOT",
+            name="Totals Co",
+            legal_name="Totals Co",
+            currency_code="USD",
+            fiscal_year_start="2025-01-01",
+            tax_id="BT-1",
+            registration_number="BT-REG",
+        )
+        self.cost_center = CostCenter.objects.create(
+            code="BT-OPS", name="Operations", company=self.company, company_group=self.group
+        )
+        self.budget = Budget.objects.create(
+            company=self.company,
+            cost_center=self.cost_center,
+            name="FY25 Totals",
+            budget_type=Budget.TYPE_OPERATIONAL,
+            period_start="2025-01-01",
+            period_end="2025-12-31",
+            amount=Decimal("0"),
+            status=Budget.STATUS_ACTIVE,
+        )
+        self.lines = [
+            BudgetLine.objects.create(
+                budget=self.budget,
+                sequence=idx + 1,
+                procurement_class=BudgetLine.ProcurementClass.STOCK_ITEM,
+                item_name=f"Material {idx}",
+                qty_limit=Decimal("100"),
+                value_limit=Decimal("5000"),
+            )
+            for idx in range(2)
+        ]
+
+    def _usage(self, line, amount, reference):
+        return BudgetUsage(
+            budget_line=line,
+            usage_type="stock_issue",
+            quantity=Decimal("1"),
+            amount=Decimal(amount),
+            reference_type="ISSUE",
+            reference_id=reference,
+        )
+
+    def test_usage_on_stale_line_instances_is_not_lost(self):
+        first = BudgetLine.objects.get(pk=self.lines[0].pk)
+        second = BudgetLine.objects.get(pk=self.lines[0].pk)
+
+        first.record_usage(Decimal("1"), Decimal("100"))
+        second.record_usage(Decimal("2"), Decimal("250"))
+
+        line = BudgetLine.objects.get(pk=self.lines[0].pk)
+        self.budget.refresh_from_db()
+        self.assertEqual((line.consumed_quantity, line.consumed_value), (Decimal("3"), Decimal("350")))
+        self.assertEqual((self.budget.consumed, self.budget.amount), (Decimal("350"), Decimal("10000")))
+
+    def test_batch_usages_take_constant_queries(self):
+        usages = [self._usage(self.lines[idx % 2], "10", f"ISS-{idx}") for idx in range(20)]
+
+        with self.assertNumQueries(6):
+            BudgetUsageService.record_usages(usages)
+
+        consumed = dict(BudgetLine.objects.filter(budget=self.budget).values_list("sequence", "consumed_value"))
+        self.assertEqual(consumed, {1: Decimal("100"), 2: Decimal("100")})
+        self.budget.refresh_from_db()
+        self.assertEqual(self.budget.consumed, Decimal("200"))
+        self.assertEqual(BudgetUsage.objects.filter(budget_line__budget=self.budget).count(), 20)
+
+    def test_commitment_changes_apply_deltas(self):
+        line = self.lines[0]
+        reserved = BudgetCommitment.objects.create(
+            budget_line=line, source_type="PR", source_reference="PR-1",
+            committed_quantity=Decimal("10"), committed_value=Decimal("1000"),
+        )
+        other = BudgetCommitment.objects.create(
+            budget_line=line, source_type="PR", source_reference="PR-2",
+            committed_quantity=Decimal("5"), committed_value=Decimal("400"),
+        )
+        line.refresh_from_db()
+        self.assertEqual(line.committed_value, Decimal("1400"))
+
+        BudgetCommitment.objects.get(pk=reserved.pk).consume(Decimal("4"), Decimal("300"))
+        BudgetCommitment.objects.get(pk=other.pk).delete()
+
+        line.refresh_from_db()
+        self.assertEqual((line.committed_quantity, line.committed_value), (Decimal("6"), Decimal("700")))
+        self.assertEqual(line.recalculate_commitments(commit=False), (Decimal("6"), Decimal("700")))
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        BudgetUsageService.record_usages([self._usage(self.lines[0], "40", "ISS-1")])
+        BudgetLine.objects.filter(pk=self.lines[1].pk).update(consumed_value=Decimal("99"))
+
+        report = BudgetUsageService.reconcile(company=self.company)
+
+        self.assertEqual([drift["line_id"] for drift in report["drifted_lines"]], [self.lines[1].pk])
+        self.assertEqual(report["drifted_lines"][0]["diffs"]["consumed_value"]["expected"], Decimal("0"))
+        # Budgets are checked against the stored line totals until the lines are fixed
+        self.assertEqual([drift["budget_id"] for drift in report["drifted_budgets"]], [self.budget.pk])
+
+        BudgetUsageService.reconcile(company=self.company, fix=True)
+        after = BudgetUsageService.reconcile(company=self.company)
+        self.assertEqual((after["drifted_lines"], after["drifted_budgets"]), ([], []))
+        self.budget.refresh_from_db()
+        self.assertEqual(self.budget.consumed, Decimal("40"))
+
+
+class BudgetHeadroomTests(TestCase):
+    def setUp(self):
+        self.group = CompanyGroup.objects.create(name="Headroom Group", db_name="cg_headroom")
+        self.company = Company.objects.create(
+            company_group=self.group,
+            code="BHDR",
+            name="Headroom Co",
+            legal_name="Headroom Co",
+            currency_code="USD",
+            fiscal_year_start="2025-01-01",
+            tax_id="BH-1",
+            registration_number="BH-REG",
+        )
+        self.cost_center = CostCenter.objects.create(
+            code="BH-OPS", name="Operations", company=self.company, company_group=self.group
+        )
+        today = timezone.now().date()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.budget = Budget.objects.create(
+                company=self.company,
+                cost_center=self.cost_center,
+                name="Headroom budget",
+                budget_type=Budget.TYPE_OPERATIONAL,
+                period_start=today - timedelta(days=30),
+                period_end=today + timedelta(days=30),
+                amount=Decimal("0"),
+                status=Budget.STATUS_ACTIVE,
+            )
+            self.stock_line = BudgetLine.objects.create(
+                budget=self.budget,
+                sequence=1,
+                procurement_class=BudgetLine.ProcurementClass.STOCK_ITEM,
+                item_name="Material",
+                qty_limit=Decimal("100"),
+                value_limit=Decimal("1000"),
+            )
+            self.service_line = BudgetLine.objects.create(
+                budget=self.budget,
+                sequence=2,
+                procurement_class=BudgetLine.ProcurementClass.SERVICE_ITEM,
+                item_name="Maintenance",
+                value_limit=Decimal("500"),
+            )
+
+    def _headroom(self, procurement_class):
+        return BudgetHeadroom.objects.get(budget=self.budget, procurement_class=procurement_class)
+
+    def test_rows_follow_line_and_budget_changes(self):
+        self.assertEqual(self._headroom(BudgetLine.ProcurementClass.STOCK_ITEM).value_limit, Decimal("1000"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.stock_line.value_limit = Decimal("1200")
+            self.stock_line.save()
+            self.service_line.delete()
+            self.budget.status = Budget.STATUS_CLOSED
+            self.budget.save(update_fields=["status"])
+
+        rows = BudgetHeadroom.objects.filter(budget=self.budget)
+        self.assertEqual(
+            list(rows.values_list("procurement_class", "value_limit", "budget_status")),
+            [(BudgetLine.ProcurementClass.STOCK_ITEM, Decimal("1200.00"), Budget.STATUS_CLOSED)],
+        )
+
+    def test_usage_and_commitment_deltas_update_headroom(self):
+        self.stock_line.record_usage(Decimal("2"), Decimal("150"))
+        BudgetCommitment.objects.create(
+            budget_line=self.stock_line, source_type="PR", source_reference="PR-H1",
+            committed_quantity=Decimal("1"), committed_value=Decimal("200"),
+        )
+
+        headroom = self._headroom(BudgetLine.ProcurementClass.STOCK_ITEM)
+        self.assertEqual((headroom.consumed_value, headroom.committed_value), (Decimal("150"), Decimal("200")))
+        self.assertEqual(headroom.available_value, Decimal("650"))
+
+    def test_check_many_uses_running_totals_in_one_query(self):
+        stock = BudgetLine.ProcurementClass.STOCK_ITEM
+        lines = [
+            {"cost_center": self.cost_center.pk, "procurement_class": stock, "amount": Decimal("600")},
+            {"cost_center": self.cost_center.pk, "procurement_class": stock, "amount": Decimal("500")},
+            {"cost_center": self.cost_center.pk, "amount": Decimal("1400")},
+            {"cost_center": self.cost_center.pk + 1000, "amount": Decimal("1")},
+        ]
+
+        with self.assertNumQueries(1):
+            results = BudgetHeadroomService.check_many(lines)
+
+        self.assertEqual([result["available"] for result in results], [True, False, True, False])
+        self.assertEqual(results[1]["requested_total"], Decimal("1100"))
+        self.assertEqual(results[2]["available_amount"], Decimal("1500"))
+        self.assertEqual(results[3]["reason"], "No active budget found")
+
+    def test_batch_availability_endpoint(self):
+        user = User.objects.create_user(username="headroom-user", password="pass1234")
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {RefreshToken.for_user(user).access_token}"
+        self.client.defaults["HTTP_X_COMPANY_ID"] = str(self.company.id)
+        payload = {
+            "lines": [
+                {"cost_center": self.cost_center.pk, "procurement_class": "service_item", "amount": "300"},
+                {"cost_center": self.cost_center.pk, "procurement_class": "service_item", "amount": "300"},
+            ]
+        }
+
+        response = self.client.post(reverse("budget-availability-batch"), payload, content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertFalse(data["available"])
+        self.assertEqual([line["available"] for line in data["lines"]], [True, False])
+        self.assertEqual(data["lines"][1]["requested_total"], "600")
+
+        response = self.client.post(
+            reverse("budget-availability-batch"), {"lines": [{"amount": "1"}]}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_single_and_batch_checks_agree_on_committed_headroom(self):
+        BudgetCommitment.objects.create(
+            budget_line=self.service_line, source_type="PR", source_reference="PR-H2",
+            committed_quantity=Decimal("1"), committed_value=Decimal("300"),
+        )
+        user = User.objects.create_user(username="headroom-single", password="pass1234")
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {RefreshToken.for_user(user).access_token}"
+        self.client.defaults["HTTP_X_COMPANY_ID"] = str(self.company.id)
+        line = {"cost_center": self.cost_center.pk, "procurement_class": "service_item", "amount": "250"}
+
+        single = self.client.post(reverse("budget-availability"), line, content_type="application/json").json()
+        batch = self.client.post(
+            reverse("budget-availability-batch"), {"lines": [line]}, content_type="application/json"
+        ).json()["lines"][0]
+
+        self.assertEqual((single["available"], single["available_amount"]), (False, "200.00"))
+        self.assertEqual(
+            (batch["available"], batch["available_amount"], batch["committed_amount"]),
+            (single["available"], single["available_amount"], single["committed_amount"]),
+        )
+
+
+class CharacterEmbedding:
+    """Letter-count vectors: texts sharing letters are close."""
+
+    def embed_documents(self, texts):
+        return [[text.lower().count(chr(ord("a") + i)) for i in range(26)] for text in texts]
+
+
+class ItemCodeSimilarityIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.group = CompanyGroup.objects.create(name="Similar Group", db_name="cg_similar")
+        self.company = Company.objects.create(
+            company_group=self.group,
+            code="SIMC",
+            name="Similar Co",
+            legal_name="Similar Co",
+            currency_code="USD",
+            fiscal_year_start="2025-01-01",
+        )
+        self.uom = UnitOfMeasure.objects.create(company=self.company, code="EA", name="Each")
+        names = ["Hydraulic pump", "Ball bearing 6204", "Copper cable 4mm", "Safety helmet"]
+        self.items = [
+            BudgetItemCode.objects.create(company=self.company, code=f"SIM-{idx}", name=name, uom=self.uom)
+            for idx, name in enumerate(names)
+        ]
+        self.scope = ("group", self.group.pk)
+
+    def _similar(self, embeddings=None, **query):
+        return item_code_index.similar(
+            self.company, query=query, embeddings=embeddings, embedding_threshold=0.9, fuzzy_threshold=0.4, limit=3
+        )
+
+    def test_trigram_fallback_finds_typos(self):
+        matches = self._similar(code="", name="hydralic pumps")
+
+        self.assertEqual([match["id"] for match in matches], [self.items[0].pk])
+        self.assertEqual(matches[0]["uom_name"], "Each")
+
+    def test_embedding_top_k_is_ranked(self):
+        matches = self._similar(code="", name="pump hydraulic", embeddings=CharacterEmbedding())
+
+        self.assertEqual(matches[0]["id"], self.items[0].pk)
+
+    def test_index_is_patched_on_save_and_delete(self):
+        index = item_code_index.get(self.scope)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            added = BudgetItemCode.objects.create(company=self.company, code="SIM-9", name="Gate valve", uom=self.uom)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.items[1].delete()
+
+        with self.assertNumQueries(0):
+            self.assertIs(item_code_index.get(self.scope), index)
+        self.assertEqual(len(index), 4)
+        self.assertEqual([match["id"] for match in self._similar(code="", name="gate valves")], [added.pk])
+        self.assertEqual(self._similar(code="", name="ball bearing 6204"), [])
+
+    def test_create_view_reports_similar_codes(self):
+        user = User.objects.create_user(username="similar-user", password="pass1234", is_system_admin=True)
+        request = APIRequestFactory().post(
+            "/api/v1/budgets/item-codes/",
+            {"code": "SIM-NEW", "name": "Safety helmets", "uom": self.uom.pk},
+            format="json",
+        )
+        force_authenticate(request, user=user)
+        request.company = self.company
+
+        with mock.patch("apps.budgeting.views.similarity_embeddings", return_value=None):
+            response = BudgetItemCodeViewSet.as_view({"post": "create"})(request)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["similar"][0]["id"], self.items[3].pk)
+
 class BudgetingAPIViewTests(TestCase):
     def setUp(self):
         self.group = CompanyGroup.objects.create(name="API Group", db_name="cg_api")
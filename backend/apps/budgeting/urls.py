@@ -2,6 +2,7 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .views import (
+    BudgetAvailabilityBatchCheckView,
     BudgetAvailabilityCheckView,
     BudgetLineViewSet,
     BudgetOverrideRequestViewSet,
@@ -48,6 +49,7 @@ urlpatterns = [
     path('approvals/queue/', BudgetApprovalQueueView.as_view(), name='budget-approval-queue'),
     path('', include(router.urls)),
     path('check-availability/', BudgetAvailabilityCheckView.as_view(), name='budget-availability'),
+    path('check-availability/batch/', BudgetAvailabilityBatchCheckView.as_view(), name='budget-availability-batch'),
     path('workspace/summary/', BudgetWorkspaceSummaryView.as_view(), name='budget-workspace-summary'),
     # Budget Entry specific
     path('entry/declared/', DeclaredBudgetsView.as_view(), name='budget-entry-declared'),
@@ -5,7 +5,6 @@ from decimal import Decimal
 
 from django.db import models
 from django.db.models import Count, F, Max, Sum
-from django.db.models.functions import Coalesce
 from django.utils import timezone
 from rest_framework import mixins, serializers, status, viewsets
 from django.conf import settings
@@ -49,10 +48,9 @@ from .serializers import (
     BudgetApprovalSerializer,
 )
 from apps.inventory.models import UnitOfMeasure
-from difflib import SequenceMatcher
-import math
 from apps.permissions.permissions import has_permission
 from apps.security.services.permission_service import PermissionService
+from .similarity import item_code_index, similarity_embeddings, uom_index
 from .services import (
     BudgetApprovalService,
     BudgetNotificationService,
@@ -64,6 +62,7 @@ from .services import (
     BudgetCloningService,
     BudgetAIService,
     BudgetGamificationService,
+    BudgetHeadroomService,
 )
 from apps.procurement.models import PurchaseOrderLine
 from apps.inventory.models import Product
@@ -1750,39 +1749,64 @@ class BudgetAvailabilityCheckView(APIView):
         except CostCenter.DoesNotExist:
             return Response({"detail": "Cost center not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        today = timezone.now().date()
-        budget_filter = {
-            "cost_center": cost_center,
-            "period_start__lte": today,
-            "period_end__gte": today,
-            "status__in": [Budget.STATUS_ACTIVE, Budget.STATUS_APPROVED],
-        }
-        line_filters = {"budget__cost_center": cost_center, "budget__status__in": [Budget.STATUS_ACTIVE, Budget.STATUS_APPROVED]}
-        if procurement_class:
-            line_filters["procurement_class"] = procurement_class
-            budget_filter["lines__procurement_class"] = procurement_class
-
-        active_budgets = Budget.objects.filter(**budget_filter).distinct()
-        if not active_budgets.exists():
-            return Response({"available": False, "reason": "No active budget found"})
-
-        line_totals = (
-            BudgetLine.objects.filter(**line_filters, budget__in=active_budgets)
-            .aggregate(
-                total_limit=Coalesce(Sum("value_limit"), Decimal("0")),
-                total_consumed=Coalesce(Sum("consumed_value"), Decimal("0")),
-            )
+        # Same headroom definition as the batch check: limit - consumed - committed
+        result = BudgetHeadroomService.check_many(
+            [{"cost_center": cost_center.pk, "procurement_class": procurement_class, "amount": amount}],
+            company=getattr(request, "company", None),
+        )[0]
+        if "reason" in result:
+            return Response({"available": False, "reason": result["reason"]})
+
+        return Response(
+            {
+                "available": result["available"],
+                "available_amount": f"{result['available_amount']}",
+                "committed_amount": f"{result['committed_amount']}",
+                "requested": f"{amount}",
+            }
         )
 
-        total_limit = line_totals.get("total_limit", Decimal("0"))
-        total_consumed = line_totals.get("total_consumed", Decimal("0"))
-        available_value = total_limit - total_consumed
 
+class BudgetAvailabilityBatchCheckView(APIView):
+    """Check every line of a multi-line request against budget headroom in one lookup."""
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        lines = request.data.get("lines")
+        if not isinstance(lines, list) or not lines:
+            return Response({"detail": "lines required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        checks = []
+        for index, line in enumerate(lines):
+            if not isinstance(line, dict) or not line.get("cost_center") or line.get("amount") is None:
+                return Response(
+                    {"detail": f"Line {index + 1}: cost_center and amount required"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            try:
+                amount = Decimal(str(line["amount"]))
+                cost_center_id = int(line["cost_center"])
+            except Exception:
+                return Response({"detail": f"Line {index + 1}: invalid amount or cost_center"}, status=status.HTTP_400_BAD_REQUEST)
+            checks.append(
+                {"cost_center": cost_center_id, "procurement_class": line.get("procurement_class"), "amount": amount}
+            )
+
+        results = BudgetHeadroomService.check_many(checks, company=getattr(request, "company", None))
         return Response(
             {
-                "available": available_value >= amount,
-                "available_amount": f"{available_value}",
-                "requested": f"{amount}",
+                "available": all(result["available"] for result in results),
+                "lines": [
+                    {
+                        **result,
+                        "requested": f"{result['requested']}",
+                        "requested_total": f"{result['requested_total']}",
+                        "available_amount": f"{result['available_amount']}",
+                        "committed_amount": f"{result['committed_amount']}",
+                    }
+                    for result in results
+                ],
             }
         )
 
@@ -1910,7 +1934,6 @@ class BudgetItemCodeViewSet(viewsets.ModelViewSet):
             use_embeddings = bool(suggest_cfg.get('use_embeddings', True))
             embed_threshold = float(suggest_cfg.get('embedding_threshold', 0.70))
             fuzzy_threshold = float(suggest_cfg.get('fuzzy_threshold', 0.50))
-            candidate_limit = int(suggest_cfg.get('candidate_limit', 200))
             results_limit = int(suggest_cfg.get('results_limit', 5))
 
             if suggest_enabled and company and (code or name) and not force:
@@ -1927,57 +1950,16 @@ class BudgetItemCodeViewSet(viewsets.ModelViewSet):
                         "name": ["duplicate"],
                     }, status=status.HTTP_400_BAD_REQUEST)
 
-                # Preselect candidate pool (prefer name match; code may be empty)
-                criteria = models.Q()
-                if name:
-                    criteria |= models.Q(name__icontains=name)
-                if code:
-                    criteria |= models.Q(code__icontains=code)
-                candidates = list(qs.filter(criteria)[:candidate_limit]) if (name or code) else []
-                # If no substring candidates (e.g., typos), sample a small set for fuzzy matching
-                if not candidates:
-                    candidates = list(qs[:candidate_limit])
-
-                # Try vector similarity first (if AI embeddings are available)
-                similar = []
-                try:
-                    from apps.ai_companion.services.ai_service_v2 import ai_service_v2  # local import
-                    emb = getattr(ai_service_v2, 'embeddings', None)
-                    if emb is None and hasattr(ai_service_v2, '_ensure_ready'):
-                        try:
-                            ai_service_v2._ensure_ready(require_generator=False)
-                            emb = getattr(ai_service_v2, 'embeddings', None)
-                        except Exception:
-                            emb = None
-                    if emb is not None and use_embeddings:
-                        query_text = f"{code} {name}".strip()
-                        qv = emb.embed_query(query_text)
-                        # cosine similarity helper
-                        def _cos(a, b):
-                            da = math.sqrt(sum(x*x for x in a)) or 1.0
-                            db = math.sqrt(sum(x*x for x in b)) or 1.0
-                            return sum(x*y for x, y in zip(a, b)) / (da * db)
-                        cand_texts = [f"{(c.code or '').strip()} {(c.name or '').strip()}".strip() for c in candidates]
-                        dvs = emb.embed_documents(cand_texts)
-                        sims = [(_cos(qv, dv), c) for dv, c in zip(dvs, candidates)]
-                        # threshold tuned for embeddings (higher than fuzzy)
-                        sims = [(s, c) for s, c in sims if s >= embed_threshold]
-                        sims.sort(key=lambda t: t[0], reverse=True)
-                        similar = [{"id": c.id, "code": c.code, "name": c.name, "uom": getattr(c.uom, 'name', None)} for s, c in sims[:results_limit]]
-                except Exception:
-                    similar = []
-
-                # Fallback to fuzzy if no vector result
-                if not similar and candidates:
-                    scored = []
-                    for c in candidates:
-                        score_code = SequenceMatcher(a=code.lower(), b=(c.code or '').lower()).ratio() if code else 0
-                        score_name = SequenceMatcher(a=name.lower(), b=(c.name or '').lower()).ratio() if name else 0
-                        score = max(score_code, score_name)
-                        if score >= fuzzy_threshold:
-                            scored.append((score, c))
-                    scored.sort(key=lambda t: t[0], reverse=True)
-                    similar = [{"id": c.id, "code": c.code, "name": c.name, "uom": getattr(c.uom, 'name', None)} for _, c in scored[:results_limit]]
+                # Nearest existing codes of the company group, from the maintained index
+                matches = item_code_index.similar(
+                    company,
+                    query={"code": code, "name": name},
+                    embeddings=similarity_embeddings() if use_embeddings else None,
+                    embedding_threshold=embed_threshold,
+                    fuzzy_threshold=fuzzy_threshold,
+                    limit=results_limit,
+                )
+                similar = [{"id": c["id"], "code": c["code"], "name": c["name"], "uom": c["uom_name"]} for c in matches]
 
                 if similar:
                     try:
@@ -2081,46 +2063,15 @@ class BudgetUnitOfMeasureViewSet(viewsets.ModelViewSet):
                 if code and qs.filter(code__iexact=code).exists():
                     return Response({"detail": "A UOM with this code already exists for your company group.", "code": ["duplicate"]}, status=status.HTTP_400_BAD_REQUEST)
 
-                candidates = list(qs.filter(models.Q(code__icontains=code) | models.Q(name__icontains=name))[:50])
-
-                # Try vector similarity if embeddings available
-                similar = []
-                try:
-                    from apps.ai_companion.services.ai_service_v2 import ai_service_v2  # local import
-                    emb = getattr(ai_service_v2, 'embeddings', None)
-                    if emb is None and hasattr(ai_service_v2, '_ensure_ready'):
-                        try:
-                            ai_service_v2._ensure_ready(require_generator=False)
-                            emb = getattr(ai_service_v2, 'embeddings', None)
-                        except Exception:
-                            emb = None
-                    if emb is not None:
-                        query_text = f"{code} {name}".strip()
-                        qv = emb.embed_query(query_text)
-                        def _cos(a, b):
-                            da = math.sqrt(sum(x*x for x in a)) or 1.0
-                            db = math.sqrt(sum(x*x for x in b)) or 1.0
-                            return sum(x*y for x, y in zip(a, b)) / (da * db)
-                        cand_texts = [f"{(u.code or '').strip()} {(u.name or '').strip()}".strip() for u in candidates]
-                        dvs = emb.embed_documents(cand_texts)
-                        sims = [(_cos(qv, dv), u) for dv, u in zip(dvs, candidates)]
-                        sims = [(s, u) for s, u in sims if s >= 0.75]
-                        sims.sort(key=lambda t: t[0], reverse=True)
-                        similar = [{"id": u.id, "code": u.code, "name": u.name} for s, u in sims[:5]]
-                except Exception:
-                    similar = []
-
-                # Fallback to fuzzy
-                if not similar and candidates:
-                    scored = []
-                    for u in candidates:
-                        score_code = SequenceMatcher(a=code.lower(), b=(u.code or '').lower()).ratio() if code else 0
-                        score_name = SequenceMatcher(a=name.lower(), b=(u.name or '').lower()).ratio() if name else 0
-                        score = max(score_code, score_name)
-                        if score >= 0.6:
-                            scored.append((score, u))
-                    scored.sort(key=lambda t: t[0], reverse=True)
-                    similar = [{"id": u.id, "code": u.code, "name": u.name} for _, u in scored[:5]]
+                matches = uom_index.similar(
+                    company,
+                    query={"code": code, "name": name},
+                    embeddings=similarity_embeddings(),
+                    embedding_threshold=0.75,
+                    fuzzy_threshold=0.6,
+                    limit=5,
+                )
+                similar = [{"id": u["id"], "code": u["code"], "name": u["name"]} for u in matches]
 
                 if similar:
                     try:
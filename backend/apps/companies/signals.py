@@ -1,9 +1,10 @@
 """
 Signal handlers for companies app.
 """
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import Company
+from .models import Company, CompanyGroup
 from .services import DefaultDataService
 from django.core.management import call_command
 import logging
@@ -44,3 +45,15 @@ def load_default_data_on_company_creation(sender, instance, created, **kwargs):
             call_command('seed_default_roles', company_id=instance.id)
         except Exception as e:
             logger.warning(f"Failed to seed default roles for company {instance.code}: {e}")
+
+
+@receiver(post_save, sender=CompanyGroup)
+@receiver(post_delete, sender=CompanyGroup)
+def invalidate_company_group_db_cache(sender, instance, **kwargs):
+    """Drop the cached database name so routing picks up db_name changes."""
+    from shared.db_routers import company_group_db_cache
+
+    company_group_id = instance.pk
+    company_group_db_cache.invalidate(company_group_id)
+    # Other threads may re-cache the old value until the change is committed
+    transaction.on_commit(lambda: company_group_db_cache.invalidate(company_group_id))
@@ -1,12 +1,21 @@
 from __future__ import annotations
 
+import asyncio
 import datetime
+import threading
 from unittest import mock
 
 from django.test import TestCase
 
 from apps.companies.models import Company, CompanyGroup
 from apps.companies.services.provisioning import CompanyGroupProvisioner, ProvisioningError
+from apps.inventory.models import Warehouse
+from shared.db_routers import (
+    CompanyGroupDatabaseRouter,
+    company_group_context,
+    company_group_db_cache,
+    get_current_company_group_db,
+)
 
 
 class CompanyGroupProvisionerTests(TestCase):
@@ -67,3 +76,61 @@ class CompanyGroupProvisionerTests(TestCase):
         group = CompanyGroup.objects.get(name="Failed Group")
         self.assertEqual(group.status, "failed")
         self.assertFalse(Company.objects.filter(company_group=group).exists())
+
+
+class CompanyGroupDatabaseRoutingTests(TestCase):
+    def setUp(self):
+        company_group_db_cache.invalidate()
+        self.router = CompanyGroupDatabaseRouter()
+        self.north = CompanyGroup.objects.create(name="Routing North", db_name="cg_route_north")
+        self.south = CompanyGroup.objects.create(name="Routing South", db_name="cg_route_south")
+
+    def test_routes_to_default_without_context(self):
+        self.assertEqual(self.router.db_for_read(Warehouse), "default")
+
+    def test_db_name_is_looked_up_once_per_process(self):
+        with company_group_context(self.north.id):
+            with self.assertNumQueries(1):
+                self.assertEqual(self.router.db_for_read(Warehouse), "cg_route_north")
+                self.assertEqual(self.router.db_for_write(Warehouse), "cg_route_north")
+        with company_group_context(self.north.id), self.assertNumQueries(0):
+            self.assertEqual(self.router.db_for_read(Warehouse), "cg_route_north")
+        self.assertEqual(self.router.db_for_read(Warehouse), "default")
+
+    def test_saving_group_invalidates_cached_db_name(self):
+        with company_group_context(self.north.id):
+            self.router.db_for_read(Warehouse)
+        self.north.db_name = "cg_route_moved"
+        self.north.save()
+
+        with company_group_context(self.north.id):
+            self.assertEqual(self.router.db_for_read(Warehouse), "cg_route_moved")
+
+    def test_context_is_isolated_between_threads(self):
+        seen = {}
+        barrier = threading.Barrier(2)
+
+        def worker(group):
+            with company_group_context(group):
+                barrier.wait()
+                seen[group.id] = get_current_company_group_db()
+
+        threads = [threading.Thread(target=worker, args=(group,)) for group in (self.north, self.south)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(seen, {self.north.id: "cg_route_north", self.south.id: "cg_route_south"})
+        self.assertIsNone(get_current_company_group_db())
+
+    def test_context_is_isolated_between_async_tasks(self):
+        async def handle(group):
+            with company_group_context(group):
+                await asyncio.sleep(0)
+                return get_current_company_group_db()
+
+        async def main():
+            return await asyncio.gather(handle(self.north), handle(self.south))
+
+        self.assertEqual(asyncio.run(main()), ["cg_route_north", "cg_route_south"])
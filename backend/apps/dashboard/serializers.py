@@ -17,6 +17,7 @@ class DashboardPayloadSerializer(serializers.Serializer):
     layout = serializers.DictField()
     widgets = serializers.ListField()
     available_widgets = serializers.ListField()
+    freshness = serializers.DictField(required=False)
 
 
 class DashboardWidgetDefinitionSerializer(serializers.ModelSerializer):
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 import copy
+import logging
+import time
 from datetime import date
 from typing import Any, Dict, Iterable, List
 
+from django.core.cache import cache
 from django.utils import timezone
 
 from apps.ai_companion.services.telemetry import TelemetryService
@@ -22,6 +25,17 @@ from apps.finance.models import Invoice
 from apps.sales.models import SalesOrder
 from .models import DashboardLayout
 
+logger = logging.getLogger(__name__)
+
+# Snapshots are served as they are while at most one background refresh per
+# company and period rebuilds them; a finished refresh bumps the snapshot
+# version, which retires every bundle cached from the old snapshots.
+REFRESH_LOCK_KEY = 'dashboard:refresh:{company_id}:{period}'
+REFRESH_LOCK_TTL = 15 * 60
+SNAPSHOT_VERSION_KEY = 'dashboard:snapshots:{company_id}:{period}'
+BUNDLE_KEY = 'dashboard:bundle:{company_id}:{period}:{layout_version}:{snapshot_version}'
+BUNDLE_TTL = 60
+
 
 DEFAULT_WIDGETS = [
     {'id': 'kpi-total-revenue', 'type': 'kpi', 'title': 'Revenue', 'description': 'Total revenue for the selected period', 'size': 'sm'},
@@ -98,38 +112,122 @@ def _ensure_layout_record(layout: DashboardLayout | None, user, company) -> Dash
         widgets=get_default_widget_ids(),
     )
 
-def _fetch_or_build_snapshots(company, period_label: str) -> tuple[SalesPerformanceSnapshot | None, CashflowSnapshot | None]:
-    alias = get_warehouse_alias("default")
-    sales_snapshot = (
-        SalesPerformanceSnapshot.objects.using(alias)
-        .filter(company_id=company.id, period=period_label)
-        .order_by('-snapshot_date')
-        .first()
-    )
-    cash_snapshot = (
-        CashflowSnapshot.objects.using(alias)
+def _latest_snapshot(model, alias: str, company, period_label: str):
+    return (
+        model.objects.using(alias)
         .filter(company_id=company.id, period=period_label)
         .order_by('-snapshot_date')
         .first()
     )
 
-    if sales_snapshot is None or cash_snapshot is None:
-        run_warehouse_etl(period=period_label, companies=[company])
-        alias = get_warehouse_alias("default")
-        sales_snapshot = (
-            SalesPerformanceSnapshot.objects.using(alias)
-            .filter(company_id=company.id, period=period_label)
-            .order_by('-snapshot_date')
-            .first()
-        )
-        cash_snapshot = (
-            CashflowSnapshot.objects.using(alias)
-            .filter(company_id=company.id, period=period_label)
-            .order_by('-snapshot_date')
-            .first()
+def _refresh_lock_key(company_id: int, period_label: str) -> str:
+    return REFRESH_LOCK_KEY.format(company_id=company_id, period=period_label)
+
+def snapshot_version(company_id: int, period_label: str):
+    key = SNAPSHOT_VERSION_KEY.format(company_id=company_id, period=period_label)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns() // 1000, None)
+        version = cache.get(key)
+    return version
+
+def _bump_snapshot_version(company_id: int, period_label: str) -> None:
+    key = SNAPSHOT_VERSION_KEY.format(company_id=company_id, period=period_label)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns() // 1000, None)
+
+def is_refreshing(company_id: int, period_label: str) -> bool:
+    return cache.get(_refresh_lock_key(company_id, period_label)) is not None
+
+def schedule_snapshot_refresh(company, period_label: str) -> bool:
+    """
+    Enqueue a background rebuild of a company's snapshots for a period.
+
+    The per company/period lock is taken here and released by the task, so
+    repeated dashboard loads enqueue at most one refresh; the lock expires on
+    its own if a worker dies mid-refresh. Returns whether a refresh is queued
+    or already running.
+    """
+    from .tasks import refresh_dashboard_snapshots
+
+    lock_key = _refresh_lock_key(company.id, period_label)
+    if not cache.add(lock_key, timezone.now().isoformat(), REFRESH_LOCK_TTL):
+        return True
+    try:
+        refresh_dashboard_snapshots.delay(company.id, period_label)
+    except Exception:  # pylint: disable=broad-except
+        cache.delete(lock_key)
+        logger.exception("Could not enqueue dashboard snapshot refresh for company %s", company.id)
+        return False
+    return True
+
+def refresh_snapshots(company, period_label: str) -> dict:
+    """
+    Rebuild a company's snapshots for a period and release its refresh lock.
+    """
+    try:
+        result = run_warehouse_etl(period=period_label, companies=[company])
+        _bump_snapshot_version(company.id, period_label)
+        return result
+    finally:
+        cache.delete(_refresh_lock_key(company.id, period_label))
+
+def _snapshot_stamp(sales_snapshot, cash_snapshot) -> Dict[str, Any]:
+    """
+    Dates of the snapshots a bundle was built from, cached alongside it.
+    """
+    snapshots = [snapshot for snapshot in (sales_snapshot, cash_snapshot) if snapshot is not None]
+    oldest = min(snapshots, key=lambda snapshot: snapshot.snapshot_date, default=None)
+    generated_at = None
+    if oldest is not None:
+        generated_at = (oldest.metadata or {}).get('generated_at') or (
+            oldest.created_at.isoformat() if oldest.created_at else None
         )
+    return {
+        'complete': len(snapshots) == 2,
+        'snapshot_date': oldest.snapshot_date if oldest else None,
+        'generated_at': generated_at,
+    }
+
+def _snapshot_freshness(stamp: Dict[str, Any], company, period_range) -> Dict[str, Any]:
+    """
+    Freshness of a bundle's snapshots, evaluated on every load.
+
+    It is kept out of the cached bundle so ``status`` follows the current
+    period and ``refreshing`` the refresh lock as it is now. Missing or
+    out-of-date snapshots are rebuilt in the background instead of inside
+    the request.
+    """
+    if not stamp['complete']:
+        status = 'missing'
+    elif stamp['snapshot_date'] >= period_range.end:
+        status = 'fresh'
+    else:
+        status = 'stale'
+
+    if status == 'fresh':
+        refreshing = is_refreshing(company.id, period_range.label)
+    else:
+        refreshing = schedule_snapshot_refresh(company, period_range.label)
 
-    return sales_snapshot, cash_snapshot
+    return {
+        'status': status,
+        'snapshot_date': stamp['snapshot_date'].isoformat() if stamp['snapshot_date'] else None,
+        'generated_at': stamp['generated_at'],
+        'refreshing': refreshing,
+    }
+
+def _fetch_snapshots(company, period_range) -> tuple[SalesPerformanceSnapshot | None, CashflowSnapshot | None]:
+    """
+    Latest snapshots for the period, whatever their date.
+    """
+    alias = get_warehouse_alias("default")
+    return (
+        _latest_snapshot(SalesPerformanceSnapshot, alias, company, period_range.label),
+        _latest_snapshot(CashflowSnapshot, alias, company, period_range.label),
+    )
 
 def _as_float(value) -> float:
     return float(decimal_or_zero(value))
@@ -257,9 +355,17 @@ WIDGET_GROUP_MAP = {
     'kpi-workflows': 'Value Added Modules',
 }
 
+def _layout_version(layout: DashboardLayout) -> str:
+    updated_at = layout.updated_at.timestamp() if layout.updated_at else 0
+    return f"{layout.pk}.{int(updated_at * 1_000_000)}"
+
 def load_dashboard(user, company, period: str = '30d') -> Dict[str, Any]:
     """
     Returns dashboard data bundle consisting of layout, widgets, and metrics.
+
+    Bundles are cached briefly per company, period, layout version and
+    snapshot version, so saving a layout or finishing a snapshot refresh
+    is visible on the next load. Snapshot freshness is computed per load.
     """
     layout_instance = _ensure_layout_record(
         DashboardLayout.objects.filter(user=user, company=company).first(),
@@ -267,11 +373,26 @@ def load_dashboard(user, company, period: str = '30d') -> Dict[str, Any]:
         company=company,
     )
 
+    period_range = resolve_period(period)
+    bundle_key = BUNDLE_KEY.format(
+        company_id=company.id,
+        period=period_range.label,
+        layout_version=_layout_version(layout_instance),
+        snapshot_version=snapshot_version(company.id, period_range.label),
+    )
+    cached = cache.get(bundle_key)
+    if cached is None:
+        cached = _build_dashboard(layout_instance, company, period_range)
+        cache.set(bundle_key, cached, BUNDLE_TTL)
+    bundle, stamp = cached
+    return {**bundle, 'freshness': _snapshot_freshness(stamp, company, period_range)}
+
+def _build_dashboard(layout_instance: DashboardLayout, company, period_range) -> tuple[Dict[str, Any], Dict[str, Any]]:
     layout_config = layout_instance.layout or get_default_layout()
     widget_ids = layout_instance.widgets or get_default_widget_ids()
 
-    period_range = resolve_period(period)
-    sales_snapshot, cash_snapshot = _fetch_or_build_snapshots(company, period_range.label)
+    sales_snapshot, cash_snapshot = _fetch_snapshots(company, period_range)
+    stamp = _snapshot_stamp(sales_snapshot, cash_snapshot)
 
     # Guard against missing analytics data
     sales_snapshot = sales_snapshot or SalesPerformanceSnapshot(
@@ -326,13 +447,14 @@ def load_dashboard(user, company, period: str = '30d') -> Dict[str, Any]:
             'group': WIDGET_GROUP_MAP.get(widget_id, 'Core Modules'),
         })
 
-    return {
+    bundle = {
         'period': period_range.label,
         'layout': _copy_layout(layout_config),
         'widgets': widgets_payload,
         'available_widgets': available_widgets,
         'currency': getattr(company, 'currency_code', 'BDT'),
     }
+    return bundle, stamp
 
 
 def save_layout(user, company, layout: Dict[str, Any], widgets: Iterable[str]) -> DashboardLayout:
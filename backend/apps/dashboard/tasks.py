@@ -0,0 +1,14 @@
+from celery import shared_task
+
+from apps.companies.models import Company
+
+from .services import refresh_snapshots
+
+
+@shared_task(name='apps.dashboard.tasks.refresh_dashboard_snapshots')
+def refresh_dashboard_snapshots(company_id: int, period: str):
+    """
+    Rebuild the warehouse snapshots behind a company's dashboard.
+    """
+    company = Company.objects.get(pk=company_id)
+    return refresh_snapshots(company, period)
@@ -0,0 +1,90 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.analytics.models import CashflowSnapshot, SalesPerformanceSnapshot
+from apps.companies.models import Company, CompanyGroup
+from apps.dashboard import services
+from apps.dashboard.tasks import refresh_dashboard_snapshots
+
+
+class DashboardSnapshotRefreshTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.group = CompanyGroup.objects.create(name="DB Group", db_name="cg_db_test")
+        self.company = Company.objects.create(name="DB Co", code="DBCO", company_group=self.group)
+        self.user = get_user_model().objects.create_user(username="dash", password="pass")
+        self.today = timezone.now().date()
+        patcher = mock.patch("apps.dashboard.tasks.refresh_dashboard_snapshots.delay")
+        self.delay = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _snapshots(self, snapshot_date, revenue):
+        common = {
+            'snapshot_date': snapshot_date, 'period': '30d', 'company_id': self.company.id,
+            'company_code': self.company.code, 'company_name': self.company.name,
+            'timeframe_start': snapshot_date - timedelta(days=29), 'timeframe_end': snapshot_date,
+        }
+        SalesPerformanceSnapshot.objects.create(total_revenue=revenue, total_orders=3, **common)
+        CashflowSnapshot.objects.create(**common)
+
+    def test_stale_snapshot_is_served_while_one_refresh_is_queued(self):
+        self._snapshots(self.today - timedelta(days=1), 125)
+
+        with mock.patch("apps.dashboard.services.run_warehouse_etl") as etl:
+            payload = services.load_dashboard(self.user, self.company)
+            services.load_dashboard(self.user, self.company)
+
+        etl.assert_not_called()
+        self.delay.assert_called_once_with(self.company.id, '30d')
+        revenue = next(w for w in payload['widgets'] if w['id'] == 'kpi-total-revenue')
+        self.assertEqual(revenue['data']['value'], 125.0)
+        self.assertEqual(payload['freshness']['status'], 'stale')
+        self.assertEqual(payload['freshness']['snapshot_date'], (self.today - timedelta(days=1)).isoformat())
+        self.assertTrue(payload['freshness']['refreshing'])
+
+    def test_finished_refresh_releases_the_lock_and_retires_cached_bundles(self):
+        services.load_dashboard(self.user, self.company)
+        self.assertTrue(services.is_refreshing(self.company.id, '30d'))
+
+        def etl(period, companies):
+            self._snapshots(self.today, 300)
+            return {'success': True}
+
+        with mock.patch("apps.dashboard.services.run_warehouse_etl", side_effect=etl):
+            refresh_dashboard_snapshots(self.company.id, '30d')
+
+        self.assertFalse(services.is_refreshing(self.company.id, '30d'))
+        payload = services.load_dashboard(self.user, self.company)
+        self.assertEqual(payload['freshness']['status'], 'fresh')
+        self.assertFalse(payload['freshness']['refreshing'])
+        revenue = next(w for w in payload['widgets'] if w['id'] == 'kpi-total-revenue')
+        self.assertEqual(revenue['data']['value'], 300.0)
+        self.delay.assert_called_once()
+
+    def test_saving_a_layout_invalidates_the_cached_bundle(self):
+        self._snapshots(self.today, 10)
+        services.load_dashboard(self.user, self.company)
+
+        services.save_layout(self.user, self.company, layout=None, widgets=['kpi-total-orders'])
+
+        payload = services.load_dashboard(self.user, self.company)
+        self.assertEqual([w['id'] for w in payload['widgets']], ['kpi-total-orders'])
+        self.delay.assert_not_called()
+
+    def test_cached_bundle_reports_the_current_refresh_state(self):
+        self._snapshots(self.today, 10)
+        self.assertFalse(services.load_dashboard(self.user, self.company)['freshness']['refreshing'])
+
+        # A refresh started after the bundle was cached
+        cache.add(services._refresh_lock_key(self.company.id, '30d'), 'now', services.REFRESH_LOCK_TTL)
+        with mock.patch("apps.dashboard.services._build_dashboard") as build:
+            payload = services.load_dashboard(self.user, self.company)
+
+        build.assert_not_called()
+        self.assertEqual(payload['freshness']['status'], 'fresh')
+        self.assertTrue(payload['freshness']['refreshing'])
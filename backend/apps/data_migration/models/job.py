@@ -123,6 +123,18 @@ class MigrationJob(CompanyAwareModel):
             logger.debug("Telemetry event failed for MigrationJob %s: %s", self.id, exc)
         return self
 
+    def update_progress(self, stage: str, *, processed: int, total: int | None = None):
+        """Record progress of a long-running stage (staging, validation, commit) in ``meta['progress']``."""
+        self.meta["progress"] = {
+            "stage": stage,
+            "processed": processed,
+            "total": total,
+            "percent": round(100.0 * processed / total, 1) if total else None,
+            "updated_at": timezone.now().isoformat(),
+        }
+        self.save(update_fields=["meta", "updated_at"])
+        return self
+
 
 class MigrationFile(models.Model):
     """
@@ -1,15 +1,17 @@
 import hashlib
 import math
-from datetime import date as date_cls
-from collections import Counter
-from dataclasses import dataclass
-from typing import Iterable, Optional
+from datetime import date as date_cls, datetime as datetime_cls
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field as dataclass_field
+from typing import Iterable, Iterator, Optional
 
 import pandas as pd
 from django.apps import apps
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import transaction
-from django.db.models import Model, NOT_PROVIDED
+from django.db.models import Model, NOT_PROVIDED, Q, UniqueConstraint
+from django.db.models.signals import post_save, pre_save
 from django.utils import timezone
 from django.utils.text import slugify
 
@@ -38,6 +40,13 @@ def normalize_header(value: str) -> str:
     return slugify(value or "", allow_unicode=False).replace("-", "_")
 
 
+def _isoformat(value) -> str:
+    """ISO string for a date/datetime; midnight datetimes are reduced to the date."""
+    if isinstance(value, datetime_cls) and (value.hour, value.minute, value.second, value.microsecond) == (0, 0, 0, 0):
+        return value.date().isoformat()
+    return value.isoformat()
+
+
 def compute_file_hash(file_like) -> str:
     hasher = hashlib.sha256()
     file_like.seek(0)
@@ -57,6 +66,57 @@ class MappingSuggestion:
     proposed_definition: Optional[dict] = None
 
 
+@dataclass
+class ColumnProfileStats:
+    """Statistics of one source column, accumulated chunk by chunk."""
+
+    row_count: int = 0
+    nulls: int = 0
+    values: set = dataclass_field(default_factory=set)
+    min_length: Optional[int] = None
+    max_length: int = 0
+    samples: list = dataclass_field(default_factory=list)
+    types: set = dataclass_field(default_factory=set)
+    empty_type: Optional[str] = None
+
+    def add(self, series: pd.Series) -> None:
+        self.row_count += len(series)
+        self.nulls += int(series.isna().sum())
+        present = series.dropna()
+        if present.empty:
+            self.empty_type = self.empty_type or MigrationPipeline._infer_series_type(series)
+            return
+        self.types.add(MigrationPipeline._infer_series_type(series))
+        self.values.update(present.unique().tolist())
+        text = present.astype(str)
+        lengths = text.map(len)
+        chunk_min = int(lengths.min())
+        self.min_length = chunk_min if self.min_length is None else min(self.min_length, chunk_min)
+        self.max_length = max(self.max_length, int(lengths.max()))
+        if len(self.samples) < 10:
+            self.samples.extend(text.head(10 - len(self.samples)).tolist())
+
+    def add_missing(self, rows: int) -> None:
+        """Count rows that lack this column as nulls."""
+        self.row_count += rows
+        self.nulls += rows
+
+    @property
+    def inferred_type(self) -> str:
+        # Chunks inferring different types would combine into an object column
+        types = self.types or {self.empty_type or "text"}
+        return next(iter(types)) if len(types) == 1 else "text"
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "nulls": self.nulls,
+            "unique": len(self.values),
+            "min_length": self.min_length or 0,
+            "max_length": self.max_length,
+        }
+
+
 class MigrationPipeline:
     """
     High-level coordinator for the Phase 3 data migration lifecycle.
@@ -74,6 +134,12 @@ class MigrationPipeline:
         "stock_balance": "inventory.StockLevel",
     }
 
+    PROFILE_PREVIEW_ROWS = 10
+    STAGE_CHUNK_SIZE = getattr(settings, "DATA_MIGRATION_STAGE_CHUNK_SIZE", 5000)
+    STAGE_BATCH_SIZE = getattr(settings, "DATA_MIGRATION_STAGE_BATCH_SIZE", 1000)
+    VALIDATE_CHUNK_SIZE = getattr(settings, "DATA_MIGRATION_VALIDATE_CHUNK_SIZE", 2000)
+    COMMIT_BATCH_SIZE = getattr(settings, "DATA_MIGRATION_COMMIT_BATCH_SIZE", 500)
+
     def __init__(self, job: MigrationJob):
         self.job = job
 
@@ -134,27 +200,49 @@ class MigrationPipeline:
     # ------------------------------------------------------------------
     # Detection & profiling
     # ------------------------------------------------------------------
-    def profile_files(self) -> pd.DataFrame:
-        dataframes = []
-        for migration_file in self.job.files.all():
-            df = self._load_dataframe(migration_file)
-            migration_file.mark_parsed(row_count=len(df), stored_path=migration_file.stored_path)
-            dataframes.append((migration_file, df))
+    def profile_files(self, *, chunk_size: int | None = None) -> pd.DataFrame:
+        """
+        Profile the columns of every job file and guess the target entity.
 
-        if not dataframes:
+        Files are streamed ``chunk_size`` rows at a time like ``stage_rows``
+        and column statistics are accumulated per chunk, so a file is never
+        loaded whole. Returns a preview of the first rows of each file.
+        """
+        chunk_size = chunk_size or self.STAGE_CHUNK_SIZE
+        profiles: dict[str, ColumnProfileStats] = {}
+        previews = []
+        files = list(self.job.files.all())
+        if not files:
             raise ValueError("No files attached to migration job.")
 
-        combined_df = pd.concat([df for _, df in dataframes], ignore_index=True)
-        self._store_column_profiles(combined_df, dataframes)
-
-        guessed_target = self._guess_entity(combined_df.columns)
+        total_rows = 0
+        for migration_file in files:
+            row_count = 0
+            for df in self._iter_chunks(migration_file, chunk_size):
+                if row_count < self.PROFILE_PREVIEW_ROWS:
+                    previews.append(df.head(self.PROFILE_PREVIEW_ROWS - row_count))
+                for column in df.columns:
+                    profile = profiles.setdefault(column, ColumnProfileStats())
+                    # Earlier rows without this column count as nulls, as in one concatenated frame
+                    profile.add_missing(total_rows - profile.row_count)
+                    profile.add(df[column])
+                row_count += len(df.index)
+                total_rows += len(df.index)
+            migration_file.mark_parsed(row_count=row_count, stored_path=migration_file.stored_path)
+        for profile in profiles.values():
+            profile.add_missing(total_rows - profile.row_count)
+
+        self._store_column_profiles(profiles)
+
+        preview_df = pd.concat(previews, ignore_index=True) if previews else pd.DataFrame(columns=list(profiles))
+        guessed_target = self._guess_entity(profiles)
         if guessed_target and not self.job.target_model:
             self.job.target_model = guessed_target
             self.job.meta.setdefault("detector", {})["entity_guess"] = guessed_target
             self.job.save(update_fields=["target_model", "meta", "updated_at"])
 
         self.job.mark_status(migration_enums.MigrationJobStatus.DETECTED)
-        return combined_df
+        return preview_df
 
     def _load_dataframe(self, migration_file: MigrationFile) -> pd.DataFrame:
         file_path = migration_file.uploaded_file.path if migration_file.uploaded_file else migration_file.stored_path
@@ -168,25 +256,17 @@ class MigrationPipeline:
         df.columns = [col.strip() for col in df.columns]
         return df
 
-    def _store_column_profiles(self, combined_df: pd.DataFrame, file_pairs: Iterable[tuple[MigrationFile, pd.DataFrame]]):
+    def _store_column_profiles(self, profiles: dict[str, ColumnProfileStats]):
         MigrationColumnProfile.objects.filter(migration_job=self.job).delete()
-        for column in combined_df.columns:
-            series = combined_df[column]
-            sample_values = series.dropna().astype(str).head(10).tolist()
-            lengths = series.dropna().astype(str).map(len)
-            stats = {
-                "nulls": int(series.isna().sum()),
-                "unique": int(series.nunique(dropna=True)),
-                "min_length": int(lengths.min()) if not lengths.empty else 0,
-                "max_length": int(lengths.max()) if not lengths.empty else 0,
-            }
-            inferred_type = self._infer_series_type(series)
+        for column, profile in profiles.items():
+            inferred_type = profile.inferred_type
+            stats = profile.stats
             MigrationColumnProfile.objects.create(
                 migration_job=self.job,
                 column_name_in_file=column,
                 detected_data_type=inferred_type,
                 inferred_field_name=normalize_header(column),
-                sample_values=sample_values,
+                sample_values=profile.samples,
                 stats=stats,
                 confidence_score=self._type_confidence(inferred_type, stats),
             )
@@ -308,51 +388,49 @@ class MigrationPipeline:
     # ------------------------------------------------------------------
     # Staging & normalization
     # ------------------------------------------------------------------
-    def stage_rows(self, *, user=None, chunk_size: int | None = None):
+    def stage_rows(self, *, user=None, chunk_size: int | None = None, batch_size: int | None = None) -> int:
+        """
+        Stream every job file into ``MigrationStagingRow`` records.
+
+        Files are read ``chunk_size`` rows at a time (CSV via pandas chunks,
+        XLSX via a read-only openpyxl row iterator), each chunk is cleaned and
+        mapped column-wise and written with ``bulk_create`` in batches of
+        ``batch_size``. Progress is recorded on the job after every chunk.
+        Returns the number of staged rows.
+        """
+        chunk_size = chunk_size or self.STAGE_CHUNK_SIZE
+        batch_size = batch_size or self.STAGE_BATCH_SIZE
+        MigrationValidationError.objects.filter(migration_job=self.job).delete()
         MigrationStagingRow.objects.filter(migration_job=self.job).delete()
         mapping_lookup = {
             mapping.column_name_in_file: mapping
             for mapping in MigrationFieldMapping.objects.filter(migration_job=self.job)
         }
 
-        for migration_file in self.job.files.all():
-            file_path = migration_file.uploaded_file.path if migration_file.uploaded_file else migration_file.stored_path
-            is_csv = file_path and file_path.lower().endswith(".csv")
-            # Choose iterator: chunked CSV if chunk_size is provided, else full DataFrame
-            if is_csv and chunk_size and chunk_size > 0:
-                chunk_iter = pd.read_csv(file_path, chunksize=chunk_size)
-                chunks = ((chunk, True) for chunk in chunk_iter)
-            else:
-                chunks = ((self._load_dataframe(migration_file), False),)
-
-            base_index = 0
-            for df, is_chunk in chunks:
-                for idx, row in df.iterrows():
-                    payload = {}
-                    extra_data = {}
-                    for column, value in row.items():
-                        mapping = mapping_lookup.get(column)
-                        if not mapping or mapping.target_storage_mode == migration_enums.TargetStorageMode.IGNORE:
-                            continue
-
-                        cleaned = self._clean_value(value)
-                        if mapping.requires_schema_extension:
-                            extra_data[mapping.target_entity_field] = cleaned
-                        else:
-                            payload[mapping.target_entity_field] = cleaned
-
-                    if extra_data:
-                        payload.setdefault("extra_data", {}).update(extra_data)
-
-                    MigrationStagingRow.objects.create(
-                        migration_job=self.job,
-                        source_file_name=migration_file.original_filename,
-                        row_index_in_file=int(base_index + idx),
-                        clean_payload_json=payload,
-                        status=migration_enums.StagingRowStatus.PENDING_VALIDATION,
-                    )
-                if is_chunk:
-                    base_index += len(df)
+        files = list(self.job.files.all())
+        total = sum(migration_file.row_count_detected or 0 for migration_file in files) or None
+        staged = 0
+        self.job.update_progress("staging", processed=0, total=total)
+        for migration_file in files:
+            row_index = 0
+            for df in self._iter_chunks(migration_file, chunk_size):
+                payloads = self._map_chunk(df, mapping_lookup)
+                MigrationStagingRow.objects.bulk_create(
+                    [
+                        MigrationStagingRow(
+                            migration_job=self.job,
+                            source_file_name=migration_file.original_filename,
+                            row_index_in_file=row_index + position,
+                            clean_payload_json=payload,
+                            status=migration_enums.StagingRowStatus.PENDING_VALIDATION,
+                        )
+                        for position, payload in enumerate(payloads)
+                    ],
+                    batch_size=batch_size,
+                )
+                row_index += len(payloads)
+                staged += len(payloads)
+                self.job.update_progress("staging", processed=staged, total=total)
 
         self._log_audit(
             self.job,
@@ -360,6 +438,98 @@ class MigrationPipeline:
             action="IMPORT_STAGE_READY",
             description="Staging rows prepared.",
         )
+        return staged
+
+    def _iter_chunks(self, migration_file: MigrationFile, chunk_size: int) -> Iterator[pd.DataFrame]:
+        """Yield the rows of a file as DataFrames of at most ``chunk_size`` rows without loading it whole."""
+        file_path = migration_file.uploaded_file.path if migration_file.uploaded_file else migration_file.stored_path
+        if not file_path:
+            raise ValueError("Migration file has no storage reference.")
+
+        lowered = file_path.lower()
+        if lowered.endswith(".csv"):
+            for df in pd.read_csv(file_path, chunksize=chunk_size):
+                df.columns = [str(col).strip() for col in df.columns]
+                yield df.reset_index(drop=True)
+        elif lowered.endswith(".xlsx"):
+            yield from self._iter_xlsx_chunks(file_path, chunk_size)
+        else:
+            # Legacy .xls has no streaming reader
+            df = self._load_dataframe(migration_file)
+            for start in range(0, len(df), chunk_size):
+                yield df.iloc[start:start + chunk_size].reset_index(drop=True)
+
+    @staticmethod
+    def _iter_xlsx_chunks(file_path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = [str(col).strip() if col is not None else f"Unnamed: {idx}" for idx, col in enumerate(header)]
+            buffer = []
+            for values in rows:
+                if values is None or all(value is None for value in values):
+                    continue
+                buffer.append(values[:len(columns)])
+                if len(buffer) >= chunk_size:
+                    yield pd.DataFrame.from_records(buffer, columns=columns)
+                    buffer = []
+            if buffer:
+                yield pd.DataFrame.from_records(buffer, columns=columns)
+        finally:
+            workbook.close()
+
+    def _map_chunk(self, df: pd.DataFrame, mapping_lookup: dict) -> list[dict]:
+        """Clean a chunk and turn it into staging payloads (mapped fields plus ``extra_data``)."""
+        direct, extension = {}, {}
+        for column in df.columns:
+            mapping = mapping_lookup.get(column)
+            if not mapping or mapping.target_storage_mode == migration_enums.TargetStorageMode.IGNORE:
+                continue
+            target = extension if mapping.requires_schema_extension else direct
+            target[column] = mapping.target_entity_field
+
+        cleaned = self._clean_frame(df[[*direct, *extension]])
+        if direct:
+            payloads = cleaned[list(direct)].rename(columns=direct).to_dict("records")
+        else:
+            payloads = [{} for _ in range(len(cleaned))]
+        if extension:
+            extra_rows = cleaned[list(extension)].rename(columns=extension).to_dict("records")
+            for payload, extra_data in zip(payloads, extra_rows):
+                payload.setdefault("extra_data", {}).update(extra_data)
+        return payloads
+
+    @staticmethod
+    def _clean_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Column-wise equivalent of ``_clean_value`` for a whole chunk.
+
+        Strings are stripped and blanks become None, NaN/NaT become None,
+        dates become ISO strings and numpy scalars become Python values so
+        the rows can be stored as JSON.
+        """
+        columns = {}
+        for column in df.columns:
+            series = df[column]
+            if pd.api.types.is_datetime64_any_dtype(series):
+                series = series.map(_isoformat, na_action="ignore")
+            elif series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+                series = series.astype(object)
+                is_str = series.map(type) == str
+                if is_str.any():
+                    stripped = series[is_str].str.strip()
+                    series = series.where(~is_str, stripped.where(stripped != "", None))
+                is_datetime = series.map(lambda value: isinstance(value, (date_cls, pd.Timestamp)))
+                if is_datetime.any():
+                    series = series.where(~is_datetime, series[is_datetime].map(_isoformat))
+            columns[column] = series.astype(object)
+        cleaned = pd.DataFrame(columns, index=df.index)
+        return cleaned.where(cleaned.notna(), None)
 
     @staticmethod
     def _clean_value(value):
@@ -375,8 +545,18 @@ class MigrationPipeline:
     # ------------------------------------------------------------------
     # Validation
     # ------------------------------------------------------------------
-    def validate(self, *, user=None):
+    def validate(self, *, user=None, chunk_size: int | None = None):
+        """
+        Validate staged rows chunk by chunk.
+
+        Each chunk is checked for missing required fields, duplicates of an
+        earlier row in the file and conflicts with records already in the
+        target table (one query per unique constraint). Errors are written
+        with ``bulk_create`` and row statuses with two bulk updates. Skipped
+        rows are left alone.
+        """
         model = self._get_model(self.job.target_model)
+        chunk_size = chunk_size or self.VALIDATE_CHUNK_SIZE
         required_fields = [
             field.name
             for field in model._meta.fields
@@ -385,59 +565,69 @@ class MigrationPipeline:
             and not getattr(field, "blank", False)
             and getattr(field, "default", NOT_PROVIDED) is NOT_PROVIDED
         ]
-        unique_constraints = [
-            [field for field in unique_set if field not in {"company", "company_group"}]
-            for unique_set in model._meta.unique_together or []
-            if any(field not in {"company", "company_group"} for field in unique_set)
-        ]
+        unique_constraints = self._unique_constraints(model)
+        mappings = {}
+        for mapping in self.job.field_mappings.order_by("id"):
+            mappings.setdefault(mapping.target_entity_field, mapping)
 
         MigrationValidationError.objects.filter(migration_job=self.job).delete()
         stats = Counter()
         seen_uniques = [set() for _ in unique_constraints]
-
-        for staging_row in self.job.staging_rows.all():
-            payload = staging_row.clean_payload_json or {}
-            row_errors = []
-
-            # Required field checks
-            for field in required_fields:
-                if payload.get(field) in (None, "") and staging_row.status != migration_enums.StagingRowStatus.SKIPPED:
-                    row_errors.append(
-                        self._create_validation_error(
-                            staging_row,
-                            field,
-                            "REQUIRED_MISSING",
-                            f"{field} is required",
-                            severity=migration_enums.ValidationSeverity.HARD,
-                        )
-                    )
-
-            # Unique combination check
-            for index, fields in enumerate(unique_constraints):
-                key = tuple(payload.get(field) for field in fields)
-                if not fields:
-                    continue
-                if any(value in (None, "") for value in key):
-                    continue
-                if key in seen_uniques[index]:
-                    row_errors.append(
-                        self._create_validation_error(
-                            staging_row,
+        rows = self.job.staging_rows.exclude(status=migration_enums.StagingRowStatus.SKIPPED)
+        total = rows.count()
+        processed = 0
+        last_id = 0
+
+        while True:
+            chunk = list(
+                rows.filter(id__gt=last_id).order_by("id").values_list("id", "clean_payload_json")[:chunk_size]
+            )
+            if not chunk:
+                break
+            last_id = chunk[-1][0]
+            errors: dict[int, list[tuple]] = {}
+
+            def add_error(row_id, field_name, code, message):
+                errors.setdefault(row_id, []).append((field_name, code, message))
+
+            for row_id, payload in chunk:
+                payload = payload or {}
+                for field in required_fields:
+                    if payload.get(field) in (None, ""):
+                        add_error(row_id, field, "REQUIRED_MISSING", f"{field} is required")
+
+            for index, (fields, scope) in enumerate(unique_constraints):
+                keys = {}
+                for row_id, payload in chunk:
+                    key = tuple((payload or {}).get(field) for field in fields)
+                    if any(value in (None, "") for value in key):
+                        continue
+                    key = tuple(str(value) for value in key)
+                    if key in seen_uniques[index]:
+                        add_error(
+                            row_id,
                             None,
                             "DUPLICATE_ROW",
                             f"Duplicate values for unique constraint on fields: {', '.join(fields)}",
-                            severity=migration_enums.ValidationSeverity.HARD,
                         )
-                    )
-                else:
-                    seen_uniques[index].add(key)
+                    else:
+                        seen_uniques[index].add(key)
+                        keys[row_id] = key
+                existing = self._existing_keys(model, fields, scope, set(keys.values()))
+                for row_id, key in keys.items():
+                    if key in existing:
+                        add_error(
+                            row_id,
+                            None,
+                            "EXISTS_IN_TARGET",
+                            f"A {model._meta.verbose_name} with the same {', '.join(fields)} already exists",
+                        )
 
-            if row_errors:
-                staging_row.mark_invalid({"errors": [error.error_code for error in row_errors]})
-                stats["invalid"] += 1
-            else:
-                staging_row.mark_valid()
-                stats["valid"] += 1
+            self._write_validation_results([row_id for row_id, _ in chunk], errors, mappings)
+            stats["invalid"] += len(errors)
+            stats["valid"] += len(chunk) - len(errors)
+            processed += len(chunk)
+            self.job.update_progress("validation", processed=processed, total=total)
 
         self.job.mark_status(migration_enums.MigrationJobStatus.VALIDATED)
         self.job.meta.setdefault("validation", {})["summary"] = dict(stats)
@@ -451,27 +641,85 @@ class MigrationPipeline:
         )
         return dict(stats)
 
-    def _create_validation_error(
-        self,
-        staging_row: MigrationStagingRow,
-        field_name: Optional[str],
-        code: str,
-        message: str,
-        severity: str,
-    ) -> MigrationValidationError:
-        mapping = None
-        if field_name:
-            mapping = MigrationFieldMapping.objects.filter(
-                migration_job=self.job,
-                target_entity_field=field_name,
-            ).first()
-        return MigrationValidationError.objects.create(
-            migration_job=self.job,
-            staging_row=staging_row,
-            field_mapping=mapping,
-            error_code=code,
-            error_message=message,
-            severity=severity,
+    @staticmethod
+    def _unique_constraints(model: type[Model]) -> list[tuple[list[str], set[str]]]:
+        """
+        Unique field sets of ``model`` as ``(fields, scope)`` pairs.
+
+        ``scope`` holds the company/company_group fields of the constraint;
+        they are filled in from the job, so they are not part of ``fields``.
+        """
+        scope_fields = {"company", "company_group"}
+        unique_sets = [tuple(unique_set) for unique_set in model._meta.unique_together or []]
+        unique_sets += [
+            tuple(constraint.fields)
+            for constraint in model._meta.constraints
+            if isinstance(constraint, UniqueConstraint) and constraint.fields and constraint.condition is None
+        ]
+        unique_sets += [(field.name,) for field in model._meta.fields if field.unique and not field.primary_key]
+
+        constraints = []
+        for unique_set in dict.fromkeys(unique_sets):
+            fields = [field for field in unique_set if field not in scope_fields]
+            if fields:
+                constraints.append((fields, scope_fields.intersection(unique_set)))
+        return constraints
+
+    def _existing_keys(self, model: type[Model], fields: list[str], scope: set[str], keys: set[tuple]) -> set[tuple]:
+        """Subset of ``keys`` (tuples of strings) that already exist in the target table."""
+        model_fields = [model._meta.get_field(field) for field in fields]
+        condition = Q()
+        for key in keys:
+            try:
+                values = [field.to_python(value) for field, value in zip(model_fields, key)]
+            except ValidationError:
+                continue  # cannot match a stored value; type errors are reported on commit
+            condition |= Q(**{field.attname: value for field, value in zip(model_fields, values)})
+        if not condition:
+            return set()
+
+        queryset = model.objects.filter(condition)
+        if "company" in scope:
+            queryset = queryset.filter(company=self.job.company)
+        if "company_group" in scope:
+            queryset = queryset.filter(company_group=self.job.company_group)
+        return {
+            tuple(str(value) for value in values)
+            for values in queryset.values_list(*[field.attname for field in model_fields])
+        }
+
+    def _write_validation_results(self, row_ids: list[int], errors: dict[int, list[tuple]], mappings: dict):
+        now = timezone.now()
+        MigrationValidationError.objects.bulk_create(
+            [
+                MigrationValidationError(
+                    migration_job=self.job,
+                    staging_row_id=row_id,
+                    field_mapping=mappings.get(field_name) if field_name else None,
+                    error_code=code,
+                    error_message=message,
+                    severity=migration_enums.ValidationSeverity.HARD,
+                )
+                for row_id, row_errors in errors.items()
+                for field_name, code, message in row_errors
+            ]
+        )
+        MigrationStagingRow.objects.filter(id__in=[row_id for row_id in row_ids if row_id not in errors]).update(
+            status=migration_enums.StagingRowStatus.VALID,
+            validation_summary={},
+            updated_at=now,
+        )
+        MigrationStagingRow.objects.bulk_update(
+            [
+                MigrationStagingRow(
+                    id=row_id,
+                    status=migration_enums.StagingRowStatus.INVALID,
+                    validation_summary={"errors": [code for _, code, _ in row_errors]},
+                    updated_at=now,
+                )
+                for row_id, row_errors in errors.items()
+            ],
+            ["status", "validation_summary", "updated_at"],
         )
 
     # ------------------------------------------------------------------
@@ -518,45 +766,73 @@ class MigrationPipeline:
     # ------------------------------------------------------------------
     # Commit & rollback
     # ------------------------------------------------------------------
-    def commit(self, *, user) -> MigrationCommitLog:
-        if self.job.status not in {migration_enums.MigrationJobStatus.APPROVED, migration_enums.MigrationJobStatus.VALIDATED}:
+    def commit(self, *, user, batch_size: int | None = None) -> MigrationCommitLog:
+        """
+        Create target records from valid staging rows in checkpointed batches.
+
+        Every batch is its own transaction: the records, their post-commit
+        hooks, the commit log and the checkpoint (last staging row id in
+        ``job.meta['commit']``) are saved together. If a batch fails the job
+        stays in COMMITTING and calling ``commit`` again resumes after the
+        last checkpoint.
+        """
+        resumable = {
+            migration_enums.MigrationJobStatus.APPROVED,
+            migration_enums.MigrationJobStatus.VALIDATED,
+            migration_enums.MigrationJobStatus.COMMITTING,
+        }
+        if self.job.status not in resumable:
             raise ValueError("Migration job must be validated and approved before committing.")
 
         model = self._get_model(self.job.target_model)
-        model_fields = {field.name for field in model._meta.fields}
-        created_records = []
-        gl_entries = []
-
-        with transaction.atomic():
+        batch_size = batch_size or self.COMMIT_BATCH_SIZE
+        use_bulk_create = self._supports_bulk_create(model)
+        commit_log, _ = MigrationCommitLog.objects.get_or_create(
+            migration_job=self.job,
+            defaults={"committed_by": user},
+        )
+        if self.job.status == migration_enums.MigrationJobStatus.COMMITTING:
+            self.job.refresh_from_db(fields=["meta"])  # resume from the last saved checkpoint
+        else:
             self.job.mark_status(migration_enums.MigrationJobStatus.COMMITTING, by_user=user)
 
-            for staging_row in self.job.staging_rows.filter(status=migration_enums.StagingRowStatus.VALID):
-                payload = dict(staging_row.clean_payload_json or {})
-                payload.update(
-                    {
-                        "company": self.job.company,
-                        "created_by": user,
-                    }
-                )
-                if "company_group" in model_fields:
-                    payload["company_group"] = self.job.company_group
-                instance = model.objects.create(**payload)
-                created_records.append({"model": self.job.target_model, "pk": instance.pk})
-                gl_entry = self._post_commit_hook(instance=instance, user=user)
-                if gl_entry:
-                    gl_entries.append(gl_entry)
-
-            commit_log = MigrationCommitLog.objects.create(
-                migration_job=self.job,
-                committed_by=user,
-                summary={
-                    "created": len(created_records),
-                    "skipped": self.job.staging_rows.filter(status=migration_enums.StagingRowStatus.SKIPPED).count(),
-                },
-                created_records=created_records,
-                gl_entries=gl_entries,
+        checkpoint = self.job.meta.setdefault("commit", {"last_row_id": 0})
+        valid_rows = self.job.staging_rows.filter(status=migration_enums.StagingRowStatus.VALID)
+        total = valid_rows.count()
+        while True:
+            batch = list(
+                valid_rows.filter(id__gt=checkpoint["last_row_id"])
+                .order_by("id")
+                .values_list("id", "clean_payload_json")[:batch_size]
             )
-            self.job.mark_status(migration_enums.MigrationJobStatus.COMMITTED, by_user=user)
+            if not batch:
+                break
+            with transaction.atomic():
+                instances = [self._build_instance(model, payload, user=user) for _, payload in batch]
+                if use_bulk_create:
+                    model.objects.bulk_create(instances)
+                else:
+                    for instance in instances:
+                        instance.save()
+                gl_entries = [self._post_commit_hook(instance=instance, user=user) for instance in instances]
+
+                commit_log.created_records.extend(
+                    {"model": self.job.target_model, "pk": instance.pk} for instance in instances
+                )
+                commit_log.gl_entries.extend(entry for entry in gl_entries if entry)
+                commit_log.save(update_fields=["created_records", "gl_entries"])
+                checkpoint["last_row_id"] = batch[-1][0]
+                self.job.update_progress("commit", processed=len(commit_log.created_records), total=total)
+
+        created_records = commit_log.created_records
+        commit_log.committed_by = user
+        commit_log.committed_at = timezone.now()
+        commit_log.summary = {
+            "created": len(created_records),
+            "skipped": self.job.staging_rows.filter(status=migration_enums.StagingRowStatus.SKIPPED).count(),
+        }
+        commit_log.save(update_fields=["committed_by", "committed_at", "summary"])
+        self.job.mark_status(migration_enums.MigrationJobStatus.COMMITTED, by_user=user)
 
         self._log_audit(
             self.job,
@@ -567,20 +843,70 @@ class MigrationPipeline:
         )
         return commit_log
 
+    @staticmethod
+    def _supports_bulk_create(model: type[Model]) -> bool:
+        """``bulk_create`` skips ``save()`` and the save signals, so only use it for models that rely on neither."""
+        return (
+            model.save is Model.save
+            and not model._meta.parents
+            and not pre_save.has_listeners(model)
+            and not post_save.has_listeners(model)
+        )
+
+    @staticmethod
+    def _supports_bulk_delete(model: type[Model]) -> bool:
+        """``QuerySet.delete`` skips ``Model.delete()``, so only use it for models that don't override it."""
+        return model.delete is Model.delete
+
+    def _build_instance(self, model: type[Model], payload: dict, *, user) -> Model:
+        field_map = {field.name: field for field in model._meta.fields}
+        values = {}
+        for name, value in (payload or {}).items():
+            field = field_map.get(name)
+            # Staged foreign keys hold primary keys, not instances
+            if field is not None and field.is_relation and not isinstance(value, Model):
+                values[field.attname] = value
+            else:
+                values[name] = value
+        values["company"] = self.job.company
+        if "created_by" in field_map:
+            values["created_by"] = user
+        if "company_group" in field_map:
+            values["company_group"] = self.job.company_group
+        return model(**values)
+
     def rollback(self, *, user) -> int:
+        """
+        Delete the records created by the commit.
+
+        Models that don't override ``delete()`` are deleted with one bulk
+        delete per batch; the others instance by instance, so their own
+        deletion logic runs.
+        """
         if not hasattr(self.job, "commit_log"):
             raise ValueError("Cannot rollback a job without a commit log.")
 
+        pks_by_model = defaultdict(list)
+        for record in self.job.commit_log.created_records:
+            pks_by_model[record["model"]].append(record["pk"])
+
         deleted = 0
         with transaction.atomic():
-            for record in self.job.commit_log.created_records:
-                model = self._get_model(record["model"])
-                try:
-                    instance = model.objects.get(pk=record["pk"], company=self.job.company)
-                    instance.delete()
-                    deleted += 1
-                except model.DoesNotExist:
-                    continue
+            for model_label, pks in pks_by_model.items():
+                model = self._get_model(model_label)
+                bulk = self._supports_bulk_delete(model)
+                for start in range(0, len(pks), self.COMMIT_BATCH_SIZE):
+                    batch = model.objects.filter(
+                        company=self.job.company,
+                        pk__in=pks[start:start + self.COMMIT_BATCH_SIZE],
+                    )
+                    if bulk:
+                        _, per_model = batch.delete()
+                        deleted += per_model.get(model._meta.label, 0)
+                        continue
+                    for instance in batch:
+                        instance.delete()
+                        deleted += 1
 
             self.job.mark_status(migration_enums.MigrationJobStatus.ROLLED_BACK, by_user=user)
             self._log_audit(
@@ -1,17 +1,26 @@
+import shutil
+import tempfile
+from datetime import datetime
 from io import BytesIO
 
 import pandas as pd
+from openpyxl import Workbook
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from apps.companies.models import CompanyGroup, Company
 from apps.users.models import User
-from apps.data_migration.models import MigrationJob
+from apps.data_migration.models import MigrationColumnProfile, MigrationFieldMapping, MigrationJob, migration_enums
 from apps.data_migration.services.pipeline import MigrationPipeline
 
 
 class MigrationPipelineChunkingTests(TestCase):
     def setUp(self):
+        media_root = tempfile.mkdtemp(prefix="migration-media-")
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
         self.group = CompanyGroup.objects.create(name="Demo Group", code="DEMO-G")
         self.company = Company.objects.create(name="Demo Co", code="DEMO", company_group=self.group)
         self.user = User.objects.create_user(username="u1", password="x")
@@ -37,3 +46,84 @@ class MigrationPipelineChunkingTests(TestCase):
         summary = pipe.validate(user=self.user)
         self.assertIsInstance(summary, dict)
 
+    def test_profiles_are_accumulated_across_chunks(self):
+        job = MigrationJob.objects.create(company=self.company, company_group=self.group, created_by=self.user)
+        pipe = MigrationPipeline(job)
+        pipe.add_file(uploaded_by=self.user, file_name="items.csv", file_content=self._csv_file(rows=25))
+        buf = BytesIO()
+        pd.DataFrame([{"code": "ITM-001", "active": "yes"}, {"code": None, "active": "No"}]).to_csv(buf, index=False)
+        pipe.add_file(
+            uploaded_by=self.user, file_name="extra.csv", file_content=SimpleUploadedFile("extra.csv", buf.getvalue())
+        )
+
+        preview = pipe.profile_files(chunk_size=4)
+
+        self.assertEqual(len(preview.index), 12)
+        self.assertEqual(sorted(job.files.values_list("row_count_detected", flat=True)), [2, 25])
+        profiles = {
+            profile.column_name_in_file: profile for profile in MigrationColumnProfile.objects.filter(migration_job=job)
+        }
+        self.assertEqual(profiles["code"].stats, {"nulls": 1, "unique": 25, "min_length": 7, "max_length": 7})
+        self.assertEqual(profiles["code"].sample_values, [f"ITM-{i:03d}" for i in range(1, 11)])
+        self.assertEqual(profiles["qty"].detected_data_type, "number")
+        self.assertEqual(profiles["qty"].stats, {"nulls": 2, "unique": 25, "min_length": 1, "max_length": 2})
+        self.assertEqual(profiles["active"].detected_data_type, "boolean")
+        self.assertEqual(profiles["active"].stats["nulls"], 25)
+
+    def _map(self, job, **columns):
+        for column, (field, mode) in columns.items():
+            MigrationFieldMapping.objects.create(
+                migration_job=job, column_name_in_file=column, target_entity_field=field, target_storage_mode=mode
+            )
+
+    def test_chunks_are_cleaned_mapped_and_bulk_inserted(self):
+        job = MigrationJob.objects.create(company=self.company, company_group=self.group, created_by=self.user)
+        pipe = MigrationPipeline(job)
+        pipe.add_file(uploaded_by=self.user, file_name="items.csv", file_content=self._csv_file(rows=25))
+        pipe.profile_files()
+        self._map(
+            job,
+            name=("name", migration_enums.TargetStorageMode.EXISTING_COLUMN),
+            code=("legacy_code", migration_enums.TargetStorageMode.NEW_FIELD),
+            qty=("qty", migration_enums.TargetStorageMode.IGNORE),
+        )
+
+        with self.assertNumQueries(14):
+            staged = pipe.stage_rows(user=self.user, chunk_size=10, batch_size=5)
+
+        self.assertEqual(staged, 25)
+        rows = list(job.staging_rows.order_by("row_index_in_file"))
+        self.assertEqual([row.row_index_in_file for row in rows], list(range(25)))
+        self.assertEqual(rows[0].clean_payload_json, {"name": "Item 1", "extra_data": {"legacy_code": "ITM-001"}})
+        job.refresh_from_db()
+        self.assertEqual(job.meta["progress"]["processed"], 25)
+        self.assertEqual(job.meta["progress"]["percent"], 100.0)
+
+    def test_xlsx_rows_are_streamed(self):
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append([" name ", "opened", "qty"])
+        sheet.append(["  Bolt ", datetime(2025, 1, 31), 4])
+        sheet.append(["", datetime(2025, 2, 1, 9, 30), None])
+        sheet.append(["Nut", None, 2.5])
+        buf = BytesIO()
+        workbook.save(buf)
+        upload = SimpleUploadedFile("items.xlsx", buf.getvalue())
+
+        job = MigrationJob.objects.create(company=self.company, company_group=self.group, created_by=self.user)
+        pipe = MigrationPipeline(job)
+        pipe.add_file(uploaded_by=self.user, file_name="items.xlsx", file_content=upload)
+        self._map(
+            job,
+            name=("name", migration_enums.TargetStorageMode.EXISTING_COLUMN),
+            opened=("opened", migration_enums.TargetStorageMode.EXISTING_COLUMN),
+            qty=("qty", migration_enums.TargetStorageMode.EXISTING_COLUMN),
+        )
+
+        staged = pipe.stage_rows(user=self.user, chunk_size=2)
+
+        self.assertEqual(staged, 3)
+        payloads = list(job.staging_rows.order_by("row_index_in_file").values_list("clean_payload_json", flat=True))
+        self.assertEqual(payloads[0], {"name": "Bolt", "opened": "2025-01-31", "qty": 4.0})
+        self.assertEqual(payloads[1], {"name": None, "opened": "2025-02-01T09:30:00", "qty": None})
+        self.assertEqual(payloads[2]["qty"], 2.5)
@@ -0,0 +1,143 @@
+from unittest import mock
+
+from django.db.models import Model
+from django.test import TestCase
+
+from apps.companies.models import Company, CompanyGroup
+from apps.data_migration.models import MigrationJob, MigrationStagingRow, MigrationValidationError, migration_enums
+from apps.data_migration.services.pipeline import MigrationPipeline
+from apps.finance.models import Account, AccountType
+from apps.sales.models import Customer
+from apps.users.models import User
+
+
+class MigrationPipelineBulkCommitTests(TestCase):
+    def setUp(self):
+        self.group = CompanyGroup.objects.create(name="Bulk Group", code="MIGBULK-G")
+        self.company = Company.objects.create(name="Bulk Co", code="MIGBULK", company_group=self.group)
+        self.user = User.objects.create_user(username="migbulk", password="x")
+        self.account = Account.objects.create(
+            company=self.company,
+            company_group=self.group,
+            code="MIG-AR-1",
+            name="Receivables",
+            account_type=AccountType.ASSET,
+        )
+
+    def _job(self, payloads):
+        job = MigrationJob.objects.create(
+            company=self.company,
+            company_group=self.group,
+            created_by=self.user,
+            target_model="sales.Customer",
+        )
+        MigrationStagingRow.objects.bulk_create(
+            MigrationStagingRow(migration_job=job, row_index_in_file=idx, clean_payload_json=payload)
+            for idx, payload in enumerate(payloads)
+        )
+        return job
+
+    def _customer(self, code, **extra):
+        return {"code": code, "name": f"Customer {code}", "receivable_account": self.account.pk, **extra}
+
+    def test_validation_flags_missing_duplicate_and_existing_rows(self):
+        Customer.objects.create(
+            company=self.company, code="C-EXISTS", name="Existing", receivable_account=self.account
+        )
+        job = self._job(
+            [
+                self._customer("C-1"),
+                self._customer("C-1"),
+                self._customer("C-EXISTS"),
+                {"code": "C-2", "receivable_account": self.account.pk},
+                self._customer("C-3"),
+            ]
+        )
+
+        summary = MigrationPipeline(job).validate(chunk_size=2)
+
+        self.assertEqual(summary, {"valid": 2, "invalid": 3})
+        statuses = dict(job.staging_rows.values_list("row_index_in_file", "validation_summary"))
+        self.assertEqual(statuses[0], {})
+        self.assertEqual(statuses[1], {"errors": ["DUPLICATE_ROW"]})
+        self.assertEqual(statuses[2], {"errors": ["EXISTS_IN_TARGET"]})
+        self.assertEqual(statuses[3], {"errors": ["REQUIRED_MISSING"]})
+        self.assertEqual(MigrationValidationError.objects.filter(migration_job=job).count(), 3)
+        job.refresh_from_db()
+        self.assertEqual(job.status, migration_enums.MigrationJobStatus.VALIDATED)
+
+    def test_validation_queries_scale_with_chunks_not_rows(self):
+        small = self._job([self._customer(f"S-{idx}") for idx in range(4)])
+        large = self._job([self._customer(f"L-{idx}") for idx in range(40)])
+
+        with self.assertNumQueries(12):
+            MigrationPipeline(small).validate(chunk_size=50)
+        with self.assertNumQueries(12):
+            MigrationPipeline(large).validate(chunk_size=50)
+
+    def test_commit_bulk_creates_and_rollback_bulk_deletes(self):
+        job = self._job([self._customer(f"B-{idx}") for idx in range(7)])
+        pipeline = MigrationPipeline(job)
+        pipeline.validate()
+
+        commit_log = pipeline.commit(user=self.user, batch_size=3)
+
+        self.assertEqual(commit_log.summary["created"], 7)
+        self.assertEqual(Customer.objects.filter(company=self.company, code__startswith="B-").count(), 7)
+        job.refresh_from_db()
+        self.assertEqual(job.status, migration_enums.MigrationJobStatus.COMMITTED)
+        self.assertEqual(job.meta["progress"]["processed"], 7)
+
+        with self.assertNumQueries(12):
+            deleted = pipeline.rollback(user=self.user)
+
+        self.assertEqual(deleted, 7)
+        self.assertFalse(Customer.objects.filter(company=self.company, code__startswith="B-").exists())
+
+    def test_rollback_runs_overridden_model_delete(self):
+        job = self._job([self._customer(f"D-{idx}") for idx in range(3)])
+        pipeline = MigrationPipeline(job)
+        pipeline.validate()
+        pipeline.commit(user=self.user)
+        deleted_codes = []
+
+        def delete(instance, *args, **kwargs):
+            deleted_codes.append(instance.code)
+            return Model.delete(instance, *args, **kwargs)
+
+        with mock.patch.object(Customer, "delete", delete):
+            deleted = pipeline.rollback(user=self.user)
+
+        self.assertEqual(deleted, 3)
+        self.assertEqual(sorted(deleted_codes), ["D-0", "D-1", "D-2"])
+        self.assertFalse(Customer.objects.filter(company=self.company, code__startswith="D-").exists())
+
+    def test_failed_commit_resumes_from_checkpoint(self):
+        job = self._job([self._customer(f"R-{idx}") for idx in range(5)])
+        pipeline = MigrationPipeline(job)
+        pipeline.validate()
+        real_bulk_create = Customer.objects.bulk_create
+        calls = []
+
+        def failing_bulk_create(objs, *args, **kwargs):
+            calls.append(len(objs))
+            if len(calls) == 2:
+                raise RuntimeError("database went away")
+            return real_bulk_create(objs, *args, **kwargs)
+
+        with mock.patch.object(Customer.objects, "bulk_create", side_effect=failing_bulk_create):
+            with self.assertRaises(RuntimeError):
+                pipeline.commit(user=self.user, batch_size=2)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, migration_enums.MigrationJobStatus.COMMITTING)
+        self.assertEqual(Customer.objects.filter(company=self.company, code__startswith="R-").count(), 2)
+        self.assertEqual(len(job.commit_log.created_records), 2)
+
+        commit_log = MigrationPipeline(job).commit(user=self.user, batch_size=2)
+
+        self.assertEqual(commit_log.summary["created"], 5)
+        self.assertEqual(
+            sorted(Customer.objects.filter(company=self.company, code__startswith="R-").values_list("code", flat=True)),
+            [f"R-{idx}" for idx in range(5)],
+        )
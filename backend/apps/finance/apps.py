@@ -6,6 +6,8 @@ class FinanceConfig(AppConfig):
     name = 'apps.finance'
 
     def ready(self):
+        import apps.finance.signals  # noqa: F401
+
         # Subscribe finance handlers to shared event bus (stock receipts/issues)
         try:
             from .event_handlers import subscribe_to_events
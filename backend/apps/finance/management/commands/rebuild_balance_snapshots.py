@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from apps.companies.models import Company
+from apps.finance.services.balance_snapshot_service import BalanceSnapshotService
+
+
+class Command(BaseCommand):
+    help = "Rebuild closed-period account balance snapshots used by trial balance and statements."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company-id', type=int, help='Only process a single company')
+
+    def handle(self, *args, **options):
+        company_id = options.get('company_id')
+        qs = Company.objects.filter(is_active=True)
+        if company_id:
+            qs = qs.filter(id=company_id)
+        for company in qs:
+            written = BalanceSnapshotService.rebuild(company)
+            self.stdout.write(f"{company.code}: {written} snapshot row(s) written.")
+        self.stdout.write(self.style.SUCCESS("Balance snapshots rebuilt."))
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.13 on 2026-10-16 19:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0009_company_currency_business_type_and_fy_cleanup'),
+        ('finance', '0015_inventorypostingrule_finance_inv_company_344372_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountPeriodBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(help_text='YYYY-MM', max_length=7)),
+                ('period_end', models.DateField()),
+                ('period_debit', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('period_credit', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('closing_debit', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('closing_credit', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_balances', to='finance.account')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='companies.company')),
+                ('company_group', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='companies.companygroup')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['company', 'period_end'], name='finance_acc_company_710c6f_idx')],
+                'unique_together': {('account', 'period')},
+            },
+        ),
+    ]
@@ -490,6 +490,32 @@ class FiscalPeriod(models.Model):
         return f"{self.company.code} {self.period} [{self.status}]"
 
 
+class AccountPeriodBalance(models.Model):
+    """
+    Closing balance snapshot of an account at the end of a closed fiscal period.
+    As-of balance queries start from the latest snapshot and only aggregate
+    journal movements dated after it.
+    """
+    company_group = models.ForeignKey('companies.CompanyGroup', on_delete=models.PROTECT)
+    company = models.ForeignKey('companies.Company', on_delete=models.PROTECT)
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='period_balances')
+    period = models.CharField(max_length=7, help_text="YYYY-MM")
+    period_end = models.DateField()
+    period_debit = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    period_credit = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    closing_debit = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    closing_credit = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('account', 'period')
+        indexes = [models.Index(fields=['company', 'period_end'])]
+
+    def __str__(self) -> str:
+        return f"{self.account_id} {self.period}: Dr {self.closing_debit} / Cr {self.closing_credit}"
+
+
 # --- Taxes ---
 class TaxJurisdiction(models.Model):
     company_group = models.ForeignKey('companies.CompanyGroup', on_delete=models.PROTECT)
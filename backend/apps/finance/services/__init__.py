@@ -1,10 +1,12 @@
 """
 Financial services.
 """
+from .account_balance_provider import AccountBalanceProvider
 from .financial_statement_service import FinancialStatementService
 from .trial_balance_service import TrialBalanceService
 
 __all__ = [
+    'AccountBalanceProvider',
     'FinancialStatementService',
     'TrialBalanceService',
 ]
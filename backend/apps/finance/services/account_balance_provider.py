@@ -0,0 +1,163 @@
+"""
+Account Balance Provider.
+
+Shared source of per-account opening, movement and closing balances for
+trial balance, financial statements and GL reconciliation. All requested
+date ranges are answered by a single grouped aggregate on top of the latest
+closed-period snapshot, and results are cached per company, range and
+voucher-posting watermark.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import Coalesce
+
+from apps.finance.models import JournalEntry, JournalStatus, JournalVoucher
+from apps.finance.services.balance_snapshot_service import ZERO, BalanceSnapshotService
+
+DateRange = Tuple[Optional[date], date]
+
+
+@dataclass(frozen=True)
+class AccountBalance:
+    """Debit/credit totals of one account for one date range."""
+
+    opening_debit: Decimal = ZERO
+    opening_credit: Decimal = ZERO
+    period_debit: Decimal = ZERO
+    period_credit: Decimal = ZERO
+
+    @property
+    def closing_debit(self) -> Decimal:
+        return self.opening_debit + self.period_debit
+
+    @property
+    def closing_credit(self) -> Decimal:
+        return self.opening_credit + self.period_credit
+
+
+EMPTY_BALANCE = AccountBalance()
+
+
+class AccountBalanceProvider:
+    """
+    Per-company balance lookups for one or more date ranges.
+
+    A range is ``(start, end)``; opening balances are cumulative up to the day
+    before ``start`` and ``start=None`` means "as of ``end``" (zero opening,
+    everything in the period columns). Create one provider per request and
+    share it between services so the watermark and results are computed once.
+    """
+
+    CACHE_TIMEOUT = 300
+    CACHE_PREFIX = 'finance:account-balances'
+
+    def __init__(self, company):
+        self.company = company
+        self._watermark: Optional[str] = None
+        self._results: Dict[DateRange, Dict[int, AccountBalance]] = {}
+
+    @property
+    def watermark(self) -> str:
+        """Fingerprint of posted vouchers; changes whenever a voucher is posted or removed."""
+        if self._watermark is None:
+            stats = JournalVoucher.objects.filter(
+                company=self.company, status=JournalStatus.POSTED
+            ).aggregate(count=Count('id'), last_id=Max('id'), last_posted=Max('posted_at'))
+            last_posted = stats['last_posted'].timestamp() if stats['last_posted'] else 0
+            self._watermark = f"{stats['count']}.{stats['last_id'] or 0}.{last_posted}"
+        return self._watermark
+
+    def _cache_key(self, date_range: DateRange) -> str:
+        start, end = date_range
+        start_key = start.isoformat() if start else '-'
+        return f"{self.CACHE_PREFIX}:{self.company.pk}:{start_key}:{end.isoformat()}:{self.watermark}"
+
+    def get_balances(self, ranges: Iterable[DateRange]) -> Dict[DateRange, Dict[int, AccountBalance]]:
+        """Return {range: {account_id: AccountBalance}} for every requested range."""
+        ranges = list(dict.fromkeys(ranges))
+        missing = [r for r in ranges if r not in self._results]
+
+        if missing:
+            keys = {r: self._cache_key(r) for r in missing}
+            cached = cache.get_many(list(keys.values()))
+            for date_range, key in keys.items():
+                if key in cached:
+                    self._results[date_range] = cached[key]
+            to_compute = [r for r in missing if r not in self._results]
+            if to_compute:
+                computed = self._compute(to_compute)
+                self._results.update(computed)
+                cache.set_many({keys[r]: computed[r] for r in to_compute}, self.CACHE_TIMEOUT)
+
+        return {r: self._results[r] for r in ranges}
+
+    def get_range(self, start: Optional[date], end: date) -> Dict[int, AccountBalance]:
+        return self.get_balances([(start, end)])[(start, end)]
+
+    def get_as_of(self, as_of_date: date) -> Dict[int, AccountBalance]:
+        return self.get_range(None, as_of_date)
+
+    def _compute(self, ranges: List[DateRange]) -> Dict[DateRange, Dict[int, AccountBalance]]:
+        """
+        Answer all ranges with one grouped query.
+
+        Each range needs cumulative balances at up to two cutoff dates; all
+        cutoffs are computed as conditional sums over the movements since the
+        latest snapshot that precedes every cutoff.
+        """
+        cutoffs = set()
+        for start, end in ranges:
+            cutoffs.add(end)
+            if start is not None:
+                cutoffs.add(start - timedelta(days=1))
+        cutoffs = sorted(cutoffs)
+
+        base_end = BalanceSnapshotService.latest_snapshot_end(self.company, cutoffs[0])
+        base = BalanceSnapshotService.get_snapshot_balances(self.company, base_end)
+
+        filters = Q(
+            voucher__company=self.company,
+            voucher__status=JournalStatus.POSTED,
+            voucher__entry_date__lte=cutoffs[-1],
+        )
+        if base_end is not None:
+            filters &= Q(voucher__entry_date__gt=base_end)
+
+        annotations = {}
+        for idx, cutoff in enumerate(cutoffs):
+            upto = Q(voucher__entry_date__lte=cutoff)
+            annotations[f'dr_{idx}'] = Coalesce(Sum('debit_amount', filter=upto), ZERO)
+            annotations[f'cr_{idx}'] = Coalesce(Sum('credit_amount', filter=upto), ZERO)
+
+        rows = JournalEntry.objects.filter(filters).order_by().values('account_id').annotate(**annotations)
+
+        cumulative: Dict[date, Dict[int, Tuple[Decimal, Decimal]]] = {cutoff: dict(base) for cutoff in cutoffs}
+        for row in rows:
+            account_id = row['account_id']
+            for idx, cutoff in enumerate(cutoffs):
+                base_debit, base_credit = base.get(account_id, (ZERO, ZERO))
+                cumulative[cutoff][account_id] = (base_debit + row[f'dr_{idx}'], base_credit + row[f'cr_{idx}'])
+
+        results: Dict[DateRange, Dict[int, AccountBalance]] = {}
+        for start, end in ranges:
+            closing = cumulative[end]
+            opening = cumulative[start - timedelta(days=1)] if start is not None else {}
+            balances = {}
+            for account_id in set(closing) | set(opening):
+                open_debit, open_credit = opening.get(account_id, (ZERO, ZERO))
+                close_debit, close_credit = closing.get(account_id, (ZERO, ZERO))
+                balances[account_id] = AccountBalance(
+                    opening_debit=open_debit,
+                    opening_credit=open_credit,
+                    period_debit=close_debit - open_debit,
+                    period_credit=close_credit - open_credit,
+                )
+            results[(start, end)] = balances
+        return results
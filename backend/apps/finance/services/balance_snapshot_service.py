@@ -0,0 +1,187 @@
+"""
+Account Balance Snapshot Service.
+
+Persists per-account closing balances when a fiscal period is closed so that
+as-of balance queries only need to aggregate movements since the last snapshot.
+"""
+from __future__ import annotations
+
+from calendar import monthrange
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+
+from apps.finance.models import (
+    AccountPeriodBalance,
+    FiscalPeriod,
+    FiscalPeriodStatus,
+    JournalEntry,
+    JournalStatus,
+)
+
+ZERO = Decimal('0.00')
+CLOSED_STATUSES = (FiscalPeriodStatus.CLOSED, FiscalPeriodStatus.LOCKED)
+
+
+def period_bounds(period: str) -> Tuple[date, date]:
+    """Return (first_day, last_day) for a 'YYYY-MM' period key."""
+    year, month = (int(part) for part in period.split('-', 1))
+    return date(year, month, 1), date(year, month, monthrange(year, month)[1])
+
+
+class BalanceSnapshotService:
+    """Build, invalidate and read closed-period account balance snapshots."""
+
+    @staticmethod
+    def latest_snapshot_end(company, as_of_date: date) -> Optional[date]:
+        """Period end of the most recent snapshot on or before ``as_of_date``."""
+        return (
+            AccountPeriodBalance.objects.filter(company=company, period_end__lte=as_of_date)
+            .order_by('-period_end')
+            .values_list('period_end', flat=True)
+            .first()
+        )
+
+    @staticmethod
+    def get_snapshot_balances(company, period_end: Optional[date]) -> Dict[int, Tuple[Decimal, Decimal]]:
+        """Return {account_id: (closing_debit, closing_credit)} for a snapshot."""
+        if period_end is None:
+            return {}
+        rows = AccountPeriodBalance.objects.filter(company=company, period_end=period_end).values_list(
+            'account_id', 'closing_debit', 'closing_credit'
+        )
+        return {account_id: (debit, credit) for account_id, debit, credit in rows}
+
+    @staticmethod
+    def aggregate_movements(
+        company,
+        start_after: Optional[date],
+        end_on: date,
+    ) -> Dict[int, Tuple[Decimal, Decimal]]:
+        """
+        Sum posted journal movements per account in one grouped query.
+
+        Movements are taken from ``start_after`` (exclusive) through ``end_on``
+        (inclusive); ``start_after=None`` means from the beginning.
+        """
+        filters = Q(voucher__company=company, voucher__status=JournalStatus.POSTED, voucher__entry_date__lte=end_on)
+        if start_after is not None:
+            filters &= Q(voucher__entry_date__gt=start_after)
+        rows = (
+            JournalEntry.objects.filter(filters)
+            .order_by()
+            .values('account_id')
+            .annotate(
+                debit=Coalesce(Sum('debit_amount'), ZERO),
+                credit=Coalesce(Sum('credit_amount'), ZERO),
+            )
+            .values_list('account_id', 'debit', 'credit')
+        )
+        return {account_id: (debit, credit) for account_id, debit, credit in rows}
+
+    @classmethod
+    def get_balances_as_of(cls, company, as_of_date: date) -> Dict[int, Tuple[Decimal, Decimal]]:
+        """
+        Cumulative (debit, credit) per account as of a date.
+
+        Starts from the latest closed-period snapshot and adds the movements
+        dated after it, so only open-period entries are scanned.
+        """
+        snapshot_end = cls.latest_snapshot_end(company, as_of_date)
+        balances = cls.get_snapshot_balances(company, snapshot_end)
+        movements = cls.aggregate_movements(company, snapshot_end, as_of_date)
+        for account_id, (debit, credit) in movements.items():
+            base_debit, base_credit = balances.get(account_id, (ZERO, ZERO))
+            balances[account_id] = (base_debit + debit, base_credit + credit)
+        return balances
+
+    @classmethod
+    @transaction.atomic
+    def snapshot_period(cls, fiscal_period: FiscalPeriod) -> int:
+        """
+        (Re)build the snapshot for a closed fiscal period.
+
+        Snapshots only cover the run of closed periods from the first one:
+        while an earlier period is open it can still take postings, so the
+        snapshot is deferred until that period closes. Closing it then
+        snapshots the closed periods that follow it as well.
+
+        Returns the number of account rows written.
+        """
+        company = fiscal_period.company
+        periods = FiscalPeriod.objects.filter(company=company).exclude(pk=fiscal_period.pk)
+        if periods.filter(period__lt=fiscal_period.period).exclude(status__in=CLOSED_STATUSES).exists():
+            cls.invalidate_from(company, fiscal_period.period)
+            return 0
+
+        written = cls._build_snapshot(fiscal_period)
+        for later in periods.filter(period__gt=fiscal_period.period).order_by('period'):
+            if later.status not in CLOSED_STATUSES:
+                break
+            written += cls._build_snapshot(later)
+        return written
+
+    @classmethod
+    def _build_snapshot(cls, fiscal_period: FiscalPeriod) -> int:
+        """Write the snapshot of one period on top of the latest earlier snapshot."""
+        company = fiscal_period.company
+        period_start, period_end = period_bounds(fiscal_period.period)
+
+        base_end = (
+            AccountPeriodBalance.objects.filter(company=company, period_end__lt=period_start)
+            .order_by('-period_end')
+            .values_list('period_end', flat=True)
+            .first()
+        )
+        closing = cls.get_snapshot_balances(company, base_end)
+        movements = cls.aggregate_movements(company, base_end, period_end)
+        in_period = cls.aggregate_movements(company, period_start - timedelta(days=1), period_end)
+
+        for account_id, (debit, credit) in movements.items():
+            base_debit, base_credit = closing.get(account_id, (ZERO, ZERO))
+            closing[account_id] = (base_debit + debit, base_credit + credit)
+
+        AccountPeriodBalance.objects.filter(company=company, period=fiscal_period.period).delete()
+        rows = [
+            AccountPeriodBalance(
+                company_group_id=fiscal_period.company_group_id,
+                company=company,
+                account_id=account_id,
+                period=fiscal_period.period,
+                period_end=period_end,
+                period_debit=in_period.get(account_id, (ZERO, ZERO))[0],
+                period_credit=in_period.get(account_id, (ZERO, ZERO))[1],
+                closing_debit=debit,
+                closing_credit=credit,
+            )
+            for account_id, (debit, credit) in closing.items()
+        ]
+        AccountPeriodBalance.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+    @staticmethod
+    def invalidate_from(company, period: str) -> int:
+        """
+        Drop snapshots for ``period`` and every later period.
+
+        Later snapshots are chained on earlier ones, so reopening a period
+        makes all of them stale.
+        """
+        period_start, _ = period_bounds(period)
+        deleted, _ = AccountPeriodBalance.objects.filter(company=company, period_end__gte=period_start).delete()
+        return deleted
+
+    @classmethod
+    def rebuild(cls, company) -> int:
+        """Rebuild the snapshots of a company's closed periods up to its first open period."""
+        AccountPeriodBalance.objects.filter(company=company).delete()
+        written = 0
+        for fiscal_period in FiscalPeriod.objects.filter(company=company).order_by('period'):
+            if fiscal_period.status not in CLOSED_STATUSES:
+                break
+            written += cls._build_snapshot(fiscal_period)
+        return written
@@ -8,11 +8,14 @@ Generates IAS/IFRS compliant financial statements:
 """
 from decimal import Decimal
 from datetime import date, timedelta
-from typing import Dict, List, Optional
-from django.db.models import Q, Sum
-from django.db.models.functions import Coalesce
-
-from apps.finance.models import Account, JournalEntry
+from typing import Dict, List, Optional, Tuple
+
+from apps.finance.models import Account
+from apps.finance.services.account_balance_provider import (
+    EMPTY_BALANCE,
+    AccountBalance,
+    AccountBalanceProvider,
+)
 from apps.companies.models import Company
 
 
@@ -25,7 +28,8 @@ class FinancialStatementService:
         start_date: date,
         end_date: date,
         currency: str = 'BDT',
-        comparative_period: bool = False
+        comparative_period: bool = False,
+        balance_provider: Optional[AccountBalanceProvider] = None,
     ):
         """
         Initialize the financial statement service.
@@ -36,12 +40,48 @@ class FinancialStatementService:
             end_date: End date of the reporting period
             currency: Currency code for reporting
             comparative_period: Include comparative period data
+            balance_provider: Shared balance provider (one is created if omitted)
         """
         self.company = company
         self.start_date = start_date
         self.end_date = end_date
         self.currency = currency
         self.comparative_period = comparative_period
+        self.balance_provider = balance_provider or AccountBalanceProvider(company)
+        self._accounts: Optional[List[Account]] = None
+
+    @property
+    def current_range(self) -> Tuple[date, date]:
+        return self.start_date, self.end_date
+
+    @property
+    def comparative_range(self) -> Tuple[date, date]:
+        """Same-length period immediately preceding the reporting period."""
+        length = self.end_date - self.start_date
+        comparative_end = self.start_date - timedelta(days=1)
+        return comparative_end - length, comparative_end
+
+    @property
+    def accounts(self) -> List[Account]:
+        """Active accounts of the company, loaded once per service instance."""
+        if self._accounts is None:
+            self._accounts = list(
+                Account.objects.filter(company=self.company, is_active=True).order_by('code')
+            )
+        return self._accounts
+
+    def _accounts_of_type(self, account_type: str, code_prefix: str = '') -> List[Account]:
+        return [
+            account for account in self.accounts
+            if account.account_type == account_type and account.code.startswith(code_prefix)
+        ]
+
+    def _prefetch_balances(self) -> None:
+        """Load current (and comparative) ranges in one grouped query."""
+        ranges = [(self.start_date, self.end_date)]
+        if self.comparative_period:
+            ranges.append(self.comparative_range)
+        self.balance_provider.get_balances(ranges)
 
     def generate_balance_sheet(self) -> Dict:
         """
@@ -67,14 +107,23 @@ class FinancialStatementService:
                 'total_liabilities_and_equity': Decimal('8000000.00')
             }
         """
-        # Get account balances as of end_date
-        assets = self._get_assets()
-        liabilities = self._get_liabilities()
-        equity = self._get_equity()
+        self._prefetch_balances()
+        data = self._build_balance_sheet(self.current_range)
+        if self.comparative_period:
+            comparative = self._build_balance_sheet(self.comparative_range)
+            comparative['as_of_date'] = self.comparative_range[1]
+            data['comparative'] = comparative
+        return data
+
+    def _build_balance_sheet(self, date_range: Tuple[date, date]) -> Dict:
+        # Account balances as of the end of the range
+        assets = self._get_assets(date_range)
+        liabilities = self._get_liabilities(date_range)
+        equity = self._get_equity(date_range)
 
         return {
             'company': self.company,
-            'as_of_date': self.end_date,
+            'as_of_date': date_range[1],
             'currency': self.currency,
             'assets': assets,
             'liabilities': liabilities,
@@ -108,11 +157,18 @@ class FinancialStatementService:
                 'net_profit': Decimal('1250000.00')
             }
         """
-        revenue = self._get_revenue()
-        cost_of_sales = self._get_cost_of_sales()
-        operating_expenses = self._get_operating_expenses()
-        finance_costs = self._get_finance_costs()
-        tax_expense = self._get_tax_expense()
+        self._prefetch_balances()
+        data = self._build_income_statement(self.current_range)
+        if self.comparative_period:
+            data['comparative'] = self._build_income_statement(self.comparative_range)
+        return data
+
+    def _build_income_statement(self, date_range: Tuple[date, date]) -> Dict:
+        revenue = self._get_revenue(date_range)
+        cost_of_sales = self._get_cost_of_sales(date_range)
+        operating_expenses = self._get_operating_expenses(date_range)
+        finance_costs = self._get_finance_costs(date_range)
+        tax_expense = self._get_tax_expense(date_range)
 
         gross_profit = revenue['total'] - cost_of_sales
         operating_profit = gross_profit - operating_expenses['total']
@@ -122,8 +178,8 @@ class FinancialStatementService:
         return {
             'company': self.company,
             'period': {
-                'start': self.start_date,
-                'end': self.end_date
+                'start': date_range[0],
+                'end': date_range[1]
             },
             'currency': self.currency,
             'revenue': revenue,
@@ -140,19 +196,13 @@ class FinancialStatementService:
             'net_profit_margin': (net_profit / revenue['total'] * 100) if revenue['total'] > 0 else Decimal('0.00'),
         }
 
-    def _get_assets(self) -> Dict:
+    def _get_assets(self, date_range: Optional[Tuple[date, date]] = None) -> Dict:
         """Get asset balances (current and non-current)."""
-        asset_accounts = Account.objects.filter(
-            company=self.company,
-            account_type='ASSET',
-            is_active=True
-        )
-
         current_assets = []
         non_current_assets = []
 
-        for account in asset_accounts:
-            balance = self._get_account_balance(account, self.end_date)
+        for account in self._accounts_of_type('ASSET'):
+            balance = self._get_account_balance(account, date_range)
 
             if balance != Decimal('0.00'):
                 account_data = {
@@ -178,19 +228,13 @@ class FinancialStatementService:
             'total': total_current + total_non_current
         }
 
-    def _get_liabilities(self) -> Dict:
+    def _get_liabilities(self, date_range: Optional[Tuple[date, date]] = None) -> Dict:
         """Get liability balances (current and non-current)."""
-        liability_accounts = Account.objects.filter(
-            company=self.company,
-            account_type='LIABILITY',
-            is_active=True
-        )
-
         current_liabilities = []
         non_current_liabilities = []
 
-        for account in liability_accounts:
-            balance = self._get_account_balance(account, self.end_date)
+        for account in self._accounts_of_type('LIABILITY'):
+            balance = self._get_account_balance(account, date_range)
 
             if balance != Decimal('0.00'):
                 account_data = {
@@ -216,18 +260,12 @@ class FinancialStatementService:
             'total': total_current + total_non_current
         }
 
-    def _get_equity(self) -> Dict:
+    def _get_equity(self, date_range: Optional[Tuple[date, date]] = None) -> Dict:
         """Get equity balances."""
-        equity_accounts = Account.objects.filter(
-            company=self.company,
-            account_type='EQUITY',
-            is_active=True
-        )
-
         equity_items = []
 
-        for account in equity_accounts:
-            balance = self._get_account_balance(account, self.end_date)
+        for account in self._accounts_of_type('EQUITY'):
+            balance = self._get_account_balance(account, date_range)
 
             if balance != Decimal('0.00'):
                 equity_items.append({
@@ -243,19 +281,13 @@ class FinancialStatementService:
             'total': total
         }
 
-    def _get_revenue(self) -> Dict:
+    def _get_revenue(self, date_range: Optional[Tuple[date, date]] = None) -> Dict:
         """Get revenue for the period."""
-        revenue_accounts = Account.objects.filter(
-            company=self.company,
-            account_type='REVENUE',
-            is_active=True
-        )
-
         revenue_items = []
         total = Decimal('0.00')
 
-        for account in revenue_accounts:
-            amount = self._get_period_movement(account)
+        for account in self._accounts_of_type('REVENUE'):
+            amount = self._get_period_movement(account, date_range)
 
             if amount != Decimal('0.00'):
                 revenue_items.append({
@@ -270,37 +302,22 @@ class FinancialStatementService:
             'total': total
         }
 
-    def _get_cost_of_sales(self) -> Decimal:
+    def _get_cost_of_sales(self, date_range: Optional[Tuple[date, date]] = None) -> Decimal:
         """Get cost of sales/COGS for the period."""
         # Accounts typically starting with 5xxx
-        cogs_accounts = Account.objects.filter(
-            company=self.company,
-            account_type='EXPENSE',
-            code__startswith='5',
-            is_active=True
+        return sum(
+            (self._get_period_movement(account, date_range) for account in self._accounts_of_type('EXPENSE', '5')),
+            Decimal('0.00'),
         )
 
-        total = Decimal('0.00')
-        for account in cogs_accounts:
-            total += self._get_period_movement(account)
-
-        return total
-
-    def _get_operating_expenses(self) -> Dict:
+    def _get_operating_expenses(self, date_range: Optional[Tuple[date, date]] = None) -> Dict:
         """Get operating expenses for the period."""
-        # Accounts typically starting with 6xxx
-        expense_accounts = Account.objects.filter(
-            company=self.company,
-            account_type='EXPENSE',
-            code__startswith='6',
-            is_active=True
-        )
-
         expense_items = []
         total = Decimal('0.00')
 
-        for account in expense_accounts:
-            amount = self._get_period_movement(account)
+        # Accounts typically starting with 6xxx
+        for account in self._accounts_of_type('EXPENSE', '6'):
+            amount = self._get_period_movement(account, date_range)
 
             if amount != Decimal('0.00'):
                 expense_items.append({
@@ -315,58 +332,40 @@ class FinancialStatementService:
             'total': total
         }
 
-    def _get_finance_costs(self) -> Decimal:
+    def _get_finance_costs(self, date_range: Optional[Tuple[date, date]] = None) -> Decimal:
         """Get finance costs for the period."""
         # Accounts typically starting with 7xxx
-        finance_accounts = Account.objects.filter(
-            company=self.company,
-            account_type='EXPENSE',
-            code__startswith='7',
-            is_active=True
+        return sum(
+            (self._get_period_movement(account, date_range) for account in self._accounts_of_type('EXPENSE', '7')),
+            Decimal('0.00'),
         )
 
-        total = Decimal('0.00')
-        for account in finance_accounts:
-            total += self._get_period_movement(account)
-
-        return total
-
-    def _get_tax_expense(self) -> Decimal:
+    def _get_tax_expense(self, date_range: Optional[Tuple[date, date]] = None) -> Decimal:
         """Get tax expense for the period."""
-        # Find tax expense accounts (usually in expenses with 'tax' in name)
-        tax_accounts = Account.objects.filter(
-            company=self.company,
-            account_type='EXPENSE',
-            name__icontains='tax',
-            is_active=True
-        ).exclude(
-            name__icontains='vat'  # Exclude VAT
+        # Tax expense accounts: expenses with 'tax' in the name, excluding VAT
+        tax_accounts = [
+            account for account in self._accounts_of_type('EXPENSE')
+            if 'tax' in account.name.lower() and 'vat' not in account.name.lower()
+        ]
+        return sum(
+            (self._get_period_movement(account, date_range) for account in tax_accounts),
+            Decimal('0.00'),
         )
 
-        total = Decimal('0.00')
-        for account in tax_accounts:
-            total += self._get_period_movement(account)
-
-        return total
+    def _balance_for(self, account: Account, date_range: Optional[Tuple[date, date]]) -> AccountBalance:
+        start, end = date_range or self.current_range
+        return self.balance_provider.get_range(start, end).get(account.id, EMPTY_BALANCE)
 
-    def _get_account_balance(self, account: Account, as_of_date: date) -> Decimal:
+    def _get_account_balance(self, account: Account, date_range: Optional[Tuple[date, date]] = None) -> Decimal:
         """
-        Get account balance as of a specific date.
+        Get account balance as of the end of the range.
 
         For assets: Debit - Credit
         For liabilities/equity/revenue: Credit - Debit
         """
-        lines = JournalEntry.objects.filter(
-            account=account,
-            voucher__entry_date__lte=as_of_date,
-            voucher__status='POSTED'
-        ).aggregate(
-            total_debit=Coalesce(Sum('debit_amount'), Decimal('0.00')),
-            total_credit=Coalesce(Sum('credit_amount'), Decimal('0.00'))
-        )
-
-        debit = lines['total_debit'] or Decimal('0.00')
-        credit = lines['total_credit'] or Decimal('0.00')
+        balance = self._balance_for(account, date_range)
+        debit = balance.closing_debit
+        credit = balance.closing_credit
 
         # Assets are debit balance accounts
         if account.account_type == 'ASSET':
@@ -375,24 +374,15 @@ class FinancialStatementService:
         else:
             return credit - debit
 
-    def _get_period_movement(self, account: Account) -> Decimal:
+    def _get_period_movement(self, account: Account, date_range: Optional[Tuple[date, date]] = None) -> Decimal:
         """
         Get account movement during the period (for P&L accounts).
 
         Returns positive number representing the absolute movement.
         """
-        lines = JournalEntry.objects.filter(
-            account=account,
-            voucher__entry_date__gte=self.start_date,
-            voucher__entry_date__lte=self.end_date,
-            voucher__status='POSTED'
-        ).aggregate(
-            total_debit=Coalesce(Sum('debit_amount'), Decimal('0.00')),
-            total_credit=Coalesce(Sum('credit_amount'), Decimal('0.00'))
-        )
-
-        debit = lines['total_debit'] or Decimal('0.00')
-        credit = lines['total_credit'] or Decimal('0.00')
+        balance = self._balance_for(account, date_range)
+        debit = balance.period_debit
+        credit = balance.period_credit
 
         # For Revenue accounts, credit is positive
         if account.account_type == 'REVENUE':
@@ -18,13 +18,14 @@ from typing import Dict, List, Optional
 from dataclasses import dataclass
 from datetime import date
 
-from django.db.models import Sum, Q, F
+from django.db.models import Q, F
 from django.utils import timezone
 
 from apps.companies.models import Company
 from apps.inventory.models import Product, Warehouse, CostLayer, StockLevel
 from apps.inventory.services.valuation_service import ValuationService
 from apps.finance.models import Account, JournalEntry, JournalVoucher, JournalStatus
+from apps.finance.services.account_balance_provider import EMPTY_BALANCE, AccountBalanceProvider
 
 logger = logging.getLogger(__name__)
 
@@ -133,13 +134,18 @@ class GLReconciliationService:
         return account_values
 
     @staticmethod
-    def get_gl_balance(account: Account, as_of_date: Optional[date] = None) -> Decimal:
+    def get_gl_balance(
+        account: Account,
+        as_of_date: Optional[date] = None,
+        balance_provider: Optional[AccountBalanceProvider] = None,
+    ) -> Decimal:
         """
         Gets the GL balance for an account as of a specific date.
 
         Args:
             account: The account to check
             as_of_date: Optional date filter (default: current date)
+            balance_provider: Optional shared provider so many accounts reuse one aggregate
 
         Returns:
             Current GL balance (considering account type for debit/credit nature)
@@ -148,18 +154,11 @@ class GLReconciliationService:
             # Use current_balance field for performance
             return account.current_balance or Decimal('0')
 
-        # Calculate historical balance by summing posted journal entries
-        posted_entries = JournalEntry.objects.filter(
-            account=account,
-            voucher__status=JournalStatus.POSTED,
-            voucher__entry_date__lte=as_of_date
-        ).aggregate(
-            total_debit=Sum('debit_amount'),
-            total_credit=Sum('credit_amount')
-        )
-
-        total_debit = posted_entries.get('total_debit') or Decimal('0')
-        total_credit = posted_entries.get('total_credit') or Decimal('0')
+        # Historical balance from the shared (snapshot-backed, cached) balance provider
+        provider = balance_provider or AccountBalanceProvider(account.company)
+        balance = provider.get_as_of(as_of_date).get(account.id, EMPTY_BALANCE)
+        total_debit = balance.closing_debit
+        total_credit = balance.closing_credit
 
         # For asset accounts (including inventory), debit increases balance
         if account.account_type == 'ASSET':
@@ -199,10 +198,11 @@ class GLReconciliationService:
         # Get all inventory accounts
         account_ids = list(inventory_values.keys())
         accounts = Account.objects.filter(id__in=account_ids)
+        balance_provider = AccountBalanceProvider(company)
 
         for account in accounts:
             inventory_value = inventory_values.get(account.id, Decimal('0'))
-            gl_balance = GLReconciliationService.get_gl_balance(account, as_of_date)
+            gl_balance = GLReconciliationService.get_gl_balance(account, as_of_date, balance_provider)
 
             variance = gl_balance - inventory_value
             variance_abs = abs(variance)
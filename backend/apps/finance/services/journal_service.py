@@ -1,4 +1,5 @@
 
+import uuid
 from decimal import Decimal, ROUND_HALF_UP
 
 from django.db import transaction
@@ -140,12 +141,10 @@ class JournalService:
             raise ValueError("Journal does not belong to the supplied company.")
 
         prepared_entries = JournalService._prepare_entries(entries_data, company)
-        voucher_number, sequence_number = JournalService._generate_voucher_number(
-            company=company,
-            journal=journal,
-            entry_date=entry_date,
-        )
 
+        # The real number is allocated last: in strict (gapless) mode the
+        # allocation locks the sequence row until commit, so everything that
+        # can fail or take time happens before it.
         voucher = JournalVoucher.objects.create(
             company=company,
             journal=journal,
@@ -156,8 +155,7 @@ class JournalService:
             status=JournalStatus.DRAFT,
             source_document_type=source_document_type,
             source_document_id=source_document_id,
-            voucher_number=voucher_number,
-            sequence_number=sequence_number,
+            voucher_number=f"PENDING-{uuid.uuid4().hex}",
             created_by=created_by,
         )
 
@@ -177,6 +175,13 @@ class JournalService:
             ]
         )
 
+        voucher.voucher_number, voucher.sequence_number = JournalService._generate_voucher_number(
+            company=company,
+            journal=journal,
+            entry_date=entry_date,
+        )
+        voucher.save(update_fields=['voucher_number', 'sequence_number'])
+
         return voucher
 
     @staticmethod
@@ -6,17 +6,22 @@ Generates trial balance reports with multi-currency support.
 from decimal import Decimal
 from datetime import date, datetime
 from typing import Dict, List, Optional, Tuple
-from django.db.models import Q, Sum, F
-from django.db.models.functions import Coalesce
 
-from apps.finance.models import Account, JournalEntry, Currency, ExchangeRate
+from apps.finance.models import Account
+from apps.finance.services.account_balance_provider import EMPTY_BALANCE, AccountBalanceProvider
 from apps.companies.models import Company
 
 
 class TrialBalanceService:
     """Service for generating trial balance reports."""
 
-    def __init__(self, company: Company, as_of_date: Optional[date] = None, currency: str = 'BDT'):
+    def __init__(
+        self,
+        company: Company,
+        as_of_date: Optional[date] = None,
+        currency: str = 'BDT',
+        balance_provider: Optional[AccountBalanceProvider] = None,
+    ):
         """
         Initialize the trial balance service.
 
@@ -24,10 +29,12 @@ class TrialBalanceService:
             company: Company to generate trial balance for
             as_of_date: Date to generate trial balance as of (defaults to today)
             currency: Currency code for reporting (defaults to base currency)
+            balance_provider: Shared balance provider (one is created if omitted)
         """
         self.company = company
         self.as_of_date = as_of_date or date.today()
         self.currency = currency
+        self.balance_provider = balance_provider or AccountBalanceProvider(company)
 
     def generate(self) -> Dict:
         """
@@ -55,18 +62,23 @@ class TrialBalanceService:
                 'difference': Decimal('0.00')
             }
         """
-        # Get all active accounts with hierarchy
-        accounts = Account.objects.filter(
-            company=self.company,
-            is_active=True
-        ).order_by('code')
+        # Load the account tree once; level/child lookups are resolved in memory
+        all_accounts = list(Account.objects.filter(company=self.company).order_by('code'))
+        parent_of = {account.id: account.parent_account_id for account in all_accounts}
+        parent_ids = {parent_id for parent_id in parent_of.values() if parent_id}
+
+        # One grouped aggregate on top of the latest closed-period snapshot
+        balances = self.balance_provider.get_as_of(self.as_of_date)
 
         account_balances = []
         total_debit = Decimal('0.00')
         total_credit = Decimal('0.00')
 
-        for account in accounts:
-            debit, credit = self._get_account_balance(account)
+        for account in all_accounts:
+            if not account.is_active:
+                continue
+            account_balance = balances.get(account.id, EMPTY_BALANCE)
+            debit, credit = account_balance.closing_debit, account_balance.closing_credit
             balance = debit - credit
 
             # For certain account types, credit is positive
@@ -78,11 +90,11 @@ class TrialBalanceService:
                 'code': account.code,
                 'name': account.name,
                 'account_type': account.account_type,
-                'level': self._get_account_level(account),
+                'level': self._get_account_level(account.id, parent_of),
                 'debit': debit,
                 'credit': credit,
                 'balance': balance,
-                'is_parent': self._has_children(account),
+                'is_parent': account.id in parent_ids,
             })
 
             total_debit += debit
@@ -101,39 +113,26 @@ class TrialBalanceService:
 
     def _get_account_balance(self, account: Account) -> Tuple[Decimal, Decimal]:
         """
-        Get debit and credit totals for an account.
+        Get debit and credit totals for a single account.
 
         Returns:
             (debit_total, credit_total)
         """
-        # Get all journal entries for this account up to as_of_date
-        lines = JournalEntry.objects.filter(
-            account=account,
-            voucher__entry_date__lte=self.as_of_date,
-            voucher__status='POSTED'
-        ).aggregate(
-            total_debit=Coalesce(Sum('debit_amount'), Decimal('0.00')),
-            total_credit=Coalesce(Sum('credit_amount'), Decimal('0.00'))
-        )
-
-        debit = lines['total_debit'] or Decimal('0.00')
-        credit = lines['total_credit'] or Decimal('0.00')
-
-        return debit, credit
-
-    def _get_account_level(self, account: Account) -> int:
-        """Get the hierarchy level of an account."""
+        account_balance = self.balance_provider.get_as_of(self.as_of_date).get(account.id, EMPTY_BALANCE)
+        return account_balance.closing_debit, account_balance.closing_credit
+
+    @staticmethod
+    def _get_account_level(account_id: int, parent_of: Dict[int, Optional[int]]) -> int:
+        """Get the hierarchy level of an account from the in-memory parent map."""
         level = 0
-        current = account
-        while current.parent_account:
+        seen = {account_id}
+        current = parent_of.get(account_id)
+        while current and current not in seen:
             level += 1
-            current = current.parent_account
+            seen.add(current)
+            current = parent_of.get(current)
         return level
 
-    def _has_children(self, account: Account) -> bool:
-        """Check if account has child accounts."""
-        return Account.objects.filter(parent_account=account).exists()
-
     def export_to_dict(self) -> Dict:
         """Export trial balance to dictionary for serialization."""
         data = self.generate()
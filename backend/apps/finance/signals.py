@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import FiscalPeriod
+from .services.balance_snapshot_service import CLOSED_STATUSES, BalanceSnapshotService
+
+
+@receiver(post_save, sender=FiscalPeriod)
+def sync_period_balance_snapshot(sender, instance: FiscalPeriod, created: bool, **kwargs):
+    if instance.status in CLOSED_STATUSES:
+        BalanceSnapshotService.snapshot_period(instance)
+    elif not created:
+        BalanceSnapshotService.invalidate_from(instance.company, instance.period)
+
+
+@receiver(post_delete, sender=FiscalPeriod)
+def drop_period_balance_snapshot(sender, instance: FiscalPeriod, **kwargs):
+    BalanceSnapshotService.invalidate_from(instance.company, instance.period)
@@ -0,0 +1,110 @@
+from datetime import date
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from apps.companies.models import Company, CompanyGroup
+from apps.finance.models import (
+    Account,
+    AccountType,
+    FiscalPeriod,
+    FiscalPeriodStatus,
+    Journal,
+    JournalEntry,
+    JournalStatus,
+    JournalVoucher,
+)
+from apps.finance.services.account_balance_provider import AccountBalanceProvider
+from apps.finance.services.financial_statement_service import FinancialStatementService
+from apps.finance.services.gl_reconciliation_service import GLReconciliationService
+
+
+class AccountBalanceProviderTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.group = CompanyGroup.objects.create(name="ABP Group", db_name="cg_abp_test")
+        self.company = Company.objects.create(name="ABP Co", code="ABPC", company_group=self.group)
+        self.cash = Account.objects.create(
+            company=self.company, code="1100-ABP", name="Cash", account_type=AccountType.ASSET
+        )
+        self.revenue = Account.objects.create(
+            company=self.company, code="4100-ABP", name="Sales", account_type=AccountType.REVENUE
+        )
+        self.tax = Account.objects.create(
+            company=self.company, code="8100-ABP", name="Income Tax Expense", account_type=AccountType.EXPENSE
+        )
+        self.journal = Journal.objects.create(company=self.company, code="ABP-GEN", name="General", type="GENERAL")
+        self._seq = 0
+
+    def _post(self, entry_date: date, amount: str, debit_account=None, credit_account=None):
+        self._seq += 1
+        voucher = JournalVoucher.objects.create(
+            company=self.company,
+            journal=self.journal,
+            voucher_number=f"ABP-{self._seq:04d}",
+            entry_date=entry_date,
+            period=entry_date.strftime("%Y-%m"),
+            description="Test",
+            status=JournalStatus.POSTED,
+        )
+        JournalEntry.objects.create(
+            voucher=voucher, line_number=1, account=debit_account or self.cash, debit_amount=Decimal(amount)
+        )
+        JournalEntry.objects.create(
+            voucher=voucher, line_number=2, account=credit_account or self.revenue, credit_amount=Decimal(amount)
+        )
+
+    def test_multiple_ranges_in_one_aggregate(self):
+        self._post(date(2025, 1, 10), "100.00")
+        self._post(date(2025, 2, 10), "40.00")
+        self._post(date(2025, 3, 10), "5.00")
+        FiscalPeriod.objects.create(
+            company=self.company, company_group=self.group, period="2025-01", status=FiscalPeriodStatus.CLOSED
+        )
+
+        provider = AccountBalanceProvider(self.company)
+        feb = (date(2025, 2, 1), date(2025, 2, 28))
+        mar = (date(2025, 3, 1), date(2025, 3, 31))
+        # watermark, snapshot lookup, snapshot rows, grouped aggregate
+        with self.assertNumQueries(4):
+            balances = provider.get_balances([feb, mar])
+
+        cash_feb = balances[feb][self.cash.id]
+        self.assertEqual(cash_feb.opening_debit, Decimal("100.00"))
+        self.assertEqual(cash_feb.period_debit, Decimal("40.00"))
+        self.assertEqual(balances[mar][self.cash.id].closing_debit, Decimal("145.00"))
+
+        with self.assertNumQueries(0):
+            provider.get_range(*feb)
+
+    def test_cache_is_invalidated_by_new_postings(self):
+        self._post(date(2025, 1, 10), "100.00")
+        as_of = date(2025, 1, 31)
+        self.assertEqual(
+            AccountBalanceProvider(self.company).get_as_of(as_of)[self.cash.id].closing_debit, Decimal("100.00")
+        )
+
+        self._post(date(2025, 1, 11), "20.00")
+        self.assertEqual(
+            AccountBalanceProvider(self.company).get_as_of(as_of)[self.cash.id].closing_debit, Decimal("120.00")
+        )
+        self.assertEqual(GLReconciliationService.get_gl_balance(self.cash, as_of), Decimal("120.00"))
+
+    def test_income_statement_with_comparative_period(self):
+        self._post(date(2025, 1, 10), "100.00")
+        self._post(date(2025, 2, 10), "300.00")
+        self._post(date(2025, 2, 15), "30.00", debit_account=self.tax, credit_account=self.cash)
+
+        service = FinancialStatementService(
+            self.company, date(2025, 2, 1), date(2025, 2, 28), comparative_period=True
+        )
+        data = service.generate_income_statement()
+
+        self.assertEqual(data["revenue"]["total"], Decimal("300.00"))
+        self.assertEqual(data["tax_expense"], Decimal("30.00"))
+        self.assertEqual(data["net_profit"], Decimal("270.00"))
+        self.assertEqual(data["comparative"]["revenue"]["total"], Decimal("100.00"))
+
+        sheet = FinancialStatementService(self.company, date(2025, 1, 1), date(2025, 2, 28)).generate_balance_sheet()
+        self.assertEqual(sheet["assets"]["total_current"], Decimal("370.00"))
@@ -0,0 +1,60 @@
+from datetime import date
+from unittest import mock
+
+from django.test import TestCase
+
+from apps.companies.models import CompanyGroup, Company
+from apps.finance.models import Account, AccountType, Journal, JournalEntry, JournalVoucher
+from apps.finance.services.journal_service import JournalService
+
+
+class JournalVoucherNumberingTests(TestCase):
+    def setUp(self):
+        self.group = CompanyGroup.objects.create(name="Demo Group", code="DEMO-G")
+        self.company = Company.objects.create(name="Demo Co", code="DEMO", company_group=self.group)
+        self.journal = Journal.objects.create(company=self.company, code="GJ", name="General Journal", type="GENERAL")
+        self.cash = Account.objects.create(
+            company=self.company, code="1000-CASH", name="Cash", account_type=AccountType.ASSET,
+        )
+        self.revenue = Account.objects.create(
+            company=self.company, code="4000-REV", name="Revenue", account_type=AccountType.REVENUE,
+        )
+
+    def _create(self, entries):
+        return JournalService.create_journal_voucher(
+            journal=self.journal,
+            entry_date=date(2026, 3, 1),
+            description="Sale",
+            entries_data=entries,
+            company=self.company,
+        )
+
+    def test_number_is_allocated_after_the_lines_are_written(self):
+        allocate = JournalService._generate_voucher_number
+        lines_at_allocation = []
+
+        def spy(**kwargs):
+            lines_at_allocation.append(JournalEntry.objects.count())
+            return allocate(**kwargs)
+
+        with mock.patch.object(JournalService, '_generate_voucher_number', side_effect=spy):
+            voucher = self._create([
+                {'account': self.cash, 'debit': '100.00'},
+                {'account': self.revenue, 'credit': '100.00'},
+            ])
+
+        self.assertEqual(lines_at_allocation, [2])
+        voucher.refresh_from_db()
+        self.assertTrue(voucher.voucher_number.startswith("GJ-"))
+        self.assertEqual(voucher.sequence_number, 1)
+
+    def test_invalid_voucher_does_not_allocate_a_number(self):
+        with mock.patch.object(JournalService, '_generate_voucher_number') as allocate:
+            with self.assertRaises(ValueError):
+                self._create([
+                    {'account': self.cash, 'debit': '100.00'},
+                    {'account': self.revenue, 'credit': '90.00'},
+                ])
+
+        allocate.assert_not_called()
+        self.assertFalse(JournalVoucher.objects.exists())
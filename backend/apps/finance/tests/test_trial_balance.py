@@ -0,0 +1,142 @@
+from datetime import date
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from apps.companies.models import Company, CompanyGroup
+from apps.finance.models import (
+    Account,
+    AccountPeriodBalance,
+    AccountType,
+    FiscalPeriod,
+    FiscalPeriodStatus,
+    Journal,
+    JournalEntry,
+    JournalStatus,
+    JournalVoucher,
+)
+from apps.finance.services.balance_snapshot_service import BalanceSnapshotService
+from apps.finance.services.trial_balance_service import TrialBalanceService
+
+
+class TrialBalanceSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.group = CompanyGroup.objects.create(name="TB Group", db_name="cg_tb_test")
+        self.company = Company.objects.create(name="TB Co", code="TBCO", company_group=self.group)
+        self.cash = Account.objects.create(
+            company=self.company, code="TB-1000", name="Cash", account_type=AccountType.ASSET
+        )
+        self.bank = Account.objects.create(
+            company=self.company,
+            code="TB-1010",
+            name="Bank",
+            account_type=AccountType.ASSET,
+            parent_account=self.cash,
+        )
+        self.revenue = Account.objects.create(
+            company=self.company, code="TB-4000", name="Sales", account_type=AccountType.REVENUE
+        )
+        self.journal = Journal.objects.create(company=self.company, code="TB-GEN", name="General", type="GENERAL")
+        self._seq = 0
+
+    def _post(self, entry_date: date, amount: str, debit_account=None):
+        self._seq += 1
+        voucher = JournalVoucher.objects.create(
+            company=self.company,
+            journal=self.journal,
+            voucher_number=f"TB-{self._seq:04d}",
+            entry_date=entry_date,
+            period=entry_date.strftime("%Y-%m"),
+            description="Test",
+            status=JournalStatus.POSTED,
+        )
+        JournalEntry.objects.create(
+            voucher=voucher, line_number=1, account=debit_account or self.bank, debit_amount=Decimal(amount)
+        )
+        JournalEntry.objects.create(voucher=voucher, line_number=2, account=self.revenue, credit_amount=Decimal(amount))
+
+    def _rows(self, as_of: date):
+        data = TrialBalanceService(self.company, as_of_date=as_of).generate()
+        return data, {row["code"]: row for row in data["accounts"]}
+
+    def test_generate_groups_balances_and_hierarchy(self):
+        self._post(date(2025, 1, 10), "100.00")
+        self._post(date(2025, 2, 5), "50.00", debit_account=self.cash)
+
+        data, rows = self._rows(date(2025, 2, 28))
+
+        self.assertTrue(data["is_balanced"])
+        self.assertEqual(rows["TB-1010"]["debit"], Decimal("100.00"))
+        self.assertEqual(rows["TB-1010"]["level"], 1)
+        self.assertTrue(rows["TB-1000"]["is_parent"])
+        self.assertFalse(rows["TB-1010"]["is_parent"])
+        self.assertEqual(rows["TB-4000"]["balance"], Decimal("150.00"))
+
+    def test_closing_period_snapshots_balances(self):
+        self._post(date(2025, 1, 10), "100.00")
+        FiscalPeriod.objects.create(
+            company=self.company, company_group=self.group, period="2025-01", status=FiscalPeriodStatus.CLOSED
+        )
+        snapshot = AccountPeriodBalance.objects.get(account=self.bank, period="2025-01")
+        self.assertEqual(snapshot.closing_debit, Decimal("100.00"))
+        self.assertEqual(snapshot.period_end, date(2025, 1, 31))
+
+        self._post(date(2025, 2, 3), "25.00")
+        _, rows = self._rows(date(2025, 2, 28))
+        self.assertEqual(rows["TB-1010"]["debit"], Decimal("125.00"))
+
+        # As-of dates before the snapshot still aggregate from the beginning
+        _, rows = self._rows(date(2024, 12, 31))
+        self.assertEqual(rows["TB-1010"]["debit"], Decimal("0.00"))
+
+    def test_reopening_period_invalidates_snapshots(self):
+        self._post(date(2025, 1, 10), "100.00")
+        period = FiscalPeriod.objects.create(
+            company=self.company, company_group=self.group, period="2025-01", status=FiscalPeriodStatus.CLOSED
+        )
+        period.status = FiscalPeriodStatus.OPEN
+        period.save(update_fields=["status"])
+        self.assertFalse(AccountPeriodBalance.objects.filter(company=self.company).exists())
+
+        self._post(date(2025, 1, 20), "10.00")
+        balances = BalanceSnapshotService.get_balances_as_of(self.company, date(2025, 1, 31))
+        self.assertEqual(balances[self.bank.id], (Decimal("110.00"), Decimal("0.00")))
+
+    def test_period_closed_before_an_earlier_open_one_is_snapshotted_once_it_closes(self):
+        january = FiscalPeriod.objects.create(
+            company=self.company, company_group=self.group, period="2025-01", status=FiscalPeriodStatus.OPEN
+        )
+        self._post(date(2025, 2, 5), "50.00")
+        FiscalPeriod.objects.create(
+            company=self.company, company_group=self.group, period="2025-02", status=FiscalPeriodStatus.CLOSED
+        )
+        self.assertFalse(AccountPeriodBalance.objects.filter(company=self.company).exists())
+
+        # January still takes postings while February is closed
+        self._post(date(2025, 1, 20), "10.00")
+        balances = BalanceSnapshotService.get_balances_as_of(self.company, date(2025, 2, 28))
+        self.assertEqual(balances[self.bank.id], (Decimal("60.00"), Decimal("0.00")))
+
+        january.status = FiscalPeriodStatus.CLOSED
+        january.save(update_fields=["status"])
+        snapshots = AccountPeriodBalance.objects.filter(account=self.bank).order_by("period")
+        self.assertEqual(
+            list(snapshots.values_list("period", "closing_debit")),
+            [("2025-01", Decimal("10.00")), ("2025-02", Decimal("60.00"))],
+        )
+        self.assertEqual(BalanceSnapshotService.rebuild(self.company), 4)
+
+    def test_generate_query_count_is_independent_of_account_count(self):
+        for idx in range(20):
+            Account.objects.create(
+                company=self.company, code=f"TB-6{idx:03d}", name=f"Expense {idx}", account_type=AccountType.EXPENSE
+            )
+        self._post(date(2025, 1, 10), "100.00")
+        with self.assertNumQueries(4):
+            TrialBalanceService(self.company, as_of_date=date(2025, 1, 31)).generate()
+
+        # A second request with no new postings is served from the cache
+        with self.assertNumQueries(2):
+            TrialBalanceService(self.company, as_of_date=date(2025, 1, 31)).generate()
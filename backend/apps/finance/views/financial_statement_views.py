@@ -9,7 +9,7 @@ from django.http import HttpResponse
 from datetime import date, timedelta
 from dateutil.relativedelta import relativedelta
 
-from apps.finance.services import FinancialStatementService, TrialBalanceService
+from apps.finance.services import AccountBalanceProvider, FinancialStatementService, TrialBalanceService
 from apps.finance.services.statement_export_service import StatementExportService
 from apps.finance.serializers.financial_statement_serializers import (
     TrialBalanceRequestSerializer,
@@ -181,10 +181,16 @@ class FinancialStatementViewSet(viewsets.ViewSet):
         # Current year
         year_start = date(today.year, 1, 1)
 
-        # Generate reports
-        month_service = FinancialStatementService(company, month_start, month_end)
-        quarter_service = FinancialStatementService(company, quarter_start, month_end)
-        year_service = FinancialStatementService(company, year_start, month_end)
+        # Generate reports; all three ranges come from one grouped balance query
+        balance_provider = AccountBalanceProvider(company)
+        balance_provider.get_balances([
+            (month_start, month_end),
+            (quarter_start, month_end),
+            (year_start, month_end),
+        ])
+        month_service = FinancialStatementService(company, month_start, month_end, balance_provider=balance_provider)
+        quarter_service = FinancialStatementService(company, quarter_start, month_end, balance_provider=balance_provider)
+        year_service = FinancialStatementService(company, year_start, month_end, balance_provider=balance_provider)
 
         month_income = month_service.generate_income_statement()
         quarter_income = quarter_service.generate_income_statement()
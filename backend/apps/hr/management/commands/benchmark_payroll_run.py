@@ -0,0 +1,151 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries, transaction
+from django.test.utils import CaptureQueriesContext
+
+from apps.companies.models import Company
+from apps.hr.models import (
+    Attendance,
+    AttendanceStatus,
+    Department,
+    Employee,
+    OvertimeEntry,
+    OvertimeRequestStatus,
+    PayrollRun,
+    SalaryStructure,
+)
+from apps.hr.services.payroll import PayrollService
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare row-by-row, vectorized and per-department payroll run generation over synthetic employees. "
+        "All data is created inside a transaction that is rolled back."
+    )
+
+    PERIOD_START = date(2099, 1, 1)
+    PERIOD_END = date(2099, 1, 31)
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company-id', type=int, required=True)
+        parser.add_argument('--employees', type=int, default=50000, help='Synthetic employees (default 50000)')
+        parser.add_argument('--departments', type=int, default=20, help='Departments to spread them over (default 20)')
+        parser.add_argument('--attendance-days', type=int, default=20, help='Attendance records per employee (default 20)')
+        parser.add_argument('--skip-row-by-row', action='store_true', help='Only time the vectorized modes')
+
+    def handle(self, *args, **options):
+        company = Company.objects.filter(id=options['company_id']).first()
+        if not company:
+            raise CommandError(f"Company {options['company_id']} not found")
+
+        modes = [('vectorized', self._vectorized), ('per-department', self._per_department)]
+        if not options['skip_row_by_row']:
+            modes.insert(0, ('row-by-row', self._row_by_row))
+
+        results = []
+        try:
+            with transaction.atomic():
+                self.stdout.write(f"Creating {options['employees']} synthetic employees...")
+                self._create_fixtures(company, options['employees'], options['departments'], options['attendance_days'])
+                for label, generate in modes:
+                    try:
+                        with transaction.atomic():
+                            reset_queries()
+                            with CaptureQueriesContext(connection) as queries:
+                                started = time.perf_counter()
+                                run, slowest = generate(company)
+                                elapsed = time.perf_counter() - started
+                            results.append((label, elapsed, len(queries), run.lines.count(), run.net_total, slowest))
+                            raise _Rollback
+                    except _Rollback:
+                        pass
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        self.stdout.write(f"{'mode':<16}{'seconds':>10}{'queries':>10}{'lines':>10}{'net total':>18}{'slowest part':>14}")
+        for label, elapsed, query_count, line_count, net_total, slowest in results:
+            slowest = f"{slowest:.3f}" if slowest is not None else '-'
+            self.stdout.write(f"{label:<16}{elapsed:>10.3f}{query_count:>10}{line_count:>10}{net_total:>18}{slowest:>14}")
+        self.stdout.write(self.style.SUCCESS("Benchmark finished; all benchmark data was rolled back."))
+
+    def _generate(self, company, **kwargs):
+        return PayrollService.generate_payroll_run(
+            company=company, period_start=self.PERIOD_START, period_end=self.PERIOD_END, **kwargs
+        )
+
+    def _row_by_row(self, company):
+        return self._generate(company), None
+
+    def _vectorized(self, company):
+        return self._generate(company, vectorized=True), None
+
+    def _per_department(self, company):
+        # The partitions Celery workers would compute in parallel, timed one after another
+        run = PayrollService._create_run(
+            company=company, period_start=self.PERIOD_START, period_end=self.PERIOD_END, period_label='',
+            notes='', expense_account=None, liability_account=None, created_by=None, status='DRAFT',
+        )
+        department_ids = set(
+            PayrollService._eligible_employees(company, self.PERIOD_START, self.PERIOD_END)
+            .values_list('department_id', flat=True)
+        )
+        slowest = 0.0
+        for department_id in department_ids:
+            started = time.perf_counter()
+            PayrollService.compute_partition(run, department_id)
+            slowest = max(slowest, time.perf_counter() - started)
+        return PayrollService.complete_run(PayrollRun.objects.get(pk=run.pk)), slowest
+
+    def _create_fixtures(self, company, employee_count, department_count, attendance_days):
+        departments = [
+            Department.objects.create(company=company, code=f"BENCH-{idx:03d}", name=f"Benchmark {idx}")
+            for idx in range(department_count)
+        ]
+        structures = [
+            SalaryStructure.objects.create(
+                company=company, code=f"BENCH-{idx}", name=f"Benchmark {idx}",
+                base_salary=Decimal(20000 + idx * 7500), housing_allowance=Decimal('3500.50'),
+                transport_allowance=Decimal('1200'), overtime_rate=Decimal('150.25'),
+                tax_rate=Decimal('10.00'), pension_rate=Decimal('5.50'),
+            )
+            for idx in range(4)
+        ]
+        employees = Employee.objects.bulk_create(
+            [
+                Employee(
+                    company=company, employee_id=f"BENCH-{idx:06d}", first_name='Bench', last_name=str(idx),
+                    department=departments[idx % department_count], salary_structure=structures[idx % len(structures)],
+                )
+                for idx in range(employee_count)
+            ],
+            batch_size=2000,
+        )
+
+        statuses = [AttendanceStatus.PRESENT] * 6 + [AttendanceStatus.REMOTE, AttendanceStatus.HALF_DAY, AttendanceStatus.LEAVE]
+        attendance = []
+        overtime = []
+        for idx, employee in enumerate(employees):
+            for day in range(attendance_days):
+                attendance.append(Attendance(
+                    company=company, employee=employee, date=self.PERIOD_START + timedelta(days=day),
+                    status=statuses[(idx + day) % len(statuses)], overtime_hours=Decimal('1.50') if day % 7 == 0 else 0,
+                ))
+            if idx % 3 == 0:
+                overtime.append(OvertimeEntry(
+                    company=company, company_group_id=company.company_group_id, employee=employee,
+                    date=self.PERIOD_START, requested_hours=Decimal('3'), approved_hours=Decimal('2.5'),
+                    status=OvertimeRequestStatus.APPROVED, hourly_rate=Decimal('180.00'), amount=Decimal('450.00'),
+                ))
+            if len(attendance) >= 20000:
+                Attendance.objects.bulk_create(attendance)
+                attendance = []
+        Attendance.objects.bulk_create(attendance)
+        OvertimeEntry.objects.bulk_create(overtime, batch_size=2000)
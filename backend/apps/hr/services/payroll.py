@@ -4,8 +4,10 @@ from collections import defaultdict
 from datetime import date
 from decimal import Decimal, ROUND_HALF_UP
 
+import numpy as np
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Count, DateField, DurationField, F, Q, QuerySet, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least
 from django.utils import timezone
 
 from apps.finance.models import Account, Journal
@@ -28,6 +30,9 @@ from ..models import (
 
 
 class PayrollService:
+    # Payroll lines per INSERT in vectorized runs
+    LINE_BATCH_SIZE = 2000
+
     @staticmethod
     def _quantize(value) -> Decimal:
         value = value or Decimal("0.00")
@@ -136,17 +141,27 @@ class PayrollService:
         )
 
     @staticmethod
-    @transaction.atomic
-    def generate_payroll_run(
+    def _eligible_employees(company, period_start: date, period_end: date) -> QuerySet:
+        return (
+            Employee.objects.select_related("salary_structure", "department")
+            .filter(company=company, is_active=True)
+            .filter(Q(date_of_joining__isnull=True) | Q(date_of_joining__lte=period_end))
+            .filter(Q(date_of_exit__isnull=True) | Q(date_of_exit__gte=period_start))
+            .exclude(status__in=[EmployeeStatus.TERMINATED, EmployeeStatus.RESIGNED])
+        )
+
+    @staticmethod
+    def _create_run(
         *,
         company,
         period_start: date,
         period_end: date,
-        period_label: str | None = "",
-        notes: str = "",
-        expense_account=None,
-        liability_account=None,
-        created_by=None,
+        period_label: str | None,
+        notes: str,
+        expense_account,
+        liability_account,
+        created_by,
+        status: str,
     ) -> PayrollRun:
         if period_start > period_end:
             raise ValueError("Payroll period start must be on or before the period end date.")
@@ -167,16 +182,7 @@ class PayrollService:
         expense_account = PayrollService._resolve_account(expense_account, company) if expense_account else None
         liability_account = PayrollService._resolve_account(liability_account, company) if liability_account else None
 
-        employees_qs = (
-            Employee.objects.select_related("salary_structure", "department")
-            .filter(company=company, is_active=True)
-            .filter(Q(date_of_joining__isnull=True) | Q(date_of_joining__lte=period_end))
-            .filter(Q(date_of_exit__isnull=True) | Q(date_of_exit__gte=period_start))
-            .exclude(status__in=[EmployeeStatus.TERMINATED, EmployeeStatus.RESIGNED])
-        )
-        employees = list(employees_qs)
-
-        run = PayrollRun.objects.create(
+        return PayrollRun.objects.create(
             company=company,
             period_start=period_start,
             period_end=period_end,
@@ -186,11 +192,45 @@ class PayrollService:
             liability_account=liability_account,
             generated_by=created_by,
             generated_at=timezone.now(),
+            status=status,
+        )
+
+    @staticmethod
+    @transaction.atomic
+    def generate_payroll_run(
+        *,
+        company,
+        period_start: date,
+        period_end: date,
+        period_label: str | None = "",
+        notes: str = "",
+        expense_account=None,
+        liability_account=None,
+        created_by=None,
+        vectorized: bool = False,
+    ) -> PayrollRun:
+        run = PayrollService._create_run(
+            company=company,
+            period_start=period_start,
+            period_end=period_end,
+            period_label=period_label,
+            notes=notes,
+            expense_account=expense_account,
+            liability_account=liability_account,
+            created_by=created_by,
             status=PayrollRunStatus.COMPUTED,
         )
+        employees_qs = PayrollService._eligible_employees(company, period_start, period_end)
+
+        if vectorized:
+            PayrollService.compute_lines(run, employees_qs, created_by=created_by)
+            run.recalculate_totals(save=True)
+            return run
 
+        employees = list(employees_qs)
         attendance_data = PayrollService._collect_attendance(company, employees, period_start, period_end)
         leave_data = PayrollService._collect_leave(company, employees, period_start, period_end)
+        overtime_data = PayrollService._collect_overtime(company, employees, period_start, period_end)
 
         total_days = Decimal(str((period_end - period_start).days + 1))
         lines = []
@@ -247,6 +287,7 @@ class PayrollService:
                 payroll_run=run,
                 employee=employee,
                 company=company,
+                company_group_id=run.company_group_id,
                 created_by=created_by,
                 attendance_days=present_days,
                 leave_days=leave_days,
@@ -278,6 +319,298 @@ class PayrollService:
         run.recalculate_totals(save=True)
         return run
 
+    @staticmethod
+    def _round_half_up(numerator, denominator):
+        """Integer division of arrays rounded half away from zero, like Decimal ROUND_HALF_UP."""
+        return np.sign(numerator) * ((np.abs(numerator) * 2 + denominator) // (denominator * 2))
+
+    @staticmethod
+    def _cents(values) -> np.ndarray:
+        return np.array([int(PayrollService._quantize(value) * 100) for value in values], dtype=np.int64)
+
+    @staticmethod
+    def _from_cents(value) -> Decimal:
+        return Decimal(int(value)).scaleb(-2)
+
+    @staticmethod
+    def compute_lines(run: PayrollRun, employees: QuerySet, created_by=None) -> int:
+        """
+        Compute and insert the payroll lines of many employees at once.
+
+        Attendance and approved leave are totalled per employee with grouped
+        queries, unposted overtime entries are read in one query, and the
+        line components are computed as integer cent arrays so they match
+        the row-by-row Decimal computation. Lines are inserted with
+        bulk_create and the overtime entries flagged with one update().
+
+        Args:
+            run: PayrollRun receiving the lines
+            employees: Employee queryset to compute
+            created_by: User recorded on the lines
+
+        Returns:
+            Number of lines created
+        """
+        company = run.company
+        period_start, period_end = run.period_start, run.period_end
+        rows = list(
+            employees.order_by("id").values_list(
+                "id",
+                "salary_structure_id",
+                "salary_structure__base_salary",
+                "salary_structure__housing_allowance",
+                "salary_structure__transport_allowance",
+                "salary_structure__meal_allowance",
+                "salary_structure__other_allowance",
+                "salary_structure__overtime_rate",
+                "salary_structure__tax_rate",
+                "salary_structure__pension_rate",
+            )
+        )
+        if not rows:
+            return 0
+
+        (employee_ids, structure_ids, base_salary, housing, transport, meal, other,
+         overtime_rate, tax_rate, pension_rate) = zip(*rows)
+        count = len(employee_ids)
+        position = {employee_id: idx for idx, employee_id in enumerate(employee_ids)}
+        scope = employees.order_by().values("id")
+
+        present_halves = np.zeros(count, dtype=np.int64)
+        recorded_leave = np.zeros(count, dtype=np.int64)
+        attendance_overtime = np.zeros(count, dtype=np.int64)  # hundredths of an hour
+        attendance = (
+            Attendance.objects.filter(
+                company=company,
+                employee_id__in=scope,
+                date__gte=period_start,
+                date__lte=period_end,
+            )
+            .order_by()
+            .values("employee_id")
+            .annotate(
+                full=Count("id", filter=Q(status__in=[AttendanceStatus.PRESENT, AttendanceStatus.REMOTE])),
+                half=Count("id", filter=Q(status=AttendanceStatus.HALF_DAY)),
+                leave=Count("id", filter=Q(status=AttendanceStatus.LEAVE)),
+                overtime=Sum("overtime_hours"),
+            )
+            .values_list("employee_id", "full", "half", "leave", "overtime")
+        )
+        for employee_id, full, half, leave, overtime in attendance:
+            idx = position[employee_id]
+            present_halves[idx] = full * 2 + half
+            recorded_leave[idx] = leave
+            attendance_overtime[idx] = int(PayrollService._quantize(overtime) * 100)
+
+        approved_leave = np.zeros(count, dtype=np.int64)
+        leave = (
+            LeaveRequest.objects.filter(
+                company=company,
+                employee_id__in=scope,
+                status=LeaveRequestStatus.APPROVED,
+                end_date__gte=period_start,
+                start_date__lte=period_end,
+            )
+            .order_by()
+            .values("employee_id")
+            .annotate(
+                requests=Count("id"),
+                span=Sum(
+                    Least(F("end_date"), Value(period_end, output_field=DateField()))
+                    - Greatest(F("start_date"), Value(period_start, output_field=DateField())),
+                    output_field=DurationField(),
+                ),
+            )
+            .values_list("employee_id", "requests", "span")
+        )
+        for employee_id, requests, span in leave:
+            # Each overlapping request covers its day difference plus one
+            approved_leave[position[employee_id]] = requests + span.days
+
+        overtime_entries = OvertimeEntry.objects.filter(
+            company=company,
+            employee_id__in=scope,
+            status=OvertimeRequestStatus.APPROVED,
+            posted_to_payroll=False,
+            date__gte=period_start,
+            date__lte=period_end,
+        )
+        entries = list(
+            overtime_entries.order_by("id").values_list(
+                "id", "employee_id", Coalesce("approved_hours", "requested_hours"), "amount"
+            )
+        )
+        entry_ids = defaultdict(list)
+        has_entries = np.zeros(count, dtype=bool)
+        entry_hours = np.zeros(count, dtype=np.int64)
+        entry_amount = np.zeros(count, dtype=np.int64)
+        if entries:
+            entry_pk, entry_employee, hours, amount = zip(*entries)
+            entry_position = np.array([position[employee_id] for employee_id in entry_employee])
+            has_entries[entry_position] = True
+            np.add.at(entry_hours, entry_position, PayrollService._cents(hours))
+            np.add.at(entry_amount, entry_position, PayrollService._cents(amount))
+            for pk, employee_id in zip(entry_pk, entry_employee):
+                entry_ids[employee_id].append(pk)
+
+        total_days = (period_end - period_start).days + 1
+        allowance_fixed = (
+            PayrollService._cents(housing) + PayrollService._cents(transport)
+            + PayrollService._cents(meal) + PayrollService._cents(other)
+        )
+        leave_days = np.maximum(recorded_leave, approved_leave)
+        paid_halves = np.minimum(present_halves + leave_days * 2, total_days * 2)
+        attendance_ratio = PayrollService._round_half_up(paid_halves * 10000, total_days * 2)  # 1/10000ths
+
+        base_pay = PayrollService._round_half_up(PayrollService._cents(base_salary) * attendance_ratio, 10000)
+        allowance_total = PayrollService._round_half_up(allowance_fixed * attendance_ratio, 10000)
+        overtime_hours = np.where(has_entries, entry_hours, attendance_overtime)
+        overtime_pay = np.where(
+            has_entries,
+            entry_amount,
+            PayrollService._round_half_up(attendance_overtime * PayrollService._cents(overtime_rate), 100),
+        )
+        gross_pay = base_pay + allowance_total + overtime_pay
+        # Rates are percentages with two decimals
+        tax_amount = PayrollService._round_half_up(gross_pay * PayrollService._cents(tax_rate), 10000)
+        pension_amount = PayrollService._round_half_up(gross_pay * PayrollService._cents(pension_rate), 10000)
+        deduction_total = tax_amount + pension_amount
+        net_pay = gross_pay - deduction_total
+
+        to_decimal = PayrollService._from_cents
+        lines = [
+            PayrollLine(
+                payroll_run=run,
+                employee_id=employee_id,
+                company=company,
+                company_group_id=run.company_group_id,
+                created_by=created_by,
+                attendance_days=to_decimal(present_halves[idx] * 50),
+                leave_days=to_decimal(leave_days[idx] * 100),
+                base_pay=to_decimal(base_pay[idx]),
+                allowance_total=to_decimal(allowance_total[idx]),
+                overtime_hours=to_decimal(overtime_hours[idx]),
+                overtime_pay=to_decimal(overtime_pay[idx]),
+                gross_pay=to_decimal(gross_pay[idx]),
+                deduction_total=to_decimal(deduction_total[idx]),
+                net_pay=to_decimal(net_pay[idx]),
+                remarks="" if structure_ids[idx] else "No salary structure linked",
+                details={
+                    "attendance_ratio": float(Decimal(int(attendance_ratio[idx])).scaleb(-4)),
+                    "tax_amount": str(to_decimal(tax_amount[idx])),
+                    "pension_amount": str(to_decimal(pension_amount[idx])),
+                    "paid_days": str(to_decimal(paid_halves[idx] * 50)),
+                    "total_days": str(total_days),
+                    "overtime_entry_ids": entry_ids.get(employee_id, []),
+                },
+            )
+            for idx, employee_id in enumerate(employee_ids)
+        ]
+        PayrollLine.objects.bulk_create(lines, batch_size=PayrollService.LINE_BATCH_SIZE)
+
+        if entries:
+            # Only the entries paid on the lines above; any approved since stay unposted for the next run.
+            # Filtered by id alone: the employee scope may exclude employees that now have a line.
+            OvertimeEntry.objects.filter(id__in=[pk for pk, *_ in entries], posted_to_payroll=False).update(
+                payroll_run=run,
+                posted_to_payroll=True,
+                updated_at=timezone.now(),
+            )
+        return len(lines)
+
+    @staticmethod
+    @transaction.atomic
+    def generate_payroll_run_partitioned(
+        *,
+        company,
+        period_start: date,
+        period_end: date,
+        period_label: str | None = "",
+        notes: str = "",
+        expense_account=None,
+        liability_account=None,
+        created_by=None,
+    ) -> PayrollRun:
+        """
+        Create a payroll run and compute it per department on Celery workers.
+
+        The run stays DRAFT until every department partition has been
+        computed with compute_lines; complete_run then totals it and marks
+        it COMPUTED. If any partition fails, abort_run cancels the run.
+        """
+        from celery import chord
+
+        from ..tasks import complete_payroll_run, compute_payroll_partition, fail_payroll_run
+
+        run = PayrollService._create_run(
+            company=company,
+            period_start=period_start,
+            period_end=period_end,
+            period_label=period_label,
+            notes=notes,
+            expense_account=expense_account,
+            liability_account=liability_account,
+            created_by=created_by,
+            status=PayrollRunStatus.DRAFT,
+        )
+        department_ids = list(
+            PayrollService._eligible_employees(company, period_start, period_end)
+            .order_by("department_id")
+            .values_list("department_id", flat=True)
+            .distinct()
+        )
+        if not department_ids:
+            return PayrollService.complete_run(run)
+
+        transaction.on_commit(
+            lambda: chord(
+                compute_payroll_partition.s(run.id, department_id) for department_id in department_ids
+            )(complete_payroll_run.si(run.id).on_error(fail_payroll_run.s(run.id)))
+        )
+        return run
+
+    @staticmethod
+    @transaction.atomic
+    def compute_partition(run: PayrollRun, department_id=None) -> int:
+        """Compute the lines of one department (None: no department) of a partitioned run."""
+        employees = (
+            PayrollService._eligible_employees(run.company, run.period_start, run.period_end)
+            .filter(department_id=department_id)
+            .exclude(payroll_lines__payroll_run=run)
+        )
+        return PayrollService.compute_lines(run, employees, created_by=run.generated_by)
+
+    @staticmethod
+    def complete_run(run: PayrollRun) -> PayrollRun:
+        run.recalculate_totals(save=False)
+        run.status = PayrollRunStatus.COMPUTED
+        run.save(update_fields=["gross_total", "deduction_total", "net_total", "status", "updated_at"])
+        return run
+
+    @staticmethod
+    @transaction.atomic
+    def abort_run(run: PayrollRun, reason: str = "") -> PayrollRun:
+        """
+        Cancel a partitioned run whose computation failed.
+
+        The lines already computed are deleted and their overtime entries
+        released, so the period can be generated again.
+        """
+        run = PayrollRun.objects.select_for_update().get(pk=run.pk)
+        if run.status != PayrollRunStatus.DRAFT:
+            return run
+
+        OvertimeEntry.objects.filter(payroll_run=run).update(
+            payroll_run=None,
+            posted_to_payroll=False,
+            updated_at=timezone.now(),
+        )
+        run.lines.all().delete()
+        run.status = PayrollRunStatus.CANCELLED
+        run.notes = "\n".join(filter(None, [run.notes, f"Computation failed: {reason}".strip()]))
+        run.save(update_fields=["status", "notes", "updated_at"])
+        return run
+
     @staticmethod
     @transaction.atomic
     def finalize_run(
@@ -4,14 +4,19 @@ Feature 2.2: Payslip Generation & Distribution
 
 This service generates PDF payslips and handles email distribution.
 """
+from collections import defaultdict
 from decimal import Decimal
 from datetime import datetime
-from typing import Optional, Dict, List
+from typing import Optional, Dict, Iterator, List, Sequence
 import logging
+import zipfile
 
 from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.template.loader import render_to_string
-from django.core.mail import EmailMessage
+from django.core.mail import EmailMessage, get_connection
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
@@ -20,52 +25,60 @@ logger = logging.getLogger(__name__)
 class PayslipGenerationService:
     """
     Service for generating and distributing payslips
+
+    Bulk runs are processed in chunks of payroll lines: YTD totals are
+    loaded for the whole run with one grouped query, and PDFs are written
+    to file storage or a zip archive as each chunk completes, so memory
+    stays bounded by the chunk size. distribute_in_chunks renders the
+    chunks on Celery workers in parallel.
     """
 
+    # Payroll lines per chunk in bulk generation
+    CHUNK_SIZE = 200
+
+    # Storage directory of generated payslips, per payroll run
+    STORAGE_DIR = "payslips/{run_id}"
+
+    # Cache key and lifetime of bulk progress
+    PROGRESS_CACHE_KEY = "hr:payslips:progress:{run_id}"
+    PROGRESS_TTL = 24 * 60 * 60
+
     @staticmethod
-    def generate_payslip_data(payroll_line) -> Dict:
+    def generate_payslip_data(
+        payroll_line,
+        ytd_data: Optional[Dict] = None,
+        overtime_details: Optional[List[Dict]] = None
+    ) -> Dict:
         """
         Compile payslip data for a single employee
 
         Args:
             payroll_line: PayrollLine instance
+            ytd_data: Preloaded YTD totals (queried when omitted)
+            overtime_details: Preloaded overtime details (queried when omitted)
 
         Returns:
             Dictionary with all payslip data
         """
-        from apps.hr.models import PayrollLine, OvertimeEntry
-
         employee = payroll_line.employee
         payroll_run = payroll_line.payroll_run
         company = payroll_run.company
         salary_structure = employee.salary_structure
 
         # Calculate YTD (Year-to-Date) values
-        ytd_data = PayslipGenerationService._calculate_ytd(
-            employee,
-            payroll_run.period_end
-        )
+        if ytd_data is None:
+            ytd_data = PayslipGenerationService._calculate_ytd(
+                employee,
+                payroll_run.period_end
+            )
 
         # Get overtime details
-        overtime_details = []
-        if payroll_line.overtime_hours > 0:
-            overtime_entries = OvertimeEntry.objects.filter(
-                payroll_run=payroll_run,
-                employee=employee,
-                posted_to_payroll=True
-            ).select_related('policy', 'shift')
-
-            overtime_details = [
-                {
-                    'date': entry.date,
-                    'hours': float(entry.effective_hours),
-                    'rate': float(entry.hourly_rate),
-                    'amount': float(entry.amount),
-                    'shift': entry.shift.name if entry.shift else None,
-                    'policy': entry.policy.name if entry.policy else None,
-                }
-                for entry in overtime_entries
-            ]
+        if overtime_details is None:
+            overtime_details = []
+            if payroll_line.overtime_hours > 0:
+                overtime_details = PayslipGenerationService._overtime_details(
+                    payroll_run, [employee.id]
+                ).get(employee.id, [])
 
         # Earnings breakdown
         earnings = []
@@ -220,29 +233,77 @@ class PayslipGenerationService:
     @staticmethod
     def _calculate_ytd(employee, period_end) -> Dict:
         """Calculate Year-to-Date totals"""
+        ytd = PayslipGenerationService.ytd_totals(employee.company, period_end, [employee.id])
+        return ytd.get(employee.id, PayslipGenerationService._ytd_row(None, None, None))
+
+    @staticmethod
+    def _ytd_row(gross, deductions, net) -> Dict:
+        return {
+            'gross_earnings': float(gross or 0),
+            'total_deductions': float(deductions or 0),
+            'net_pay': float(net or 0),
+        }
+
+    @staticmethod
+    def ytd_totals(company, period_end, employee_ids) -> Dict[int, Dict]:
+        """
+        Year-to-Date totals of many employees with one grouped query
+
+        Args:
+            company: Company instance
+            period_end: Last day included
+            employee_ids: Employee ids or a values() queryset of them
+
+        Returns:
+            Dict of employee id to YTD totals (employees without posted lines are omitted)
+        """
         from apps.hr.models import PayrollLine
         from django.db.models import Sum
 
         year_start = datetime(period_end.year, 1, 1).date()
 
-        ytd_aggregates = PayrollLine.objects.filter(
-            employee=employee,
-            payroll_run__company=employee.company,
+        rows = PayrollLine.objects.filter(
+            employee_id__in=employee_ids,
+            payroll_run__company=company,
             payroll_run__period_end__gte=year_start,
             payroll_run__period_end__lte=period_end,
             payroll_run__status__in=['POSTED', 'APPROVED']
-        ).aggregate(
+        ).order_by().values('employee_id').annotate(
             gross=Sum('gross_pay'),
             deductions=Sum('deduction_total'),
             net=Sum('net_pay')
         )
 
         return {
-            'gross_earnings': float(ytd_aggregates.get('gross') or 0),
-            'total_deductions': float(ytd_aggregates.get('deductions') or 0),
-            'net_pay': float(ytd_aggregates.get('net') or 0),
+            row['employee_id']: PayslipGenerationService._ytd_row(row['gross'], row['deductions'], row['net'])
+            for row in rows
         }
 
+    @staticmethod
+    def _overtime_details(payroll_run, employee_ids: Sequence[int]) -> Dict[int, List[Dict]]:
+        """Posted overtime entries of a payroll run by employee id"""
+        from apps.hr.models import OvertimeEntry
+
+        details = defaultdict(list)
+        if not employee_ids:
+            return details
+        overtime_entries = OvertimeEntry.objects.filter(
+            payroll_run=payroll_run,
+            employee_id__in=employee_ids,
+            posted_to_payroll=True
+        ).select_related('policy', 'shift').order_by('date', 'id')
+
+        for entry in overtime_entries:
+            details[entry.employee_id].append({
+                'date': entry.date,
+                'hours': float(entry.effective_hours),
+                'rate': float(entry.hourly_rate),
+                'amount': float(entry.amount),
+                'shift': entry.shift.name if entry.shift else None,
+                'policy': entry.policy.name if entry.policy else None,
+            })
+        return details
+
     @staticmethod
     def _amount_to_words(amount: Decimal) -> str:
         """Convert amount to words (simplified version)"""
@@ -388,12 +449,19 @@ class PayslipGenerationService:
                 # Return HTML as bytes as last resort
                 return html.encode('utf-8')
 
+    @staticmethod
+    def payslip_filename(payslip_data: Dict) -> str:
+        """File name of a payslip PDF"""
+        payslip_info = payslip_data['payslip']
+        return f"Payslip_{payslip_data['employee']['id']}_{payslip_info['period'].replace(' ', '_')}.pdf"
+
     @staticmethod
     def send_payslip_email(
         employee_email: str,
         payslip_pdf: bytes,
         payslip_data: Dict,
-        password: Optional[str] = None
+        password: Optional[str] = None,
+        connection=None
     ) -> bool:
         """
         Send payslip via email
@@ -403,6 +471,7 @@ class PayslipGenerationService:
             payslip_pdf: PDF bytes
             payslip_data: Payslip data dictionary
             password: Optional password for PDF protection
+            connection: Optional open email backend connection to reuse
 
         Returns:
             True if sent successfully, False otherwise
@@ -445,9 +514,10 @@ This is an automated email. Please do not reply.
                 body=message,
                 from_email=settings.DEFAULT_FROM_EMAIL,
                 to=[employee_email],
+                connection=connection,
             )
 
-            filename = f"Payslip_{employee_info['id']}_{payslip_info['period'].replace(' ', '_')}.pdf"
+            filename = PayslipGenerationService.payslip_filename(payslip_data)
             email.attach(filename, payslip_pdf, 'application/pdf')
 
             email.send(fail_silently=False)
@@ -460,105 +530,304 @@ This is an automated email. Please do not reply.
             return False
 
     @staticmethod
-    def bulk_generate_payslips(payroll_run) -> Dict[str, any]:
+    def _payroll_lines(payroll_run, line_ids: Optional[Sequence[int]] = None):
+        from apps.hr.models import PayrollLine
+
+        lines = PayrollLine.objects.filter(payroll_run=payroll_run)
+        if line_ids is not None:
+            lines = lines.filter(id__in=line_ids)
+        return lines.select_related(
+            'payroll_run__company',
+            'employee',
+            'employee__department',
+            'employee__salary_structure'
+        ).order_by('id')
+
+    @staticmethod
+    def record_progress(payroll_run, stage: str, processed: int, total: int, **counts) -> Dict:
         """
-        Generate payslips for all employees in a payroll run
+        Record progress of a bulk run in the cache
 
         Args:
             payroll_run: PayrollRun instance
+            stage: 'generate' or 'send'
+            processed: Payroll lines processed so far
+            total: Payroll lines in the run
+            **counts: Outcome counters (generated, failed, sent, ...)
 
         Returns:
-            Dictionary with results
+            Progress dictionary
         """
-        from apps.hr.models import PayrollLine
+        progress = {
+            'stage': stage,
+            'processed': processed,
+            'total': total,
+            'percent': round(100.0 * processed / total, 1) if total else None,
+            **counts,
+            'updated_at': timezone.now().isoformat(),
+        }
+        cache.set(
+            PayslipGenerationService.PROGRESS_CACHE_KEY.format(run_id=payroll_run.id),
+            progress,
+            PayslipGenerationService.PROGRESS_TTL
+        )
+        return progress
+
+    @staticmethod
+    def get_progress(payroll_run) -> Optional[Dict]:
+        """Latest progress of a bulk run, if one is running or finished recently"""
+        return cache.get(PayslipGenerationService.PROGRESS_CACHE_KEY.format(run_id=payroll_run.id))
+
+    @staticmethod
+    def iter_payslip_chunks(
+        payroll_run,
+        chunk_size: Optional[int] = None,
+        line_ids: Optional[Sequence[int]] = None
+    ) -> Iterator[List[Dict]]:
+        """
+        Generate the payslips of a payroll run chunk by chunk
+
+        Each payslip is a dict with 'line' and, on success, 'data' and
+        'pdf'; failures carry 'error' instead of 'pdf'.
+
+        Args:
+            payroll_run: PayrollRun instance
+            chunk_size: Payroll lines per chunk (default: CHUNK_SIZE)
+            line_ids: Optional payroll lines to render (default: the whole run)
+
+        Yields:
+            List of payslip dicts per chunk
+        """
+        chunk_size = chunk_size or PayslipGenerationService.CHUNK_SIZE
+        lines = PayslipGenerationService._payroll_lines(payroll_run, line_ids)
+        ytd = PayslipGenerationService.ytd_totals(
+            payroll_run.company,
+            payroll_run.period_end,
+            lines.values('employee_id')
+        )
+        no_ytd = PayslipGenerationService._ytd_row(None, None, None)
+
+        last_id = 0
+        while True:
+            chunk = list(lines.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+
+            overtime = PayslipGenerationService._overtime_details(
+                payroll_run,
+                [line.employee_id for line in chunk if line.overtime_hours > 0]
+            )
+            payslips = []
+            for line in chunk:
+                payslip = {'line': line}
+                try:
+                    payslip['data'] = PayslipGenerationService.generate_payslip_data(
+                        line,
+                        ytd_data=ytd.get(line.employee_id, no_ytd),
+                        overtime_details=overtime.get(line.employee_id, [])
+                    )
+                    payslip['pdf'] = PayslipGenerationService.generate_payslip_pdf(payslip['data'])
+                except Exception as e:
+                    payslip['error'] = str(e)
+                payslips.append(payslip)
+
+            yield payslips
+
+    @staticmethod
+    def _record_failure(results: Dict, payslip: Dict) -> None:
+        employee_id = payslip['line'].employee.employee_id
+        logger.error(f"Error generating payslip for {employee_id}: {payslip['error']}")
+        results['failed'] += 1
+        results['errors'].append({
+            'employee_id': employee_id,
+            'error': payslip['error']
+        })
+
+    @staticmethod
+    def bulk_generate_payslips(
+        payroll_run,
+        archive=None,
+        chunk_size: Optional[int] = None,
+        line_ids: Optional[Sequence[int]] = None
+    ) -> Dict[str, any]:
+        """
+        Generate payslips for all employees in a payroll run
+
+        PDFs are written as each chunk completes: into ``archive`` when
+        given, otherwise to default storage under STORAGE_DIR, replacing
+        the file of a previous run.
 
+        Args:
+            payroll_run: PayrollRun instance
+            archive: Optional zip file path or writable binary file
+            chunk_size: Payroll lines per chunk (default: CHUNK_SIZE)
+            line_ids: Optional payroll lines to generate (default: the whole run)
+
+        Returns:
+            Dictionary with results; 'payslips' holds the written paths
+        """
         results = {
-            'total': 0,
+            'total': PayslipGenerationService._payroll_lines(payroll_run, line_ids).count(),
             'generated': 0,
             'failed': 0,
             'payslips': [],
             'errors': []
         }
+        directory = PayslipGenerationService.STORAGE_DIR.format(run_id=payroll_run.id)
 
-        payroll_lines = PayrollLine.objects.filter(
-            payroll_run=payroll_run
-        ).select_related(
-            'employee',
-            'employee__department',
-            'employee__salary_structure'
-        )
-
-        results['total'] = payroll_lines.count()
-
-        for line in payroll_lines:
-            try:
-                payslip_data = PayslipGenerationService.generate_payslip_data(line)
-                payslip_pdf = PayslipGenerationService.generate_payslip_pdf(payslip_data)
-
-                results['payslips'].append({
-                    'employee_id': line.employee.employee_id,
-                    'employee_name': line.employee.full_name,
-                    'data': payslip_data,
-                    'pdf': payslip_pdf,
-                })
-
-                results['generated'] += 1
-
-            except Exception as e:
-                logger.error(f"Error generating payslip for {line.employee.employee_id}: {str(e)}")
-                results['failed'] += 1
-                results['errors'].append({
-                    'employee_id': line.employee.employee_id,
-                    'error': str(e)
-                })
+        zip_file = zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) if archive is not None else None
+        try:
+            for payslips in PayslipGenerationService.iter_payslip_chunks(payroll_run, chunk_size, line_ids):
+                for payslip in payslips:
+                    if 'pdf' not in payslip:
+                        PayslipGenerationService._record_failure(results, payslip)
+                        continue
+
+                    filename = PayslipGenerationService.payslip_filename(payslip['data'])
+                    if zip_file:
+                        zip_file.writestr(filename, payslip['pdf'])
+                        path = filename
+                    else:
+                        path = f"{directory}/{filename}"
+                        # Storage renames on collision; replace the payslip of an earlier run instead
+                        if default_storage.exists(path):
+                            default_storage.delete(path)
+                        path = default_storage.save(path, ContentFile(payslip['pdf']))
+
+                    employee = payslip['line'].employee
+                    results['payslips'].append({
+                        'employee_id': employee.employee_id,
+                        'employee_name': employee.full_name,
+                        'path': path,
+                    })
+                    results['generated'] += 1
+
+                if line_ids is not None:
+                    # A chunk of distribute_in_chunks; its GroupResult tracks progress
+                    continue
+                PayslipGenerationService.record_progress(
+                    payroll_run,
+                    'generate',
+                    results['generated'] + results['failed'],
+                    results['total'],
+                    generated=results['generated'],
+                    failed=results['failed']
+                )
+        finally:
+            if zip_file:
+                zip_file.close()
 
         return results
 
     @staticmethod
     def bulk_send_payslips(
         payroll_run,
-        use_password_protection: bool = True
+        use_password_protection: bool = True,
+        chunk_size: Optional[int] = None,
+        line_ids: Optional[Sequence[int]] = None
     ) -> Dict[str, any]:
         """
         Generate and send payslips for all employees
 
+        Payslips are emailed chunk by chunk over one email connection.
+
         Args:
             payroll_run: PayrollRun instance
             use_password_protection: Whether to password protect PDFs
+            chunk_size: Payroll lines per chunk (default: CHUNK_SIZE)
+            line_ids: Optional payroll lines to send (default: the whole run)
 
         Returns:
             Dictionary with results
         """
-        results = PayslipGenerationService.bulk_generate_payslips(payroll_run)
-
-        sent_count = 0
-        send_failed = 0
-
-        for payslip_info in results['payslips']:
-            employee_data = payslip_info['data']['employee']
-            email = employee_data['email']
+        results = {
+            'total': PayslipGenerationService._payroll_lines(payroll_run, line_ids).count(),
+            'generated': 0,
+            'failed': 0,
+            'errors': [],
+            'sent': 0,
+            'send_failed': 0,
+        }
 
-            if not email:
-                logger.warning(f"No email for employee {employee_data['id']}")
-                send_failed += 1
-                continue
+        connection = get_connection()
+        connection.open()
+        try:
+            for payslips in PayslipGenerationService.iter_payslip_chunks(payroll_run, chunk_size, line_ids):
+                for payslip in payslips:
+                    if 'pdf' not in payslip:
+                        PayslipGenerationService._record_failure(results, payslip)
+                        continue
+                    results['generated'] += 1
+
+                    employee_data = payslip['data']['employee']
+                    email = employee_data['email']
+
+                    if not email:
+                        logger.warning(f"No email for employee {employee_data['id']}")
+                        results['send_failed'] += 1
+                        continue
+
+                    # Use employee ID as password if protection is enabled
+                    password = employee_data['id'] if use_password_protection else None
+
+                    sent = PayslipGenerationService.send_payslip_email(
+                        employee_email=email,
+                        payslip_pdf=payslip['pdf'],
+                        payslip_data=payslip['data'],
+                        password=password,
+                        connection=connection
+                    )
+
+                    if sent:
+                        results['sent'] += 1
+                    else:
+                        results['send_failed'] += 1
+
+                if line_ids is not None:
+                    continue
+                PayslipGenerationService.record_progress(
+                    payroll_run,
+                    'send',
+                    results['generated'] + results['failed'],
+                    results['total'],
+                    generated=results['generated'],
+                    failed=results['failed'],
+                    sent=results['sent'],
+                    send_failed=results['send_failed']
+                )
+        finally:
+            connection.close()
 
-            # Use employee ID as password if protection is enabled
-            password = employee_data['id'] if use_password_protection else None
+        return results
 
-            sent = PayslipGenerationService.send_payslip_email(
-                employee_email=email,
-                payslip_pdf=payslip_info['pdf'],
-                payslip_data=payslip_info['data'],
-                password=password
-            )
+    @staticmethod
+    def distribute_in_chunks(payroll_run, send: bool = True, chunk_size: Optional[int] = None):
+        """
+        Generate (and email) the payslips of a run as a group of Celery tasks
 
-            if sent:
-                sent_count += 1
-            else:
-                send_failed += 1
+        Rendering is CPU-bound, so chunks are spread over worker processes
+        rather than threads. Each task handles one range of payroll lines
+        with bulk_send_payslips or bulk_generate_payslips and returns its
+        results.
 
-        results['sent'] = sent_count
-        results['send_failed'] = send_failed
+        Args:
+            payroll_run: PayrollRun instance
+            send: Email the payslips instead of only writing them to storage
+            chunk_size: Payroll lines per task (default: CHUNK_SIZE)
 
-        return results
+        Returns:
+            Saved celery GroupResult
+        """
+        from celery import group
+
+        from apps.hr.tasks import distribute_payslip_chunk
+
+        chunk_size = chunk_size or PayslipGenerationService.CHUNK_SIZE
+        line_ids = list(PayslipGenerationService._payroll_lines(payroll_run).values_list('id', flat=True))
+        result = group(
+            distribute_payslip_chunk.s(payroll_run.id, line_ids[start:start + chunk_size], send)
+            for start in range(0, len(line_ids), chunk_size)
+        ).apply_async()
+        result.save()
+        return result
@@ -5,6 +5,8 @@ from celery import shared_task
 from django.utils import timezone
 
 from .models import PayrollRun, PayrollRunStatus
+from .services.payroll import PayrollService
+from .services.payslip import PayslipGenerationService
 
 logger = logging.getLogger(__name__)
 
@@ -41,3 +43,51 @@ def send_payroll_reminders():
     except Exception as exc:
         logger.exception("Payroll reminder job failed: %s", exc)
         return {"status": "error", "error": str(exc)}
+
+
+@shared_task(name="apps.hr.tasks.distribute_payslips")
+def distribute_payslips(payroll_run_id, send=True, chunk_size=None):
+    """Fan the payslips of a payroll run out to one task per chunk of payroll lines."""
+    payroll_run = PayrollRun.objects.select_related("company").get(pk=payroll_run_id)
+    result = PayslipGenerationService.distribute_in_chunks(payroll_run, send=send, chunk_size=chunk_size)
+    logger.info("HR: Payslips for %s - %s chunk task(s) queued", payroll_run, len(result.results))
+    return {"status": "ok", "group": result.id, "chunks": len(result.results)}
+
+
+@shared_task(name="apps.hr.tasks.distribute_payslip_chunk")
+def distribute_payslip_chunk(payroll_run_id, line_ids, send=True):
+    """Generate (and email) the payslips of one chunk of a distribute_payslips run."""
+    payroll_run = PayrollRun.objects.select_related("company").get(pk=payroll_run_id)
+    if send:
+        results = PayslipGenerationService.bulk_send_payslips(payroll_run, line_ids=line_ids)
+    else:
+        results = PayslipGenerationService.bulk_generate_payslips(payroll_run, line_ids=line_ids)
+    logger.info(
+        "HR: Payslips for %s chunk - %s generated, %s failed",
+        payroll_run, results["generated"], results["failed"],
+    )
+    return {"status": "ok", **results}
+
+
+@shared_task(name="apps.hr.tasks.compute_payroll_partition")
+def compute_payroll_partition(payroll_run_id, department_id=None):
+    """Compute the payroll lines of one department of a partitioned payroll run."""
+    payroll_run = PayrollRun.objects.select_related("company").get(pk=payroll_run_id)
+    created = PayrollService.compute_partition(payroll_run, department_id)
+    logger.info("HR: Payroll %s department %s - %s line(s)", payroll_run, department_id, created)
+    return {"status": "ok", "department": department_id, "lines": created}
+
+
+@shared_task(name="apps.hr.tasks.complete_payroll_run")
+def complete_payroll_run(payroll_run_id):
+    """Total a partitioned payroll run once all of its departments are computed."""
+    payroll_run = PayrollService.complete_run(PayrollRun.objects.get(pk=payroll_run_id))
+    return {"status": "ok", "run": payroll_run.id, "net_total": str(payroll_run.net_total)}
+
+
+@shared_task(name="apps.hr.tasks.fail_payroll_run")
+def fail_payroll_run(request, exc, traceback, payroll_run_id):
+    """Error callback of a partitioned payroll run: cancel the run and drop its partial lines."""
+    logger.error("HR: Payroll run %s failed in task %s: %s", payroll_run_id, request.id, exc)
+    payroll_run = PayrollService.abort_run(PayrollRun.objects.get(pk=payroll_run_id), reason=str(exc))
+    return {"status": "failed", "run": payroll_run.id}
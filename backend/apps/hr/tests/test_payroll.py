@@ -0,0 +1,234 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
+
+from celery import signature
+from django.db import transaction
+from django.test import TestCase
+
+from apps.companies.models import Company, CompanyGroup
+from apps.hr.models import (
+    Attendance,
+    AttendanceStatus,
+    Department,
+    Employee,
+    LeaveRequest,
+    LeaveRequestStatus,
+    LeaveType,
+    OvertimeEntry,
+    OvertimeRequestStatus,
+    PayrollLine,
+    PayrollRun,
+    SalaryStructure,
+)
+from apps.hr.services.payroll import PayrollService
+
+
+class _Rollback(Exception):
+    pass
+
+
+class VectorizedPayrollTests(TestCase):
+    period_start = date(2025, 2, 1)
+    period_end = date(2025, 2, 28)
+
+    def setUp(self):
+        self.group = CompanyGroup.objects.create(name="Payroll Group", db_name="cg_payroll")
+        self.company = Company.objects.create(
+            company_group=self.group,
+            code="PRC",
+            name="Payroll Company",
+            legal_name="Payroll Company Ltd",
+            fiscal_year_start=date(2025, 1, 1),
+            tax_id="TAX-PR",
+            registration_number="REG-PR",
+        )
+        ops, stores = [
+            Department.objects.create(company=self.company, code=code, name=code) for code in ("OPS", "STORES")
+        ]
+        standard = SalaryStructure.objects.create(
+            company=self.company, code="STD", name="Standard", base_salary=Decimal("30000.00"),
+            housing_allowance=Decimal("4500.55"), transport_allowance=Decimal("1000.00"),
+            overtime_rate=Decimal("12.34"), tax_rate=Decimal("10.50"), pension_rate=Decimal("5.00"),
+        )
+        odd = SalaryStructure.objects.create(
+            company=self.company, code="ODD", name="Odd", base_salary=Decimal("3333.33"), tax_rate=Decimal("7.25"),
+        )
+        self.employees = [
+            Employee.objects.create(
+                company=self.company, employee_id=f"PR{idx}", first_name="Staff", last_name=str(idx),
+                department=department, salary_structure=structure,
+            )
+            for idx, (department, structure) in enumerate(
+                [(ops, standard), (stores, standard), (ops, None), (None, odd)]
+            )
+        ]
+        first, second, _, third = self.employees
+
+        for day in range(15):
+            self._attendance(first, day, AttendanceStatus.PRESENT, overtime=Decimal("1.25") if day == 3 else 0)
+        self._attendance(first, 15, AttendanceStatus.HALF_DAY)
+        self._attendance(first, 16, AttendanceStatus.HALF_DAY)
+        self._attendance(first, 17, AttendanceStatus.LEAVE)
+        leave_type = LeaveType.objects.create(company=self.company, code="AL", name="Annual")
+        for start, end in ((date(2025, 1, 29), date(2025, 2, 3)), (date(2025, 2, 25), date(2025, 3, 2))):
+            LeaveRequest.objects.create(
+                company=self.company, employee=first, leave_type=leave_type,
+                start_date=start, end_date=end, status=LeaveRequestStatus.APPROVED,
+            )
+
+        for day in range(20):
+            self._attendance(second, day, AttendanceStatus.REMOTE, overtime=Decimal("2"))
+        for day, hours in ((2, "3.5"), (9, "1.75")):
+            OvertimeEntry.objects.create(
+                company=self.company, employee=second, date=self.period_start + timedelta(days=day),
+                requested_hours=Decimal("4"), approved_hours=Decimal(hours),
+                status=OvertimeRequestStatus.APPROVED, hourly_rate=Decimal("20.00"),
+            )
+
+        for day in range(28):
+            self._attendance(third, day, AttendanceStatus.PRESENT)
+        LeaveRequest.objects.create(
+            company=self.company, employee=third, leave_type=leave_type,
+            start_date=date(2025, 2, 10), end_date=date(2025, 2, 12), status=LeaveRequestStatus.APPROVED,
+        )
+
+    def _attendance(self, employee, day, status, overtime=0):
+        Attendance.objects.create(
+            company=self.company, employee=employee, date=self.period_start + timedelta(days=day),
+            status=status, overtime_hours=overtime,
+        )
+
+    def _generate(self, **kwargs):
+        return PayrollService.generate_payroll_run(
+            company=self.company, period_start=self.period_start, period_end=self.period_end, **kwargs
+        )
+
+    @staticmethod
+    def _lines(run):
+        return {
+            line.employee.employee_id: (
+                line.attendance_days, line.leave_days, line.base_pay, line.allowance_total, line.overtime_hours,
+                line.overtime_pay, line.gross_pay, line.deduction_total, line.net_pay, line.remarks,
+                line.details["attendance_ratio"], Decimal(line.details["tax_amount"]),
+                Decimal(line.details["paid_days"]), sorted(line.details["overtime_entry_ids"]),
+            )
+            for line in run.lines.select_related("employee")
+        }
+
+    def _row_by_row_lines(self):
+        try:
+            with transaction.atomic():
+                expected = self._lines(self._generate())
+                raise _Rollback
+        except _Rollback:
+            return expected
+
+    def test_vectorized_run_matches_row_by_row_computation(self):
+        expected = self._row_by_row_lines()
+
+        # Duplicate check, run, employees, attendance, leave, overtime, lines, overtime flags, totals (2), savepoint (2)
+        with self.assertNumQueries(12):
+            run = self._generate(vectorized=True)
+
+        self.assertEqual(self._lines(run), expected)
+        self.assertEqual(expected["PR0"][:2], (Decimal("16.00"), Decimal("7.00")))
+        self.assertEqual(expected["PR1"][4:6], (Decimal("5.25"), Decimal("105.00")))
+        self.assertEqual(expected["PR2"][-5], "No salary structure linked")
+        self.assertEqual(expected["PR3"][-2], Decimal("28.00"))
+        self.assertEqual(
+            OvertimeEntry.objects.filter(payroll_run=run, posted_to_payroll=True).count(), 2
+        )
+        self.assertEqual(run.status, "COMPUTED")
+        self.assertEqual(run.gross_total, sum(line[6] for line in expected.values()))
+
+    def test_department_partitions_compose_the_full_run(self):
+        expected = self._row_by_row_lines()
+        run = PayrollService._create_run(
+            company=self.company, period_start=self.period_start, period_end=self.period_end,
+            period_label="", notes="", expense_account=None, liability_account=None, created_by=None,
+            status="DRAFT",
+        )
+
+        department_ids = {employee.department_id for employee in self.employees}
+        created = [PayrollService.compute_partition(run, department_id) for department_id in department_ids]
+        self.assertEqual(sorted(created), [1, 1, 2])
+        self.assertEqual(PayrollService.compute_partition(run, None), 0)
+
+        run = PayrollService.complete_run(run)
+        self.assertEqual(self._lines(run), expected)
+        self.assertEqual(run.status, "COMPUTED")
+
+    def test_failed_partition_cancels_the_run_and_releases_its_overtime(self):
+        with mock.patch("celery.chord") as chord, self.captureOnCommitCallbacks(execute=True):
+            run = PayrollService.generate_payroll_run_partitioned(
+                company=self.company, period_start=self.period_start, period_end=self.period_end,
+            )
+        body = chord.return_value.call_args.args[0]
+        errback = signature(body.options["link_error"][0])
+
+        # The department holding the approved overtime is computed, another one fails
+        PayrollService.compute_partition(run, self.employees[1].department_id)
+        self.assertTrue(OvertimeEntry.objects.filter(payroll_run=run, posted_to_payroll=True).exists())
+        errback(SimpleNamespace(id="partition-task"), RuntimeError("worker lost"), None)
+
+        run.refresh_from_db()
+        self.assertEqual(run.status, "CANCELLED")
+        self.assertIn("worker lost", run.notes)
+        self.assertFalse(run.lines.exists())
+        self.assertEqual(
+            set(OvertimeEntry.objects.values_list("posted_to_payroll", "payroll_run_id")), {(False, None)}
+        )
+        self.assertEqual(self._generate().status, "COMPUTED")
+        self.assertEqual(PayrollRun.objects.count(), 2)
+
+    def test_row_by_row_run_consumes_approved_overtime(self):
+        run = self._generate()
+
+        line = run.lines.get(employee__employee_id="PR1")
+        self.assertEqual((line.overtime_hours, line.overtime_pay), (Decimal("5.25"), Decimal("105.00")))
+        entries = OvertimeEntry.objects.filter(employee=line.employee)
+        self.assertEqual(
+            list(entries.values_list("posted_to_payroll", "payroll_run_id")), [(True, run.id), (True, run.id)]
+        )
+
+    def test_overtime_approved_during_the_run_stays_unposted(self):
+        second = self.employees[1]
+        OvertimeEntry.objects.filter(employee=second).delete()
+        late = OvertimeEntry.objects.create(
+            company=self.company, employee=second, date=self.period_start, requested_hours=Decimal("2"),
+            status=OvertimeRequestStatus.SUBMITTED, hourly_rate=Decimal("20.00"),
+        )
+        paid = OvertimeEntry.objects.create(
+            company=self.company, employee=second, date=self.period_start + timedelta(days=1),
+            requested_hours=Decimal("1"), approved_hours=Decimal("1"),
+            status=OvertimeRequestStatus.APPROVED, hourly_rate=Decimal("20.00"),
+        )
+        bulk_create = PayrollLine.objects.bulk_create
+
+        def approve_while_computing(*args, **kwargs):
+            OvertimeEntry.objects.filter(pk=late.pk).update(status=OvertimeRequestStatus.APPROVED)
+            return bulk_create(*args, **kwargs)
+
+        with mock.patch.object(PayrollLine.objects, "bulk_create", side_effect=approve_while_computing):
+            run = self._generate(vectorized=True)
+
+        self.assertEqual(run.lines.get(employee=second).details["overtime_entry_ids"], [paid.id])
+        late.refresh_from_db()
+        paid.refresh_from_db()
+        self.assertEqual((late.posted_to_payroll, late.payroll_run_id), (False, None))
+        self.assertEqual((paid.posted_to_payroll, paid.payroll_run_id), (True, run.id))
+
+    def test_lines_carry_the_company_group(self):
+        for vectorized in (False, True):
+            with self.subTest(vectorized=vectorized):
+                try:
+                    with transaction.atomic():
+                        run = self._generate(vectorized=vectorized)
+                        self.assertEqual(
+                            set(run.lines.values_list("company_group_id", flat=True)), {self.group.id}
+                        )
+                        raise _Rollback
+                except _Rollback:
+                    pass
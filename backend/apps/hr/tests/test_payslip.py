@@ -0,0 +1,124 @@
+import io
+import tempfile
+import zipfile
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.core import mail
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+
+from apps.companies.models import Company, CompanyGroup
+from apps.hr.models import Department, Employee, PayrollLine, PayrollRun, PayrollRunStatus
+from apps.hr.services.payslip import PayslipGenerationService
+from apps.hr.tasks import distribute_payslip_chunk
+
+
+class PayslipBulkGenerationTests(TestCase):
+    def setUp(self):
+        self.group = CompanyGroup.objects.create(name="Payslip Group", db_name="cg_payslip")
+        self.company = Company.objects.create(
+            company_group=self.group,
+            code="PSC",
+            name="Payslip Company",
+            legal_name="Payslip Company Ltd",
+            fiscal_year_start=date(2025, 1, 1),
+            tax_id="TAX-PS",
+            registration_number="REG-PS",
+        )
+        self.department = Department.objects.create(company=self.company, code="OPS", name="Operations")
+        self.employees = [
+            Employee.objects.create(
+                company=self.company,
+                employee_id=f"PS{idx}",
+                first_name="Worker",
+                last_name=str(idx),
+                email=email,
+                department=self.department,
+            )
+            for idx, email in enumerate(["ps0@example.com", "ps1@example.com", ""])
+        ]
+        january = self._run(date(2025, 1, 1), date(2025, 1, 31), PayrollRunStatus.POSTED)
+        self._line(january, self.employees[0], Decimal("1000"))
+        self.run = self._run(date(2025, 2, 1), date(2025, 2, 28), PayrollRunStatus.COMPUTED)
+        for employee in self.employees:
+            self._line(self.run, employee, Decimal("1200"), overtime_hours=Decimal("2") if employee is self.employees[1] else 0)
+
+    def _run(self, period_start, period_end, status):
+        return PayrollRun.objects.create(
+            company=self.company, period_start=period_start, period_end=period_end, status=status
+        )
+
+    def _line(self, run, employee, gross, overtime_hours=0):
+        return PayrollLine.objects.create(
+            company=self.company, payroll_run=run, employee=employee, attendance_days=Decimal("20"),
+            base_pay=gross, gross_pay=gross, net_pay=gross, overtime_hours=overtime_hours,
+        )
+
+    def test_ytd_totals_are_grouped_per_employee(self):
+        ytd = PayslipGenerationService.ytd_totals(
+            self.company, date(2025, 2, 28), [employee.id for employee in self.employees]
+        )
+
+        self.assertEqual(list(ytd), [self.employees[0].id])
+        self.assertEqual(ytd[self.employees[0].id]["gross_earnings"], 1000.0)
+        self.assertEqual(
+            PayslipGenerationService._calculate_ytd(self.employees[1], date(2025, 2, 28))["net_pay"], 0.0
+        )
+
+    def test_bulk_generation_streams_chunks_into_a_zip(self):
+        archive = io.BytesIO()
+
+        # count, YTD, then lines (+ overtime when present) per chunk and the final empty chunk
+        with self.assertNumQueries(6):
+            results = PayslipGenerationService.bulk_generate_payslips(self.run, archive=archive, chunk_size=2)
+
+        self.assertEqual((results["total"], results["generated"], results["failed"]), (3, 3, 0))
+        with zipfile.ZipFile(archive) as zip_file:
+            self.assertEqual(
+                sorted(zip_file.namelist()),
+                [f"Payslip_PS{idx}_February_2025.pdf" for idx in range(3)],
+            )
+        self.assertEqual(results["payslips"][0]["path"], "Payslip_PS0_February_2025.pdf")
+        progress = PayslipGenerationService.get_progress(self.run)
+        self.assertEqual((progress["stage"], progress["processed"], progress["percent"]), ("generate", 3, 100.0))
+
+    def test_bulk_generation_writes_to_storage(self):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            results = PayslipGenerationService.bulk_generate_payslips(self.run)
+
+            self.assertEqual(results["generated"], 3)
+            for payslip in results["payslips"]:
+                self.assertTrue(payslip["path"].startswith(f"payslips/{self.run.id}/"))
+                self.assertTrue(default_storage.exists(payslip["path"]))
+
+    def test_bulk_generation_replaces_payslips_of_an_earlier_run(self):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            first = PayslipGenerationService.bulk_generate_payslips(self.run)
+            second = PayslipGenerationService.bulk_generate_payslips(self.run)
+
+            self.assertEqual(second["payslips"], first["payslips"])
+            self.assertEqual(len(default_storage.listdir(f"payslips/{self.run.id}")[1]), 3)
+
+    def test_distribution_fans_chunks_out_to_tasks(self):
+        with mock.patch("celery.group") as group:
+            PayslipGenerationService.distribute_in_chunks(self.run, send=False, chunk_size=2)
+
+        chunks = [task.args for task in group.call_args.args[0]]
+        line_ids = list(self.run.lines.order_by("id").values_list("id", flat=True))
+        self.assertEqual(chunks, [(self.run.id, line_ids[:2], False), (self.run.id, line_ids[2:], False)])
+        group.return_value.apply_async.return_value.save.assert_called_once()
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            results = distribute_payslip_chunk(*chunks[1])
+
+        self.assertEqual((results["total"], results["generated"], results["failed"]), (1, 1, 0))
+        self.assertEqual(results["payslips"][0]["employee_id"], "PS2")
+
+    def test_bulk_send_emails_each_chunk(self):
+        results = PayslipGenerationService.bulk_send_payslips(self.run, chunk_size=2)
+
+        self.assertEqual((results["generated"], results["sent"], results["send_failed"]), (3, 2, 1))
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ["ps0@example.com", "ps1@example.com"])
+        self.assertEqual(PayslipGenerationService.get_progress(self.run)["sent"], 2)
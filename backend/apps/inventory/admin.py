@@ -6,7 +6,8 @@ from .models import (
     Warehouse, WarehouseBin, StockLedger, StockMovement, StockMovementLine,
     GoodsReceipt, GoodsReceiptLine, DeliveryOrder, DeliveryOrderLine,
     InternalRequisition, ItemCategory,
-    ItemValuationMethod, CostLayer, ValuationChangeLog,
+    ItemValuationMethod, CostLayer, CostLayerBalance, ValuationChangeLog,
+    ItemClassificationSnapshot, ItemClassification,
     Item, ItemOperationalExtension, ItemWarehouseConfig,
     ItemSupplier, ItemUOMConversion, MovementEvent, InTransitShipmentLine,
     StandardCostVariance, PurchasePriceVariance,
@@ -560,6 +561,47 @@ class CostLayerAdmin(admin.ModelAdmin):
     layer_status.short_description = 'Status'
 
 
+@admin.register(CostLayerBalance)
+class CostLayerBalanceAdmin(admin.ModelAdmin):
+    """Admin interface for running cost layer balances - Read-only view"""
+    list_display = ['budget_item', 'warehouse', 'stock_state', 'qty', 'value', 'updated_at', 'company']
+    list_filter = ['stock_state', 'warehouse', 'company']
+    search_fields = ['budget_item__code', 'budget_item__name']
+    readonly_fields = ['company', 'budget_item', 'warehouse', 'stock_state', 'qty', 'value', 'updated_at']
+
+    def has_add_permission(self, request):
+        # Maintained by ValuationService; use rebuild_cost_layer_balances to repair
+        return False
+
+
+@admin.register(ItemClassificationSnapshot)
+class ItemClassificationSnapshotAdmin(admin.ModelAdmin):
+    """Admin interface for item classification snapshots - Read-only view"""
+    list_display = ['company', 'as_of_date', 'period_months', 'ledger_cutoff', 'created_at']
+    list_filter = ['company']
+    date_hierarchy = 'as_of_date'
+    readonly_fields = ['company', 'as_of_date', 'period_months', 'ledger_cutoff', 'created_at']
+
+    def has_add_permission(self, request):
+        # Taken by ABCVEDClassificationService.classify
+        return False
+
+
+@admin.register(ItemClassification)
+class ItemClassificationAdmin(admin.ModelAdmin):
+    """Admin interface for per-item classifications - Read-only view"""
+    list_display = [
+        'budget_item', 'snapshot', 'abc_class', 'ved_class', 'fsn_class', 'hml_class',
+        'combined_priority', 'consumption_value', 'last_issue_date'
+    ]
+    list_filter = ['abc_class', 'ved_class', 'fsn_class', 'hml_class', 'combined_priority']
+    search_fields = ['budget_item__code', 'budget_item__name']
+    readonly_fields = [f.name for f in ItemClassification._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(ValuationChangeLog)
 class ValuationChangeLogAdmin(admin.ModelAdmin):
     """Admin interface for Valuation Change Logs"""
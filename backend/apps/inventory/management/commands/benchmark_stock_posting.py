@@ -0,0 +1,87 @@
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries, transaction
+from django.test.utils import CaptureQueriesContext
+
+from apps.budgeting.models import BudgetItemCode
+from apps.companies.models import Company
+from apps.inventory.models import StockMovement, StockMovementLine, UnitOfMeasure, Warehouse
+from apps.inventory.services.stock_service import InventoryService
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare line-by-line and bulk posting of a synthetic multi-line receipt and issue. "
+        "All data is created inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company-id', type=int, required=True)
+        parser.add_argument('--lines', type=int, default=500, help='Lines per document (default 500)')
+        parser.add_argument('--items', type=int, default=100, help='Distinct items across the lines (default 100)')
+
+    def handle(self, *args, **options):
+        company = Company.objects.filter(id=options['company_id']).first()
+        if not company:
+            raise CommandError(f"Company {options['company_id']} not found")
+
+        results = []
+        try:
+            with transaction.atomic():
+                fixtures = self._create_fixtures(company, options['items'])
+                for label, bulk in (('line-by-line', False), ('bulk', True)):
+                    warehouse = Warehouse.objects.create(company=company, code=f"BENCH-{label[:4].upper()}", name=f"Benchmark {label}")
+                    for movement_type in ('RECEIPT', 'ISSUE'):
+                        movement = self._create_movement(company, warehouse, movement_type, fixtures, options['lines'])
+                        reset_queries()
+                        with CaptureQueriesContext(connection) as queries:
+                            started = time.perf_counter()
+                            InventoryService._post_stock_movement(movement, bulk=bulk)
+                            elapsed = time.perf_counter() - started
+                        results.append((label, movement_type, elapsed, len(queries)))
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        self.stdout.write(f"{'mode':<14}{'document':<10}{'seconds':>10}{'queries':>10}")
+        for label, movement_type, elapsed, query_count in results:
+            self.stdout.write(f"{label:<14}{movement_type:<10}{elapsed:>10.3f}{query_count:>10}")
+        self.stdout.write(self.style.SUCCESS("Benchmark finished; all benchmark data was rolled back."))
+
+    def _create_fixtures(self, company, item_count):
+        uom = UnitOfMeasure.objects.filter(company=company).first() or UnitOfMeasure.objects.create(
+            company=company, code='BENCH', name='Benchmark Unit'
+        )
+        return [
+            BudgetItemCode.objects.create(company=company, code=f"BENCH-{idx:05d}", name=f"Benchmark item {idx}", uom=uom)
+            for idx in range(item_count)
+        ]
+
+    def _create_movement(self, company, warehouse, movement_type, items, line_count):
+        is_receipt = movement_type == 'RECEIPT'
+        movement = StockMovement.objects.create(
+            company=company,
+            movement_number=f"BENCH-{movement_type}-{warehouse.pk}",
+            movement_date=date.today(),
+            movement_type=movement_type,
+            to_warehouse=warehouse,
+            from_warehouse=None if is_receipt else warehouse,
+        )
+        StockMovementLine.objects.bulk_create([
+            StockMovementLine(
+                movement=movement,
+                line_number=idx + 1,
+                budget_item=items[idx % len(items)],
+                quantity=Decimal('10') if is_receipt else Decimal('1'),
+                rate=Decimal('4.25') if is_receipt else Decimal('0'),
+            )
+            for idx in range(line_count)
+        ])
+        return movement
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from apps.companies.models import Company
+from apps.inventory.services.cost_layer_balance_service import CostLayerBalanceService
+
+
+class Command(BaseCommand):
+    help = "Verify running cost layer balances against open cost layers and rebuild mismatches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company-id', type=int, help='Only process a single company')
+        parser.add_argument('--check', action='store_true', help='Only report mismatches, do not rebuild')
+
+    def handle(self, *args, **options):
+        company_id = options.get('company_id')
+        fix = not options.get('check')
+        qs = Company.objects.filter(is_active=True)
+        if company_id:
+            qs = qs.filter(id=company_id)
+
+        total = 0
+        for company in qs:
+            mismatches = CostLayerBalanceService.rebuild(company, fix=fix)
+            total += len(mismatches)
+            for row in mismatches:
+                self.stdout.write(
+                    f"{company.code}: item {row['budget_item_id']} warehouse {row['warehouse_id']} "
+                    f"[{row['stock_state']}] stored {row['stored_qty']} / {row['stored_value']}, "
+                    f"layers {row['expected_qty']} / {row['expected_value']}"
+                )
+
+        if not total:
+            self.stdout.write(self.style.SUCCESS("Cost layer balances match cost layers."))
+        elif fix:
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} cost layer balance(s)."))
+        else:
+            self.stdout.write(self.style.WARNING(f"{total} cost layer balance(s) out of sync."))
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.13 on 2026-10-16 19:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Sum
+
+
+def backfill_cost_layer_balances(apps, schema_editor):
+    CostLayer = apps.get_model('inventory', 'CostLayer')
+    CostLayerBalance = apps.get_model('inventory', 'CostLayerBalance')
+    rows = (
+        CostLayer.objects.filter(is_closed=False, budget_item__isnull=False)
+        .order_by()
+        .values('company_id', 'budget_item_id', 'warehouse_id', 'stock_state')
+        .annotate(qty=Sum('qty_remaining'), value=Sum('cost_remaining'))
+    )
+    CostLayerBalance.objects.bulk_create(
+        [CostLayerBalance(**row) for row in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgeting', '0031_unified_item_production'),
+        ('companies', '0009_company_currency_business_type_and_fy_cleanup'),
+        ('inventory', '10030_warehouse_category_mapping'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CostLayerBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stock_state', models.CharField(choices=[('QUARANTINE', 'Quarantine'), ('ON_HOLD', 'On Hold'), ('RELEASED', 'Released')], default='RELEASED', max_length=20)),
+                ('qty', models.DecimalField(decimal_places=3, default=0, help_text='Sum of qty_remaining of open layers', max_digits=15)),
+                ('value', models.DecimalField(decimal_places=2, default=0, help_text='Sum of cost_remaining of open layers', max_digits=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('budget_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cost_layer_balances', to='budgeting.budgetitemcode')),
+                ('company', models.ForeignKey(help_text='Company this record belongs to', on_delete=django.db.models.deletion.PROTECT, to='companies.company')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cost_layer_balances', to='inventory.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Cost Layer Balance',
+                'verbose_name_plural': 'Cost Layer Balances',
+                'unique_together': {('company', 'budget_item', 'warehouse', 'stock_state')},
+            },
+        ),
+        migrations.RunPython(backfill_cost_layer_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.13 on 2026-10-16 20:14
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_stock_level_values(apps, schema_editor):
+    CostLayerBalance = apps.get_model('inventory', 'CostLayerBalance')
+    StockLevel = apps.get_model('inventory', 'StockLevel')
+    totals = {
+        (row['company_id'], row['budget_item_id'], row['warehouse_id']): row['value']
+        for row in CostLayerBalance.objects.order_by()
+        .values('company_id', 'budget_item_id', 'warehouse_id')
+        .annotate(value=Sum('value'))
+    }
+    levels = []
+    for level in StockLevel.objects.only('id', 'company_id', 'budget_item_id', 'warehouse_id').iterator():
+        value = totals.get((level.company_id, level.budget_item_id, level.warehouse_id))
+        if value:
+            level.value = value
+            levels.append(level)
+    StockLevel.objects.bulk_update(levels, ['value'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '10031_cost_layer_balance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stocklevel',
+            name='value',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Running stock value; equals balance_value of the latest ledger entry', max_digits=20),
+        ),
+        migrations.AddIndex(
+            model_name='stockledger',
+            index=models.Index(fields=['budget_item', 'warehouse', '-id'], name='inv_ledger_tail_idx'),
+        ),
+        migrations.RunPython(backfill_stock_level_values, migrations.RunPython.noop),
+    ]
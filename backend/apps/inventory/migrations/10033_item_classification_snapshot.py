@@ -0,0 +1,61 @@
+# Generated by Django 4.2.13 on 2026-10-16 21:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgeting', '0032_budget_headroom'),
+        ('companies', '0009_company_currency_business_type_and_fy_cleanup'),
+        ('inventory', '10032_stocklevel_value'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemClassificationSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of_date', models.DateField()),
+                ('period_months', models.PositiveSmallIntegerField(default=12, help_text='Consumption period used for ABC')),
+                ('last_ledger_id', models.BigIntegerField(default=0, help_text='Highest stock ledger id included')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='item_classification_snapshots', to='companies.company')),
+            ],
+            options={
+                'verbose_name': 'Item Classification Snapshot',
+                'verbose_name_plural': 'Item Classification Snapshots',
+                'ordering': ['-as_of_date', '-id'],
+                'unique_together': {('company', 'as_of_date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ItemClassification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('consumption_value', models.DecimalField(decimal_places=2, default=0, help_text='Issue value over the ABC period', max_digits=20)),
+                ('issue_count', models.PositiveIntegerField(default=0, help_text='Issues in the last 90 days')),
+                ('last_issue_date', models.DateField(blank=True, null=True)),
+                ('unit_price', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('criticality_score', models.PositiveSmallIntegerField(default=0)),
+                ('ved_rationale', models.CharField(blank=True, max_length=255)),
+                ('abc_class', models.CharField(max_length=1)),
+                ('ved_class', models.CharField(max_length=1)),
+                ('fsn_class', models.CharField(max_length=1)),
+                ('hml_class', models.CharField(max_length=1)),
+                ('combined_priority', models.CharField(max_length=10)),
+                ('budget_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='classifications', to='budgeting.budgetitemcode')),
+                ('snapshot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='inventory.itemclassificationsnapshot')),
+            ],
+            options={
+                'verbose_name': 'Item Classification',
+                'verbose_name_plural': 'Item Classifications',
+                'unique_together': {('snapshot', 'budget_item')},
+                'indexes': [
+                    models.Index(fields=['snapshot', 'abc_class'], name='inv_cls_snapshot_abc_idx'),
+                    models.Index(fields=['budget_item', 'snapshot'], name='inv_cls_item_snapshot_idx'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.13 on 2026-10-16 22:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0009_company_currency_business_type_and_fy_cleanup'),
+        ('inventory', '10033_item_classification_snapshot'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='itemclassificationsnapshot',
+            unique_together={('company', 'as_of_date', 'period_months')},
+        ),
+        migrations.AddField(
+            model_name='itemclassificationsnapshot',
+            name='ledger_cutoff',
+            field=models.DateTimeField(blank=True, help_text='Stock ledger rows created before this are included', null=True),
+        ),
+        migrations.AddField(
+            model_name='itemclassificationsnapshot',
+            name='recent_ledger_ids',
+            field=models.JSONField(blank=True, default=list, help_text='Included stock ledger rows created from the cutoff on'),
+        ),
+        migrations.RemoveField(
+            model_name='itemclassificationsnapshot',
+            name='last_ledger_id',
+        ),
+    ]
@@ -359,6 +359,8 @@ class StockLedger(models.Model):
         indexes = [
             models.Index(fields=['company', 'budget_item', 'warehouse']),
             models.Index(fields=['transaction_date']),
+            # Ledger tail lookups (latest running balance per item/warehouse)
+            models.Index(fields=['budget_item', 'warehouse', '-id'], name='inv_ledger_tail_idx'),
         ]
 
 class DeliveryOrder(models.Model):
@@ -524,11 +526,16 @@ class GoodsReceipt(models.Model):
         self.save(update_fields=['quality_status', 'hold_reason', 'quality_checked_by', 'quality_checked_at', 'updated_at'])
         # Update related cost layers to ON_HOLD
         try:
-            CostLayer.objects.filter(
-                company=self.company,
-                source_document_type='GoodsReceipt',
-                source_document_id=self.id,
-            ).update(stock_state='ON_HOLD')
+            from apps.inventory.services.cost_layer_balance_service import CostLayerBalanceService
+            CostLayerBalanceService.move_stock_state(
+                self.company,
+                CostLayer.objects.filter(
+                    company=self.company,
+                    source_document_type='GoodsReceipt',
+                    source_document_id=self.id,
+                ),
+                'ON_HOLD',
+            )
         except Exception:
             pass
 
@@ -540,11 +547,16 @@ class GoodsReceipt(models.Model):
         # Update related cost layers to RELEASED or keep ON_HOLD if rejected
         try:
             new_state = 'RELEASED' if passed else 'ON_HOLD'
-            CostLayer.objects.filter(
-                company=self.company,
-                source_document_type='GoodsReceipt',
-                source_document_id=self.id,
-            ).update(stock_state=new_state)
+            from apps.inventory.services.cost_layer_balance_service import CostLayerBalanceService
+            CostLayerBalanceService.move_stock_state(
+                self.company,
+                CostLayer.objects.filter(
+                    company=self.company,
+                    source_document_type='GoodsReceipt',
+                    source_document_id=self.id,
+                ),
+                new_state,
+            )
         except Exception:
             pass
 
@@ -556,6 +568,7 @@ class StockLevel(models.Model):
     budget_item = models.ForeignKey('budgeting.BudgetItemCode', on_delete=models.PROTECT, null=True, blank=True, related_name='stock_levels', help_text="Item with stock level")
     warehouse = models.ForeignKey(Warehouse, on_delete=models.PROTECT)
     quantity = models.DecimalField(max_digits=15, decimal_places=3, default=0)
+    value = models.DecimalField(max_digits=20, decimal_places=2, default=0, help_text="Running stock value; equals balance_value of the latest ledger entry")
 
     class Meta:
         unique_together = ('company', 'budget_item', 'warehouse')
@@ -826,11 +839,13 @@ class CostLayer(models.Model):
         return f"{item_code} Layer #{self.fifo_sequence} @ {self.cost_per_unit}"
 
     def save(self, *args, **kwargs):
-        # Auto-calculate total_cost and cost_remaining
+        # Auto-calculate total_cost, and cost_remaining for new layers only:
+        # weighted-average issues carry remaining value at the running average,
+        # so revaluations adjust cost_remaining explicitly
         if self.qty_received and self.cost_per_unit:
             self.total_cost = Decimal(str(self.qty_received)) * Decimal(str(self.cost_per_unit))
 
-        if self.qty_remaining and self.cost_per_unit:
+        if self._state.adding and self.qty_remaining and self.cost_per_unit:
             self.cost_remaining = Decimal(str(self.qty_remaining)) * Decimal(str(self.cost_per_unit + self.landed_cost_adjustment))
 
         # Mark as closed if qty_remaining is zero
@@ -840,6 +855,93 @@ class CostLayer(models.Model):
         super().save(*args, **kwargs)
 
 
+class CostLayerBalance(models.Model):
+    """
+    Running (qty, value) totals of the open cost layers per item, warehouse and stock state.
+
+    Maintained incrementally by ValuationService whenever layers are created,
+    consumed or revalued so weighted-average cost and inventory value can be
+    read without scanning the layers. ``rebuild_cost_layer_balances`` verifies
+    and repairs it from the layers.
+    """
+    company = models.ForeignKey('companies.Company', on_delete=models.PROTECT, help_text="Company this record belongs to")
+    budget_item = models.ForeignKey('budgeting.BudgetItemCode', on_delete=models.CASCADE, related_name='cost_layer_balances')
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='cost_layer_balances')
+    stock_state = models.CharField(max_length=20, choices=CostLayer.STOCK_STATE_CHOICES, default='RELEASED')
+    qty = models.DecimalField(max_digits=15, decimal_places=3, default=0, help_text="Sum of qty_remaining of open layers")
+    value = models.DecimalField(max_digits=20, decimal_places=2, default=0, help_text="Sum of cost_remaining of open layers")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('company', 'budget_item', 'warehouse', 'stock_state')
+        verbose_name = 'Cost Layer Balance'
+        verbose_name_plural = 'Cost Layer Balances'
+
+    def __str__(self):
+        return f"{self.budget_item_id}@{self.warehouse_id} [{self.stock_state}] {self.qty} / {self.value}"
+
+    @property
+    def average_cost(self):
+        if self.qty > 0:
+            return self.value / self.qty
+        return None
+
+
+class ItemClassificationSnapshot(models.Model):
+    """
+    A company's ABC/VED/FSN/HML item classification as of a date.
+
+    The snapshot includes every issue row created before ``ledger_cutoff``
+    plus the later ones listed in ``recent_ledger_ids``, so the next snapshot
+    only has to aggregate rows outside that set, including rows committed
+    late by long transactions.
+    """
+    company = models.ForeignKey('companies.Company', on_delete=models.CASCADE, related_name='item_classification_snapshots')
+    as_of_date = models.DateField()
+    period_months = models.PositiveSmallIntegerField(default=12, help_text="Consumption period used for ABC")
+    ledger_cutoff = models.DateTimeField(null=True, blank=True, help_text="Stock ledger rows created before this are included")
+    recent_ledger_ids = models.JSONField(default=list, blank=True, help_text="Included stock ledger rows created from the cutoff on")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-as_of_date', '-id']
+        unique_together = ('company', 'as_of_date', 'period_months')
+        verbose_name = 'Item Classification Snapshot'
+        verbose_name_plural = 'Item Classification Snapshots'
+
+    def __str__(self):
+        return f"{self.company_id} classification as of {self.as_of_date}"
+
+
+class ItemClassification(models.Model):
+    """Per-item metrics and classes of an ItemClassificationSnapshot."""
+    snapshot = models.ForeignKey(ItemClassificationSnapshot, on_delete=models.CASCADE, related_name='items')
+    budget_item = models.ForeignKey('budgeting.BudgetItemCode', on_delete=models.CASCADE, related_name='classifications')
+    consumption_value = models.DecimalField(max_digits=20, decimal_places=2, default=0, help_text="Issue value over the ABC period")
+    issue_count = models.PositiveIntegerField(default=0, help_text="Issues in the last 90 days")
+    last_issue_date = models.DateField(null=True, blank=True)
+    unit_price = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    criticality_score = models.PositiveSmallIntegerField(default=0)
+    ved_rationale = models.CharField(max_length=255, blank=True)
+    abc_class = models.CharField(max_length=1)
+    ved_class = models.CharField(max_length=1)
+    fsn_class = models.CharField(max_length=1)
+    hml_class = models.CharField(max_length=1)
+    combined_priority = models.CharField(max_length=10)
+
+    class Meta:
+        unique_together = ('snapshot', 'budget_item')
+        indexes = [
+            models.Index(fields=['snapshot', 'abc_class'], name='inv_cls_snapshot_abc_idx'),
+            models.Index(fields=['budget_item', 'snapshot'], name='inv_cls_item_snapshot_idx'),
+        ]
+        verbose_name = 'Item Classification'
+        verbose_name_plural = 'Item Classifications'
+
+    def __str__(self):
+        return f"{self.budget_item_id}: {self.abc_class}{self.ved_class}{self.fsn_class}{self.hml_class}"
+
+
 class ValuationChangeLog(models.Model):
     """
     Audit trail for valuation method changes.
@@ -13,23 +13,30 @@ Features:
 - Periodic reclassification
 - Multi-criteria analysis
 - Actionable recommendations
+
+All items of a company are classified together from a few grouped queries
+and the result is persisted as an ItemClassificationSnapshot. A new snapshot
+starts from the previous one and only aggregates ledger rows posted since,
+plus rows entering or leaving the rolling windows, so dashboards and
+replenishment read classes from the latest snapshot instead of recomputing.
 """
 
 import logging
 from decimal import Decimal
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Sequence, Tuple
 from dataclasses import dataclass
 from datetime import date, timedelta
 
-from django.db.models import Sum, Count, Avg, F, Q
+from django.db.models import Count, Exists, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import TruncDate
 from django.db import transaction
 from django.utils import timezone
 
+from apps.budgeting.models import BudgetItemCategory, BudgetItemCode
 from apps.companies.models import Company
 from apps.inventory.models import (
-    Product,
-    ProductCategory,
-    Warehouse,
+    ItemClassification,
+    ItemClassificationSnapshot,
     StockLedger,
     StockLevel
 )
@@ -85,6 +92,24 @@ class ABCVEDClassificationService:
     ABC_B_THRESHOLD = 90  # Next 20% of value (70-90%)
     # C class = remaining 10% (90-100%)
 
+    ABC_RECOMMENDATIONS = {
+        'A': (
+            "Tight control: Daily monitoring, accurate records, "
+            "frequent review of demand forecasts, close supplier relationships"
+        ),
+        'B': (
+            "Moderate control: Regular monitoring, good records, "
+            "periodic demand review, standard supplier management"
+        ),
+        'C': (
+            "Simple control: Periodic review, basic records, "
+            "bulk ordering to reduce costs, standard procedures"
+        ),
+    }
+
+    # VED consumption frequency window (days)
+    VED_ISSUE_DAYS = 90
+
     # FSN thresholds (days since last movement)
     FSN_FAST_DAYS = 30
     FSN_SLOW_DAYS = 180
@@ -93,156 +118,395 @@ class ABCVEDClassificationService:
     HML_HIGH_PERCENTILE = 80
     HML_LOW_PERCENTILE = 20
 
+    # Snapshots retained per company and period
+    SNAPSHOTS_KEPT = 30
+
+    # Ledger rows created this recently may still be uncommitted; their ids
+    # are recorded so the next snapshot can add the ones it finds late
+    LEDGER_OVERLAP = timedelta(minutes=10)
+
     @staticmethod
-    @transaction.atomic
-    def perform_abc_analysis(
+    def classify_abc(cumulative_percentage: Decimal) -> str:
+        """
+        Classify an item by its cumulative share of consumption value.
+
+        Args:
+            cumulative_percentage: Cumulative percentage up to and including the item
+
+        Returns:
+            A, B, or C
+        """
+        if cumulative_percentage <= ABCVEDClassificationService.ABC_A_THRESHOLD:
+            return 'A'
+        elif cumulative_percentage <= ABCVEDClassificationService.ABC_B_THRESHOLD:
+            return 'B'
+        else:
+            return 'C'
+
+    @staticmethod
+    def classify_ved(
+        issue_count: int,
+        at_reorder_level: bool,
+        unit_price: Decimal,
+        expiry_controlled: bool
+    ) -> Tuple[int, str, str]:
+        """
+        Score item criticality.
+
+        Since criticality is subjective, heuristics are used:
+        - Frequently issued items score highest
+        - Items at or below their reorder level
+        - High value and expiry-controlled items
+
+        Args:
+            issue_count: Issues in the last VED_ISSUE_DAYS days
+            at_reorder_level: Stock is at or below the reorder level in a warehouse
+            unit_price: Item unit price
+            expiry_controlled: Expired stock may not be issued
+
+        Returns:
+            (criticality_score, ved_class, rationale)
+        """
+        criticality_score = 0
+        rationale_parts = []
+
+        if issue_count >= 20:  # Issued 20+ times in 90 days
+            criticality_score += 3
+            rationale_parts.append("High consumption frequency")
+        elif issue_count >= 10:
+            criticality_score += 2
+            rationale_parts.append("Moderate consumption frequency")
+        elif issue_count >= 5:
+            criticality_score += 1
+            rationale_parts.append("Regular consumption")
+
+        if at_reorder_level:
+            criticality_score += 2
+            rationale_parts.append("Frequently at reorder level")
+
+        if unit_price > Decimal('1000'):
+            criticality_score += 1
+            rationale_parts.append("High value item")
+
+        if expiry_controlled:
+            criticality_score += 1
+            rationale_parts.append("Expiry-controlled item")
+
+        if criticality_score >= 5:
+            ved_class = 'V'  # Vital
+            rationale = "Vital: " + ", ".join(rationale_parts) if rationale_parts else "High criticality indicators"
+        elif criticality_score >= 3:
+            ved_class = 'E'  # Essential
+            rationale = "Essential: " + ", ".join(rationale_parts) if rationale_parts else "Moderate criticality"
+        else:
+            ved_class = 'D'  # Desirable
+            rationale = "Desirable: " + ", ".join(rationale_parts) if rationale_parts else "Low criticality"
+
+        return criticality_score, ved_class, rationale
+
+    @staticmethod
+    def price_percentiles(prices: Sequence[Decimal]) -> Dict[str, Decimal]:
+        """
+        HML thresholds from the positive unit prices of all items.
+
+        Args:
+            prices: Unit prices
+
+        Returns:
+            Dict with 'high' and 'low' thresholds
+        """
+        prices = sorted(p for p in prices if p and p > 0)
+        if not prices:
+            return {'high': Decimal('1000'), 'low': Decimal('10')}
+
+        high_idx = int(len(prices) * ABCVEDClassificationService.HML_HIGH_PERCENTILE / 100)
+        low_idx = int(len(prices) * ABCVEDClassificationService.HML_LOW_PERCENTILE / 100)
+        return {
+            'high': prices[high_idx] if high_idx < len(prices) else prices[-1],
+            'low': prices[low_idx]
+        }
+
+    @staticmethod
+    def _window(as_of_date: date, days: int) -> Q:
+        """Ledger rows dated within ``days`` days up to and including ``as_of_date``."""
+        return Q(
+            transaction_date__date__gt=as_of_date - timedelta(days=days),
+            transaction_date__date__lte=as_of_date
+        )
+
+    @staticmethod
+    def _shifted_window(previous_as_of: date, as_of_date: date, days: int) -> Q:
+        """Ledger rows that are in only one of the two ``days`` windows."""
+        start, previous_start = as_of_date - timedelta(days=days), previous_as_of - timedelta(days=days)
+        return (
+            Q(transaction_date__date__gt=previous_start, transaction_date__date__lte=min(start, previous_as_of))
+            | Q(transaction_date__date__gt=max(previous_as_of, start), transaction_date__date__lte=as_of_date)
+        )
+
+    @staticmethod
+    def latest_snapshot(company: Company, period_months: int = 12) -> Optional[ItemClassificationSnapshot]:
+        return ItemClassificationSnapshot.objects.filter(company=company, period_months=period_months).first()
+
+    @staticmethod
+    def _snapshot_for_read(company: Company, period_months: int = 12) -> ItemClassificationSnapshot:
+        """The latest snapshot for the period; one is only taken when none exists yet."""
+        snapshot = ABCVEDClassificationService.latest_snapshot(company, period_months)
+        if snapshot is None:
+            snapshot = ABCVEDClassificationService.classify(company, period_months=period_months)
+        return snapshot
+
+    @staticmethod
+    def get_item_classes(
         company: Company,
-        period_months: int = 12,
-        warehouse: Optional[Warehouse] = None,
-        category: Optional[ProductCategory] = None
-    ) -> List[ABCClassification]:
+        items: Optional[Sequence[BudgetItemCode]] = None,
+        period_months: int = 12
+    ) -> Dict[int, ItemClassification]:
         """
-        Perform ABC analysis based on annual consumption value.
+        Classes of the latest snapshot by item id, read with one query.
 
-        ABC Analysis classifies inventory based on consumption value:
-        - A items: Top 70% of consumption value (typically 10-20% of items)
-        - B items: Next 20% of consumption value (typically 30% of items)
-        - C items: Bottom 10% of consumption value (typically 50-60% of items)
+        Args:
+            company: Company instance
+            items: Optional items to restrict to
+            period_months: ABC consumption period of the snapshot (default: 12)
+
+        Returns:
+            Dict of budget_item_id to ItemClassification (empty before the first snapshot)
+        """
+        rows = ItemClassification.objects.filter(
+            snapshot_id=Subquery(
+                ItemClassificationSnapshot.objects.filter(
+                    company=company, period_months=period_months
+                ).values('id')[:1]
+            )
+        )
+        if items is not None:
+            rows = rows.filter(budget_item__in=items)
+        return {row.budget_item_id: row for row in rows}
+
+    @staticmethod
+    @transaction.atomic
+    def classify(
+        company: Company,
+        as_of_date: Optional[date] = None,
+        period_months: int = 12
+    ) -> ItemClassificationSnapshot:
+        """
+        Classify every stocked or issued item and persist the result as a snapshot.
+
+        Consumption value (issues over ``period_months`` months), issue
+        counts and last issue dates are carried over from the latest
+        snapshot on or before ``as_of_date`` with the same period, and only
+        ledger rows it did not include or crossing the window edges are
+        aggregated. Rows created within ``LEDGER_OVERLAP`` of the previous
+        snapshot are re-read and added unless it listed them, so rows
+        committed late with a lower id are not skipped. Without such a
+        snapshot the whole ledger is aggregated. A snapshot for the same
+        date and period is replaced.
 
         Args:
             company: Company instance
-            period_months: Analysis period in months (default: 12)
-            warehouse: Optional warehouse filter
-            category: Optional category filter
+            as_of_date: Classification date (default: today)
+            period_months: ABC consumption period in months (default: 12)
 
         Returns:
-            List of ABCClassification sorted by value
+            The new ItemClassificationSnapshot
         """
-        cutoff_date = timezone.now().date() - timedelta(days=period_months * 30)
+        if as_of_date is None:
+            as_of_date = timezone.localdate()
+        period_days = period_months * 30
+        service = ABCVEDClassificationService
 
-        # Get products with stock
-        products_query = Product.objects.filter(
+        issues = StockLedger.objects.filter(company=company, transaction_type='ISSUE', budget_item__isnull=False)
+        ledger_cutoff = timezone.now() - service.LEDGER_OVERLAP
+        recent_ledger_ids = list(issues.filter(created_at__gte=ledger_cutoff).values_list('id', flat=True))
+        included = Q(created_at__lt=ledger_cutoff) | Q(id__in=recent_ledger_ids)
+
+        previous = ItemClassificationSnapshot.objects.filter(
             company=company,
-            is_active=True
-        ).select_related('category')
+            period_months=period_months,
+            as_of_date__lte=as_of_date,
+            ledger_cutoff__isnull=False
+        ).first()
+
+        # item id -> [consumption value, issue count, last issue date]
+        metrics: Dict[int, list] = {}
+        value_window = service._window(as_of_date, period_days)
+        count_window = service._window(as_of_date, service.VED_ISSUE_DAYS)
+        if previous:
+            for item_id, value, count, last_issue in previous.items.values_list(
+                'budget_item_id', 'consumption_value', 'issue_count', 'last_issue_date'
+            ):
+                metrics[item_id] = [value, count, last_issue]
+            seen = Q(created_at__lt=previous.ledger_cutoff) | Q(id__in=previous.recent_ledger_ids)
+            scope = (
+                ~seen
+                | service._shifted_window(previous.as_of_date, as_of_date, period_days)
+                | service._shifted_window(previous.as_of_date, as_of_date, service.VED_ISSUE_DAYS)
+            )
+            newly_dated = ~seen | Q(transaction_date__date__gt=previous.as_of_date)
+            left = {
+                'value_out': Sum('value', filter=seen & service._window(previous.as_of_date, period_days), default=Decimal('0')),
+                'count_out': Count('id', filter=seen & service._window(previous.as_of_date, service.VED_ISSUE_DAYS)),
+            }
+        else:
+            scope = newly_dated = Q()
+            left = {'value_out': Value(Decimal('0')), 'count_out': Value(0)}
+
+        # Rows entering the windows are added, rows of the previous snapshot leaving them subtracted
+        deltas = issues.filter(scope).filter(included).order_by().values('budget_item_id').annotate(
+            value_in=Sum('value', filter=value_window, default=Decimal('0')),
+            count_in=Count('id', filter=count_window),
+            last_day=Max(TruncDate('transaction_date'), filter=newly_dated & Q(transaction_date__date__lte=as_of_date)),
+            **left
+        ).values_list('budget_item_id', 'value_in', 'value_out', 'count_in', 'count_out', 'last_day')
+        for item_id, value_in, value_out, count_in, count_out, last_day in deltas:
+            item_metrics = metrics.setdefault(item_id, [Decimal('0'), 0, None])
+            item_metrics[0] -= value_in - value_out  # issue values are negative
+            item_metrics[1] += count_in - count_out
+            if last_day and (item_metrics[2] is None or last_day > item_metrics[2]):
+                item_metrics[2] = last_day
+
+        levels = StockLevel.objects.filter(company=company, budget_item=OuterRef('pk'))
+        items = list(
+            BudgetItemCode.objects.filter(
+                Q(Exists(levels)) | Q(Exists(issues.filter(budget_item=OuterRef('pk'))))
+            ).annotate(
+                at_reorder_level=Exists(levels.filter(quantity__lte=OuterRef('reorder_level')))
+            ).values_list('id', 'standard_cost', 'cost_price', 'reorder_level', 'prevent_expired_issuance', 'at_reorder_level')
+        )
 
-        if category:
-            products_query = products_query.filter(category=category)
+        unit_prices = {item[0]: item[1] or item[2] or Decimal('0') for item in items}
+        percentiles = service.price_percentiles(unit_prices.values())
 
-        products = list(products_query)
+        # ABC: rank items by consumption value
+        abc_classes = {}
+        consuming = sorted(
+            ((item_id, metrics[item_id][0]) for item_id in unit_prices if item_id in metrics and metrics[item_id][0] > 0),
+            key=lambda pair: pair[1],
+            reverse=True
+        )
+        total_value = sum(value for _, value in consuming)
+        cumulative_value = Decimal('0')
+        for item_id, value in consuming:
+            cumulative_value += value
+            abc_classes[item_id] = service.classify_abc(cumulative_value / total_value * 100)
 
-        # Calculate consumption value for each product
-        product_values = []
+        ItemClassificationSnapshot.objects.filter(
+            company=company, as_of_date=as_of_date, period_months=period_months
+        ).delete()
+        snapshot = ItemClassificationSnapshot.objects.create(
+            company=company,
+            as_of_date=as_of_date,
+            period_months=period_months,
+            ledger_cutoff=ledger_cutoff,
+            recent_ledger_ids=recent_ledger_ids
+        )
 
-        for product in products:
-            # Get issue transactions in the period
-            issues_query = StockLedger.objects.filter(
-                company=company,
-                product=product,
-                transaction_type='ISSUE',
-                transaction_date__gte=cutoff_date
+        rows = []
+        for item_id, _, _, reorder_level, expiry_controlled, at_reorder_level in items:
+            value, issue_count, last_issue = metrics.get(item_id, (Decimal('0'), 0, None))
+            unit_price = unit_prices[item_id]
+            abc_class = abc_classes.get(item_id, 'C')
+            criticality_score, ved_class, rationale = service.classify_ved(
+                issue_count,
+                bool(reorder_level) and at_reorder_level,
+                unit_price,
+                expiry_controlled
             )
+            fsn_class = service.classify_fsn((as_of_date - last_issue).days if last_issue else 999)
+            rows.append(ItemClassification(
+                snapshot=snapshot,
+                budget_item_id=item_id,
+                consumption_value=value,
+                issue_count=issue_count,
+                last_issue_date=last_issue,
+                unit_price=unit_price,
+                criticality_score=criticality_score,
+                ved_rationale=rationale[:255],
+                abc_class=abc_class,
+                ved_class=ved_class,
+                fsn_class=fsn_class,
+                hml_class=service.classify_hml(unit_price, percentiles),
+                combined_priority=service._determine_combined_priority(abc_class, ved_class, fsn_class),
+            ))
+        ItemClassification.objects.bulk_create(rows, batch_size=1000)
 
-            if warehouse:
-                issues_query = issues_query.filter(warehouse=warehouse)
-
-            # Sum absolute value of issues
-            consumption_value = issues_query.aggregate(
-                total=Sum(F('quantity') * F('rate'))
-            )['total'] or Decimal('0')
+        stale = ItemClassificationSnapshot.objects.filter(
+            company=company, period_months=period_months
+        ).values_list('id', flat=True)[service.SNAPSHOTS_KEPT:]
+        ItemClassificationSnapshot.objects.filter(id__in=list(stale)).delete()
 
-            consumption_value = abs(consumption_value)  # Issues are negative
+        logger.info(
+            "Classified %s item(s) for %s as of %s (%s)",
+            len(rows), company.code, as_of_date, "incremental" if previous else "full"
+        )
+        return snapshot
 
-            if consumption_value > 0:
-                product_values.append({
-                    'product': product,
-                    'value': consumption_value
-                })
+    @staticmethod
+    def perform_abc_analysis(
+        company: Company,
+        period_months: int = 12,
+        category: Optional[BudgetItemCategory] = None
+    ) -> List[ABCClassification]:
+        """
+        Perform ABC analysis based on annual consumption value.
+        Served from the latest classification snapshot for the period.
 
-        if not product_values:
-            return []
+        ABC Analysis classifies inventory based on consumption value:
+        - A items: Top 70% of consumption value (typically 10-20% of items)
+        - B items: Next 20% of consumption value (typically 30% of items)
+        - C items: Bottom 10% of consumption value (typically 50-60% of items)
 
-        # Sort by value descending
-        product_values.sort(key=lambda x: x['value'], reverse=True)
+        Args:
+            company: Company instance
+            period_months: Analysis period in months (default: 12)
+            category: Optional category filter (shares stay company-wide)
 
-        # Calculate total value
-        total_value = sum(pv['value'] for pv in product_values)
+        Returns:
+            List of ABCClassification sorted by value
+        """
+        snapshot = ABCVEDClassificationService._snapshot_for_read(company, period_months)
+        rows = list(
+            snapshot.items.filter(consumption_value__gt=0).order_by('-consumption_value').values_list(
+                'budget_item_id', 'budget_item__code', 'budget_item__name',
+                'budget_item__category_ref_id', 'consumption_value', 'abc_class'
+            )
+        )
+        total_value = sum(row[4] for row in rows)
 
-        # Classify products
         classifications = []
         cumulative_value = Decimal('0')
-
-        for pv in product_values:
-            product = pv['product']
-            value = pv['value']
-
+        for item_id, code, name, category_id, value, abc_class in rows:
             cumulative_value += value
-            percentage = (value / total_value * 100) if total_value > 0 else Decimal('0')
-            cumulative_percentage = (cumulative_value / total_value * 100) if total_value > 0 else Decimal('0')
-
-            # Determine ABC class
-            if cumulative_percentage <= ABCVEDClassificationService.ABC_A_THRESHOLD:
-                abc_class = 'A'
-                recommendation = (
-                    "Tight control: Daily monitoring, accurate records, "
-                    "frequent review of demand forecasts, close supplier relationships"
-                )
-            elif cumulative_percentage <= ABCVEDClassificationService.ABC_B_THRESHOLD:
-                abc_class = 'B'
-                recommendation = (
-                    "Moderate control: Regular monitoring, good records, "
-                    "periodic demand review, standard supplier management"
-                )
-            else:
-                abc_class = 'C'
-                recommendation = (
-                    "Simple control: Periodic review, basic records, "
-                    "bulk ordering to reduce costs, standard procedures"
-                )
-
+            if category and category_id != category.id:
+                continue
             classifications.append(ABCClassification(
-                product_id=product.id,
-                product_code=product.code,
-                product_name=product.name,
+                product_id=item_id,
+                product_code=code,
+                product_name=name,
                 annual_consumption_value=value,
-                percentage_of_total=percentage,
-                cumulative_percentage=cumulative_percentage,
+                percentage_of_total=value / total_value * 100,
+                cumulative_percentage=cumulative_value / total_value * 100,
                 abc_class=abc_class,
-                recommendation=recommendation
+                recommendation=ABCVEDClassificationService.ABC_RECOMMENDATIONS[abc_class]
             ))
 
-            # Update product record
-            product.abc_classification = abc_class
-            product.abc_classification_date = timezone.now().date()
-
-        # Bulk update products
-        Product.objects.bulk_update(
-            [c.product_code for c in classifications],
-            ['abc_classification', 'abc_classification_date'],
-            batch_size=100
-        )
-
         return classifications
 
     @staticmethod
-    @transaction.atomic
     def perform_ved_analysis(
         company: Company,
-        category: Optional[ProductCategory] = None
+        category: Optional[BudgetItemCategory] = None
     ) -> List[VEDClassification]:
         """
         Perform VED analysis based on criticality.
+        Served from the latest classification snapshot for the period.
 
         VED Analysis classifies inventory based on criticality:
         - V (Vital): Critical items, shortage leads to production stoppage
         - E (Essential): Important items, shortage causes problems but not immediate stoppage
         - D (Desirable): Nice to have, shortage causes minor inconvenience
 
-        Since criticality is subjective, this method uses heuristics:
-        - Products with high consumption frequency = V
-        - Products used in production/sales = E
-        - Rarely used products = D
-
         Args:
             company: Company instance
             category: Optional category filter
@@ -250,95 +514,25 @@ class ABCVEDClassificationService:
         Returns:
             List of VEDClassification
         """
-        products_query = Product.objects.filter(
-            company=company,
-            is_active=True
-        )
-
+        snapshot = ABCVEDClassificationService._snapshot_for_read(company)
+        rows = snapshot.items.order_by('budget_item__code')
         if category:
-            products_query = products_query.filter(category=category)
-
-        products = list(products_query)
-
-        classifications = []
-
-        for product in products:
-            criticality_score = 0
-            rationale_parts = []
-
-            # Check consumption frequency (last 90 days)
-            cutoff_date = timezone.now().date() - timedelta(days=90)
-            issue_count = StockLedger.objects.filter(
-                company=company,
-                product=product,
-                transaction_type='ISSUE',
-                transaction_date__gte=cutoff_date
-            ).count()
-
-            if issue_count >= 20:  # Issued 20+ times in 90 days
-                criticality_score += 3
-                rationale_parts.append("High consumption frequency")
-            elif issue_count >= 10:
-                criticality_score += 2
-                rationale_parts.append("Moderate consumption frequency")
-            elif issue_count >= 5:
-                criticality_score += 1
-                rationale_parts.append("Regular consumption")
-
-            # Check if product has low stock levels (indicates importance)
-            stock_levels = StockLevel.objects.filter(
-                company=company,
-                product=product
-            )
-
-            for stock_level in stock_levels:
-                if product.reorder_level and stock_level.quantity <= product.reorder_level:
-                    criticality_score += 2
-                    rationale_parts.append("Frequently at reorder level")
-                    break
-
-            # Check if product is expensive (high value items are often critical)
-            if product.standard_cost and product.standard_cost > Decimal('1000'):
-                criticality_score += 1
-                rationale_parts.append("High value item")
-
-            # Check expiry tracking (perishable items often critical)
-            if product.prevent_expired_issuance:
-                criticality_score += 1
-                rationale_parts.append("Expiry-controlled item")
-
-            # Determine VED class based on score
-            if criticality_score >= 5:
-                ved_class = 'V'  # Vital
-                rationale = "Vital: " + ", ".join(rationale_parts) if rationale_parts else "High criticality indicators"
-            elif criticality_score >= 3:
-                ved_class = 'E'  # Essential
-                rationale = "Essential: " + ", ".join(rationale_parts) if rationale_parts else "Moderate criticality"
-            else:
-                ved_class = 'D'  # Desirable
-                rationale = "Desirable: " + ", ".join(rationale_parts) if rationale_parts else "Low criticality"
-
-            classifications.append(VEDClassification(
-                product_id=product.id,
-                product_code=product.code,
-                product_name=product.name,
-                criticality_score=criticality_score,
+            rows = rows.filter(budget_item__category_ref=category)
+
+        return [
+            VEDClassification(
+                product_id=item_id,
+                product_code=code,
+                product_name=name,
+                criticality_score=score,
                 ved_class=ved_class,
                 rationale=rationale
-            ))
-
-            # Update product record
-            product.ved_classification = ved_class
-            product.ved_classification_date = timezone.now().date()
-
-        # Bulk update products
-        Product.objects.bulk_update(
-            [c.product_code for c in classifications],
-            ['ved_classification', 'ved_classification_date'],
-            batch_size=100
-        )
-
-        return classifications
+            )
+            for item_id, code, name, score, ved_class, rationale in rows.values_list(
+                'budget_item_id', 'budget_item__code', 'budget_item__name',
+                'criticality_score', 'ved_class', 'ved_rationale'
+            )
+        ]
 
     @staticmethod
     def classify_fsn(days_since_last_movement: int) -> str:
@@ -381,110 +575,46 @@ class ABCVEDClassificationService:
     def perform_multi_dimensional_classification(
         company: Company,
         period_months: int = 12,
-        warehouse: Optional[Warehouse] = None,
-        category: Optional[ProductCategory] = None
+        category: Optional[BudgetItemCategory] = None
     ) -> List[MultiDimensionalClassification]:
         """
         Perform comprehensive multi-dimensional classification.
+        Served from the latest classification snapshot for the period.
 
         Combines ABC, VED, FSN, and HML analyses for holistic view.
 
         Args:
             company: Company instance
             period_months: Analysis period
-            warehouse: Optional warehouse filter
             category: Optional category filter
 
         Returns:
             List of MultiDimensionalClassification
         """
-        # Run ABC analysis
-        abc_results = ABCVEDClassificationService.perform_abc_analysis(
-            company, period_months, warehouse, category
-        )
-        abc_dict = {r.product_id: r.abc_class for r in abc_results}
-
-        # Run VED analysis
-        ved_results = ABCVEDClassificationService.perform_ved_analysis(company, category)
-        ved_dict = {r.product_id: r.ved_class for r in ved_results}
-
-        # Get all products
-        products_query = Product.objects.filter(
-            company=company,
-            is_active=True
-        )
-
+        snapshot = ABCVEDClassificationService._snapshot_for_read(company, period_months)
+        rows = snapshot.items.order_by('budget_item__code')
         if category:
-            products_query = products_query.filter(category=category)
-
-        products = list(products_query)
-
-        # Calculate price percentiles for HML
-        prices = [
-            p.standard_cost for p in products
-            if p.standard_cost and p.standard_cost > 0
-        ]
-        prices.sort()
-
-        if prices:
-            high_idx = int(len(prices) * ABCVEDClassificationService.HML_HIGH_PERCENTILE / 100)
-            low_idx = int(len(prices) * ABCVEDClassificationService.HML_LOW_PERCENTILE / 100)
-            price_percentiles = {
-                'high': prices[high_idx] if high_idx < len(prices) else prices[-1],
-                'low': prices[low_idx] if low_idx >= 0 else prices[0]
-            }
-        else:
-            price_percentiles = {'high': Decimal('1000'), 'low': Decimal('10')}
+            rows = rows.filter(budget_item__category_ref=category)
 
-        # Classify each product
-        classifications = []
-        cutoff_date = timezone.now().date() - timedelta(days=90)
-
-        for product in products:
-            abc_class = abc_dict.get(product.id, 'C')
-            ved_class = ved_dict.get(product.id, 'D')
-
-            # FSN classification
-            last_movement = StockLedger.objects.filter(
-                company=company,
-                product=product,
-                transaction_type='ISSUE'
-            ).order_by('-transaction_date').first()
-
-            if last_movement:
-                days_since_movement = (timezone.now().date() - last_movement.transaction_date).days
-            else:
-                days_since_movement = 999
-
-            fsn_class = ABCVEDClassificationService.classify_fsn(days_since_movement)
-
-            # HML classification
-            unit_price = product.standard_cost or Decimal('0')
-            hml_class = ABCVEDClassificationService.classify_hml(unit_price, price_percentiles)
-
-            # Determine combined priority
-            combined_priority = ABCVEDClassificationService._determine_combined_priority(
-                abc_class, ved_class, fsn_class
-            )
-
-            # Get management strategy
-            management_strategy = ABCVEDClassificationService._get_management_strategy(
-                abc_class, ved_class, fsn_class, hml_class
-            )
-
-            classifications.append(MultiDimensionalClassification(
-                product_id=product.id,
-                product_code=product.code,
-                product_name=product.name,
+        return [
+            MultiDimensionalClassification(
+                product_id=item_id,
+                product_code=code,
+                product_name=name,
                 abc_class=abc_class,
                 ved_class=ved_class,
                 fsn_class=fsn_class,
                 hml_class=hml_class,
                 combined_priority=combined_priority,
-                management_strategy=management_strategy
-            ))
-
-        return classifications
+                management_strategy=ABCVEDClassificationService._get_management_strategy(
+                    abc_class, ved_class, fsn_class, hml_class
+                )
+            )
+            for item_id, code, name, abc_class, ved_class, fsn_class, hml_class, combined_priority in rows.values_list(
+                'budget_item_id', 'budget_item__code', 'budget_item__name',
+                'abc_class', 'ved_class', 'fsn_class', 'hml_class', 'combined_priority'
+            )
+        ]
 
     @staticmethod
     def _determine_combined_priority(abc_class: str, ved_class: str, fsn_class: str) -> str:
@@ -574,7 +704,7 @@ class ABCVEDClassificationService:
     @staticmethod
     def get_classification_summary(company: Company) -> Dict:
         """
-        Get summary of product classifications.
+        Get summary of the latest item classification.
 
         Args:
             company: Company instance
@@ -582,25 +712,15 @@ class ABCVEDClassificationService:
         Returns:
             Dict with classification summary
         """
-        products = Product.objects.filter(company=company, is_active=True)
+        snapshot = ABCVEDClassificationService.latest_snapshot(company)
+        rows = ItemClassification.objects.filter(snapshot=snapshot)
 
-        abc_counts = products.values('abc_classification').annotate(count=Count('id'))
-        ved_counts = products.values('ved_classification').annotate(count=Count('id'))
-
-        total_products = products.count()
+        abc_counts = dict(rows.order_by().values_list('abc_class').annotate(count=Count('id')))
+        ved_counts = dict(rows.order_by().values_list('ved_class').annotate(count=Count('id')))
 
         return {
-            'total_products': total_products,
-            'abc_analysis': {
-                class_name: next((c['count'] for c in abc_counts if c['abc_classification'] == class_name), 0)
-                for class_name in ['A', 'B', 'C']
-            },
-            'ved_analysis': {
-                class_name: next((c['count'] for c in ved_counts if c['ved_classification'] == class_name), 0)
-                for class_name in ['V', 'E', 'D']
-            },
-            'last_classification_date': products.aggregate(
-                last_abc=Max('abc_classification_date'),
-                last_ved=Max('ved_classification_date')
-            )
+            'total_products': sum(abc_counts.values()),
+            'abc_analysis': {class_name: abc_counts.get(class_name, 0) for class_name in ['A', 'B', 'C']},
+            'ved_analysis': {class_name: ved_counts.get(class_name, 0) for class_name in ['V', 'E', 'D']},
+            'last_classification_date': snapshot.as_of_date if snapshot else None
         }
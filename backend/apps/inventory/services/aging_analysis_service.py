@@ -10,29 +10,38 @@ Features:
 - Non-moving identification
 - Obsolescence risk scoring
 - Aging buckets (0-30, 31-60, 61-90, 90+ days)
+
+Aging is computed set-based: the open cost layers of a company are streamed
+with one query and bucketed in a single vectorized pass, and last-movement
+dates come from one grouped ledger query. The result is an ``AgingResultSet``
+whose columns the Excel/PDF exporters read directly.
 """
 
 import logging
+from dataclasses import dataclass, fields, replace
+from datetime import date
 from decimal import Decimal
-from typing import List, Dict, Optional, Tuple
-from dataclasses import dataclass
-from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence
 
-from django.db.models import Q, Sum, Min, Max, Count, Avg, F
+import numpy as np
+from django.db.models import Max
+from django.db.models.functions import TruncDate
 from django.utils import timezone
 
+from apps.budgeting.models import BudgetItemCategory, BudgetItemCode
 from apps.companies.models import Company
-from apps.inventory.models import (
-    Product,
-    Warehouse,
-    CostLayer,
-    StockLevel,
-    StockLedger,
-    ProductCategory
-)
+from apps.inventory.models import CostLayer, StockLedger, Warehouse
 
 logger = logging.getLogger(__name__)
 
+# Quantities and values are summed exactly as integers of their smallest unit
+QTY_SCALE = 1000  # qty_remaining has 3 decimal places
+VALUE_SCALE = 100  # cost_remaining has 2 decimal places
+
+NO_MOVEMENT_DAYS = 999
+NO_EXPIRY = np.iinfo(np.int64).max
+LAYER_CHUNK_SIZE = 5000
+
 
 @dataclass
 class AgingBucket:
@@ -64,6 +73,100 @@ class ProductAgingAnalysis:
     recommended_action: str
 
 
+@dataclass
+class AgingResultSet:
+    """
+    Columnar aging result: entry ``i`` of every column belongs to the same item.
+
+    Quantities are stored in thousandths and values in cents (``*_units``);
+    ``total_quantity``/``total_value`` give them as floats for reporting and
+    ``rows()`` yields exact ``ProductAgingAnalysis`` records.
+    """
+    as_of_date: date
+    product_id: np.ndarray
+    product_code: np.ndarray
+    product_name: np.ndarray
+    category: np.ndarray
+    quantity_units: np.ndarray
+    value_units: np.ndarray
+    bucket_quantity_units: np.ndarray  # (items, buckets)
+    bucket_value_units: np.ndarray  # (items, buckets)
+    average_age_days: np.ndarray
+    oldest_stock_days: np.ndarray
+    newest_stock_days: np.ndarray
+    days_since_last_movement: np.ndarray
+    movement_velocity: np.ndarray
+    obsolescence_risk: np.ndarray
+    recommended_action: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.product_id)
+
+    @classmethod
+    def empty(cls, as_of_date: date) -> "AgingResultSet":
+        columns = {
+            f.name: np.empty(0, dtype=object if f.name in _TEXT_COLUMNS else np.int64)
+            for f in fields(cls) if f.name != 'as_of_date'
+        }
+        bucket_count = len(AgingAnalysisService.AGING_BUCKETS)
+        columns['bucket_quantity_units'] = np.zeros((0, bucket_count), dtype=np.int64)
+        columns['bucket_value_units'] = np.zeros((0, bucket_count), dtype=np.int64)
+        return cls(as_of_date=as_of_date, **columns)
+
+    @property
+    def total_quantity(self) -> np.ndarray:
+        return self.quantity_units / QTY_SCALE
+
+    @property
+    def total_value(self) -> np.ndarray:
+        return self.value_units / VALUE_SCALE
+
+    def take(self, index) -> "AgingResultSet":
+        """Subset of the items selected by a boolean mask, index array or slice."""
+        return replace(self, **{
+            f.name: getattr(self, f.name)[index]
+            for f in fields(self) if f.name != 'as_of_date'
+        })
+
+    def rows(self) -> Iterator[ProductAgingAnalysis]:
+        buckets = AgingAnalysisService.AGING_BUCKETS
+        for i in range(len(self)):
+            total_quantity = Decimal(int(self.quantity_units[i])).scaleb(-3)
+            aging_buckets = []
+            for b, (bucket_name, min_days, max_days) in enumerate(buckets):
+                quantity = Decimal(int(self.bucket_quantity_units[i, b])).scaleb(-3)
+                aging_buckets.append(AgingBucket(
+                    bucket_name=bucket_name,
+                    min_days=min_days,
+                    max_days=max_days,
+                    quantity=quantity,
+                    value=Decimal(int(self.bucket_value_units[i, b])).scaleb(-2),
+                    percentage=(quantity / total_quantity * 100) if total_quantity > 0 else Decimal('0'),
+                ))
+            yield ProductAgingAnalysis(
+                product_id=int(self.product_id[i]),
+                product_code=self.product_code[i],
+                product_name=self.product_name[i],
+                category=self.category[i],
+                total_quantity=total_quantity,
+                total_value=Decimal(int(self.value_units[i])).scaleb(-2),
+                average_age_days=int(self.average_age_days[i]),
+                oldest_stock_days=int(self.oldest_stock_days[i]),
+                newest_stock_days=int(self.newest_stock_days[i]),
+                aging_buckets=aging_buckets,
+                movement_velocity=self.movement_velocity[i],
+                days_since_last_movement=int(self.days_since_last_movement[i]),
+                obsolescence_risk=self.obsolescence_risk[i],
+                recommended_action=self.recommended_action[i],
+            )
+
+
+_TEXT_COLUMNS = {
+    'product_code', 'product_name', 'category',
+    'movement_velocity', 'obsolescence_risk', 'recommended_action',
+}
+
+
 class AgingAnalysisService:
     """
     Service for analyzing inventory aging and movement patterns.
@@ -85,6 +188,9 @@ class AgingAnalysisService:
     SLOW_MOVING_DAYS = 180
     NON_MOVING_DAYS = 365
 
+    # Ledger transactions that count as stock moving out
+    MOVEMENT_TRANSACTION_TYPES = ['ISSUE', 'TRANSFER']
+
     @staticmethod
     def calculate_stock_age(receipt_date: date, as_of_date: Optional[date] = None) -> int:
         """
@@ -215,145 +321,171 @@ class AgingAnalysisService:
                 return "Normal: Continue monitoring"
 
     @staticmethod
-    def analyze_product_aging(
+    def compute_aging(
         company: Company,
-        product: Product,
         warehouse: Optional[Warehouse] = None,
-        as_of_date: Optional[date] = None
-    ) -> Optional[ProductAgingAnalysis]:
+        category: Optional[BudgetItemCategory] = None,
+        as_of_date: Optional[date] = None,
+        items: Optional[Sequence[BudgetItemCode]] = None
+    ) -> AgingResultSet:
         """
-        Analyze aging for a single product.
+        Analyze aging for every item with open cost layers.
+
+        Runs three queries whatever the number of items: the open layers,
+        the last outward movement per item and the item details.
 
         Args:
             company: Company instance
-            product: Product to analyze
             warehouse: Optional warehouse filter
-            as_of_date: Optional date for analysis
+            category: Optional item category filter
+            as_of_date: Optional date for analysis (default: today)
+            items: Optional items to restrict the analysis to
 
         Returns:
-            ProductAgingAnalysis or None if no stock
+            AgingResultSet with one entry per item, ordered by item code
         """
         if as_of_date is None:
-            as_of_date = timezone.now().date()
+            as_of_date = timezone.localdate()
 
-        # Get cost layers with remaining stock
-        cost_layers_query = CostLayer.objects.filter(
+        layers = CostLayer.objects.filter(
             company=company,
-            product=product,
+            budget_item__isnull=False,
             qty_remaining__gt=0
-        ).select_related('warehouse')
-
+        ).annotate(receipt_day=TruncDate('receipt_date')).filter(receipt_day__lte=as_of_date)
         if warehouse:
-            cost_layers_query = cost_layers_query.filter(warehouse=warehouse)
-
-        cost_layers = list(cost_layers_query)
-
-        if not cost_layers:
-            return None
-
-        # Calculate total quantity and value
-        total_quantity = sum(layer.qty_remaining for layer in cost_layers)
-        total_value = sum(layer.cost_remaining for layer in cost_layers)
-
-        # Calculate age statistics
-        ages = [
-            AgingAnalysisService.calculate_stock_age(layer.receipt_date, as_of_date)
-            for layer in cost_layers
-        ]
-
-        average_age_days = int(sum(ages) / len(ages))
-        oldest_stock_days = max(ages)
-        newest_stock_days = min(ages)
-
-        # Calculate aging buckets
-        aging_buckets = []
-        for bucket_name, min_days, max_days in AgingAnalysisService.AGING_BUCKETS:
-            bucket_quantity = Decimal('0')
-            bucket_value = Decimal('0')
-
-            for layer in cost_layers:
-                age = AgingAnalysisService.calculate_stock_age(layer.receipt_date, as_of_date)
-
-                if max_days is None:
-                    # Last bucket (e.g., "Over 365 days")
-                    if age >= min_days:
-                        bucket_quantity += layer.qty_remaining
-                        bucket_value += layer.cost_remaining
-                else:
-                    if min_days <= age <= max_days:
-                        bucket_quantity += layer.qty_remaining
-                        bucket_value += layer.cost_remaining
-
-            percentage = (bucket_quantity / total_quantity * 100) if total_quantity > 0 else Decimal('0')
-
-            aging_buckets.append(AgingBucket(
-                bucket_name=bucket_name,
-                min_days=min_days,
-                max_days=max_days,
-                quantity=bucket_quantity,
-                value=bucket_value,
-                percentage=percentage
-            ))
-
-        # Calculate days since last movement
-        last_movement = StockLedger.objects.filter(
-            company=company,
-            product=product,
-            transaction_type__in=['ISSUE', 'TRANSFER']
-        ).order_by('-transaction_date').first()
-
-        if last_movement:
-            days_since_last_movement = (as_of_date - last_movement.transaction_date).days
-        else:
-            days_since_last_movement = 999  # No movement recorded
-
-        # Categorize velocity
-        velocity = AgingAnalysisService.categorize_movement_velocity(days_since_last_movement)
-
-        # Get earliest expiry date from cost layers
-        expiry_dates = [layer.expiry_date for layer in cost_layers if layer.expiry_date]
-        earliest_expiry = min(expiry_dates) if expiry_dates else None
-
-        # Calculate obsolescence risk
-        obsolescence_risk = AgingAnalysisService.calculate_obsolescence_risk(
-            average_age_days,
-            days_since_last_movement,
-            earliest_expiry
+            layers = layers.filter(warehouse=warehouse)
+        if category:
+            layers = layers.filter(budget_item__category_ref=category)
+        if items is not None:
+            layers = layers.filter(budget_item__in=items)
+
+        item_ids, receipt_days, quantities, values, expiries = [], [], [], [], []
+        for item_id, receipt_day, qty, value, expiry in layers.order_by().values_list(
+            'budget_item_id', 'receipt_day', 'qty_remaining', 'cost_remaining', 'expiry_date'
+        ).iterator(chunk_size=LAYER_CHUNK_SIZE):
+            item_ids.append(item_id)
+            receipt_days.append(receipt_day.toordinal())
+            quantities.append(int(qty * QTY_SCALE))
+            values.append(int(value * VALUE_SCALE))
+            expiries.append(expiry.toordinal() if expiry else NO_EXPIRY)
+
+        if not item_ids:
+            return AgingResultSet.empty(as_of_date)
+
+        # One pass over all layers: group by item, bucket by age
+        as_of_ordinal = as_of_date.toordinal()
+        ages = as_of_ordinal - np.array(receipt_days, dtype=np.int64)
+        keys, item_index = np.unique(np.array(item_ids, dtype=np.int64), return_inverse=True)
+        upper_bounds = [max_days for _, _, max_days in AgingAnalysisService.AGING_BUCKETS if max_days is not None]
+        bucket_index = np.searchsorted(upper_bounds, ages, side='left')
+
+        item_count = len(keys)
+        bucket_count = len(AgingAnalysisService.AGING_BUCKETS)
+        bucket_quantity = np.zeros((item_count, bucket_count), dtype=np.int64)
+        bucket_value = np.zeros((item_count, bucket_count), dtype=np.int64)
+        np.add.at(bucket_quantity, (item_index, bucket_index), np.array(quantities, dtype=np.int64))
+        np.add.at(bucket_value, (item_index, bucket_index), np.array(values, dtype=np.int64))
+
+        layer_count = np.bincount(item_index, minlength=item_count)
+        age_total = np.zeros(item_count, dtype=np.int64)
+        np.add.at(age_total, item_index, ages)
+        oldest = np.zeros(item_count, dtype=np.int64)
+        np.maximum.at(oldest, item_index, ages)
+        newest = np.full(item_count, np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(newest, item_index, ages)
+        earliest_expiry = np.full(item_count, NO_EXPIRY, dtype=np.int64)
+        np.minimum.at(earliest_expiry, item_index, np.array(expiries, dtype=np.int64))
+        average_age = age_total // layer_count
+
+        # Last outward movement per item, from one grouped query
+        last_movement = dict(
+            StockLedger.objects.filter(
+                company=company,
+                budget_item_id__isnull=False,
+                transaction_type__in=AgingAnalysisService.MOVEMENT_TRANSACTION_TYPES,
+                transaction_date__date__lte=as_of_date
+            ).order_by().values('budget_item_id').annotate(
+                last_day=Max(TruncDate('transaction_date'))
+            ).values_list('budget_item_id', 'last_day')
         )
-
-        # Get recommended action
-        recommended_action = AgingAnalysisService.get_recommended_action(
-            velocity,
-            obsolescence_risk,
-            average_age_days
+        days_since_last_movement = np.array([
+            as_of_ordinal - last_movement[key].toordinal() if key in last_movement else NO_MOVEMENT_DAYS
+            for key in keys.tolist()
+        ], dtype=np.int64)
+
+        details = {
+            item_id: (code, name, category_name or legacy_category or "Uncategorized")
+            for item_id, code, name, category_name, legacy_category in BudgetItemCode.objects.filter(
+                id__in=layers.order_by().values('budget_item_id')
+            ).values_list('id', 'code', 'name', 'category_ref__name', 'category')
+        }
+        codes, names, categories = zip(*(details.get(key, ("", "", "Uncategorized")) for key in keys.tolist()))
+
+        velocities, risks, actions = [], [], []
+        for avg_age, days, expiry in zip(average_age.tolist(), days_since_last_movement.tolist(), earliest_expiry.tolist()):
+            velocity = AgingAnalysisService.categorize_movement_velocity(days)
+            risk = AgingAnalysisService.calculate_obsolescence_risk(
+                avg_age,
+                days,
+                date.fromordinal(expiry) if expiry != NO_EXPIRY else None
+            )
+            velocities.append(velocity)
+            risks.append(risk)
+            actions.append(AgingAnalysisService.get_recommended_action(velocity, risk, avg_age))
+
+        result = AgingResultSet(
+            as_of_date=as_of_date,
+            product_id=keys,
+            product_code=np.array(codes, dtype=object),
+            product_name=np.array(names, dtype=object),
+            category=np.array(categories, dtype=object),
+            quantity_units=bucket_quantity.sum(axis=1),
+            value_units=bucket_value.sum(axis=1),
+            bucket_quantity_units=bucket_quantity,
+            bucket_value_units=bucket_value,
+            average_age_days=average_age,
+            oldest_stock_days=oldest,
+            newest_stock_days=newest,
+            days_since_last_movement=days_since_last_movement,
+            movement_velocity=np.array(velocities, dtype=object),
+            obsolescence_risk=np.array(risks, dtype=object),
+            recommended_action=np.array(actions, dtype=object),
         )
+        return result.take(np.argsort(result.product_code.astype(str), kind='stable'))
 
-        return ProductAgingAnalysis(
-            product_id=product.id,
-            product_code=product.code,
-            product_name=product.name,
-            category=product.category.name if product.category else "Uncategorized",
-            total_quantity=total_quantity,
-            total_value=total_value,
-            average_age_days=average_age_days,
-            oldest_stock_days=oldest_stock_days,
-            newest_stock_days=newest_stock_days,
-            aging_buckets=aging_buckets,
-            movement_velocity=velocity,
-            days_since_last_movement=days_since_last_movement,
-            obsolescence_risk=obsolescence_risk,
-            recommended_action=recommended_action
+    @staticmethod
+    def analyze_product_aging(
+        company: Company,
+        product: BudgetItemCode,
+        warehouse: Optional[Warehouse] = None,
+        as_of_date: Optional[date] = None
+    ) -> Optional[ProductAgingAnalysis]:
+        """
+        Analyze aging for a single item.
+
+        Args:
+            company: Company instance
+            product: Item to analyze
+            warehouse: Optional warehouse filter
+            as_of_date: Optional date for analysis
+
+        Returns:
+            ProductAgingAnalysis or None if no stock
+        """
+        result = AgingAnalysisService.compute_aging(
+            company, warehouse=warehouse, as_of_date=as_of_date, items=[product]
         )
+        return next(result.rows(), None)
 
     @staticmethod
     def analyze_warehouse_aging(
         company: Company,
         warehouse: Optional[Warehouse] = None,
-        category: Optional[ProductCategory] = None,
+        category: Optional[BudgetItemCategory] = None,
         as_of_date: Optional[date] = None
     ) -> List[ProductAgingAnalysis]:
         """
-        Analyze aging for all products in a warehouse.
+        Analyze aging for all items in a warehouse.
 
         Args:
             company: Company instance
@@ -364,34 +496,7 @@ class AgingAnalysisService:
         Returns:
             List of ProductAgingAnalysis
         """
-        # Get products with stock
-        products_query = Product.objects.filter(
-            company=company,
-            is_active=True,
-            stock_levels__quantity__gt=0
-        ).select_related('category').distinct()
-
-        if warehouse:
-            products_query = products_query.filter(stock_levels__warehouse=warehouse)
-
-        if category:
-            products_query = products_query.filter(category=category)
-
-        products = list(products_query)
-
-        # Analyze each product
-        analyses = []
-        for product in products:
-            analysis = AgingAnalysisService.analyze_product_aging(
-                company=company,
-                product=product,
-                warehouse=warehouse,
-                as_of_date=as_of_date
-            )
-            if analysis:
-                analyses.append(analysis)
-
-        return analyses
+        return list(AgingAnalysisService.compute_aging(company, warehouse, category, as_of_date).rows())
 
     @staticmethod
     def get_slow_moving_products(
@@ -410,12 +515,12 @@ class AgingAnalysisService:
         Returns:
             List of slow-moving products
         """
-        analyses = AgingAnalysisService.analyze_warehouse_aging(company, warehouse)
-        return [
-            a for a in analyses
-            if a.movement_velocity in ['SLOW', 'NON_MOVING']
-            and a.days_since_last_movement >= min_days
-        ]
+        result = AgingAnalysisService.compute_aging(company, warehouse)
+        mask = (
+            np.isin(result.movement_velocity, ['SLOW', 'NON_MOVING'])
+            & (result.days_since_last_movement >= min_days)
+        )
+        return list(result.take(mask).rows())
 
     @staticmethod
     def get_non_moving_products(
@@ -434,12 +539,9 @@ class AgingAnalysisService:
         Returns:
             List of non-moving products
         """
-        analyses = AgingAnalysisService.analyze_warehouse_aging(company, warehouse)
-        return [
-            a for a in analyses
-            if a.movement_velocity == 'NON_MOVING'
-            and a.days_since_last_movement >= min_days
-        ]
+        result = AgingAnalysisService.compute_aging(company, warehouse)
+        mask = (result.movement_velocity == 'NON_MOVING') & (result.days_since_last_movement >= min_days)
+        return list(result.take(mask).rows())
 
     @staticmethod
     def get_obsolescence_risk_report(
@@ -461,61 +563,50 @@ class AgingAnalysisService:
         risk_order = {'LOW': 0, 'MEDIUM': 1, 'HIGH': 2, 'CRITICAL': 3}
         min_risk_value = risk_order.get(min_risk_level, 1)
 
-        analyses = AgingAnalysisService.analyze_warehouse_aging(company, warehouse)
-
-        # Filter by risk level
-        at_risk_products = [
-            a for a in analyses
-            if risk_order.get(a.obsolescence_risk, 0) >= min_risk_value
-        ]
+        result = AgingAnalysisService.compute_aging(company, warehouse)
+        at_risk = result.take(np.isin(
+            result.obsolescence_risk,
+            [risk for risk, order in risk_order.items() if order >= min_risk_value]
+        ))
 
         # Group by risk level
-        by_risk = {'CRITICAL': [], 'HIGH': [], 'MEDIUM': [], 'LOW': []}
-        for analysis in at_risk_products:
-            by_risk[analysis.obsolescence_risk].append(analysis)
+        by_risk = {risk: at_risk.take(at_risk.obsolescence_risk == risk) for risk in ('CRITICAL', 'HIGH', 'MEDIUM')}
 
-        # Calculate totals
-        total_at_risk_value = sum(a.total_value for a in at_risk_products)
-        total_at_risk_quantity = sum(a.total_quantity for a in at_risk_products)
+        def products(group: AgingResultSet) -> List[Dict]:
+            return [
+                {
+                    'code': code,
+                    'name': name,
+                    'value': value,
+                    'age_days': age,
+                    'action': action
+                }
+                for code, name, value, age, action in zip(
+                    group.product_code, group.product_name, group.total_value.tolist(),
+                    group.average_age_days.tolist(), group.recommended_action
+                )
+            ]
 
         return {
             'company': company.code,
             'warehouse': warehouse.name if warehouse else 'All Warehouses',
-            'total_products_at_risk': len(at_risk_products),
-            'total_value_at_risk': float(total_at_risk_value),
-            'total_quantity_at_risk': float(total_at_risk_quantity),
+            'total_products_at_risk': len(at_risk),
+            'total_value_at_risk': float(at_risk.total_value.sum()),
+            'total_quantity_at_risk': float(at_risk.total_quantity.sum()),
             'by_risk_level': {
                 'critical': {
                     'count': len(by_risk['CRITICAL']),
-                    'value': float(sum(a.total_value for a in by_risk['CRITICAL'])),
-                    'products': [
-                        {
-                            'code': a.product_code,
-                            'name': a.product_name,
-                            'value': float(a.total_value),
-                            'age_days': a.average_age_days,
-                            'action': a.recommended_action
-                        }
-                        for a in by_risk['CRITICAL']
-                    ]
+                    'value': float(by_risk['CRITICAL'].total_value.sum()),
+                    'products': products(by_risk['CRITICAL'])
                 },
                 'high': {
                     'count': len(by_risk['HIGH']),
-                    'value': float(sum(a.total_value for a in by_risk['HIGH'])),
-                    'products': [
-                        {
-                            'code': a.product_code,
-                            'name': a.product_name,
-                            'value': float(a.total_value),
-                            'age_days': a.average_age_days,
-                            'action': a.recommended_action
-                        }
-                        for a in by_risk['HIGH']
-                    ]
+                    'value': float(by_risk['HIGH'].total_value.sum()),
+                    'products': products(by_risk['HIGH'])
                 },
                 'medium': {
                     'count': len(by_risk['MEDIUM']),
-                    'value': float(sum(a.total_value for a in by_risk['MEDIUM'])),
+                    'value': float(by_risk['MEDIUM'].total_value.sum()),
                 }
             }
         }
@@ -535,9 +626,9 @@ class AgingAnalysisService:
         Returns:
             Dict with aging summary
         """
-        analyses = AgingAnalysisService.analyze_warehouse_aging(company, warehouse)
+        result = AgingAnalysisService.compute_aging(company, warehouse)
 
-        if not analyses:
+        if not len(result):
             return {
                 'total_products': 0,
                 'total_value': 0,
@@ -546,64 +637,39 @@ class AgingAnalysisService:
                 'aging_buckets': []
             }
 
-        total_value = sum(a.total_value for a in analyses)
-        total_quantity = sum(a.total_quantity for a in analyses)
-        average_age = int(sum(a.average_age_days for a in analyses) / len(analyses))
-
-        # Velocity breakdown
-        velocity_counts = {'FAST': 0, 'NORMAL': 0, 'SLOW': 0, 'NON_MOVING': 0}
-        velocity_values = {'FAST': Decimal('0'), 'NORMAL': Decimal('0'), 'SLOW': Decimal('0'), 'NON_MOVING': Decimal('0')}
-
-        for analysis in analyses:
-            velocity_counts[analysis.movement_velocity] += 1
-            velocity_values[analysis.movement_velocity] += analysis.total_value
-
-        # Aggregate aging buckets
-        aggregated_buckets = {}
-        for analysis in analyses:
-            for bucket in analysis.aging_buckets:
-                if bucket.bucket_name not in aggregated_buckets:
-                    aggregated_buckets[bucket.bucket_name] = {
-                        'quantity': Decimal('0'),
-                        'value': Decimal('0')
-                    }
-                aggregated_buckets[bucket.bucket_name]['quantity'] += bucket.quantity
-                aggregated_buckets[bucket.bucket_name]['value'] += bucket.value
+        count = len(result)
+        total_value = float(result.total_value.sum())
+        bucket_quantities = result.bucket_quantity_units.sum(axis=0) / QTY_SCALE
+        bucket_values = result.bucket_value_units.sum(axis=0) / VALUE_SCALE
+
+        def velocity(name: str) -> Dict:
+            mask = result.movement_velocity == name
+            return {
+                'count': int(mask.sum()),
+                'value': float(result.total_value[mask].sum()),
+                'percentage': round(int(mask.sum()) / count * 100, 2)
+            }
 
         return {
-            'total_products': len(analyses),
-            'total_value': float(total_value),
-            'total_quantity': float(total_quantity),
-            'average_age_days': average_age,
+            'total_products': count,
+            'total_value': total_value,
+            'total_quantity': float(result.total_quantity.sum()),
+            'average_age_days': int(result.average_age_days.sum() // count),
             'velocity_breakdown': {
-                'fast_moving': {
-                    'count': velocity_counts['FAST'],
-                    'value': float(velocity_values['FAST']),
-                    'percentage': round(velocity_counts['FAST'] / len(analyses) * 100, 2)
-                },
-                'normal_moving': {
-                    'count': velocity_counts['NORMAL'],
-                    'value': float(velocity_values['NORMAL']),
-                    'percentage': round(velocity_counts['NORMAL'] / len(analyses) * 100, 2)
-                },
-                'slow_moving': {
-                    'count': velocity_counts['SLOW'],
-                    'value': float(velocity_values['SLOW']),
-                    'percentage': round(velocity_counts['SLOW'] / len(analyses) * 100, 2)
-                },
-                'non_moving': {
-                    'count': velocity_counts['NON_MOVING'],
-                    'value': float(velocity_values['NON_MOVING']),
-                    'percentage': round(velocity_counts['NON_MOVING'] / len(analyses) * 100, 2)
-                }
+                'fast_moving': velocity('FAST'),
+                'normal_moving': velocity('NORMAL'),
+                'slow_moving': velocity('SLOW'),
+                'non_moving': velocity('NON_MOVING')
             },
             'aging_buckets': [
                 {
                     'name': name,
-                    'quantity': float(data['quantity']),
-                    'value': float(data['value']),
-                    'percentage': round(data['value'] / total_value * 100, 2) if total_value > 0 else 0
+                    'quantity': float(quantity),
+                    'value': float(value),
+                    'percentage': round(float(value) / total_value * 100, 2) if total_value > 0 else 0
                 }
-                for name, data in aggregated_buckets.items()
+                for (name, _, _), quantity, value in zip(
+                    AgingAnalysisService.AGING_BUCKETS, bucket_quantities, bucket_values
+                )
             ]
         }
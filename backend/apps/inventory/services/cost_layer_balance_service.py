@@ -0,0 +1,262 @@
+"""
+Cost Layer Balance Service
+==========================
+
+Maintains the running (qty, value) totals of open cost layers per
+company/item/warehouse/stock state (``CostLayerBalance``).
+
+Every code path that creates, consumes, revalues or re-states cost layers
+reports the change here inside its own transaction, so weighted-average cost
+and inventory value are O(1) reads instead of scans over all open layers.
+"""
+
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+from functools import reduce
+from operator import or_
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from apps.inventory.models import CostLayer, CostLayerBalance, StockLevel
+
+BalanceKey = Tuple[int, int, str]
+QTY_PLACES = Decimal('0.001')
+VALUE_PLACES = Decimal('0.01')
+QTY_FIELD = DecimalField(max_digits=15, decimal_places=3)
+VALUE_FIELD = DecimalField(max_digits=20, decimal_places=2)
+
+
+def quantize_value(value) -> Decimal:
+    """Round a cost amount the way it is stored on CostLayer.cost_remaining."""
+    return Decimal(str(value or 0)).quantize(VALUE_PLACES, rounding=ROUND_HALF_UP)
+
+
+def quantize_qty(qty) -> Decimal:
+    return Decimal(str(qty or 0)).quantize(QTY_PLACES, rounding=ROUND_HALF_UP)
+
+
+class CostLayerBalanceService:
+    """Read and incrementally maintain per item/warehouse cost layer totals."""
+
+    @staticmethod
+    def layer_key(layer: CostLayer) -> BalanceKey:
+        return (layer.budget_item_id, layer.warehouse_id, layer.stock_state)
+
+    @staticmethod
+    def open_contribution(layer: CostLayer) -> Tuple[Decimal, Decimal]:
+        """The (qty, value) a layer adds to its balance row in its current state."""
+        if layer.is_closed:
+            return Decimal('0'), Decimal('0')
+        return quantize_qty(layer.qty_remaining), quantize_value(layer.cost_remaining)
+
+    @classmethod
+    def snapshot(cls, layers: Iterable[CostLayer]) -> Dict[int, Tuple[BalanceKey, Decimal, Decimal]]:
+        """Capture layer contributions before they are modified in memory."""
+        return {layer.pk: (cls.layer_key(layer),) + cls.open_contribution(layer) for layer in layers if layer.pk}
+
+    @classmethod
+    def record_layer_changes(cls, company, layers: Iterable[CostLayer], before=None) -> None:
+        """
+        Apply the difference between the captured and current contributions of ``layers``.
+
+        Layers missing from ``before`` are treated as new.
+        """
+        before = before or {}
+        deltas: Dict[BalanceKey, List[Decimal]] = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+        for layer in layers:
+            if layer.pk in before:
+                old_key, old_qty, old_value = before[layer.pk]
+                deltas[old_key][0] -= old_qty
+                deltas[old_key][1] -= old_value
+            qty, value = cls.open_contribution(layer)
+            key = cls.layer_key(layer)
+            deltas[key][0] += qty
+            deltas[key][1] += value
+        cls.apply_deltas(company, {key: tuple(delta) for key, delta in deltas.items()})
+
+    @classmethod
+    def record_revaluation(cls, company, layers: Iterable[CostLayer], before) -> None:
+        """
+        Record a revaluation of ``layers`` that moves no stock, such as a landed cost.
+
+        Besides the balance rows, the value change is added to the
+        item/warehouse StockLevel rows, which postings keep in step otherwise.
+        """
+        layers = list(layers)
+        value_deltas: Dict[Tuple[int, int], Decimal] = defaultdict(Decimal)
+        for layer in layers:
+            old_value = before[layer.pk][2] if layer.pk in before else Decimal('0')
+            value_deltas[(layer.budget_item_id, layer.warehouse_id)] += cls.open_contribution(layer)[1] - old_value
+        cls.record_layer_changes(company, layers, before)
+
+        value_deltas = {key: value for key, value in value_deltas.items() if key[0] is not None and value}
+        if not value_deltas:
+            return
+        StockLevel.objects.filter(
+            reduce(or_, (Q(budget_item_id=item_id, warehouse_id=warehouse_id) for item_id, warehouse_id in value_deltas)),
+            company_id=getattr(company, 'pk', company),
+        ).update(
+            value=F('value') + Case(
+                *[
+                    When(budget_item_id=item_id, warehouse_id=warehouse_id, then=Value(value))
+                    for (item_id, warehouse_id), value in value_deltas.items()
+                ],
+                default=Value(Decimal('0')),
+                output_field=VALUE_FIELD,
+            ),
+            updated_at=timezone.now(),
+        )
+
+    @staticmethod
+    def apply_deltas(company, deltas: Dict[BalanceKey, Tuple[Decimal, Decimal]]) -> None:
+        """
+        Add (qty, value) deltas to balance rows, creating rows on first use.
+
+        Existing rows are resolved with one query, missing ones are inserted in
+        bulk and all rows are then moved with a single F-expression UPDATE, so
+        the cost does not grow with the number of keys. ``company`` may be a
+        Company instance or its primary key.
+        """
+        deltas = {
+            key: (qty, value) for key, (qty, value) in deltas.items()
+            if key[0] is not None and (qty or value)
+        }
+        if not deltas:
+            return
+        company_id = getattr(company, 'pk', company)
+
+        def resolve(keys):
+            rows = CostLayerBalance.objects.filter(
+                company_id=company_id,
+                budget_item_id__in={key[0] for key in keys},
+                warehouse_id__in={key[1] for key in keys},
+            ).values_list('pk', 'budget_item_id', 'warehouse_id', 'stock_state')
+            return {(item_id, warehouse_id, state): pk for pk, item_id, warehouse_id, state in rows}
+
+        pk_by_key = resolve(deltas)
+        missing = [key for key in deltas if key not in pk_by_key]
+        if missing:
+            CostLayerBalance.objects.bulk_create(
+                [
+                    CostLayerBalance(
+                        company_id=company_id,
+                        budget_item_id=item_id,
+                        warehouse_id=warehouse_id,
+                        stock_state=stock_state,
+                    )
+                    for item_id, warehouse_id, stock_state in missing
+                ],
+                ignore_conflicts=True,
+            )
+            pk_by_key.update(resolve(missing))
+
+        qty_cases = [When(pk=pk_by_key[key], then=Value(qty)) for key, (qty, _) in deltas.items()]
+        value_cases = [When(pk=pk_by_key[key], then=Value(value)) for key, (_, value) in deltas.items()]
+        CostLayerBalance.objects.filter(pk__in=[pk_by_key[key] for key in deltas]).update(
+            qty=F('qty') + Case(*qty_cases, default=Value(Decimal('0')), output_field=QTY_FIELD),
+            value=F('value') + Case(*value_cases, default=Value(Decimal('0')), output_field=VALUE_FIELD),
+            updated_at=timezone.now(),
+        )
+
+    @classmethod
+    @transaction.atomic
+    def move_stock_state(cls, company, layers_qs, new_state: str) -> int:
+        """Change the stock state of a set of layers and move their totals with them."""
+        rows = (
+            layers_qs.filter(is_closed=False)
+            .exclude(stock_state=new_state)
+            .order_by()
+            .values('budget_item_id', 'warehouse_id', 'stock_state')
+            .annotate(qty=Sum('qty_remaining'), value=Sum('cost_remaining'))
+        )
+        deltas: Dict[BalanceKey, List[Decimal]] = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+        for row in rows:
+            deltas[(row['budget_item_id'], row['warehouse_id'], row['stock_state'])][0] -= row['qty']
+            deltas[(row['budget_item_id'], row['warehouse_id'], row['stock_state'])][1] -= row['value']
+            deltas[(row['budget_item_id'], row['warehouse_id'], new_state)][0] += row['qty']
+            deltas[(row['budget_item_id'], row['warehouse_id'], new_state)][1] += row['value']
+        updated = layers_qs.update(stock_state=new_state)
+        cls.apply_deltas(company, {key: tuple(delta) for key, delta in deltas.items()})
+        return updated
+
+    @staticmethod
+    def get_balance(company, product, warehouse, stock_state: str = 'RELEASED') -> Optional[CostLayerBalance]:
+        return CostLayerBalance.objects.filter(
+            company=company, budget_item=product, warehouse=warehouse, stock_state=stock_state
+        ).first()
+
+    @staticmethod
+    def get_totals(company, product, warehouse, stock_state: Optional[str] = None) -> Tuple[Decimal, Decimal]:
+        """Return (qty, value) for one stock state, or across all states when ``stock_state`` is None."""
+        qs = CostLayerBalance.objects.filter(company=company, budget_item=product, warehouse=warehouse)
+        if stock_state is not None:
+            qs = qs.filter(stock_state=stock_state)
+        totals = qs.aggregate(qty=Sum('qty'), value=Sum('value'))
+        return totals['qty'] or Decimal('0'), totals['value'] or Decimal('0')
+
+    @staticmethod
+    def compute_from_layers(company) -> Dict[BalanceKey, Tuple[Decimal, Decimal]]:
+        """Aggregate the open layers of a company into balance totals (one grouped query)."""
+        rows = (
+            CostLayer.objects.filter(company=company, is_closed=False, budget_item__isnull=False)
+            .order_by()
+            .values('budget_item_id', 'warehouse_id', 'stock_state')
+            .annotate(qty=Sum('qty_remaining'), value=Sum('cost_remaining'))
+        )
+        return {
+            (row['budget_item_id'], row['warehouse_id'], row['stock_state']): (row['qty'], row['value'])
+            for row in rows
+        }
+
+    @classmethod
+    @transaction.atomic
+    def rebuild(cls, company, fix: bool = True) -> List[Dict]:
+        """
+        Verify the stored balances of a company against its layers.
+
+        Returns one dict per mismatching key (expected vs stored). With
+        ``fix=True`` the stored balances are replaced by the computed ones.
+        """
+        expected = cls.compute_from_layers(company)
+        stored = {
+            (row.budget_item_id, row.warehouse_id, row.stock_state): row
+            for row in CostLayerBalance.objects.select_for_update().filter(company=company)
+        }
+
+        mismatches = []
+        zero = (Decimal('0'), Decimal('0'))
+        for key in set(expected) | set(stored):
+            exp_qty, exp_value = expected.get(key, zero)
+            row = stored.get(key)
+            cur_qty, cur_value = (row.qty, row.value) if row else zero
+            if exp_qty != cur_qty or exp_value != cur_value:
+                mismatches.append({
+                    'budget_item_id': key[0],
+                    'warehouse_id': key[1],
+                    'stock_state': key[2],
+                    'expected_qty': exp_qty,
+                    'expected_value': exp_value,
+                    'stored_qty': cur_qty,
+                    'stored_value': cur_value,
+                })
+
+        if fix and mismatches:
+            CostLayerBalance.objects.filter(company=company).delete()
+            CostLayerBalance.objects.bulk_create(
+                [
+                    CostLayerBalance(
+                        company=company,
+                        budget_item_id=item_id,
+                        warehouse_id=warehouse_id,
+                        stock_state=stock_state,
+                        qty=qty,
+                        value=value,
+                    )
+                    for (item_id, warehouse_id, stock_state), (qty, value) in expected.items()
+                ],
+                batch_size=1000,
+            )
+        return mismatches
@@ -91,12 +91,12 @@ class ExcelExportService:
             worksheet.column_dimensions[column_letter].width = adjusted_width
 
     @staticmethod
-    def export_aging_report(aging_analyses: List, company_name: str) -> bytes:
+    def export_aging_report(aging_result, company_name: str) -> bytes:
         """
         Export aging analysis to Excel.
 
         Args:
-            aging_analyses: List of ProductAgingAnalysis
+            aging_result: AgingResultSet from AgingAnalysisService.compute_aging
             company_name: Company name for header
 
         Returns:
@@ -126,36 +126,35 @@ class ExcelExportService:
 
         ExcelExportService.style_header_row(ws, 4)
 
-        # Data
-        row_num = 5
-        for analysis in aging_analyses:
-            ws.cell(row=row_num, column=1, value=analysis.product_code)
-            ws.cell(row=row_num, column=2, value=analysis.product_name)
-            ws.cell(row=row_num, column=3, value=analysis.category)
-            ws.cell(row=row_num, column=4, value=float(analysis.total_quantity))
-            ws.cell(row=row_num, column=5, value=float(analysis.total_value))
-            ws.cell(row=row_num, column=6, value=analysis.average_age_days)
-            ws.cell(row=row_num, column=7, value=analysis.oldest_stock_days)
-            ws.cell(row=row_num, column=8, value=analysis.movement_velocity)
-            ws.cell(row=row_num, column=9, value=analysis.days_since_last_movement)
-            ws.cell(row=row_num, column=10, value=analysis.obsolescence_risk)
-            ws.cell(row=row_num, column=11, value=analysis.recommended_action)
-
-            # Color code by risk
-            risk_colors = {
-                'CRITICAL': 'FF0000',
-                'HIGH': 'FFA500',
-                'MEDIUM': 'FFFF00',
-                'LOW': '00FF00'
-            }
-            if analysis.obsolescence_risk in risk_colors:
-                ws.cell(row=row_num, column=10).fill = PatternFill(
-                    start_color=risk_colors[analysis.obsolescence_risk],
-                    end_color=risk_colors[analysis.obsolescence_risk],
-                    fill_type="solid"
-                )
-
-            row_num += 1
+        # Color code by risk
+        risk_fills = {
+            risk: PatternFill(start_color=color, end_color=color, fill_type="solid")
+            for risk, color in (
+                ('CRITICAL', 'FF0000'),
+                ('HIGH', 'FFA500'),
+                ('MEDIUM', 'FFFF00'),
+                ('LOW', '00FF00'),
+            )
+        }
+
+        # Data, read column-wise from the result set
+        rows = zip(
+            aging_result.product_code,
+            aging_result.product_name,
+            aging_result.category,
+            aging_result.total_quantity.tolist(),
+            aging_result.total_value.tolist(),
+            aging_result.average_age_days.tolist(),
+            aging_result.oldest_stock_days.tolist(),
+            aging_result.movement_velocity,
+            aging_result.days_since_last_movement.tolist(),
+            aging_result.obsolescence_risk,
+            aging_result.recommended_action,
+        )
+        for row_num, row in enumerate(rows, 5):
+            ws.append(row)
+            if row[9] in risk_fills:
+                ws.cell(row=row_num, column=10).fill = risk_fills[row[9]]
 
         ExcelExportService.auto_size_columns(ws)
 
@@ -329,12 +328,12 @@ class PDFExportService:
     """
 
     @staticmethod
-    def export_aging_report_pdf(aging_analyses: List, company_name: str) -> bytes:
+    def export_aging_report_pdf(aging_result, company_name: str) -> bytes:
         """
         Export aging analysis to PDF.
 
         Args:
-            aging_analyses: List of ProductAgingAnalysis
+            aging_result: AgingResultSet from AgingAnalysisService.compute_aging
             company_name: Company name
 
         Returns:
@@ -375,15 +374,19 @@ class PDFExportService:
             'Avg Age', 'Velocity', 'Risk'
         ]]
 
-        for analysis in aging_analyses[:50]:  # Limit to 50 for PDF
+        top = aging_result.take(slice(0, 50))  # Limit to 50 for PDF
+        for code, category, qty, value, age, velocity, risk in zip(
+            top.product_code, top.category, top.total_quantity.tolist(), top.total_value.tolist(),
+            top.average_age_days.tolist(), top.movement_velocity, top.obsolescence_risk
+        ):
             data.append([
-                analysis.product_code,
-                analysis.category[:15],
-                f"{float(analysis.total_quantity):.0f}",
-                f"${float(analysis.total_value):,.2f}",
-                f"{analysis.average_age_days}d",
-                analysis.movement_velocity,
-                analysis.obsolescence_risk
+                code,
+                category[:15],
+                f"{qty:.0f}",
+                f"${value:,.2f}",
+                f"{age}d",
+                velocity,
+                risk
             ])
 
         # Create table
@@ -12,6 +12,7 @@ from ..models import (
     GoodsReceipt, GoodsReceiptLine, CostLayer,
     Item, Warehouse
 )
+from .cost_layer_balance_service import CostLayerBalanceService
 
 
 class LandedCostService:
@@ -246,16 +247,20 @@ class LandedCostService:
             grn_line: GoodsReceiptLine instance
             cost_adjustment: Per-unit cost adjustment
         """
-        cost_layers = CostLayer.objects.filter(
+        cost_layers = list(CostLayer.objects.select_for_update().filter(
             goods_receipt_line=grn_line
-        )
+        ))
+        before = CostLayerBalanceService.snapshot(cost_layers)
 
         for layer in cost_layers:
             layer.landed_cost_adjustment = (layer.landed_cost_adjustment or Decimal('0')) + cost_adjustment
+            layer.cost_remaining = (layer.cost_remaining or Decimal('0')) + cost_adjustment * layer.qty_remaining
             layer.adjustment_date = timezone.now()
             layer.adjustment_reason = f"Landed cost applied to GRN#{grn_line.goods_receipt.grn_number}"
             layer.save()
 
+        CostLayerBalanceService.record_revaluation(grn_line.goods_receipt.company_id, cost_layers, before)
+
     @staticmethod
     def _post_to_gl(components, grn):
         """
@@ -383,6 +388,7 @@ class LandedCostService:
         return summary
 
     @staticmethod
+    @transaction.atomic
     def reverse_landed_cost(component_id, reason, reversed_by):
         """
         Reverse a landed cost component.
@@ -415,17 +421,23 @@ class LandedCostService:
 
             # Update cost layers (reverse adjustments)
             for apportionment in component.line_apportionments.all():
-                cost_layers = CostLayer.objects.filter(
+                cost_layers = list(CostLayer.objects.select_for_update().filter(
                     goods_receipt_line=apportionment.goods_receipt_line
-                )
+                ))
+                before = CostLayerBalanceService.snapshot(cost_layers)
                 for layer in cost_layers:
                     layer.landed_cost_adjustment = (
                         (layer.landed_cost_adjustment or Decimal('0')) -
                         apportionment.cost_per_unit_adjustment
                     )
+                    layer.cost_remaining = (
+                        (layer.cost_remaining or Decimal('0')) -
+                        apportionment.cost_per_unit_adjustment * layer.qty_remaining
+                    )
                     layer.adjustment_reason = f"Landed cost reversal: {reason}"
                     layer.adjustment_date = timezone.now()
                     layer.save()
+                CostLayerBalanceService.record_revaluation(component.company_id, cost_layers, before)
 
             # Mark component as reversed
             component.posted_to_gl = False
@@ -183,6 +183,7 @@ class LandedCostVoucherService:
             # Update the cost layer
             cost_layer.cost_per_unit = new_cost_per_unit
             cost_layer.total_cost = cost_layer.quantity * new_cost_per_unit
+            cost_layer.cost_remaining += cost_layer.qty_remaining * cost_per_unit_adjustment
             cost_layer.save()
 
             allocations.append(allocation)
@@ -416,6 +417,7 @@ class LandedCostVoucherService:
         cost_layer = allocation.cost_layer
 
         # Restore original cost per unit
+        cost_layer.cost_remaining -= cost_layer.qty_remaining * (cost_layer.cost_per_unit - allocation.original_cost_per_unit)
         cost_layer.cost_per_unit = allocation.original_cost_per_unit
         cost_layer.total_cost = cost_layer.quantity * cost_layer.cost_per_unit
         cost_layer.save()
@@ -1,13 +1,23 @@
+"""
+Replenishment planning.
+
+Configs are planned in batches: the supply position of all configs (stock
+levels, open purchase order quantities, in-transit transfers and the ranked
+suppliers outside a blackout window) is loaded with one grouped query each
+into in-memory indexes, and reorder points are computed with numpy across
+all configs at once. Multi-warehouse runs can be split into Celery chunks
+with ReplenishmentService.plan_in_chunks.
+"""
 from __future__ import annotations
 
 from collections import defaultdict
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from datetime import date, timedelta
 from decimal import Decimal, ROUND_UP
-from math import sqrt
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
-from datetime import timedelta
-from django.db.models import Sum, Q
+import numpy as np
+from django.db.models import DecimalField, Exists, F, OuterRef, Q, QuerySet, Sum
 from django.utils import timezone
 
 from apps.inventory.models import (
@@ -25,6 +35,8 @@ from apps.procurement.models import (
 )
 from apps.budgeting.models import BudgetLine, CostCenter
 
+ZERO = Decimal('0')
+
 
 @dataclass
 class ReplenishmentSuggestion:
@@ -67,6 +79,16 @@ class ReplenishmentSuggestion:
         }
 
 
+@dataclass
+class SupplyPosition:
+    """Supply of a batch of configs keyed by (budget_item_id, warehouse_id)."""
+    on_hand: Dict[Tuple[int, int], Decimal] = field(default_factory=dict)
+    on_order: Dict[Tuple[int, int], Decimal] = field(default_factory=dict)
+    in_transit: Dict[Tuple[int, int], Decimal] = field(default_factory=dict)
+    # budget_item_id -> best ranked active supplier link outside a blackout window
+    suppliers: Dict[int, ItemSupplier] = field(default_factory=dict)
+
+
 class ReplenishmentService:
     """Advanced reorder planning service."""
 
@@ -78,132 +100,188 @@ class ReplenishmentService:
         PurchaseOrder.Status.PARTIALLY_RECEIVED,
     }
 
-    @staticmethod
-    def _z_score(service_level: Decimal | float | int) -> float:
+    # (minimum service level %, z-score), highest first
+    Z_SCORES = (
+        (99, 2.33),
+        (98, 2.05),
+        (97, 1.88),
+        (96, 1.75),
+        (95, 1.65),
+        (92, 1.41),
+        (90, 1.28),
+    )
+    DEFAULT_Z_SCORE = 1.0
+    DEFAULT_SERVICE_LEVEL = 95
+
+    # Configs per Celery task in chunked planning
+    CHUNK_SIZE = 2000
+
+    @classmethod
+    def _z_score(cls, service_level: Decimal | float | int) -> float:
         try:
-            level = float(service_level or 95)
+            level = float(service_level or cls.DEFAULT_SERVICE_LEVEL)
         except Exception:
-            level = 95.0
-        if level >= 99:
-            return 2.33
-        if level >= 98:
-            return 2.05
-        if level >= 97:
-            return 1.88
-        if level >= 96:
-            return 1.75
-        if level >= 95:
-            return 1.65
-        if level >= 92:
-            return 1.41
-        if level >= 90:
-            return 1.28
-        return 1.0
+            level = float(cls.DEFAULT_SERVICE_LEVEL)
+        for threshold, z_score in cls.Z_SCORES:
+            if level >= threshold:
+                return z_score
+        return cls.DEFAULT_Z_SCORE
+
+    @classmethod
+    def calculate_rops(cls, configs: Sequence[ItemWarehouseConfig]) -> List[Decimal]:
+        """
+        Reorder points of many configs, computed as arrays.
+
+        ROP = demand * lead time + z * sqrt(lead time * demand std^2 + demand^2 * lead time std^2),
+        floored at the configured reorder point.
+
+        Args:
+            configs: ItemWarehouseConfig instances
+
+        Returns:
+            Reorder points in config order, rounded to 3 decimals
+        """
+        fields = np.array([
+            (
+                cfg.avg_daily_demand or 0,
+                cfg.lead_time_days or 0,
+                cfg.demand_std_dev or 0,
+                cfg.lead_time_std_dev or 0,
+                cfg.service_level_pct or cls.DEFAULT_SERVICE_LEVEL,
+                cfg.reorder_point or 0,
+            )
+            for cfg in configs
+        ], dtype=float).reshape(-1, 6)
+        demand, lead_time, demand_std, lead_time_std, service_level, reorder_point = fields.T
+
+        z_scores = np.select(
+            [service_level >= threshold for threshold, _ in cls.Z_SCORES],
+            [z_score for _, z_score in cls.Z_SCORES],
+            cls.DEFAULT_Z_SCORE,
+        )
+        variance = np.maximum(lead_time * demand_std ** 2 + demand ** 2 * lead_time_std ** 2, 0.0)
+        rops = np.maximum(np.round(demand * lead_time + z_scores * np.sqrt(variance), 3), reorder_point)
+        return [Decimal(f"{rop:.3f}") for rop in rops]
 
     @classmethod
     def _calculate_rop(cls, cfg: ItemWarehouseConfig) -> Decimal:
-        avg_demand = cfg.avg_daily_demand or Decimal('0')
-        lt_days = Decimal(cfg.lead_time_days or 0)
-        demand_std = cfg.demand_std_dev or Decimal('0')
-        lt_std = Decimal(cfg.lead_time_std_dev or 0)
-
-        base = avg_demand * lt_days
-        variance = (lt_days * (demand_std ** 2)) + ((avg_demand ** 2) * (lt_std ** 2))
-        variance_float = max(float(variance), 0.0)
-        safety = Decimal(str(cls._z_score(cfg.service_level_pct))) * Decimal(str(sqrt(variance_float)))
-        rop = (base + safety).quantize(Decimal('0.001'))
-        return max(rop, cfg.reorder_point or Decimal('0'))
+        return cls.calculate_rops([cfg])[0]
 
     @staticmethod
-    def _on_hand(company, item, warehouse) -> Decimal:
-        qty = StockLevel.objects.filter(
+    def planning_configs(company, warehouse_ids: Optional[Iterable[int]] = None) -> QuerySet:
+        """Active auto-replenished warehouse configs of a company."""
+        configs = ItemWarehouseConfig.objects.filter(
             company=company,
-            item=item,
-            warehouse=warehouse
-        ).aggregate(value=Sum('quantity'))['value'] or Decimal('0')
-        return qty
+            auto_replenish=True,
+            is_active=True,
+            warehouse__isnull=False,
+        )
+        if warehouse_ids:
+            configs = configs.filter(warehouse_id__in=list(warehouse_ids))
+        return configs
 
     @classmethod
-    def _on_order(cls, company, item, warehouse) -> Decimal:
-        qs = PurchaseOrderLine.objects.filter(
+    def load_supply_position(cls, company, configs: QuerySet, as_of: Optional[date] = None) -> SupplyPosition:
+        """
+        Load the supply position of all configs with four grouped queries.
+
+        Args:
+            company: Company instance
+            configs: ItemWarehouseConfig queryset (used as a subquery)
+            as_of: Date for supplier blackout windows (default: today)
+
+        Returns:
+            SupplyPosition
+        """
+        as_of = as_of or timezone.localdate()
+        item_ids = configs.order_by().values('budget_item_id')
+        warehouse_ids = configs.order_by().values('warehouse_id')
+        position = SupplyPosition()
+
+        levels = StockLevel.objects.filter(
+            company=company,
+            budget_item_id__in=item_ids,
+            warehouse_id__in=warehouse_ids,
+        ).order_by().values('budget_item_id', 'warehouse_id').annotate(qty=Sum('quantity'))
+        for row in levels:
+            position.on_hand[(row['budget_item_id'], row['warehouse_id'])] = row['qty'] or ZERO
+
+        open_lines = PurchaseOrderLine.objects.filter(
             purchase_order__company=company,
-            purchase_order__delivery_address=warehouse,
+            purchase_order__delivery_address_id__in=warehouse_ids,
             purchase_order__status__in=cls.ACTIVE_PO_STATUSES,
-            product=item,
+            product__budget_item_id__in=item_ids,
+        ).order_by().values('product__budget_item_id', 'purchase_order__delivery_address_id').annotate(
+            qty=Sum(F('quantity') - F('received_quantity'), output_field=DecimalField(max_digits=15, decimal_places=3))
         )
-        qty = Decimal('0')
-        for line in qs:
-            qty += (line.quantity or Decimal('0')) - (line.received_quantity or Decimal('0'))
-        return max(qty, Decimal('0'))
+        for row in open_lines:
+            key = (row['product__budget_item_id'], row['purchase_order__delivery_address_id'])
+            position.on_order[key] = max(row['qty'] or ZERO, ZERO)
 
-    @staticmethod
-    def _in_transit(company, item, warehouse) -> Decimal:
-        qty = InTransitShipmentLine.objects.filter(
+        transit = InTransitShipmentLine.objects.filter(
             company=company,
-            item=item,
-            to_warehouse=warehouse,
-        ).aggregate(value=Sum('quantity'))['value'] or Decimal('0')
-        return qty
-
-    @staticmethod
-    def _supplier_blackout(supplier, target_date) -> bool:
-        return SupplierBlackoutWindow.objects.filter(
-            supplier=supplier,
-            start_date__lte=target_date,
-            end_date__gte=target_date,
-        ).exists()
+            budget_item_id__in=item_ids,
+            to_warehouse_id__in=warehouse_ids,
+        ).order_by().values('budget_item_id', 'to_warehouse_id').annotate(qty=Sum('quantity'))
+        for row in transit:
+            position.in_transit[(row['budget_item_id'], row['to_warehouse_id'])] = row['qty'] or ZERO
+
+        blackouts = SupplierBlackoutWindow.objects.filter(
+            supplier=OuterRef('supplier_id'),
+            start_date__lte=as_of,
+            end_date__gte=as_of,
+        )
+        links = ItemSupplier.objects.select_related('supplier').filter(
+            company=company,
+            budget_item_id__in=item_ids,
+            is_active=True,
+        ).filter(~Exists(blackouts)).order_by('budget_item_id', 'preferred_rank', 'supplier_id')
+        for link in links:
+            position.suppliers.setdefault(link.budget_item_id, link)
 
-    @classmethod
-    def _pick_supplier(cls, item) -> Optional[ItemSupplier]:
-        today = timezone.now().date()
-        suppliers = item.supplier_links.select_related('supplier').filter(is_active=True).order_by('preferred_rank')
-        for link in suppliers:
-            if cls._supplier_blackout(link.supplier, today):
-                continue
-            return link
-        return None
+        return position
 
     @classmethod
-    def _build_suggestion(cls, cfg: ItemWarehouseConfig) -> Optional[ReplenishmentSuggestion]:
-        if not cfg.warehouse or not cfg.item or not cfg.auto_replenish:
+    def _build_suggestion(
+        cls,
+        cfg: ItemWarehouseConfig,
+        rop: Decimal,
+        position: SupplyPosition
+    ) -> Optional[ReplenishmentSuggestion]:
+        if not cfg.warehouse or not cfg.budget_item or not cfg.auto_replenish:
             return None
 
-        company = cfg.company
-        item = cfg.item
+        budget_item = cfg.budget_item
         warehouse = cfg.warehouse
-
-        budget_item = getattr(cfg, 'budget_item', None) or getattr(cfg.budget_item, 'budget_item', None)
-        fallback_code = budget_item.code if budget_item else item.code
-        fallback_name = budget_item.name if budget_item else item.name
-        rop = cls._calculate_rop(cfg)
-        on_hand = cls._on_hand(company, item, warehouse)
-        on_order = cls._on_order(company, item, warehouse)
-        in_transit = cls._in_transit(company, item, warehouse)
+        key = (cfg.budget_item_id, cfg.warehouse_id)
+        on_hand = position.on_hand.get(key, ZERO)
+        on_order = position.on_order.get(key, ZERO)
+        in_transit = position.in_transit.get(key, ZERO)
         available = on_hand + on_order + in_transit
 
         if available > rop:
             return None
 
-        supplier_link = cls._pick_supplier(item)
+        supplier_link = position.suppliers.get(cfg.budget_item_id)
         if not supplier_link:
             return ReplenishmentSuggestion(
                 config=cfg,
-                item_code=fallback_code,
-                item_name=fallback_name,
+                item_code=budget_item.code,
+                item_name=budget_item.name,
                 warehouse_name=warehouse.name,
                 on_hand=on_hand,
                 on_order=on_order,
                 in_transit=in_transit,
                 rop=rop,
-                recommended_qty=Decimal('0'),
+                recommended_qty=ZERO,
                 supplier=None,
                 reason='No active supplier available',
             )
 
         shortfall = rop - available
-        recommended = max(shortfall, cfg.economic_order_qty or Decimal('0'), Decimal('0'))
-        supplier_moq = supplier_link.moq_qty or Decimal('0')
-        supplier_multiple = supplier_link.multiple_qty or Decimal('0')
+        recommended = max(shortfall, cfg.economic_order_qty or ZERO, ZERO)
+        supplier_moq = supplier_link.moq_qty or ZERO
+        supplier_multiple = supplier_link.multiple_qty or ZERO
         if supplier_moq > 0:
             recommended = max(recommended, supplier_moq)
         if supplier_multiple > 0:
@@ -218,8 +296,8 @@ class ReplenishmentService:
 
         return ReplenishmentSuggestion(
             config=cfg,
-            item_code=fallback_code,
-            item_name=fallback_name,
+            item_code=budget_item.code,
+            item_name=budget_item.name,
             warehouse_name=warehouse.name,
             on_hand=on_hand,
             on_order=on_order,
@@ -228,28 +306,69 @@ class ReplenishmentService:
             recommended_qty=recommended,
             supplier=supplier_link,
             reason='ROP breached',
-            budget_item_code=budget_item.code if budget_item else None,
+            budget_item_code=budget_item.code,
         )
 
+    @classmethod
+    def plan(cls, company, configs: QuerySet, as_of: Optional[date] = None) -> List[ReplenishmentSuggestion]:
+        """
+        Plan a batch of configs in five queries regardless of its size.
+
+        Args:
+            company: Company instance
+            configs: ItemWarehouseConfig queryset
+            as_of: Planning date (default: today)
+
+        Returns:
+            List of ReplenishmentSuggestion, in config order
+        """
+        batch = list(configs.select_related('item', 'warehouse', 'budget_item'))
+        if not batch:
+            return []
+        position = cls.load_supply_position(company, configs, as_of=as_of)
+        suggestions = (
+            cls._build_suggestion(cfg, rop, position)
+            for cfg, rop in zip(batch, cls.calculate_rops(batch))
+        )
+        return [suggestion for suggestion in suggestions if suggestion]
+
     @classmethod
     def get_suggestions(cls, company, warehouse_id=None) -> List[dict]:
         if not company:
             return []
-        configs = ItemWarehouseConfig.objects.select_related('item', 'warehouse').filter(
-            company=company,
-            auto_replenish=True,
-            is_active=True,
-            warehouse__isnull=False,
-        )
-        if warehouse_id:
-            configs = configs.filter(warehouse_id=warehouse_id)
+        configs = cls.planning_configs(company, [warehouse_id] if warehouse_id else None)
+        return [suggestion.as_dict() for suggestion in cls.plan(company, configs.order_by('id'))]
+
+    @classmethod
+    def plan_in_chunks(cls, company, warehouse_ids: Optional[Iterable[int]] = None, chunk_size: Optional[int] = None):
+        """
+        Plan a multi-warehouse run as a group of Celery tasks.
+
+        Config ids are ordered by warehouse so each chunk covers few
+        warehouses. Each task returns the suggestion dicts of its chunk.
+
+        Args:
+            company: Company instance
+            warehouse_ids: Optional warehouses to plan (default: all)
+            chunk_size: Configs per task (default: CHUNK_SIZE)
 
-        results = []
-        for cfg in configs:
-            suggestion = cls._build_suggestion(cfg)
-            if suggestion:
-                results.append(suggestion.as_dict())
-        return results
+        Returns:
+            Saved celery GroupResult
+        """
+        from celery import group
+
+        from apps.inventory.tasks import plan_replenishment_chunk
+
+        chunk_size = chunk_size or cls.CHUNK_SIZE
+        config_ids = list(
+            cls.planning_configs(company, warehouse_ids).order_by('warehouse_id', 'id').values_list('id', flat=True)
+        )
+        result = group(
+            plan_replenishment_chunk.s(company.id, config_ids[start:start + chunk_size])
+            for start in range(0, len(config_ids), chunk_size)
+        ).apply_async()
+        result.save()
+        return result
 
     @classmethod
     def _resolve_budget_line(cls, company, item):
@@ -274,22 +393,26 @@ class ReplenishmentService:
         if not company or not user or not config_ids:
             return {'created': [], 'skipped': [{'reason': 'Missing company, user, or config IDs'}]}
 
-        configs = ItemWarehouseConfig.objects.select_related('item', 'warehouse').filter(
+        configs = ItemWarehouseConfig.objects.filter(
             company=company,
             id__in=config_ids,
             auto_replenish=True,
             warehouse__isnull=False,
-        )
+        ).order_by('id')
+        planned = {suggestion.config.id: suggestion for suggestion in cls.plan(company, configs)}
 
         suggestions = []
         skips = []
-        for cfg in configs:
-            suggestion = cls._build_suggestion(cfg)
+        for cfg_id in configs.values_list('id', flat=True):
+            suggestion = planned.get(cfg_id)
             if not suggestion:
-                skips.append({'config_id': cfg.id, 'reason': 'No replenishment needed'})
+                skips.append({'config_id': cfg_id, 'reason': 'No replenishment needed'})
                 continue
             if suggestion.recommended_qty <= 0 or not suggestion.supplier:
-                skips.append({'config_id': cfg.id, 'reason': suggestion.reason or 'Invalid quantity'})
+                skips.append({'config_id': cfg_id, 'reason': suggestion.reason or 'Invalid quantity'})
+                continue
+            if not suggestion.config.item_id:
+                skips.append({'config_id': cfg_id, 'reason': 'No inventory item linked'})
                 continue
             suggestions.append(suggestion)
 
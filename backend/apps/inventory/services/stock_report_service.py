@@ -0,0 +1,132 @@
+"""
+Stock Report Service
+====================
+
+Stock valuation and stock card reports read straight from the stock ledger.
+
+Every ledger row carries the running ``balance_qty``/``balance_value`` of its
+item/warehouse, taken from the locked ``StockLevel`` row at posting time, so
+the balance at any point is the *tail* of the ledger (the last row posted up
+to that point) rather than a recomputation over cost layers.
+"""
+
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Optional
+
+from django.db.models import Max
+
+from apps.inventory.models import StockLedger
+
+
+class StockReportService:
+    """Ledger-tail based stock reports."""
+
+    @staticmethod
+    def ledger_tail(company, as_of_date: Optional[date] = None, warehouse=None):
+        """
+        Latest ledger row per item/warehouse (in posting order) dated on or before ``as_of_date``.
+
+        Returns a queryset resolved with a single query; the latest row ids
+        are selected in a subquery.
+        """
+        qs = StockLedger.objects.filter(company=company)
+        if as_of_date is not None:
+            qs = qs.filter(transaction_date__date__lte=as_of_date)
+        if warehouse is not None:
+            qs = qs.filter(warehouse=warehouse)
+        tail_ids = qs.order_by().values('budget_item_id', 'warehouse_id').annotate(last_id=Max('id')).values('last_id')
+        return StockLedger.objects.filter(id__in=tail_ids)
+
+    @classmethod
+    def valuation_report(cls, company, as_of_date: Optional[date] = None, warehouse=None) -> Dict:
+        """
+        Stock valuation per item/warehouse as of a date (default: now).
+
+        The result has the shape expected by ``ExcelExportService.export_valuation_report``.
+        """
+        rows = (
+            cls.ledger_tail(company, as_of_date, warehouse)
+            .exclude(balance_qty=0, balance_value=0)
+            .order_by('budget_item__code', 'warehouse__code')
+            .values(
+                'budget_item_id', 'budget_item__code', 'budget_item__name',
+                'warehouse_id', 'warehouse__code', 'balance_qty', 'balance_value',
+                'valuation_method_used', 'transaction_date',
+            )
+        )
+        items = []
+        total_qty = Decimal('0')
+        total_value = Decimal('0')
+        for row in rows:
+            qty = row['balance_qty']
+            value = row['balance_value']
+            items.append({
+                'product_id': row['budget_item_id'],
+                'product_code': row['budget_item__code'],
+                'product_name': row['budget_item__name'],
+                'warehouse_id': row['warehouse_id'],
+                'warehouse_code': row['warehouse__code'],
+                'quantity': qty,
+                'unit_cost': (value / qty).quantize(Decimal('0.01')) if qty else Decimal('0'),
+                'total_value': value,
+                'method': row['valuation_method_used'],
+                'last_movement_date': row['transaction_date'],
+            })
+            total_qty += qty
+            total_value += value
+
+        return {
+            'as_of_date': as_of_date,
+            'items': items,
+            'summary': {
+                'item_count': len(items),
+                'total_quantity': total_qty,
+                'total_value': total_value,
+            },
+        }
+
+    @staticmethod
+    def stock_card(company, item, warehouse, date_from: Optional[date] = None, date_to: Optional[date] = None) -> Dict:
+        """
+        Movements of one item in one warehouse with running balances.
+
+        The opening balance is the tail of the ledger before ``date_from``;
+        each movement row already carries its closing balance.
+        """
+        ledger = StockLedger.objects.filter(company=company, budget_item=item, warehouse=warehouse)
+
+        opening_qty = Decimal('0')
+        opening_value = Decimal('0')
+        if date_from is not None:
+            opening = (
+                ledger.filter(transaction_date__date__lt=date_from)
+                .order_by('-id')
+                .values('balance_qty', 'balance_value')
+                .first()
+            )
+            if opening:
+                opening_qty, opening_value = opening['balance_qty'], opening['balance_value']
+            ledger = ledger.filter(transaction_date__date__gte=date_from)
+        if date_to is not None:
+            ledger = ledger.filter(transaction_date__date__lte=date_to)
+
+        entries = list(
+            ledger.order_by('id').values(
+                'id', 'transaction_date', 'transaction_type', 'source_document_type', 'source_document_id',
+                'quantity', 'rate', 'value', 'balance_qty', 'balance_value', 'valuation_method_used',
+            )
+        )
+        closing = entries[-1] if entries else {'balance_qty': opening_qty, 'balance_value': opening_value}
+
+        return {
+            'item_id': getattr(item, 'pk', item),
+            'warehouse_id': getattr(warehouse, 'pk', warehouse),
+            'date_from': date_from,
+            'date_to': date_to,
+            'opening_qty': opening_qty,
+            'opening_value': opening_value,
+            'entries': entries,
+            'closing_qty': closing['balance_qty'],
+            'closing_value': closing['balance_value'],
+        }
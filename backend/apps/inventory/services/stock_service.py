@@ -1,19 +1,27 @@
 
+from collections import defaultdict
 from decimal import Decimal
 from django.db import transaction
 from django.utils import timezone
 
-from ..models import StockMovement, StockMovementLine, StockLedger, StockLevel, MovementEvent, InTransitShipmentLine
+from ..models import (
+    StockMovement, StockMovementLine, StockLedger, StockLevel, MovementEvent, InTransitShipmentLine,
+    ItemValuationMethod,
+)
+from .cost_layer_balance_service import QTY_FIELD, VALUE_FIELD, quantize_value
 from .valuation_service import ValuationService
 from .uom_service import UoMConversionService
 from shared.event_bus import event_bus
-from django.db.models import Sum
+from django.db.models import Case, F, Sum, Value, When
 
 class InventoryService:
     """
     Service layer for handling all inventory transactions.
     """
 
+    # Documents with at least this many lines are posted through the bulk pipeline
+    BULK_POSTING_MIN_LINES = 50
+
     @staticmethod
     @transaction.atomic
     def receive_goods_against_po(goods_receipt):
@@ -171,6 +179,7 @@ class InventoryService:
         - Publishes 'stock.landed_cost_adjustment' with account-wise breakdown
         """
         from ..models import CostLayer
+        from .cost_layer_balance_service import CostLayerBalanceService
         from django.utils import timezone
         # Normalize inputs
         try:
@@ -180,13 +189,14 @@ class InventoryService:
         if total_adj == 0:
             return {'inventory_adjustment': 0.0, 'consumed_adjustment': 0.0}
 
-        layers = list(CostLayer.objects.select_related('product__inventory_account', 'product__expense_account').filter(
+        layers = list(CostLayer.objects.select_for_update(of=('self',)).select_related('budget_item').filter(
             company=goods_receipt.company,
             source_document_type='GoodsReceipt',
             source_document_id=goods_receipt.id,
         ))
         if not layers:
             raise ValueError('No cost layers found for this Goods Receipt')
+        before = CostLayerBalanceService.snapshot(layers)
 
         if method == 'VALUE':
             base_total = sum((layer.total_cost or Decimal('0')) for layer in layers)
@@ -222,13 +232,15 @@ class InventoryService:
             layer.save(update_fields=['landed_cost_adjustment', 'adjustment_date', 'adjustment_reason', 'cost_remaining'])
 
             # Aggregate by accounts
-            inv_acct_id = layer.product.inventory_account_id
-            cogs_acct_id = layer.product.expense_account_id
+            inv_acct_id = layer.budget_item.inventory_account_id if layer.budget_item else None
+            cogs_acct_id = layer.budget_item.expense_account_id if layer.budget_item else None
             inv_by_account[inv_acct_id] = inv_by_account.get(inv_acct_id, Decimal('0')) + adj_remaining
             cogs_by_account[cogs_acct_id] = cogs_by_account.get(cogs_acct_id, Decimal('0')) + adj_consumed
             inventory_total += adj_remaining
             consumed_total += adj_consumed
 
+        CostLayerBalanceService.record_revaluation(goods_receipt.company, layers, before)
+
         # Publish event for finance to post JV: Dr Inventory (remaining), Dr COGS (consumed), Cr Accrued Freight
         event_bus.publish(
             'stock.landed_cost_adjustment',
@@ -297,16 +309,29 @@ class InventoryService:
         *,
         receipt_source: tuple | None = None,
         receipt_stock_state: str | None = None,
+        bulk: bool | None = None,
     ):
         """
         Posts a stock movement to the StockLedger, updates stock levels,
         creates/consumes cost layers based on valuation method, and publishes an event.
 
         ENHANCED: Now integrates with ValuationService for accurate costing.
+
+        ``bulk`` selects the batch pipeline (``_post_stock_movement_bulk``);
+        by default it is used for documents with BULK_POSTING_MIN_LINES or more lines.
         """
         if movement.status != 'DRAFT':
             raise ValueError("Stock movement must be in DRAFT status to be posted.")
 
+        if bulk is None:
+            bulk = movement.lines.count() >= InventoryService.BULK_POSTING_MIN_LINES
+        if bulk:
+            return InventoryService._post_stock_movement_bulk(
+                movement,
+                receipt_source=receipt_source,
+                receipt_stock_state=receipt_stock_state,
+            )
+
         reference_type = receipt_source[0] if receipt_source else 'StockMovement'
         reference_id = receipt_source[1] if receipt_source else movement.id
 
@@ -451,6 +476,10 @@ class InventoryService:
                 event=event,
             )
 
+        return InventoryService._complete_posting(movement)
+
+    @staticmethod
+    def _complete_posting(movement: StockMovement):
         # 3. Update movement status
         if movement.movement_type == 'TRANSFER':
             movement.status = 'IN_TRANSIT'
@@ -467,6 +496,250 @@ class InventoryService:
 
         return movement
 
+    @staticmethod
+    @transaction.atomic
+    def _post_stock_movement_bulk(
+        movement: StockMovement,
+        *,
+        receipt_source: tuple | None = None,
+        receipt_stock_state: str | None = None,
+    ):
+        """
+        Batch variant of ``_post_stock_movement`` for documents with many lines.
+
+        Valuation methods and stock levels for all lines are loaded up front
+        (stock levels locked once), receipt cost layers, movement events,
+        ledger rows and in-transit records are written with ``bulk_create``
+        and stock levels (quantity and value) are moved with a single
+        F-expression UPDATE. Issues
+        consume cost layers once per item for the document's total quantity
+        and split the consumed layers over the item's lines.
+        """
+        company = movement.company
+        reference_type = receipt_source[0] if receipt_source else 'StockMovement'
+        reference_id = receipt_source[1] if receipt_source else movement.id
+        is_transfer = movement.movement_type == 'TRANSFER'
+        is_receipt = movement.movement_type not in ('ISSUE', 'TRANSFER')
+        warehouse = movement.to_warehouse if is_receipt else movement.from_warehouse
+        sign = Decimal('1') if is_receipt else Decimal('-1')
+        event_type = InventoryService._derive_event_type(movement.movement_type, is_receipt)
+
+        lines = list(
+            movement.lines.select_related('budget_item__uom', 'entered_uom', 'cost_center', 'project')
+            .order_by('line_number', 'id')
+        )
+        item_ids = {line.budget_item_id for line in lines}
+
+        methods = {}
+        for method in ItemValuationMethod.objects.filter(
+            company=company,
+            budget_item_id__in=item_ids,
+            warehouse=warehouse,
+            effective_date__lte=timezone.now().date(),
+            is_active=True,
+        ).order_by('budget_item_id', '-effective_date'):
+            methods.setdefault(method.budget_item_id, method)
+
+        valuation_used = {}
+        consumed_detail = {}
+        if is_receipt:
+            try:
+                with transaction.atomic():
+                    ValuationService.create_cost_layers_bulk(
+                        company,
+                        warehouse,
+                        [
+                            {
+                                'product': line.budget_item,
+                                'qty': line.quantity,
+                                'cost_per_unit': line.rate,
+                                'source_document_type': reference_type,
+                                'source_document_id': reference_id,
+                                'batch_no': line.batch_no,
+                                'serial_no': line.serial_no,
+                                'expiry_date': line.expiry_date,
+                            }
+                            for line in lines
+                        ],
+                        stock_state=(receipt_stock_state or 'RELEASED'),
+                    )
+                for line in lines:
+                    method = methods.get(line.budget_item_id)
+                    valuation_used[line.pk] = method.valuation_method if method else 'FIFO'
+            except Exception as exc:
+                print(f"Warning: ValuationService error on bulk receipt: {exc}")
+                valuation_used = {line.pk: 'SIMPLE' for line in lines}
+        else:
+            lines_by_item = defaultdict(list)
+            for line in lines:
+                lines_by_item[line.budget_item_id].append(line)
+
+            def consume(item_lines, qty):
+                return ValuationService.consume_cost_layers(
+                    company=company,
+                    item=item_lines[0].budget_item,
+                    warehouse=warehouse,
+                    qty=qty,
+                    source_document_type='StockMovement',
+                    source_document_id=movement.id,
+                    valuation_method=methods.get(item_lines[0].budget_item_id),
+                )
+
+            repriced = []
+            for item_lines in lines_by_item.values():
+                # One consumption per item; the layers are then split over its lines in line order
+                try:
+                    _, consumed_layers, method_used = consume(item_lines, sum(line.quantity for line in item_lines))
+                    splits = InventoryService._split_consumed_layers(consumed_layers, [line.quantity for line in item_lines])
+                except ValueError:
+                    # Not enough stock for all lines: consume line by line so earlier lines are still costed
+                    splits, method_used = [], None
+                    for line in item_lines:
+                        try:
+                            total_cost, consumed_layers, method_used = consume([line], line.quantity)
+                            splits.append((consumed_layers, total_cost))
+                        except ValueError as exc:
+                            print(f"Warning: ValuationService error on issue: {exc}")
+                            splits.append((None, None))
+
+                for line, (line_layers, line_cost) in zip(item_lines, splits):
+                    if line_layers is None:
+                        valuation_used[line.pk] = 'SIMPLE'
+                        continue
+                    valuation_used[line.pk] = method_used
+                    consumed_detail[line.pk] = line_layers
+                    line.rate = line_cost / line.quantity
+                    repriced.append(line)
+            if repriced:
+                StockMovementLine.objects.bulk_update(repriced, ['rate'])
+
+        levels = InventoryService._lock_stock_levels(company, warehouse, item_ids)
+        running = {item_id: [level.quantity, level.value] for item_id, level in levels.items()}
+
+        events = [
+            InventoryService._build_movement_event(
+                movement=movement,
+                line=line,
+                warehouse=warehouse,
+                qty_change=sign * line.quantity,
+                event_type=event_type,
+                valuation_method=valuation_used.get(line.pk),
+                reference_type=reference_type,
+                reference_id=reference_id,
+            )
+            for line in lines
+        ]
+        MovementEvent.objects.bulk_create(events, batch_size=500)
+
+        ledger_entries = []
+        deltas = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+        for line, event in zip(lines, events):
+            quantity_change = sign * line.quantity
+            value_change = quantize_value(quantity_change * line.rate)
+            balance = running[line.budget_item_id]
+            balance[0] += quantity_change
+            balance[1] += value_change
+            delta = deltas[levels[line.budget_item_id].pk]
+            delta[0] += quantity_change
+            delta[1] += value_change
+            ledger_entries.append(InventoryService._build_ledger_entry(
+                movement=movement,
+                line=line,
+                warehouse=warehouse,
+                quantity_change=quantity_change,
+                value_change=value_change,
+                balance_qty=balance[0],
+                balance_value=balance[1],
+                line_cost_center=line.cost_center or movement.cost_center,
+                line_project=line.project or movement.project,
+                valuation_method_used=valuation_used.get(line.pk),
+                layer_consumed_detail=consumed_detail.get(line.pk),
+                event=event,
+            ))
+        StockLedger.objects.bulk_create(ledger_entries, batch_size=500)
+
+        StockLevel.objects.filter(pk__in=deltas).update(
+            quantity=F('quantity') + Case(
+                *[When(pk=pk, then=Value(qty)) for pk, (qty, _) in deltas.items()],
+                default=Value(Decimal('0')),
+                output_field=QTY_FIELD,
+            ),
+            value=F('value') + Case(
+                *[When(pk=pk, then=Value(value)) for pk, (_, value) in deltas.items()],
+                default=Value(Decimal('0')),
+                output_field=VALUE_FIELD,
+            ),
+            updated_at=timezone.now(),
+        )
+
+        if is_transfer:
+            InTransitShipmentLine.objects.filter(movement=movement).delete()
+            InTransitShipmentLine.objects.bulk_create(
+                [
+                    InTransitShipmentLine(
+                        company=company,
+                        movement=movement,
+                        movement_line=line,
+                        budget_item=line.budget_item,
+                        from_warehouse=movement.from_warehouse,
+                        to_warehouse=movement.to_warehouse,
+                        quantity=line.quantity,
+                        rate=line.rate,
+                        batch_no=line.batch_no,
+                        serial_no=line.serial_no,
+                        cost_center=line.cost_center or movement.cost_center,
+                        project=line.project or movement.project,
+                        movement_event=event,
+                    )
+                    for line, event in zip(lines, events)
+                ],
+                batch_size=500,
+            )
+            event_bus.publish('stock.transfer_out', stock_movement_id=movement.id)
+
+        return InventoryService._complete_posting(movement)
+
+    @staticmethod
+    def _split_consumed_layers(consumed_layers, quantities):
+        """
+        Split the layer detail of one consumption into consecutive per-line parts.
+
+        Returns [(layer_detail, cost)] per quantity, consuming the layers in
+        the order they were consumed, which is what consecutive per-line
+        consumption would have produced.
+        """
+        pending = [dict(detail, qty_consumed=Decimal(str(detail['qty_consumed']))) for detail in consumed_layers]
+        position = 0
+        splits = []
+        for quantity in quantities:
+            needed = quantity
+            parts = []
+            cost = Decimal('0')
+            while needed > 0 and position < len(pending):
+                detail = pending[position]
+                taken = min(needed, detail['qty_consumed'])
+                part_cost = taken * Decimal(str(detail['cost_per_unit']))
+                parts.append(dict(detail, qty_consumed=float(taken), cost_total=float(part_cost)))
+                cost += part_cost
+                detail['qty_consumed'] -= taken
+                needed -= taken
+                if detail['qty_consumed'] <= 0:
+                    position += 1
+            splits.append((parts, cost))
+        return splits
+
+    @staticmethod
+    def _lock_stock_levels(company, warehouse, item_ids) -> dict:
+        """Return {budget_item_id: StockLevel} for the items, creating missing rows and locking all of them."""
+        StockLevel.objects.bulk_create(
+            [StockLevel(company=company, budget_item_id=item_id, warehouse=warehouse) for item_id in item_ids],
+            ignore_conflicts=True,
+        )
+        levels = StockLevel.objects.select_for_update().filter(
+            company=company, warehouse=warehouse, budget_item_id__in=item_ids
+        ).order_by('id')
+        return {level.budget_item_id: level for level in levels}
+
     @staticmethod
     def _derive_event_type(movement_type: str, is_receipt: bool) -> str:
         if movement_type == 'ADJUSTMENT':
@@ -490,33 +763,58 @@ class InventoryService:
         reference_id: int,
     ):
         try:
-            return MovementEvent.objects.create(
-                company=movement.company,
+            event = InventoryService._build_movement_event(
                 movement=movement,
-                movement_line=line,
-                item=line.budget_item,
+                line=line,
                 warehouse=warehouse,
-                event_type=event_type,
                 qty_change=qty_change,
-                stock_uom=line.budget_item.uom,
-                source_uom=line.entered_uom or line.budget_item.uom,
-                source_quantity=line.entered_quantity,
-                event_date=movement.movement_date,
-                reference_document_type=reference_type,
-                reference_document_id=reference_id,
-                reference_number=movement.movement_number or movement.reference or '',
-                cost_per_unit_at_event=line.rate,
-                valuation_method_used=valuation_method or '',
-                event_metadata={
-                    'stock_movement_id': movement.id,
-                    'stock_movement_line_id': line.id,
-                    'movement_type': movement.movement_type,
-                },
+                event_type=event_type,
+                valuation_method=valuation_method,
+                reference_type=reference_type,
+                reference_id=reference_id,
             )
+            event.save()
+            return event
         except Exception as exc:
             print(f"Warning: failed to record movement event for movement {movement.id}: {exc}")
             return None
 
+    @staticmethod
+    def _build_movement_event(
+        *,
+        movement,
+        line,
+        warehouse,
+        qty_change,
+        event_type: str,
+        valuation_method: str | None,
+        reference_type: str,
+        reference_id: int,
+    ) -> MovementEvent:
+        return MovementEvent(
+            company=movement.company,
+            movement=movement,
+            movement_line=line,
+            budget_item=line.budget_item,
+            warehouse=warehouse,
+            event_type=event_type,
+            qty_change=qty_change,
+            stock_uom=line.budget_item.uom,
+            source_uom=line.entered_uom or line.budget_item.uom,
+            source_quantity=line.entered_quantity,
+            event_date=movement.movement_date,
+            reference_document_type=reference_type,
+            reference_document_id=reference_id,
+            reference_number=movement.movement_number or movement.reference or '',
+            cost_per_unit_at_event=line.rate,
+            valuation_method_used=valuation_method or '',
+            event_metadata={
+                'stock_movement_id': movement.id,
+                'stock_movement_line_id': line.id,
+                'movement_type': movement.movement_type,
+            },
+        )
+
     @staticmethod
     def _apply_event_effects(
         *,
@@ -530,28 +828,56 @@ class InventoryService:
         layer_consumed_detail,
         event,
     ) -> None:
-        ledger_txn_type = 'TRANSFER' if movement.movement_type == 'TRANSFER' else movement.movement_type
-        balance_before = StockLevel.objects.filter(
-            company=movement.company,
-            item=line.budget_item,
+        # The locked stock level is the source of truth for the running balance
+        stock_level = InventoryService._lock_stock_levels(movement.company, warehouse, [line.budget_item_id])[line.budget_item_id]
+        value_change = quantize_value(quantity_change * line.rate)
+        stock_level.quantity += quantity_change
+        stock_level.value += value_change
+
+        InventoryService._build_ledger_entry(
+            movement=movement,
+            line=line,
             warehouse=warehouse,
-        ).first()
-        current_balance_qty = balance_before.quantity if balance_before else Decimal('0')
-        current_balance_value = (balance_before.quantity * line.rate) if balance_before else Decimal('0')
-        new_balance_qty = current_balance_qty + quantity_change
-        new_balance_value = current_balance_value + (quantity_change * line.rate)
+            quantity_change=quantity_change,
+            value_change=value_change,
+            balance_qty=stock_level.quantity,
+            balance_value=stock_level.value,
+            line_cost_center=line_cost_center,
+            line_project=line_project,
+            valuation_method_used=valuation_method_used,
+            layer_consumed_detail=layer_consumed_detail,
+            event=event,
+        ).save()
+        stock_level.save(update_fields=['quantity', 'value', 'updated_at'])
 
-        StockLedger.objects.create(
+    @staticmethod
+    def _build_ledger_entry(
+        *,
+        movement,
+        line,
+        warehouse,
+        quantity_change,
+        value_change,
+        balance_qty,
+        balance_value,
+        line_cost_center,
+        line_project,
+        valuation_method_used,
+        layer_consumed_detail,
+        event,
+    ) -> StockLedger:
+        ledger_txn_type = 'TRANSFER' if movement.movement_type == 'TRANSFER' else movement.movement_type
+        return StockLedger(
             company=movement.company,
             transaction_date=movement.movement_date,
             transaction_type=ledger_txn_type,
-            item=line.budget_item,
+            budget_item=line.budget_item,
             warehouse=warehouse,
             quantity=quantity_change,
             rate=line.rate,
-            value=quantity_change * line.rate,
-            balance_qty=new_balance_qty,
-            balance_value=new_balance_value,
+            value=value_change,
+            balance_qty=balance_qty,
+            balance_value=balance_value,
             source_document_type='StockMovement',
             source_document_id=movement.id,
             batch_no=line.batch_no,
@@ -563,15 +889,6 @@ class InventoryService:
             movement_event=event,
         )
 
-        stock_level, _ = StockLevel.objects.get_or_create(
-            company=movement.company,
-            item=line.budget_item,
-            warehouse=warehouse,
-            defaults={'quantity': 0},
-        )
-        stock_level.quantity += quantity_change
-        stock_level.save()
-
     @staticmethod
     def _create_in_transit_record(
         *,
@@ -588,7 +905,7 @@ class InventoryService:
             movement_line=line,
             defaults={
                 'company': movement.company,
-                'item': line.budget_item,
+                'budget_item': line.budget_item,
                 'from_warehouse': movement.from_warehouse,
                 'to_warehouse': movement.to_warehouse,
                 'quantity': quantity,
@@ -612,7 +929,7 @@ class InventoryService:
 
         pending_lines = list(
             InTransitShipmentLine.objects.select_related(
-                'movement_line__item',
+                'movement_line__budget_item',
                 'to_warehouse',
                 'from_warehouse',
                 'movement_line__entered_uom',
@@ -15,11 +15,12 @@ This service handles:
 4. Valuation method configuration per item/warehouse
 """
 
+from datetime import date
 from decimal import Decimal
 from typing import List, Dict, Tuple, Optional
 from django.db import transaction
 from django.utils import timezone
-from django.db.models import F, Sum, Q
+from django.db.models import Max, Sum, Q
 
 from apps.inventory.models import (
     Product,
@@ -29,6 +30,7 @@ from apps.inventory.models import (
     StockLedger,
     ValuationChangeLog
 )
+from apps.inventory.services.cost_layer_balance_service import CostLayerBalanceService, quantize_value
 
 
 class ValuationService:
@@ -70,17 +72,19 @@ class ValuationService:
     @transaction.atomic
     def create_cost_layer(
         company,
-        product: Product,
-        warehouse: Warehouse,
-        qty: Decimal,
-        cost_per_unit: Decimal,
-        source_document_type: str,
-        source_document_id: int,
+        product: Product = None,
+        warehouse: Warehouse = None,
+        qty: Decimal = None,
+        cost_per_unit: Decimal = None,
+        source_document_type: str = '',
+        source_document_id: int = None,
         batch_no: str = "",
         serial_no: str = "",
         receipt_date=None,
         stock_state: str = 'RELEASED',
-        expiry_date=None
+        expiry_date=None,
+        *,
+        item=None
     ) -> CostLayer:
         """
         Create a new cost layer when inventory is received.
@@ -96,21 +100,21 @@ class ValuationService:
             batch_no: Optional batch number
             serial_no: Optional serial number
             receipt_date: When received (defaults to now)
+            item: Alias of ``product``
+
+        The layer is added to the item/warehouse CostLayerBalance in the same
+        transaction.
 
         Returns:
             CostLayer instance
         """
+        product = product if product is not None else item
         if receipt_date is None:
             receipt_date = timezone.now()
 
         # Get next FIFO sequence for this product/warehouse
-        max_seq = CostLayer.objects.filter(
-            company=company,
-            budget_item=product,
-            warehouse=warehouse
-        ).aggregate(max_seq=Sum('fifo_sequence'))['max_seq'] or 0
-
-        fifo_sequence = max_seq + 1
+        last_sequence = ValuationService._last_fifo_sequences(company, warehouse, [product.pk])
+        fifo_sequence = last_sequence.get(product.pk, 0) + 1
 
         # Create the cost layer
         layer = CostLayer.objects.create(
@@ -133,9 +137,79 @@ class ValuationService:
             stock_state=stock_state,
             expiry_date=expiry_date
         )
+        CostLayerBalanceService.record_layer_changes(company, [layer])
 
         return layer
 
+    @staticmethod
+    def _last_fifo_sequences(company, warehouse: Warehouse, item_ids) -> Dict[int, int]:
+        """Highest FIFO sequence of each item's layers in a warehouse, from one grouped query."""
+        return dict(
+            CostLayer.objects.filter(company=company, warehouse=warehouse, budget_item_id__in=item_ids)
+            .order_by()
+            .values('budget_item_id')
+            .annotate(max_seq=Max('fifo_sequence'))
+            .values_list('budget_item_id', 'max_seq')
+        )
+
+    @staticmethod
+    @transaction.atomic
+    def create_cost_layers_bulk(
+        company,
+        warehouse: Warehouse,
+        rows: List[Dict],
+        receipt_date=None,
+        stock_state: str = 'RELEASED'
+    ) -> List[CostLayer]:
+        """
+        Create cost layers for many receipt lines of one warehouse at once.
+
+        Each row is a dict with ``product``, ``qty``, ``cost_per_unit``,
+        ``source_document_type`` and ``source_document_id`` and optionally
+        ``batch_no``, ``serial_no`` and ``expiry_date``. FIFO sequences are
+        continued per item from one grouped query, layers are written with
+        ``bulk_create`` and the CostLayerBalance rows are updated once per item.
+        """
+        if not rows:
+            return []
+        if receipt_date is None:
+            receipt_date = timezone.now()
+
+        next_sequence = ValuationService._last_fifo_sequences(
+            company, warehouse, {row['product'].pk for row in rows}
+        )
+
+        layers = []
+        for row in rows:
+            item_id = row['product'].pk
+            next_sequence[item_id] = next_sequence.get(item_id, 0) + 1
+            qty = row['qty']
+            cost_per_unit = row['cost_per_unit']
+            layers.append(CostLayer(
+                company=company,
+                budget_item=row['product'],
+                warehouse=warehouse,
+                receipt_date=receipt_date,
+                qty_received=qty,
+                cost_per_unit=cost_per_unit,
+                total_cost=qty * cost_per_unit,
+                qty_remaining=qty,
+                cost_remaining=qty * cost_per_unit,
+                fifo_sequence=next_sequence[item_id],
+                batch_no=row.get('batch_no') or '',
+                serial_no=row.get('serial_no') or '',
+                source_document_type=row['source_document_type'],
+                source_document_id=row['source_document_id'],
+                immutable_after_post=True,
+                is_closed=qty <= 0,
+                stock_state=stock_state,
+                expiry_date=row.get('expiry_date')
+            ))
+
+        CostLayer.objects.bulk_create(layers, batch_size=500)
+        CostLayerBalanceService.record_layer_changes(company, layers)
+        return layers
+
     @staticmethod
     def calculate_fifo_cost(
         company,
@@ -263,6 +337,29 @@ class ValuationService:
 
         return total_cost, consumed_layers
 
+    @staticmethod
+    def get_weighted_totals(company, product: Product, warehouse: Warehouse, exclude_expired: bool = True) -> Tuple[Decimal, Decimal]:
+        """
+        Return (qty, value) of the issuable (RELEASED) open layers.
+
+        Read from the running CostLayerBalance; only expired layers, which are
+        few, are aggregated from CostLayer to take them out of the totals.
+        """
+        total_qty, total_value = CostLayerBalanceService.get_totals(company, product, warehouse, 'RELEASED')
+        if exclude_expired and total_qty > 0:
+            expired = CostLayer.objects.filter(
+                company=company,
+                budget_item=product,
+                warehouse=warehouse,
+                stock_state='RELEASED',
+                is_closed=False,
+                qty_remaining__gt=0,
+                expiry_date__lt=timezone.now().date()
+            ).aggregate(qty=Sum('qty_remaining'), value=Sum('cost_remaining'))
+            total_qty -= expired['qty'] or Decimal('0')
+            total_value -= expired['value'] or Decimal('0')
+        return total_qty, total_value
+
     @staticmethod
     def calculate_weighted_average_cost(
         company,
@@ -274,35 +371,18 @@ class ValuationService:
         """
         Calculate cost using Weighted Average method.
 
-        For PERPETUAL: Uses moving average from all open layers
+        For PERPETUAL: Uses the moving average of the running CostLayerBalance
         For DAILY/WEEKLY/MONTHLY: Would require period-specific calculation
 
         Returns:
             Tuple of (total_cost, consumed_layers_detail)
         """
-        # Get all open layers
         from django.utils import timezone as _tz
         today = _tz.now().date()
         prevent_expired = ValuationService._prevent_expired(product, warehouse)
-        layers = CostLayer.objects.filter(
-            company=company,
-            budget_item=product,
-            warehouse=warehouse,
-            stock_state='RELEASED',
-            is_closed=False,
-            qty_remaining__gt=0
+        total_qty, total_value = ValuationService.get_weighted_totals(
+            company, product, warehouse, exclude_expired=prevent_expired
         )
-        if prevent_expired:
-            layers = layers.filter(Q(expiry_date__isnull=True) | Q(expiry_date__gte=today))
-
-        # Calculate weighted average
-        total_qty = Decimal('0')
-        total_value = Decimal('0')
-
-        for layer in layers:
-            effective_cost = layer.cost_per_unit + layer.landed_cost_adjustment
-            total_qty += layer.qty_remaining
-            total_value += layer.qty_remaining * effective_cost
 
         if total_qty == 0:
             raise ValueError("No inventory available for weighted average calculation")
@@ -321,8 +401,18 @@ class ValuationService:
         # but we'll represent it as consuming from oldest layers first for tracking
         consumed_layers = []
         qty_remaining = qty_needed
+        layers = CostLayer.objects.filter(
+            company=company,
+            budget_item=product,
+            warehouse=warehouse,
+            stock_state='RELEASED',
+            is_closed=False,
+            qty_remaining__gt=0
+        )
+        if prevent_expired:
+            layers = layers.filter(Q(expiry_date__isnull=True) | Q(expiry_date__gte=today))
 
-        for layer in layers.order_by('expiry_date', 'fifo_sequence', 'receipt_date'):
+        for layer in layers.order_by('expiry_date', 'fifo_sequence', 'receipt_date').iterator():
             if qty_remaining <= 0:
                 break
 
@@ -447,46 +537,178 @@ class ValuationService:
 
         return cost, layers, method
 
+    @staticmethod
+    def _lock_open_layers(company, product: Product, warehouse: Warehouse, method: str) -> List[CostLayer]:
+        """
+        Lock the open cost layers of a product/warehouse and return them in consumption order.
+
+        Rows are locked in primary-key order so concurrent issues against the same
+        item always acquire locks in the same sequence; the consumption order for
+        the valuation method is applied in memory afterwards.
+        """
+        layers = CostLayer.objects.select_for_update().filter(
+            company=company,
+            budget_item=product,
+            warehouse=warehouse,
+            stock_state='RELEASED',
+            is_closed=False,
+            qty_remaining__gt=0
+        )
+        if method != 'STANDARD' and ValuationService._prevent_expired(product, warehouse):
+            today = timezone.now().date()
+            layers = layers.filter(Q(expiry_date__isnull=True) | Q(expiry_date__gte=today))
+        layers = list(layers.order_by('id'))
+
+        def fifo_key(layer):
+            return (layer.fifo_sequence, layer.receipt_date, layer.id)
+
+        if method == 'STANDARD':
+            layers.sort(key=fifo_key)
+        else:
+            # FEFO first: layers without an expiry date sort last, as in the ORDER BY
+            layers.sort(key=fifo_key, reverse=(method == 'LIFO'))
+            layers.sort(key=lambda layer: (layer.expiry_date is None, layer.expiry_date or date.min))
+        return layers
+
+    @staticmethod
+    def _allocate_layers(
+        layers: List[CostLayer],
+        qty_needed: Decimal,
+        method: str,
+        unit_cost: Optional[Decimal] = None
+    ) -> Tuple[Decimal, List[Dict], List[CostLayer]]:
+        """
+        Apply an issue quantity to locked layers in memory.
+
+        Decrements ``qty_remaining``/``cost_remaining`` on the layer instances,
+        marks exhausted layers closed and returns (total_cost,
+        consumed_layers_detail, touched_layers). ``unit_cost`` prices the issue
+        for WEIGHTED_AVG (the running average) and STANDARD; FIFO/LIFO use each
+        layer's own cost.
+
+        For WEIGHTED_AVG the value an exhausted layer still carries (its cost
+        differs from the average) moves to the next open layer, so the open
+        layers keep adding up to the running balance while only the consumed
+        layers, plus at most one more, are written.
+        """
+        available = sum((layer.qty_remaining for layer in layers), Decimal('0'))
+        if available < qty_needed:
+            raise ValueError(
+                f"Insufficient inventory for {method} consumption. "
+                f"Needed: {qty_needed}, Available: {available}"
+            )
+
+        total_cost = Decimal('0')
+        qty_remaining = qty_needed
+        consumed_layers = []
+
+        for layer in layers:
+            if qty_remaining <= 0:
+                break
+
+            qty_to_consume = min(layer.qty_remaining, qty_remaining)
+            effective_cost = layer.cost_per_unit + layer.landed_cost_adjustment
+            cost_per_unit = effective_cost if unit_cost is None else unit_cost
+            layer_cost = qty_to_consume * cost_per_unit
+
+            total_cost += layer_cost
+            qty_remaining -= qty_to_consume
+
+            layer.qty_remaining -= qty_to_consume
+            layer.cost_remaining = quantize_value(layer.cost_remaining - layer_cost)
+            layer.is_closed = layer.qty_remaining <= 0
+
+            detail = {
+                'layer_id': layer.id,
+                'qty_consumed': float(qty_to_consume),
+                'cost_per_unit': float(cost_per_unit),
+                'cost_total': float(layer_cost),
+                'fifo_sequence': layer.fifo_sequence
+            }
+            if method == 'STANDARD':
+                detail['actual_cost_per_unit'] = float(layer.cost_per_unit)
+            consumed_layers.append(detail)
+
+        touched = layers[:len(consumed_layers)]
+        if method == 'WEIGHTED_AVG':
+            total_cost = qty_needed * unit_cost
+            carry = Decimal('0')
+            for layer in touched:
+                if layer.is_closed:
+                    carry += layer.cost_remaining
+                    layer.cost_remaining = Decimal('0')
+            carrier = next((layer for layer in layers[max(len(touched) - 1, 0):] if not layer.is_closed), None)
+            if carry and carrier is not None:
+                carrier.cost_remaining = quantize_value(carrier.cost_remaining + carry)
+                if carrier not in touched:
+                    touched.append(carrier)
+
+        return total_cost, consumed_layers, touched
+
     @staticmethod
     @transaction.atomic
     def consume_cost_layers(
         company,
-        product: Product,
-        warehouse: Warehouse,
-        qty: Decimal,
-        source_document_type: str,
-        source_document_id: int,
-        valuation_method: Optional[ItemValuationMethod] = None
+        product: Product = None,
+        warehouse: Warehouse = None,
+        qty: Decimal = None,
+        source_document_type: str = '',
+        source_document_id: int = None,
+        valuation_method: Optional[ItemValuationMethod] = None,
+        *,
+        item=None
     ) -> Tuple[Decimal, List[Dict], str]:
         """
         Consume cost layers when issuing inventory.
-        Updates qty_remaining on affected layers.
+
+        The open layers of the item/warehouse are locked once, the issue is
+        applied to them in memory in FEFO/FIFO (or LIFO) order and the consumed
+        layers are written back - including the close flag of exhausted layers -
+        with a single bulk update. Concurrent issues against the same item
+        serialize on the layer locks and never consume the same quantity twice.
+        WEIGHTED_AVG issues are priced at the running average of the
+        CostLayerBalance. The consumed quantity and value are removed from the
+        CostLayerBalance.
+
+        ``item`` is accepted as an alias of ``product``.
 
         Returns:
             Tuple of (total_cost, consumed_layers_detail, method_used)
+
+        Raises:
+            ValueError: If the product (or item), warehouse or qty is missing
         """
-        # Calculate which layers to consume
-        total_cost, consumed_layers, method_used = ValuationService.calculate_cost(
-            company, product, warehouse, qty, valuation_method
-        )
+        product = product if product is not None else item
+        missing = [
+            name for name, value in (('product', product), ('warehouse', warehouse), ('qty', qty)) if value is None
+        ]
+        if missing:
+            raise ValueError(f"consume_cost_layers requires {', '.join(missing)}")
 
-        # Update the cost layers
-        for layer_detail in consumed_layers:
-            layer = CostLayer.objects.get(id=layer_detail['layer_id'])
-            qty_consumed = Decimal(str(layer_detail['qty_consumed']))
+        if valuation_method is None:
+            valuation_method = ValuationService.get_valuation_method(company, product, warehouse)
+        method = valuation_method.valuation_method if valuation_method else 'FIFO'
+        if method not in ('FIFO', 'LIFO', 'WEIGHTED_AVG', 'STANDARD'):
+            raise ValueError(f"Unknown valuation method: {method}")
+
+        layers = ValuationService._lock_open_layers(company, product, warehouse, method)
+        unit_cost = None
+        if method == 'STANDARD':
+            unit_cost = product.cost_price
+        elif method == 'WEIGHTED_AVG':
+            total_qty, total_value = ValuationService.get_weighted_totals(
+                company, product, warehouse, exclude_expired=ValuationService._prevent_expired(product, warehouse)
+            )
+            unit_cost = total_value / total_qty if total_qty > 0 else Decimal('0')
 
-            # Update remaining quantities
-            layer.qty_remaining = F('qty_remaining') - qty_consumed
-            layer.cost_remaining = F('cost_remaining') - Decimal(str(layer_detail['cost_total']))
-            layer.save(update_fields=['qty_remaining', 'cost_remaining'])
+        before = CostLayerBalanceService.snapshot(layers)
+        total_cost, consumed_layers, touched = ValuationService._allocate_layers(layers, qty, method, unit_cost)
 
-            # Reload to check if layer is now closed
-            layer.refresh_from_db()
-            if layer.qty_remaining <= 0:
-                layer.is_closed = True
-                layer.save(update_fields=['is_closed'])
+        if touched:
+            CostLayer.objects.bulk_update(touched, ['qty_remaining', 'cost_remaining', 'is_closed'])
+            CostLayerBalanceService.record_layer_changes(company, touched, before)
 
-        return total_cost, consumed_layers, method_used
+        return total_cost, consumed_layers, method
 
     @staticmethod
     def get_current_cost(
@@ -559,25 +781,8 @@ class ValuationService:
             return product.cost_price  # Fallback
 
         elif method == 'WEIGHTED_AVG':
-            # Calculate current weighted average
-            from django.utils import timezone as _tz
-            today = _tz.now().date()
-            layers = CostLayer.objects.filter(
-                company=company,
-                budget_item=product,
-                warehouse=warehouse,
-                stock_state='RELEASED',
-                is_closed=False,
-                qty_remaining__gt=0
-            ).filter(Q(expiry_date__isnull=True) | Q(expiry_date__gte=today))
-
-            total_qty = Decimal('0')
-            total_value = Decimal('0')
-
-            for layer in layers:
-                effective_cost = layer.cost_per_unit + layer.landed_cost_adjustment
-                total_qty += layer.qty_remaining
-                total_value += layer.qty_remaining * effective_cost
+            # Current moving average from the running layer balance
+            total_qty, total_value = ValuationService.get_weighted_totals(company, product, warehouse)
 
             if total_qty > 0:
                 return total_value / total_qty
@@ -606,8 +811,7 @@ class ValuationService:
             qty_remaining__gt=0
         )
 
-        qty_on_hand = sum(layer.qty_remaining for layer in layers)
-        total_value = sum(layer.cost_remaining for layer in layers)
+        qty_on_hand, total_value = CostLayerBalanceService.get_totals(company, product, warehouse)
 
         current_cost = ValuationService.get_current_cost(
             company, product, warehouse, valuation_method
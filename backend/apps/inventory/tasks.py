@@ -0,0 +1,31 @@
+import logging
+
+from celery import shared_task
+
+from apps.companies.models import Company
+
+from .services.abc_ved_classification_service import ABCVEDClassificationService
+from .services.replenishment_service import ReplenishmentService
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name="apps.inventory.tasks.refresh_item_classifications")
+def refresh_item_classifications():
+    """Take today's ABC/VED/FSN/HML classification snapshot for every active company."""
+    classified = 0
+    for company in Company.objects.filter(is_active=True):
+        try:
+            ABCVEDClassificationService.classify(company)
+            classified += 1
+        except Exception as exc:
+            logger.exception("Inventory: item classification failed for %s: %s", company.code, exc)
+    return {"status": "ok", "companies": classified}
+
+
+@shared_task(name="apps.inventory.tasks.plan_replenishment_chunk")
+def plan_replenishment_chunk(company_id, config_ids):
+    """Plan one chunk of a ReplenishmentService.plan_in_chunks run."""
+    company = Company.objects.get(pk=company_id)
+    configs = ReplenishmentService.planning_configs(company).filter(id__in=config_ids).order_by('id')
+    return [suggestion.as_dict() for suggestion in ReplenishmentService.plan(company, configs)]
@@ -0,0 +1,85 @@
+"""
+Tests for the set-based inventory aging engine.
+"""
+import io
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.budgeting.models import BudgetItemCode
+from apps.inventory.models import StockLedger
+from apps.inventory.services.aging_analysis_service import AgingAnalysisService
+from apps.inventory.services.export_service import EXCEL_AVAILABLE, ExcelExportService
+from apps.inventory.tests.test_cost_layer_consumption import CostLayerFixtureMixin
+
+
+class AgingAnalysisTests(CostLayerFixtureMixin, TestCase):
+    def setUp(self):
+        self._create_fixtures()
+        self.other = BudgetItemCode.objects.create(company=self.company, code="CL-ITEM-0", name="Gadget", uom=self.uom)
+
+    def _issue(self, item, days_ago):
+        StockLedger.objects.create(
+            company=self.company, budget_item=item, warehouse=self.warehouse,
+            transaction_date=timezone.now() - timedelta(days=days_ago), transaction_type="ISSUE",
+            quantity=Decimal("-1"), rate=Decimal("1"), value=Decimal("-1"),
+            balance_qty=Decimal("0"), balance_value=Decimal("0"),
+            source_document_type="Test", source_document_id=1,
+        )
+
+    def test_layers_are_bucketed_per_item_in_three_queries(self):
+        self._layer("10", "5.00", days_ago=10)
+        self._layer("4", "2.50", days_ago=45)
+        self._layer("2", "1.00", days_ago=400)
+        self._layer("0.5", "4.00", days_ago=400, expiry_date=timezone.now().date() - timedelta(days=1))
+        self.item, other_item = self.other, self.item
+        self._layer("3", "1.00", days_ago=100)
+        self._issue(other_item, days_ago=20)
+        self._issue(other_item, days_ago=5)
+
+        with self.assertNumQueries(3):
+            result = AgingAnalysisService.compute_aging(self.company)
+
+        self.assertEqual(list(result.product_code), ["CL-ITEM-0", "CL-ITEM-1"])
+        gadget, widget = result.rows()
+        self.assertEqual((widget.total_quantity, widget.total_value), (Decimal("16.500"), Decimal("64.00")))
+        self.assertEqual([b.quantity for b in widget.aging_buckets], [
+            Decimal("10.000"), Decimal("4.000"), Decimal("0.000"), Decimal("0.000"), Decimal("0.000"), Decimal("2.500"),
+        ])
+        self.assertEqual((widget.average_age_days, widget.oldest_stock_days, widget.newest_stock_days), (213, 400, 10))
+        self.assertEqual((widget.days_since_last_movement, widget.movement_velocity), (5, "FAST"))
+        # Average age over 180 days plus an expired layer
+        self.assertEqual(widget.obsolescence_risk, "HIGH")
+
+        self.assertEqual((gadget.days_since_last_movement, gadget.movement_velocity), (999, "NON_MOVING"))
+        self.assertEqual(gadget.aging_buckets[3].value, Decimal("3.00"))
+
+    def test_reports_filter_the_result_set(self):
+        self._layer("10", "5.00", days_ago=10)
+        self.item = self.other
+        self._layer("3", "1.00", days_ago=400)
+
+        slow = AgingAnalysisService.get_non_moving_products(self.company, self.warehouse)
+        self.assertEqual([a.product_code for a in slow], ["CL-ITEM-0", "CL-ITEM-1"])
+        self.assertEqual(AgingAnalysisService.analyze_product_aging(self.company, self.other).total_quantity, Decimal("3.000"))
+
+        summary = AgingAnalysisService.get_aging_summary(self.company)
+        self.assertEqual((summary["total_products"], summary["total_value"]), (2, 53.0))
+        self.assertEqual(summary["aging_buckets"][5]["value"], 3.0)
+
+        report = AgingAnalysisService.get_obsolescence_risk_report(self.company, min_risk_level="HIGH")
+        self.assertEqual(report["by_risk_level"]["high"]["products"][0]["code"], "CL-ITEM-0")
+
+    @unittest.skipUnless(EXCEL_AVAILABLE, "openpyxl not installed")
+    def test_excel_export_reads_result_columns(self):
+        import openpyxl
+
+        self._layer("10", "5.00", days_ago=10)
+        result = AgingAnalysisService.compute_aging(self.company)
+
+        workbook = openpyxl.load_workbook(io.BytesIO(ExcelExportService.export_aging_report(result, "CL Co")))
+        row = [cell.value for cell in workbook.active[5]]
+        self.assertEqual(row[:5], ["CL-ITEM-1", "Widget", "Uncategorized", 10, 50])
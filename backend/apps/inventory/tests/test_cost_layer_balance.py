@@ -0,0 +1,130 @@
+"""
+Tests for the running cost layer balance (weighted-average accumulator).
+"""
+from decimal import Decimal
+from io import StringIO
+from types import SimpleNamespace
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from apps.inventory.models import CostLayer, CostLayerBalance, ItemValuationMethod, StockLevel
+from apps.inventory.services.cost_layer_balance_service import CostLayerBalanceService
+from apps.inventory.services.stock_service import InventoryService
+from apps.inventory.services.valuation_service import ValuationService
+from apps.inventory.tests.test_cost_layer_consumption import CostLayerFixtureMixin
+
+
+class CostLayerBalanceTests(CostLayerFixtureMixin, TestCase):
+    def setUp(self):
+        self._create_fixtures()
+        self.weighted = ItemValuationMethod(valuation_method="WEIGHTED_AVG")
+
+    def _balance(self, stock_state="RELEASED"):
+        return CostLayerBalance.objects.get(
+            company=self.company, budget_item=self.item, warehouse=self.warehouse, stock_state=stock_state
+        )
+
+    def test_layer_creation_and_consumption_update_balance(self):
+        self._layer("10", "5.00", days_ago=2)
+        self._layer("10", "7.00", days_ago=1)
+        balance = self._balance()
+        self.assertEqual((balance.qty, balance.value), (Decimal("20.000"), Decimal("120.00")))
+
+        self._consume("15")
+
+        balance = self._balance()
+        self.assertEqual((balance.qty, balance.value), (Decimal("5.000"), Decimal("35.00")))
+        self.assertEqual(CostLayerBalanceService.rebuild(self.company, fix=False), [])
+
+    def test_weighted_average_reads_running_balance(self):
+        self._layer("10", "5.00", days_ago=2)
+        self._layer("30", "7.00", days_ago=1)
+
+        with self.assertNumQueries(2):
+            cost = ValuationService.get_current_cost(self.company, self.item, self.warehouse, self.weighted)
+        self.assertEqual(cost, Decimal("6.5"))
+
+        total, _, _ = self._consume("20", valuation_method=self.weighted)
+        self.assertEqual(total, Decimal("130.00"))
+        # Moving average is unchanged by an issue at average cost
+        self.assertEqual(
+            ValuationService.get_current_cost(self.company, self.item, self.warehouse, self.weighted), Decimal("6.5")
+        )
+        self.assertEqual(CostLayerBalanceService.rebuild(self.company, fix=False), [])
+
+    def test_weighted_average_issue_writes_only_consumed_layers(self):
+        first = self._layer("10", "5.00", days_ago=3)
+        second = self._layer("10", "7.00", days_ago=2)
+        untouched = self._layer("20", "9.00", days_ago=1)
+
+        total, detail, _ = self._consume("15", valuation_method=self.weighted)
+
+        # Average 7.50; the first layer's 25.00 shortfall moves to the second
+        self.assertEqual(total, Decimal("112.50"))
+        self.assertEqual([d["layer_id"] for d in detail], [first.id, second.id])
+        first.refresh_from_db()
+        second.refresh_from_db()
+        untouched.refresh_from_db()
+        self.assertEqual((first.is_closed, first.cost_remaining), (True, Decimal("0")))
+        self.assertEqual(second.cost_remaining, Decimal("7.50"))
+        self.assertEqual(untouched.cost_remaining, Decimal("180.00"))
+        self.assertEqual(self._balance().value, Decimal("187.50"))
+        self.assertEqual(CostLayerBalanceService.rebuild(self.company, fix=False), [])
+
+        # Saving a layer keeps its carried value instead of re-pricing it
+        second.adjustment_reason = "note"
+        second.save()
+        second.refresh_from_db()
+        self.assertEqual(second.cost_remaining, Decimal("7.50"))
+
+    def test_landed_cost_adjustment_revalues_remaining_quantity(self):
+        self._layer("10", "5.00", source_document_type="GoodsReceipt")
+        self._consume("4")
+        grn = SimpleNamespace(company=self.company, company_id=self.company.id, id=self._seq)
+
+        result = InventoryService.apply_landed_cost_adjustment(goods_receipt=grn, total_adjustment="20.00")
+
+        self.assertEqual(result["inventory_adjustment"], 12.0)
+        self.assertEqual(self._balance().value, Decimal("42.00"))
+        self.assertEqual(CostLayerBalanceService.rebuild(self.company, fix=False), [])
+
+    def test_landed_cost_adjustment_revalues_the_stock_level(self):
+        self._layer("10", "5.00", source_document_type="GoodsReceipt")
+        self._consume("4")
+        level = StockLevel.objects.create(
+            company=self.company, budget_item=self.item, warehouse=self.warehouse,
+            quantity=Decimal("6"), value=Decimal("30.00"),
+        )
+        grn = SimpleNamespace(company=self.company, company_id=self.company.id, id=self._seq)
+
+        InventoryService.apply_landed_cost_adjustment(goods_receipt=grn, total_adjustment="20.00")
+        level.refresh_from_db()
+        self.assertEqual((level.quantity, level.value), (Decimal("6.000"), Decimal("42.00")))
+
+        InventoryService.apply_landed_cost_adjustment(goods_receipt=grn, total_adjustment="-5.00")
+        level.refresh_from_db()
+        self.assertEqual(level.value, Decimal("39.00"))
+        self.assertEqual(level.value, self._balance().value)
+
+    def test_stock_state_change_moves_totals(self):
+        layer = self._layer("10", "5.00")
+
+        CostLayerBalanceService.move_stock_state(self.company, CostLayer.objects.filter(pk=layer.pk), "ON_HOLD")
+
+        self.assertEqual(self._balance("RELEASED").qty, Decimal("0"))
+        self.assertEqual(self._balance("ON_HOLD").value, Decimal("50.00"))
+        self.assertEqual(CostLayerBalanceService.rebuild(self.company, fix=False), [])
+
+    def test_rebuild_command_repairs_drift(self):
+        self._layer("10", "5.00")
+        CostLayerBalance.objects.filter(company=self.company).update(qty=Decimal("3"), value=Decimal("1.00"))
+
+        out = StringIO()
+        call_command("rebuild_cost_layer_balances", company_id=self.company.id, check=True, stdout=out)
+        self.assertIn("out of sync", out.getvalue())
+        self.assertEqual(self._balance().qty, Decimal("3"))
+
+        call_command("rebuild_cost_layer_balances", company_id=self.company.id, stdout=StringIO())
+        balance = self._balance()
+        self.assertEqual((balance.qty, balance.value), (Decimal("10.000"), Decimal("50.00")))
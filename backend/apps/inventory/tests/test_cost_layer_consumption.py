@@ -0,0 +1,186 @@
+"""
+Concurrency tests for batched cost layer consumption.
+"""
+import threading
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.utils import timezone
+
+from apps.budgeting.models import BudgetItemCode
+from apps.companies.models import Company, CompanyGroup
+from apps.inventory.models import CostLayer, CostLayerBalance, ItemValuationMethod, UnitOfMeasure, Warehouse
+from apps.inventory.services.valuation_service import ValuationService
+
+
+class CostLayerFixtureMixin:
+    def _create_fixtures(self):
+        self.group = CompanyGroup.objects.create(name="CL Group", db_name="cg_cl_test")
+        self.company = Company.objects.create(name="CL Co", code="CLCO", company_group=self.group)
+        self.uom = UnitOfMeasure.objects.create(company=self.company, code="CL-EA", name="Each")
+        self.item = BudgetItemCode.objects.create(
+            company=self.company, code="CL-ITEM-1", name="Widget", uom=self.uom, cost_price=Decimal("9.00")
+        )
+        self.warehouse = Warehouse.objects.create(company=self.company, code="CL-WH", name="Main")
+        self._seq = 0
+
+    def _layer(self, qty, cost, days_ago=0, expiry_date=None, source_document_type="Test"):
+        self._seq += 1
+        return ValuationService.create_cost_layer(
+            company=self.company,
+            item=self.item,
+            warehouse=self.warehouse,
+            qty=Decimal(qty),
+            cost_per_unit=Decimal(cost),
+            source_document_type=source_document_type,
+            source_document_id=self._seq,
+            receipt_date=timezone.now() - timedelta(days=days_ago),
+            expiry_date=expiry_date,
+        )
+
+    def _consume(self, qty, **kwargs):
+        return ValuationService.consume_cost_layers(
+            company=self.company,
+            item=self.item,
+            warehouse=self.warehouse,
+            qty=Decimal(qty),
+            source_document_type="Test",
+            source_document_id=1,
+            **kwargs,
+        )
+
+
+class CostLayerConsumptionTests(CostLayerFixtureMixin, TestCase):
+    def setUp(self):
+        self._create_fixtures()
+
+    def test_fifo_consumes_oldest_layers_and_closes_them(self):
+        first = self._layer("10", "5.00", days_ago=2)
+        second = self._layer("10", "7.00", days_ago=1)
+
+        total, detail, method = self._consume("15")
+
+        self.assertEqual(method, "FIFO")
+        self.assertEqual(total, Decimal("85.00"))
+        self.assertEqual([d["layer_id"] for d in detail], [first.id, second.id])
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertTrue(first.is_closed)
+        self.assertEqual(first.qty_remaining, Decimal("0"))
+        self.assertFalse(second.is_closed)
+        self.assertEqual(second.qty_remaining, Decimal("5"))
+        self.assertEqual(second.cost_remaining, Decimal("35.00"))
+
+    def test_lifo_consumes_newest_layer_first(self):
+        self._layer("10", "5.00", days_ago=2)
+        newest = self._layer("10", "7.00", days_ago=1)
+        method = ItemValuationMethod(valuation_method="LIFO")
+
+        total, detail, _ = self._consume("4", valuation_method=method)
+
+        self.assertEqual(total, Decimal("28.00"))
+        self.assertEqual(detail[0]["layer_id"], newest.id)
+
+    def test_expiring_layers_are_consumed_first(self):
+        self._layer("10", "5.00", days_ago=2)
+        expiring = self._layer("10", "7.00", days_ago=1, expiry_date=timezone.now().date() + timedelta(days=3))
+
+        _, detail, _ = self._consume("3")
+
+        self.assertEqual(detail[0]["layer_id"], expiring.id)
+
+    def test_insufficient_inventory_leaves_layers_untouched(self):
+        layer = self._layer("5", "5.00")
+
+        with self.assertRaises(ValueError):
+            self._consume("6")
+
+        layer.refresh_from_db()
+        self.assertEqual(layer.qty_remaining, Decimal("5"))
+
+    def test_single_and_bulk_receipts_continue_one_fifo_sequence(self):
+        layers = [self._layer("1", "5.00") for _ in range(3)]
+        layers += ValuationService.create_cost_layers_bulk(
+            self.company,
+            self.warehouse,
+            [
+                {"product": self.item, "qty": Decimal("1"), "cost_per_unit": Decimal("5.00"),
+                 "source_document_type": "Test", "source_document_id": idx}
+                for idx in range(2)
+            ],
+        )
+        layers.append(self._layer("1", "5.00"))
+
+        self.assertEqual([layer.fifo_sequence for layer in layers], [1, 2, 3, 4, 5, 6])
+
+    def test_missing_identifiers_are_rejected(self):
+        with self.assertRaisesMessage(ValueError, "consume_cost_layers requires product, qty"):
+            ValuationService.consume_cost_layers(company=self.company, warehouse=self.warehouse)
+        with self.assertRaisesMessage(ValueError, "consume_cost_layers requires warehouse"):
+            ValuationService.consume_cost_layers(self.company, item=self.item, qty=Decimal("1"))
+
+    def test_consumption_writes_layers_in_one_statement(self):
+        for _ in range(10):
+            self._layer("1", "5.00")
+        method = ItemValuationMethod(valuation_method="FIFO")
+
+        # SAVEPOINT, layer lock, bulk update, balance lookup + update, RELEASE
+        with self.assertNumQueries(6):
+            self._consume("10", valuation_method=method)
+
+        self.assertFalse(CostLayer.objects.filter(budget_item=self.item, is_closed=False).exists())
+        balance = CostLayerBalance.objects.get(budget_item=self.item, stock_state="RELEASED")
+        self.assertEqual((balance.qty, balance.value), (Decimal("0"), Decimal("0")))
+
+
+@skipUnlessDBFeature("has_select_for_update")
+class ConcurrentCostLayerConsumptionTests(CostLayerFixtureMixin, TransactionTestCase):
+    WORKERS = 12
+    ISSUES_PER_WORKER = 5
+
+    def setUp(self):
+        if connection.vendor == "sqlite":
+            self.skipTest("SQLite does not support concurrent writers")
+        self._create_fixtures()
+
+    def test_parallel_issues_never_over_consume(self):
+        for days_ago in range(8, 0, -1):
+            self._layer("5", "2.00", days_ago=days_ago)
+        available = Decimal("40")
+        issued = []
+        failures = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(self.WORKERS)
+
+        def worker():
+            try:
+                barrier.wait()
+                for _ in range(self.ISSUES_PER_WORKER):
+                    try:
+                        _, detail, _ = self._consume("1")
+                    except ValueError:
+                        with lock:
+                            failures.append(1)
+                        continue
+                    with lock:
+                        issued.append(sum(Decimal(str(d["qty_consumed"])) for d in detail))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        remaining = sum(
+            CostLayer.objects.filter(budget_item=self.item).values_list("qty_remaining", flat=True), Decimal("0")
+        )
+        self.assertEqual(sum(issued, Decimal("0")), available)
+        self.assertEqual(len(failures), self.WORKERS * self.ISSUES_PER_WORKER - int(available))
+        self.assertEqual(remaining, Decimal("0"))
+        self.assertFalse(CostLayer.objects.filter(budget_item=self.item, is_closed=False).exists())
+        balance = CostLayerBalance.objects.get(budget_item=self.item, stock_state="RELEASED")
+        self.assertEqual((balance.qty, balance.value), (Decimal("0"), Decimal("0")))
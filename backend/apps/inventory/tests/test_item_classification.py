@@ -0,0 +1,146 @@
+"""
+Tests for persisted, incrementally refreshed ABC/VED/FSN/HML item classification.
+"""
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.budgeting.models import BudgetItemCode
+from apps.companies.models import Company, CompanyGroup
+from apps.inventory.models import ItemClassificationSnapshot, StockLedger, StockLevel, UnitOfMeasure, Warehouse
+from apps.inventory.services.abc_ved_classification_service import ABCVEDClassificationService
+
+
+class ItemClassificationTests(TestCase):
+    def setUp(self):
+        self.group = CompanyGroup.objects.create(name="IC Group", db_name="cg_ic_test")
+        self.company = Company.objects.create(name="IC Co", code="ICCO", company_group=self.group)
+        self.uom = UnitOfMeasure.objects.create(company=self.company, code="IC-EA", name="Each")
+        self.warehouse = Warehouse.objects.create(company=self.company, code="IC-WH", name="Main")
+        self.items = [
+            BudgetItemCode.objects.create(
+                company=self.company, code=f"IC-{idx}", name=f"Item {idx}", uom=self.uom,
+                standard_cost=Decimal(price), prevent_expired_issuance=False,
+            )
+            for idx, price in enumerate(["2000", "50", "5", "1"])
+        ]
+
+    def _issue(self, item, day, value, count=1, **extra):
+        for _ in range(count):
+            StockLedger.objects.create(
+                **extra,
+                company=self.company, budget_item=item, warehouse=self.warehouse,
+                transaction_date=timezone.make_aware(datetime.combine(day, time(12))), transaction_type="ISSUE",
+                quantity=Decimal("-1"), rate=Decimal(value), value=-Decimal(value),
+                balance_qty=Decimal("0"), balance_value=Decimal("0"),
+                source_document_type="Test", source_document_id=1,
+            )
+
+    def _classes(self):
+        return {
+            row.budget_item.code: row
+            for row in ABCVEDClassificationService.get_item_classes(self.company).values()
+        }
+
+    def test_classifies_all_items_from_grouped_queries(self):
+        self._issue(self.items[0], date(2026, 6, 1), "500")
+        self._issue(self.items[1], date(2026, 5, 1), "30", count=10)
+        self._issue(self.items[2], date(2025, 1, 1), "100")  # outside the 12 month period
+        StockLevel.objects.create(company=self.company, budget_item=self.items[3], warehouse=self.warehouse, quantity=5)
+
+        with self.assertNumQueries(10):
+            snapshot = ABCVEDClassificationService.classify(self.company, as_of_date=date(2026, 6, 10))
+
+        self.assertEqual(snapshot.items.count(), 4)
+        classes = self._classes()
+        self.assertEqual(
+            {code: (row.abc_class, row.fsn_class, row.hml_class) for code, row in classes.items()},
+            {"IC-0": ("A", "F", "H"), "IC-1": ("C", "S", "M"), "IC-2": ("C", "N", "M"), "IC-3": ("C", "N", "L")},
+        )
+        self.assertEqual(classes["IC-0"].consumption_value, Decimal("500.00"))
+        self.assertEqual((classes["IC-1"].issue_count, classes["IC-1"].ved_class), (10, "D"))
+        self.assertEqual(classes["IC-2"].last_issue_date, date(2025, 1, 1))
+
+        summary = ABCVEDClassificationService.get_classification_summary(self.company)
+        self.assertEqual(summary["abc_analysis"], {"A": 1, "B": 0, "C": 3})
+        self.assertEqual(summary["last_classification_date"], date(2026, 6, 10))
+
+    def test_incremental_snapshot_matches_full_recomputation(self):
+        self._issue(self.items[0], date(2026, 3, 1), "500", count=6)
+        self._issue(self.items[1], date(2026, 5, 20), "40")
+        ABCVEDClassificationService.classify(self.company, as_of_date=date(2026, 6, 1))
+
+        # New issues, one backdated, while older issues leave the 90 day window
+        self._issue(self.items[1], date(2026, 6, 15), "900", count=5)
+        self._issue(self.items[2], date(2026, 5, 30), "10")
+        ABCVEDClassificationService.classify(self.company, as_of_date=date(2026, 7, 1))
+        incremental = {
+            code: (row.consumption_value, row.issue_count, row.last_issue_date, row.abc_class, row.fsn_class)
+            for code, row in self._classes().items()
+        }
+
+        ItemClassificationSnapshot.objects.all().delete()
+        ABCVEDClassificationService.classify(self.company, as_of_date=date(2026, 7, 1))
+        full = {
+            code: (row.consumption_value, row.issue_count, row.last_issue_date, row.abc_class, row.fsn_class)
+            for code, row in self._classes().items()
+        }
+
+        self.assertEqual(incremental, full)
+        self.assertEqual(full["IC-0"][:2], (Decimal("3000.00"), 0))
+        self.assertEqual(full["IC-1"][:3], (Decimal("4540.00"), 6, date(2026, 6, 15)))
+
+    def test_reclassifying_the_same_day_replaces_the_snapshot(self):
+        self._issue(self.items[0], date(2026, 6, 1), "100")
+        first = ABCVEDClassificationService.classify(self.company, as_of_date=date(2026, 6, 10))
+        self._issue(self.items[1], date(2026, 6, 9), "400")
+
+        second = ABCVEDClassificationService.classify(self.company, as_of_date=date(2026, 6, 10))
+
+        self.assertFalse(ItemClassificationSnapshot.objects.filter(id=first.id).exists())
+        self.assertEqual(ABCVEDClassificationService.latest_snapshot(self.company), second)
+        results = ABCVEDClassificationService.perform_abc_analysis(self.company)
+        self.assertEqual(
+            [(r.product_code, r.abc_class, r.cumulative_percentage) for r in results],
+            [("IC-1", "B", Decimal("80")), ("IC-0", "C", Decimal("100"))],
+        )
+
+    def test_analyses_read_the_latest_snapshot_without_reclassifying(self):
+        self._issue(self.items[0], date(2026, 6, 1), "100")
+        snapshot = ABCVEDClassificationService.classify(self.company, as_of_date=date(2026, 6, 10))
+        self._issue(self.items[1], date(2026, 6, 9), "400")
+
+        with self.assertNumQueries(2):
+            results = ABCVEDClassificationService.perform_abc_analysis(self.company)
+        ABCVEDClassificationService.perform_ved_analysis(self.company)
+        ABCVEDClassificationService.perform_multi_dimensional_classification(self.company)
+
+        self.assertEqual([r.product_code for r in results], ["IC-0"])
+        self.assertEqual(list(ItemClassificationSnapshot.objects.values_list("id", flat=True)), [snapshot.id])
+
+    def test_snapshots_of_other_periods_are_kept_apart(self):
+        self._issue(self.items[0], date(2026, 6, 1), "100")
+        yearly = ABCVEDClassificationService.classify(self.company, as_of_date=date(2026, 6, 10))
+
+        half_year = ABCVEDClassificationService.classify(self.company, as_of_date=date(2026, 6, 10), period_months=6)
+
+        self.assertTrue(ItemClassificationSnapshot.objects.filter(id=yearly.id).exists())
+        self.assertEqual(ABCVEDClassificationService.latest_snapshot(self.company), yearly)
+        self.assertEqual(ABCVEDClassificationService.latest_snapshot(self.company, period_months=6), half_year)
+        self.assertEqual(
+            {row.snapshot_id for row in ABCVEDClassificationService.get_item_classes(self.company).values()}, {yearly.id}
+        )
+
+    def test_rows_committed_late_with_a_lower_id_are_picked_up(self):
+        self._issue(self.items[0], date(2026, 6, 1), "100", id=500)
+        ABCVEDClassificationService.classify(self.company, as_of_date=date(2026, 6, 10))
+
+        # Created with a lower id, but committed only after that snapshot
+        self._issue(self.items[1], date(2026, 6, 9), "400", id=400)
+        ABCVEDClassificationService.classify(self.company, as_of_date=date(2026, 6, 11))
+
+        classes = self._classes()
+        self.assertEqual(classes["IC-1"].consumption_value, Decimal("400.00"))
+        self.assertEqual(classes["IC-0"].consumption_value, Decimal("100.00"))
@@ -0,0 +1,134 @@
+"""
+Tests for batch replenishment planning over a preloaded supply position.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.budgeting.models import BudgetItemCode
+from apps.companies.models import Company, CompanyGroup
+from apps.finance.models import Account, AccountType
+from apps.inventory.models import (
+    InTransitShipmentLine,
+    Item,
+    ItemCategory,
+    ItemSupplier,
+    ItemWarehouseConfig,
+    StockLevel,
+    StockMovement,
+    StockMovementLine,
+    UnitOfMeasure,
+    Warehouse,
+)
+from apps.inventory.services.replenishment_service import ReplenishmentService
+from apps.inventory.tasks import plan_replenishment_chunk
+from apps.procurement.models import PurchaseOrder, PurchaseOrderLine, Supplier, SupplierBlackoutWindow
+
+
+class ReplenishmentPlanningTests(TestCase):
+    def setUp(self):
+        self.group = CompanyGroup.objects.create(name="RP Group", db_name="cg_rp_test")
+        self.company = Company.objects.create(name="RP Co", code="RPCO", company_group=self.group)
+        self.uom = UnitOfMeasure.objects.create(company=self.company, code="RP-EA", name="Each")
+        self.main = Warehouse.objects.create(company=self.company, code="RP-A", name="Main")
+        self.branch = Warehouse.objects.create(company=self.company, code="RP-B", name="Branch")
+        self.bolt, self.nut, self.washer = [
+            BudgetItemCode.objects.create(company=self.company, code=code, name=code, uom=self.uom)
+            for code in ("RP-BOLT", "RP-NUT", "RP-WASHER")
+        ]
+        category = ItemCategory.objects.create(company=self.company, code="RP-CAT", name="Hardware")
+        self.bolt_item = Item.objects.create(
+            company=self.company, budget_item=self.bolt, name="Bolt", category=category, uom=self.uom
+        )
+
+        payable = Account.objects.create(
+            company_group=self.group, company=self.company, code="RP-2100", name="Payable",
+            account_type=AccountType.LIABILITY,
+        )
+        blocked, self.backup = [
+            Supplier.objects.create(company=self.company, code=code, name=code, payable_account=payable)
+            for code in ("RP-S1", "RP-S2")
+        ]
+        today = timezone.localdate()
+        SupplierBlackoutWindow.objects.create(
+            supplier=blocked, start_date=today - timedelta(days=1), end_date=today + timedelta(days=1)
+        )
+        ItemSupplier.objects.create(company=self.company, budget_item=self.bolt, supplier=blocked, preferred_rank=1)
+        ItemSupplier.objects.create(
+            company=self.company, budget_item=self.bolt, supplier=self.backup, preferred_rank=2,
+            moq_qty=Decimal("10"), multiple_qty=Decimal("25"),
+        )
+
+        self.bolt_main = self._config(
+            self.bolt, self.main, avg_daily_demand=Decimal("10"), lead_time_days=5,
+            demand_std_dev=Decimal("2"), lead_time_std_dev=1,
+        )
+        self.bolt_branch = self._config(self.bolt, self.branch, reorder_point=Decimal("100"))
+        self.nut_main = self._config(self.nut, self.main, reorder_point=Decimal("10"))
+        self._config(self.washer, self.main, reorder_point=Decimal("50"), auto_replenish=False)
+
+        StockLevel.objects.create(company=self.company, budget_item=self.bolt, warehouse=self.main, quantity=20)
+        StockLevel.objects.create(company=self.company, budget_item=self.bolt, warehouse=self.branch, quantity=150)
+        order = PurchaseOrder.objects.create(
+            company=self.company, supplier=self.backup, order_number="RP-PO-1",
+            delivery_address=self.main, status=PurchaseOrder.Status.ISSUED,
+        )
+        # Inserted directly: only the open quantity matters here, not budget commitments
+        PurchaseOrderLine.objects.bulk_create([PurchaseOrderLine(
+            purchase_order=order, line_number=1, product=self.bolt_item, quantity=Decimal("30"),
+            received_quantity=Decimal("10"), unit_price=Decimal("1"),
+        )])
+        movement = StockMovement.objects.create(
+            company=self.company, movement_number="RP-MV-1", movement_date=today, movement_type="TRANSFER",
+            from_warehouse=self.branch, to_warehouse=self.main,
+        )
+        line = StockMovementLine.objects.create(
+            movement=movement, line_number=1, budget_item=self.bolt, quantity=Decimal("5"), rate=Decimal("1")
+        )
+        InTransitShipmentLine.objects.create(
+            company=self.company, movement=movement, movement_line=line, budget_item=self.bolt,
+            from_warehouse=self.branch, to_warehouse=self.main, quantity=Decimal("5"), rate=Decimal("1"),
+        )
+
+    def _config(self, budget_item, warehouse, auto_replenish=True, **values):
+        return ItemWarehouseConfig.objects.create(
+            company=self.company, budget_item=budget_item, warehouse=warehouse,
+            auto_replenish=auto_replenish, **values
+        )
+
+    def test_plans_all_configs_from_grouped_queries(self):
+        with self.assertNumQueries(5):
+            suggestions = ReplenishmentService.get_suggestions(self.company)
+
+        self.assertEqual([s['config_id'] for s in suggestions], [self.bolt_main.id, self.nut_main.id])
+        bolt, nut = suggestions
+        # ROP 50 + 1.65 * sqrt(5 * 2^2 + 10^2 * 1^2); 45 available, shortfall rounded up to multiples of 25
+        self.assertEqual(
+            (bolt['on_hand'], bolt['on_order'], bolt['in_transit'], bolt['rop'], bolt['recommended_qty']),
+            (20.0, 20.0, 5.0, 68.075, 25.0),
+        )
+        self.assertEqual((bolt['supplier_id'], bolt['reason']), (self.backup.id, 'ROP breached'))
+        self.assertEqual((nut['rop'], nut['recommended_qty'], nut['supplier_id']), (10.0, 0.0, None))
+        self.assertEqual(nut['reason'], 'No active supplier available')
+
+        self.assertEqual(ReplenishmentService.get_suggestions(self.company, warehouse_id=self.branch.id), [])
+
+    def test_vectorized_rops_match_the_single_config_formula(self):
+        configs = [self.bolt_main, self.bolt_branch, self.nut_main]
+        self.bolt_branch.service_level_pct = Decimal("90")
+        self.bolt_branch.avg_daily_demand = Decimal("30")
+        self.bolt_branch.lead_time_days = 4
+
+        self.assertEqual(
+            ReplenishmentService.calculate_rops(configs),
+            [Decimal("68.075"), Decimal("120.000"), Decimal("10.000")],
+        )
+        self.assertEqual(ReplenishmentService._calculate_rop(self.bolt_main), Decimal("68.075"))
+        self.assertEqual(ReplenishmentService.calculate_rops([]), [])
+
+    def test_chunk_task_plans_only_its_configs(self):
+        suggestions = plan_replenishment_chunk(self.company.id, [self.nut_main.id, self.bolt_branch.id])
+
+        self.assertEqual([s['config_id'] for s in suggestions], [self.nut_main.id])
@@ -0,0 +1,186 @@
+"""
+Tests for the bulk stock movement posting pipeline.
+"""
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.budgeting.models import BudgetItemCode
+from apps.companies.models import Company, CompanyGroup
+from apps.inventory.models import (
+    CostLayerBalance,
+    InTransitShipmentLine,
+    MovementEvent,
+    StockLedger,
+    StockLevel,
+    StockMovement,
+    StockMovementLine,
+    UnitOfMeasure,
+    Warehouse,
+)
+from apps.inventory.services.stock_service import InventoryService
+
+
+class BulkStockPostingTests(TestCase):
+    def setUp(self):
+        # GL posting of stock events is exercised by the finance tests
+        patcher = mock.patch("apps.inventory.services.stock_service.event_bus")
+        self.event_bus = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.group = CompanyGroup.objects.create(name="SP Group", db_name="cg_sp_test")
+        self.company = Company.objects.create(name="SP Co", code="SPCO", company_group=self.group)
+        self.uom = UnitOfMeasure.objects.create(company=self.company, code="SP-EA", name="Each")
+        self.main = Warehouse.objects.create(company=self.company, code="SP-WH1", name="Main")
+        self.other = Warehouse.objects.create(company=self.company, code="SP-WH2", name="Other")
+        self.items = [
+            BudgetItemCode.objects.create(company=self.company, code=f"SP-{idx:03d}", name=f"Item {idx}", uom=self.uom)
+            for idx in range(40)
+        ]
+        self._seq = 0
+
+    def _movement(self, movement_type, lines, to_warehouse=None, from_warehouse=None):
+        self._seq += 1
+        movement = StockMovement.objects.create(
+            company=self.company,
+            movement_number=f"SP-{self._seq:04d}",
+            movement_date=date(2025, 3, 1),
+            movement_type=movement_type,
+            to_warehouse=to_warehouse or self.main,
+            from_warehouse=from_warehouse,
+        )
+        StockMovementLine.objects.bulk_create([
+            StockMovementLine(movement=movement, line_number=idx + 1, budget_item=item, quantity=qty, rate=rate)
+            for idx, (item, qty, rate) in enumerate(lines)
+        ])
+        return movement
+
+    def _receipt_lines(self, count):
+        # Every item appears twice so running balances inside one document are exercised
+        return [(self.items[idx % 20], Decimal("5"), Decimal("2.50")) for idx in range(count)]
+
+    def _state(self, warehouse):
+        levels = list(
+            StockLevel.objects.filter(warehouse=warehouse)
+            .order_by("budget_item__code")
+            .values_list("budget_item__code", "quantity", "value")
+        )
+        ledger = list(
+            StockLedger.objects.filter(warehouse=warehouse)
+            .order_by("id")
+            .values_list("budget_item__code", "quantity", "balance_qty", "balance_value", "transaction_type")
+        )
+        balances = dict(
+            CostLayerBalance.objects.filter(warehouse=warehouse).values_list("budget_item__code", "qty")
+        )
+        return levels, ledger, balances
+
+    def test_bulk_receipt_matches_line_by_line_posting(self):
+        line_by_line = self._movement("RECEIPT", self._receipt_lines(40), to_warehouse=self.main)
+        bulk = self._movement("RECEIPT", self._receipt_lines(40), to_warehouse=self.other)
+
+        InventoryService._post_stock_movement(line_by_line, bulk=False)
+        InventoryService._post_stock_movement(bulk, bulk=True)
+
+        self.assertEqual(self._state(self.main), self._state(self.other))
+        self.assertEqual(MovementEvent.objects.filter(movement=bulk).count(), 40)
+        self.assertEqual(StockLevel.objects.get(warehouse=self.other, budget_item=self.items[0]).quantity, Decimal("10"))
+        bulk.refresh_from_db()
+        self.assertEqual(bulk.status, "COMPLETED")
+
+    def test_bulk_issue_consumes_layers_and_reprices_lines(self):
+        receipt = self._movement("RECEIPT", self._receipt_lines(20))
+        InventoryService._post_stock_movement(receipt, bulk=True)
+        issue = self._movement(
+            "ISSUE", [(item, Decimal("2"), Decimal("0")) for item in self.items[:20]], from_warehouse=self.main
+        )
+
+        InventoryService._post_stock_movement(issue, bulk=True)
+
+        self.assertEqual(StockLevel.objects.get(warehouse=self.main, budget_item=self.items[0]).quantity, Decimal("3"))
+        self.assertEqual(set(issue.lines.values_list("rate", flat=True)), {Decimal("2.50")})
+        self.assertEqual(CostLayerBalance.objects.get(warehouse=self.main, budget_item=self.items[0]).qty, Decimal("3"))
+        ledger = StockLedger.objects.filter(source_document_id=issue.id).first()
+        self.assertEqual(ledger.valuation_method_used, "FIFO")
+        self.assertEqual(ledger.balance_qty, Decimal("3"))
+
+    def test_bulk_issue_splits_item_consumption_over_lines(self):
+        for rate in ("2.50", "3.00"):
+            receipt = self._movement("RECEIPT", [(self.items[0], Decimal("5"), Decimal(rate))])
+            InventoryService._post_stock_movement(receipt, bulk=True)
+        issue = self._movement(
+            "ISSUE",
+            [(self.items[0], Decimal("4"), Decimal("0")), (self.items[0], Decimal("4"), Decimal("0"))],
+            from_warehouse=self.main,
+        )
+
+        InventoryService._post_stock_movement(issue, bulk=True)
+
+        first, second = issue.lines.order_by("line_number")
+        self.assertEqual(first.rate, Decimal("2.50"))
+        self.assertEqual(second.rate, Decimal("2.88"))
+        details = list(
+            StockLedger.objects.filter(source_document_id=issue.id).order_by("id").values_list("layer_consumed_detail", flat=True)
+        )
+        self.assertEqual([len(detail) for detail in details], [1, 2])
+        self.assertEqual(StockLevel.objects.get(warehouse=self.main, budget_item=self.items[0]).quantity, Decimal("2"))
+
+    def test_ledger_balance_value_follows_consumed_cost(self):
+        for bulk in (False, True):
+            warehouse = self.other if bulk else self.main
+            for rate in ("2.50", "3.00"):
+                receipt = self._movement("RECEIPT", [(self.items[0], Decimal("5"), Decimal(rate))], to_warehouse=warehouse)
+                InventoryService._post_stock_movement(receipt, bulk=bulk)
+            issue = self._movement(
+                "ISSUE",
+                [(self.items[0], Decimal("4"), Decimal("0")), (self.items[0], Decimal("4"), Decimal("0"))],
+                from_warehouse=warehouse,
+            )
+            InventoryService._post_stock_movement(issue, bulk=bulk)
+
+            tail = StockLedger.objects.filter(warehouse=warehouse).latest("id")
+            level = StockLevel.objects.get(warehouse=warehouse, budget_item=self.items[0])
+            balance = CostLayerBalance.objects.get(warehouse=warehouse, budget_item=self.items[0])
+            self.assertEqual((tail.balance_qty, tail.balance_value), (Decimal("2"), Decimal("6.00")))
+            self.assertEqual((level.quantity, level.value), (tail.balance_qty, tail.balance_value))
+            self.assertEqual(balance.value, level.value)
+
+    def test_bulk_transfer_records_in_transit_lines(self):
+        receipt = self._movement("RECEIPT", self._receipt_lines(20))
+        InventoryService._post_stock_movement(receipt, bulk=True)
+        transfer = self._movement(
+            "TRANSFER",
+            [(item, Decimal("1"), Decimal("0")) for item in self.items[:20]],
+            to_warehouse=self.other,
+            from_warehouse=self.main,
+        )
+
+        InventoryService._post_stock_movement(transfer, bulk=True)
+
+        transfer.refresh_from_db()
+        self.assertEqual(transfer.status, "IN_TRANSIT")
+        self.assertEqual(InTransitShipmentLine.objects.filter(movement=transfer).count(), 20)
+        self.event_bus.publish.assert_any_call("stock.transfer_out", stock_movement_id=transfer.id)
+        self.assertEqual(StockLevel.objects.get(warehouse=self.main, budget_item=self.items[0]).quantity, Decimal("4"))
+
+    def test_bulk_query_count_does_not_grow_with_lines(self):
+        small = self._movement("RECEIPT", self._receipt_lines(4), to_warehouse=self.main)
+        large = self._movement("RECEIPT", self._receipt_lines(40), to_warehouse=self.other)
+
+        with CaptureQueriesContext(connection) as small_queries:
+            InventoryService._post_stock_movement(small, bulk=True)
+        with CaptureQueriesContext(connection) as large_queries:
+            InventoryService._post_stock_movement(large, bulk=True)
+
+        self.assertEqual(len(large_queries), len(small_queries))
+
+    def test_large_documents_use_bulk_pipeline_by_default(self):
+        movement = self._movement("RECEIPT", self._receipt_lines(InventoryService.BULK_POSTING_MIN_LINES))
+
+        with CaptureQueriesContext(connection) as queries:
+            InventoryService._post_stock_movement(movement)
+
+        self.assertLess(len(queries), InventoryService.BULK_POSTING_MIN_LINES)
@@ -0,0 +1,75 @@
+"""
+Tests for ledger-tail stock valuation and stock card reports.
+"""
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+
+from apps.budgeting.models import BudgetItemCode
+from apps.companies.models import Company, CompanyGroup
+from apps.inventory.models import StockMovement, StockMovementLine, UnitOfMeasure, Warehouse
+from apps.inventory.services.stock_report_service import StockReportService
+from apps.inventory.services.stock_service import InventoryService
+
+
+class StockReportTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch("apps.inventory.services.stock_service.event_bus")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.group = CompanyGroup.objects.create(name="SR Group", db_name="cg_sr_test")
+        self.company = Company.objects.create(name="SR Co", code="SRCO", company_group=self.group)
+        self.uom = UnitOfMeasure.objects.create(company=self.company, code="SR-EA", name="Each")
+        self.warehouse = Warehouse.objects.create(company=self.company, code="SR-WH", name="Main")
+        self.bolt = BudgetItemCode.objects.create(company=self.company, code="SR-BOLT", name="Bolt", uom=self.uom)
+        self.nut = BudgetItemCode.objects.create(company=self.company, code="SR-NUT", name="Nut", uom=self.uom)
+        self._seq = 0
+
+    def _post(self, movement_type, movement_date, lines):
+        self._seq += 1
+        movement = StockMovement.objects.create(
+            company=self.company,
+            movement_number=f"SR-{self._seq:04d}",
+            movement_date=movement_date,
+            movement_type=movement_type,
+            to_warehouse=self.warehouse,
+            from_warehouse=self.warehouse if movement_type == "ISSUE" else None,
+        )
+        for idx, (item, qty, rate) in enumerate(lines):
+            StockMovementLine.objects.create(
+                movement=movement, line_number=idx + 1, budget_item=item, quantity=Decimal(qty), rate=Decimal(rate)
+            )
+        return InventoryService._post_stock_movement(movement)
+
+    def _post_history(self):
+        self._post("RECEIPT", date(2025, 1, 10), [(self.bolt, "10", "2.00"), (self.nut, "4", "0.50")])
+        self._post("RECEIPT", date(2025, 2, 10), [(self.bolt, "10", "3.00")])
+        self._post("ISSUE", date(2025, 3, 10), [(self.bolt, "15", "0")])
+
+    def test_valuation_report_reads_ledger_tail(self):
+        self._post_history()
+
+        with self.assertNumQueries(1):
+            report = StockReportService.valuation_report(self.company)
+
+        bolt, nut = report["items"]
+        self.assertEqual((bolt["product_code"], bolt["quantity"], bolt["total_value"]), ("SR-BOLT", Decimal("5"), Decimal("15.00")))
+        self.assertEqual(bolt["unit_cost"], Decimal("3.00"))
+        self.assertEqual(nut["total_value"], Decimal("2.00"))
+        self.assertEqual(report["summary"]["total_value"], Decimal("17.00"))
+
+        as_of = StockReportService.valuation_report(self.company, as_of_date=date(2025, 2, 28))
+        self.assertEqual(as_of["items"][0]["total_value"], Decimal("50.00"))
+        self.assertEqual(as_of["summary"]["total_value"], Decimal("52.00"))
+
+    def test_stock_card_opens_from_ledger_tail(self):
+        self._post_history()
+
+        card = StockReportService.stock_card(self.company, self.bolt, self.warehouse, date_from=date(2025, 2, 1))
+
+        self.assertEqual((card["opening_qty"], card["opening_value"]), (Decimal("10"), Decimal("20.00")))
+        self.assertEqual([entry["transaction_type"] for entry in card["entries"]], ["RECEIPT", "ISSUE"])
+        self.assertEqual(card["entries"][1]["value"], Decimal("-35.00"))
+        self.assertEqual((card["closing_qty"], card["closing_value"]), (Decimal("5"), Decimal("15.00")))
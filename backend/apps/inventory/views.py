@@ -4,6 +4,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.core.exceptions import ValidationError
 from datetime import timedelta
 from django.db import models
@@ -50,6 +51,7 @@ from .serializers import (
 )
 from .services.valuation_service import ValuationService
 from .services.stock_service import InventoryService
+from .services.stock_report_service import StockReportService
 from .services.replenishment_service import ReplenishmentService
 from .services.landed_cost_voucher_service import LandedCostVoucherService
 from .services.rtv_service import RTVService
@@ -340,6 +342,43 @@ class StockLedgerViewSet(viewsets.ModelViewSet):
     queryset = StockLedger.objects.all()
     serializer_class = StockLedgerSerializer
 
+    @action(detail=False, methods=['get'])
+    def valuation(self, request):
+        """
+        Stock valuation from the ledger tail.
+        Query params: as_of_date (YYYY-MM-DD, optional), warehouse_id (optional)
+        """
+        company = getattr(request, 'company', None)
+        if not company:
+            return Response({'error': 'Company context required'}, status=status.HTTP_400_BAD_REQUEST)
+        as_of_date = parse_date(request.query_params.get('as_of_date') or '')
+        warehouse_id = request.query_params.get('warehouse_id')
+        warehouse = Warehouse.objects.filter(id=warehouse_id, company=company).first() if warehouse_id else None
+        return Response(StockReportService.valuation_report(company, as_of_date=as_of_date, warehouse=warehouse))
+
+    @action(detail=False, methods=['get'], url_path='stock-card')
+    def stock_card(self, request):
+        """
+        Stock card (movements with running balances) for one item in one warehouse.
+        Query params: item_id, warehouse_id, date_from, date_to
+        """
+        company = getattr(request, 'company', None)
+        item_id = request.query_params.get('item_id')
+        warehouse_id = request.query_params.get('warehouse_id')
+        if not company or not item_id or not warehouse_id:
+            return Response(
+                {'error': 'Company context, item_id and warehouse_id are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        card = StockReportService.stock_card(
+            company,
+            item_id,
+            warehouse_id,
+            date_from=parse_date(request.query_params.get('date_from') or ''),
+            date_to=parse_date(request.query_params.get('date_to') or ''),
+        )
+        return Response(card)
+
 class DeliveryOrderViewSet(viewsets.ModelViewSet):
     queryset = DeliveryOrder.objects.all()
     serializer_class = DeliveryOrderSerializer
@@ -456,19 +495,9 @@ class StockLedgerSummaryView(APIView):
         total_skus_tracked = qs.values('budget_item').distinct().count()
         last = qs.order_by('-transaction_date', '-id').values_list('transaction_date', flat=True).first()
 
-        # Rough approximation for ledger value: sum of balance_value of the latest entry per (budget_item, warehouse)
-        ledger_value = 0
-        try:
-            latest_map = {}
-            for row in qs.values('budget_item', 'warehouse', 'transaction_date', 'id', 'balance_value'):
-                key = (row['budget_item'], row['warehouse'])
-                prev = latest_map.get(key)
-                curr_key = (row['transaction_date'], row['id'])
-                if not prev or curr_key > prev[0]:
-                    latest_map[key] = (curr_key, row['balance_value'])
-            ledger_value = float(sum(v[1] or 0 for v in latest_map.values()))
-        except Exception:
-            ledger_value = 0
+        # Ledger value: stock levels carry the balance_value of the latest ledger entry per (budget_item, warehouse)
+        levels = StockLevel.objects.filter(company=company) if company else StockLevel.objects.all()
+        ledger_value = float(levels.aggregate(total=models.Sum('value'))['total'] or 0)
 
         # Open discrepancies placeholder (requires reconciliation features); return 0
         open_discrepancies = 0
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from apps.companies.models import Company
+from apps.metadata.models import DocumentSequence
+from core.doc_numbers import BLOCK, STRICT, allocate_doc_value
+
+# (label, allocation mode, allocate at the start of the transaction?)
+SCENARIOS = (
+    ("strict-early", STRICT, True),
+    ("strict-late", STRICT, False),
+    ("block", BLOCK, True),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure document number allocation under contention: N parallel writers each post "
+        "documents in transactions that hold for --hold-ms. Sequence rows created by the "
+        "benchmark are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company-id', type=int, required=True)
+        parser.add_argument('--writers', type=int, default=8, help='Parallel writer threads (default 8)')
+        parser.add_argument('--documents', type=int, default=50, help='Documents per writer (default 50)')
+        parser.add_argument('--hold-ms', type=float, default=5.0, help='Simulated posting work per transaction (default 5)')
+        parser.add_argument('--block-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        company = Company.objects.filter(id=options['company_id']).first()
+        if not company:
+            raise CommandError(f"Company {options['company_id']} not found")
+        if connections['default'].vendor == 'sqlite':
+            raise CommandError("SQLite serializes all writers; run the benchmark against PostgreSQL")
+
+        self.stdout.write(
+            f"{'scenario':<14}{'seconds':>10}{'docs/s':>10}{'numbers':>10}{'duplicates':>12}{'gaps':>8}"
+        )
+        for label, mode, early in SCENARIOS:
+            doc_type = f"BENCH-{label.upper()}"[:20]
+            fiscal_year = f"B{int(time.time()) % 10**8}"
+            try:
+                elapsed, values = self._run(company, doc_type, fiscal_year, mode, early, options)
+            finally:
+                DocumentSequence.objects.filter(company=company, doc_type=doc_type, fiscal_year=fiscal_year).delete()
+            duplicates = len(values) - len(set(values))
+            gaps = (max(values) - len(set(values))) if values else 0
+            self.stdout.write(
+                f"{label:<14}{elapsed:>10.3f}{len(values) / elapsed:>10.1f}{len(values):>10}{duplicates:>12}{gaps:>8}"
+            )
+        self.stdout.write(self.style.SUCCESS("Benchmark finished; benchmark sequences were deleted."))
+
+    def _run(self, company, doc_type, fiscal_year, mode, early, options):
+        hold = options['hold_ms'] / 1000.0
+        values = []
+        errors = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(options['writers'])
+
+        def allocate():
+            return allocate_doc_value(
+                company=company,
+                doc_type=doc_type,
+                fiscal_year=fiscal_year,
+                mode=mode,
+                block_size=options['block_size'],
+            )
+
+        def writer():
+            try:
+                barrier.wait()
+                for _ in range(options['documents']):
+                    with transaction.atomic():
+                        value = allocate() if early else None
+                        time.sleep(hold)
+                        if not early:
+                            value = allocate()
+                    with lock:
+                        values.append(value)
+            except Exception as exc:  # noqa: BLE001
+                with lock:
+                    errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=writer) for _ in range(options['writers'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if errors:
+            raise CommandError(f"{len(errors)} writer(s) failed: {errors[0]}")
+        return elapsed, values
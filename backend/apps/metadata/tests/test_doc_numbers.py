@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import datetime
+import threading
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase
+
+from apps.companies.models import Company, CompanyGroup
+from apps.metadata.models import DocumentSequence
+from core.doc_numbers import BLOCK, STRICT, allocate_doc_value, get_next_doc_no
+
+
+def _create_company(code):
+    group = CompanyGroup.objects.create(name=f"{code} Group", db_name=f"cg_{code.lower()}")
+    return Company.objects.create(
+        company_group=group,
+        code=code,
+        name=f"{code} Company",
+        legal_name=f"{code} Company Ltd.",
+        currency_code="USD",
+        fiscal_year_start=datetime.date(2024, 1, 1),
+        tax_id=f"{code}-TAX",
+        registration_number=f"{code}-REG",
+    )
+
+
+class StrictDocNumberTests(TestCase):
+    def setUp(self):
+        self.company = _create_company("DNSTRICT")
+
+    def test_numbers_are_sequential_and_formatted(self):
+        first = get_next_doc_no(company=self.company, doc_type="PO")
+        second = get_next_doc_no(company=self.company, doc_type="PO", width=3)
+
+        year = first.split("-")[1]
+        self.assertEqual(first, f"PO-{year}-00001")
+        self.assertEqual(second, f"PO-{year}-002")
+
+    def test_allocation_is_one_statement_once_the_row_exists(self):
+        allocate_doc_value(company=self.company, doc_type="JV", fiscal_year="2025")
+
+        with self.assertNumQueries(1):
+            value = allocate_doc_value(company=self.company, doc_type="JV", fiscal_year="2025")
+
+        self.assertEqual(value, 2)
+
+    def test_rolled_back_document_releases_its_number(self):
+        allocate_doc_value(company=self.company, doc_type="GRN", fiscal_year="2025")
+        try:
+            with transaction.atomic():
+                allocate_doc_value(company=self.company, doc_type="GRN", fiscal_year="2025")
+                raise RuntimeError("posting failed")
+        except RuntimeError:
+            pass
+
+        self.assertEqual(allocate_doc_value(company=self.company, doc_type="GRN", fiscal_year="2025"), 2)
+
+    def test_unknown_mode_is_rejected(self):
+        with self.assertRaises(ValueError):
+            allocate_doc_value(company=self.company, doc_type="PO", fiscal_year="2025", mode="random")
+
+
+class ParallelDocNumberTests(TransactionTestCase):
+    WRITERS = 8
+    DOCUMENTS = 10
+
+    def setUp(self):
+        if connection.vendor == "sqlite":
+            self.skipTest("SQLite does not support concurrent writers")
+        self.company = _create_company("DNPAR")
+
+    def _parallel(self, mode, doc_type):
+        values = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(self.WRITERS)
+
+        def writer():
+            try:
+                barrier.wait()
+                for _ in range(self.DOCUMENTS):
+                    with transaction.atomic():
+                        value = allocate_doc_value(
+                            company=self.company, doc_type=doc_type, fiscal_year="2025", mode=mode, block_size=4
+                        )
+                    with lock:
+                        values.append(value)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=writer) for _ in range(self.WRITERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return values
+
+    def test_strict_numbers_are_unique_and_gapless(self):
+        values = self._parallel(STRICT, "PS")
+
+        self.assertEqual(sorted(values), list(range(1, self.WRITERS * self.DOCUMENTS + 1)))
+
+    def test_block_numbers_are_unique_and_reserved_outside_the_transaction(self):
+        values = self._parallel(BLOCK, "PB")
+
+        self.assertEqual(len(set(values)), self.WRITERS * self.DOCUMENTS)
+        sequence = DocumentSequence.objects.get(company=self.company, doc_type="PB")
+        self.assertGreaterEqual(sequence.current_value, max(values))
+        self.assertEqual(sequence.current_value % 4, 0)
+
+    def test_benchmark_command_reports_every_scenario(self):
+        out = StringIO()
+        call_command(
+            "benchmark_doc_numbers", company_id=self.company.id, writers=3, documents=4, hold_ms=1, stdout=out
+        )
+
+        output = out.getvalue()
+        for label in ("strict-early", "strict-late", "block"):
+            self.assertIn(label, output)
+        self.assertFalse(DocumentSequence.objects.filter(company=self.company, doc_type__startswith="BENCH").exists())
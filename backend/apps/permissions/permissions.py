@@ -1,9 +1,75 @@
 """
 Core permission checking logic for the ERP.
 """
+from django.core.cache import cache
+
 from apps.users.models import User
 from apps.companies.models import Company
 
+PERMISSION_CODES_CACHE_KEY = 'permission_codes:{user_id}:{company_id}'
+PERMISSION_CODES_CACHE_TIMEOUT = 60 * 15
+
+
+class PermissionResolver:
+    """
+    Permission codes of one user, loaded once per company.
+
+    The resolver is memoized on the user instance, which lives for one
+    request, so repeated ``has_permission`` calls in a view or a list
+    serializer are set lookups. The loaded codes are also shared across
+    requests through the cache; ``invalidate`` drops them when roles or
+    role assignments change (see ``signals``).
+    """
+
+    def __init__(self, user: User):
+        self.user = user
+        self._codes = {}
+
+    @classmethod
+    def for_user(cls, user: User) -> 'PermissionResolver':
+        resolver = getattr(user, '_permission_resolver', None)
+        if resolver is None:
+            resolver = cls(user)
+            user._permission_resolver = resolver
+        return resolver
+
+    def codes(self, company) -> frozenset:
+        """Codes granted by the user's active roles in ``company``."""
+        company_id = getattr(company, 'pk', company)
+        codes = self._codes.get(company_id)
+        if codes is None:
+            cache_key = PERMISSION_CODES_CACHE_KEY.format(user_id=self.user.pk, company_id=company_id)
+            codes = cache.get(cache_key)
+            if codes is None:
+                codes = self._load_codes(company_id)
+                cache.set(cache_key, codes, PERMISSION_CODES_CACHE_TIMEOUT)
+            self._codes[company_id] = codes
+        return codes
+
+    def has(self, permission_code: str, company) -> bool:
+        return permission_code in self.codes(company)
+
+    def _load_codes(self, company_id) -> frozenset:
+        from apps.permissions.models import Permission
+
+        return frozenset(
+            Permission.objects.filter(
+                role__usercompanyrole__user=self.user,
+                role__usercompanyrole__company_id=company_id,
+                role__usercompanyrole__is_active=True,
+            )
+            .values_list('code', flat=True)
+            .distinct()
+        )
+
+    @staticmethod
+    def invalidate(pairs) -> None:
+        """Drop the cached codes of ``(user_id, company_id)`` pairs."""
+        cache.delete_many(
+            [PERMISSION_CODES_CACHE_KEY.format(user_id=user_id, company_id=company_id) for user_id, company_id in pairs]
+        )
+
+
 def has_permission(user: User, permission_code: str, company: Company) -> bool:
     """
     Checks if a user has a specific permission within the context of a given company.
@@ -31,14 +97,6 @@ def has_permission(user: User, permission_code: str, company: Company) -> bool:
     if not company:
         return False
 
-    # Get all active roles for the user in the specified company
-    user_company_roles = user.usercompanyrole_set.filter(company=company, is_active=True)
-
-    if not user_company_roles.exists():
-        return False
-
-    # Check if any of the user's roles contain the required permission.
-    # This is optimized to perform a single database query.
-    return user_company_roles.filter(
-        role__permissions__code=permission_code
-    ).exists()
+    # All codes of the user's active roles in the company are loaded once per
+    # request (and cached across requests); each check is a set lookup.
+    return PermissionResolver.for_user(user).has(permission_code, company)
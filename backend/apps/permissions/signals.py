@@ -1,8 +1,11 @@
-from django.db.models.signals import post_migrate
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save, pre_delete
 from django.dispatch import receiver
 from django.apps import apps as django_apps
 from django.core.management import call_command
 
+from .models import Permission, Role
+
 
 @receiver(post_migrate)
 def seed_defaults_after_migrate(sender, app_config, **kwargs):
@@ -25,3 +28,53 @@ def seed_defaults_after_migrate(sender, app_config, **kwargs):
         # Soft-fail: never block migrations
         return
 
+
+
+def _invalidate_now_and_on_commit(pairs):
+    from .permissions import PermissionResolver
+
+    pairs = list(pairs)
+    if not pairs:
+        return
+    PermissionResolver.invalidate(pairs)
+    # Another request may re-cache the old codes until the change is committed
+    transaction.on_commit(lambda: PermissionResolver.invalidate(pairs))
+
+
+@receiver(post_save, sender='users.UserCompanyRole')
+@receiver(post_delete, sender='users.UserCompanyRole')
+def invalidate_user_company_role_permissions(sender, instance, **kwargs):
+    _invalidate_now_and_on_commit([(instance.user_id, instance.company_id)])
+
+
+@receiver(m2m_changed, sender=Role.permissions.through)
+def invalidate_role_permission_changes(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in {'post_add', 'post_remove', 'post_clear', 'pre_clear'}:
+        return
+    if not reverse:
+        role_ids = [instance.pk]
+    elif pk_set is not None:
+        role_ids = list(pk_set)
+    else:
+        # Reverse clear: the roles are gone from the through table after the fact
+        role_ids = list(Role.objects.filter(permissions=instance).values_list('pk', flat=True))
+    _invalidate_role_holders(role_ids)
+
+
+@receiver(post_save, sender=Permission)
+def invalidate_renamed_permission(sender, instance, created, **kwargs):
+    if not created:
+        _invalidate_role_holders(Role.objects.filter(permissions=instance).values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Permission)
+def invalidate_deleted_permission(sender, instance, **kwargs):
+    _invalidate_role_holders(Role.objects.filter(permissions=instance).values_list('pk', flat=True))
+
+
+def _invalidate_role_holders(role_ids):
+    from apps.users.models import UserCompanyRole
+
+    _invalidate_now_and_on_commit(
+        UserCompanyRole.objects.filter(role_id__in=list(role_ids)).values_list('user_id', 'company_id').distinct()
+    )
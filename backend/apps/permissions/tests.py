@@ -0,0 +1,63 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from apps.companies.models import Company, CompanyGroup
+from apps.permissions.models import Permission, Role
+from apps.permissions.permissions import has_permission
+from apps.users.models import User, UserCompanyRole
+
+
+class HasPermissionResolverTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.group = CompanyGroup.objects.create(name="Resolver Group", db_name="cg_resolver")
+        self.company = Company.objects.create(name="Resolver Co", code="RSLV", company_group=self.group)
+        self.other_company = Company.objects.create(name="Resolver Two", code="RSLV2", company_group=self.group)
+        self.user = User.objects.create_user(username="resolver.user", password="x")
+        self.view = Permission.objects.create(code="rslv.view", name="View", module="rslv")
+        self.approve = Permission.objects.create(code="rslv.approve", name="Approve", module="rslv")
+        self.role = Role.objects.create(name="Resolver viewer", company=self.company)
+        self.role.permissions.add(self.view)
+        self.assignment = UserCompanyRole.objects.create(
+            user=self.user, company_group=self.group, company=self.company, role=self.role
+        )
+
+    def _fresh_user(self):
+        # Each request gets its own user instance from AuthenticationMiddleware
+        return User.objects.get(pk=self.user.pk)
+
+    def test_codes_are_loaded_once_per_request(self):
+        user = self._fresh_user()
+
+        with self.assertNumQueries(1):
+            self.assertTrue(has_permission(user, "rslv.view", self.company))
+            self.assertFalse(has_permission(user, "rslv.approve", self.company))
+            for _ in range(20):
+                has_permission(user, "rslv.view", self.company)
+
+        with self.assertNumQueries(1):
+            self.assertFalse(has_permission(user, "rslv.view", self.other_company))
+
+    def test_codes_are_shared_across_requests(self):
+        has_permission(self._fresh_user(), "rslv.view", self.company)
+        user = self._fresh_user()
+
+        with self.assertNumQueries(0):
+            self.assertTrue(has_permission(user, "rslv.view", self.company))
+
+    def test_role_permission_changes_invalidate_cached_codes(self):
+        self.assertFalse(has_permission(self._fresh_user(), "rslv.approve", self.company))
+
+        self.role.permissions.add(self.approve)
+        self.assertTrue(has_permission(self._fresh_user(), "rslv.approve", self.company))
+
+        self.approve.role_set.clear()
+        self.assertFalse(has_permission(self._fresh_user(), "rslv.approve", self.company))
+
+    def test_assignment_changes_invalidate_cached_codes(self):
+        self.assertTrue(has_permission(self._fresh_user(), "rslv.view", self.company))
+
+        self.assignment.is_active = False
+        self.assignment.save()
+
+        self.assertFalse(has_permission(self._fresh_user(), "rslv.view", self.company))
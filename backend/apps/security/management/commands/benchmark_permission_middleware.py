@@ -0,0 +1,142 @@
+import copy
+import time
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from apps.security.middleware.permission_context_middleware import PermissionContextMiddleware
+from apps.security.models import SecPermission, SecRole, SecRolePermission, SecScope, SecUserRole, SecUserRoleScope
+from apps.security.services.permission_cache import bump_user_version
+from apps.security.services.permission_service import PermissionService
+from apps.companies.models import CompanyGroup
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _legacy_effective_permissions(user):
+    """The pre-cache resolution: one scope query and one permission query per role."""
+    effective_permissions = {}
+    for user_role in SecUserRole.objects.filter(user=user, valid_from__lte=date.today()):
+        scopes = [
+            f"{urs.scope.scope_type}:{urs.scope.object_id}"
+            for urs in SecUserRoleScope.objects.filter(user_role=user_role).select_related('scope')
+        ]
+        for rp in SecRolePermission.objects.filter(role=user_role.role).select_related('permission'):
+            allowed = effective_permissions.setdefault(rp.permission.code, set())
+            if not rp.permission.scope_required:
+                effective_permissions[rp.permission.code] = {'*'}
+            elif '*' not in allowed:
+                allowed.update(scopes)
+    return effective_permissions
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure PermissionContextMiddleware overhead per request before and after the compiled '
+        'permission cache. Benchmark users, roles and permissions are rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--roles', type=int, default=10)
+        parser.add_argument('--permissions-per-role', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=500)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                user = self._build_user(options['roles'], options['permissions_per_role'])
+                self._report(user, options['requests'])
+                raise _Rollback
+        except _Rollback:
+            pass
+        self.stdout.write(self.style.SUCCESS('Benchmark finished; benchmark data was rolled back.'))
+
+    def _build_user(self, role_count, per_role):
+        group = CompanyGroup.objects.create(name='Permission benchmark', db_name='perm_benchmark')
+        user = get_user_model().objects.create_user(username='perm-benchmark-user', password='x')
+        scope = SecScope.objects.create(scope_type='company', object_id='1', name='Benchmark', company_group=group)
+        permissions = SecPermission.objects.bulk_create(
+            SecPermission(code=f'bench_perm_{idx}', category='benchmark', scope_required=bool(idx % 2))
+            for idx in range(role_count * per_role)
+        )
+        for role_idx in range(role_count):
+            role = SecRole.objects.create(name=f'Bench role {role_idx}', code=f'bench_role_{role_idx}')
+            SecRolePermission.objects.bulk_create(
+                SecRolePermission(role=role, permission=permission)
+                for permission in permissions[role_idx * per_role:(role_idx + 1) * per_role]
+            )
+            user_role = SecUserRole.objects.create(user=user, role=role, valid_from=date(2000, 1, 1))
+            SecUserRoleScope.objects.create(user_role=user_role, scope=scope)
+        return user
+
+    def _report(self, user, requests):
+        factory = RequestFactory()
+
+        def legacy_cold(request):
+            request.user.effective_permissions = _legacy_effective_permissions(request.user)
+
+        def legacy_warm(request):
+            key = f'perm_benchmark:{request.user.id}'
+            permissions = cache.get(key)
+            if permissions is None:
+                permissions = _legacy_effective_permissions(request.user)
+                cache.set(key, permissions, 300)
+            request.user.effective_permissions = permissions
+
+        def lazy(check=False, invalidate=False):
+            def view(request):
+                if invalidate:
+                    bump_user_version(request.user.id)
+                if check:
+                    PermissionService.user_has_permission(request.user, 'bench_perm_1', 'company:1')
+                return HttpResponse()
+
+            return PermissionContextMiddleware(view)
+
+        def eager(before):
+            def middleware(request):
+                before(request)
+                return HttpResponse()
+
+            return middleware
+
+        scenarios = [
+            ('before: eager, cache miss', eager(legacy_cold)),
+            ('before: eager, cache hit', eager(legacy_warm)),
+            ('after: lazy, no check', lazy()),
+            ('after: lazy, one check', lazy(check=True)),
+            ('after: check after change', lazy(check=True, invalidate=True)),
+        ]
+
+        self.stdout.write(f"{'scenario':<30}{'us/request':>12}{'queries/request':>17}")
+        for label, handler in scenarios:
+            # Warm up caches so the steady state is measured
+            handler(self._request(factory, user))
+            queries = []
+
+            def count_query(execute, sql, params, many, context):
+                queries.append(sql)
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(count_query):
+                started = time.perf_counter()
+                for _ in range(requests):
+                    handler(self._request(factory, user))
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{label:<30}{elapsed / requests * 1e6:>12.1f}{len(queries) / requests:>17.2f}"
+            )
+
+    @staticmethod
+    def _request(factory, user):
+        request = factory.get('/')
+        # A fresh user object per request, as AuthenticationMiddleware provides
+        request.user = copy.copy(user)
+        return request
@@ -1,3 +1,5 @@
+from django.utils.functional import SimpleLazyObject
+
 from apps.security.services.permission_service import PermissionService
 
 class PermissionContextMiddleware:
@@ -6,9 +8,12 @@ class PermissionContextMiddleware:
 
     def __call__(self, request):
         if hasattr(request, 'user') and request.user.is_authenticated:
-            # Attach effective permissions to the request.user object
-            # This will be lazy-loaded or cached by the PermissionService
-            request.user.effective_permissions = PermissionService.get_user_effective_permissions(request.user)
+            # Attach effective permissions to the request.user object. Nothing is
+            # resolved until a view or serializer actually reads them.
+            user = request.user
+            request.user.effective_permissions = SimpleLazyObject(
+                lambda: PermissionService.get_user_effective_permissions(user)
+            )
         else:
             # Ensure effective_permissions attribute exists even for anonymous users
             if hasattr(request, 'user'):
@@ -0,0 +1,114 @@
+"""
+Versioned cache of compiled effective permissions.
+
+A user's permissions are compiled once into ``{code: frozenset(scopes)}``
+and stored in the shared Django cache (so every worker reuses them) under a
+key that embeds two version stamps:
+
+* the global stamp, bumped when role permissions or permissions change
+  (these affect every holder of a role);
+* the user stamp, bumped when the user's role assignments or role scopes
+  change.
+
+Bumping a stamp makes every key built with the old value unreachable, so no
+worker can serve a stale compile; the orphaned entries expire on their own.
+"""
+import time
+from datetime import date
+
+from django.core.cache import cache
+
+GLOBAL_VERSION_KEY = 'sec_perms:version:global'
+USER_VERSION_KEY = 'sec_perms:version:user:{user_id}'
+COMPILED_KEY = 'sec_perms:compiled:{user_id}:{stamp}'
+GLOBAL_SCOPE = '*'
+
+
+def _fresh_version() -> int:
+    # Missing (evicted) stamps restart from the clock, never from an old value
+    return time.time_ns() // 1000
+
+
+def _bump(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), None)
+
+
+def bump_global_version() -> None:
+    """Invalidate the compiled permissions of every user."""
+    _bump(GLOBAL_VERSION_KEY)
+
+
+def bump_user_version(user_id) -> None:
+    """Invalidate the compiled permissions of one user."""
+    if user_id is not None:
+        _bump(USER_VERSION_KEY.format(user_id=user_id))
+
+
+def version_stamp(user_id) -> str:
+    """
+    Current stamp for a user's compiled permissions.
+
+    Includes today's date so role validity windows are re-evaluated daily.
+    """
+    user_key = USER_VERSION_KEY.format(user_id=user_id)
+    versions = cache.get_many([GLOBAL_VERSION_KEY, user_key])
+    for key in (GLOBAL_VERSION_KEY, user_key):
+        if key not in versions:
+            cache.add(key, _fresh_version(), None)
+            versions[key] = cache.get(key)
+    return f"{versions[GLOBAL_VERSION_KEY]}.{versions[user_key]}.{date.today():%Y%m%d}"
+
+
+class CompiledPermissions:
+    """
+    Effective permissions of one user, compiled for constant-time checks.
+
+    ``scopes`` maps a permission code to the scope strings it is granted in
+    (``"company:1"``, ``"cost_center:7"``...); ``GLOBAL_SCOPE`` means
+    everywhere. Per-company code sets are derived on first use.
+    """
+
+    __slots__ = ('stamp', 'is_superuser', 'scopes', '_company_codes')
+
+    def __init__(self, scopes, *, stamp='', is_superuser=False):
+        self.stamp = stamp
+        self.is_superuser = is_superuser
+        self.scopes = {code: frozenset(values) for code, values in scopes.items()}
+        self._company_codes = {}
+
+    def has(self, perm_code, record_scope_str=None) -> bool:
+        if self.is_superuser:
+            return True
+        allowed = self.scopes.get(perm_code)
+        if not allowed:
+            return False
+        if GLOBAL_SCOPE in allowed:
+            return True
+        return record_scope_str is not None and record_scope_str in allowed
+
+    def codes_for_company(self, company_id) -> frozenset:
+        """Codes granted globally or for ``company:<company_id>``."""
+        codes = self._company_codes.get(company_id)
+        if codes is None:
+            scope = f"company:{company_id}"
+            codes = frozenset(
+                code for code, allowed in self.scopes.items() if GLOBAL_SCOPE in allowed or scope in allowed
+            )
+            self._company_codes[company_id] = codes
+        return codes
+
+    def as_dict(self) -> dict:
+        """Legacy ``get_user_effective_permissions`` shape."""
+        if self.is_superuser:
+            return {code: {GLOBAL_SCOPE: True} for code in self.scopes}
+        return {code: set(allowed) for code, allowed in self.scopes.items()}
+
+    def to_cache(self) -> dict:
+        return {'is_superuser': self.is_superuser, 'scopes': {code: tuple(v) for code, v in self.scopes.items()}}
+
+    @classmethod
+    def from_cache(cls, payload, *, stamp):
+        return cls(payload['scopes'], stamp=stamp, is_superuser=payload['is_superuser'])
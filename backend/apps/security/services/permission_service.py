@@ -1,7 +1,10 @@
 from django.conf import settings
 from django.core.cache import cache
 from django.db.models import Q
-from apps.security.models import SecPermission, SecRole, SecUserRole, SecUserRoleScope, SecScope, SecSoDRule
+from apps.security.models import (
+    SecPermission, SecRole, SecRolePermission, SecUserRole, SecUserRoleScope, SecScope, SecSoDRule,
+)
+from apps.security.services.permission_cache import COMPILED_KEY, GLOBAL_SCOPE, CompiledPermissions, version_stamp
 from datetime import date
 
 class PermissionService:
@@ -9,60 +12,76 @@ class PermissionService:
 
     @staticmethod
     def _get_user_roles_and_scopes(user):
-        """Helper to get all roles and their associated scopes for a user."""
-        user_roles_data = []
-        user_roles = SecUserRole.objects.filter(user=user, valid_from__lte=date.today()).filter(Q(valid_to__isnull=True) | Q(valid_to__gte=date.today()))
-
-        for user_role in user_roles:
-            role_scopes = SecUserRoleScope.objects.filter(user_role=user_role).select_related('scope')
-            scopes = [{'id': urs.scope.id, 'type': urs.scope.scope_type, 'object_id': urs.scope.object_id} for urs in role_scopes]
-            user_roles_data.append({
-                'role': user_role.role,
-                'scopes': scopes
-            })
-        return user_roles_data
+        """Helper to get all active role ids of a user with the scope strings assigned to each (two queries)."""
+        user_roles = dict(
+            SecUserRole.objects.filter(user=user, valid_from__lte=date.today())
+            .filter(Q(valid_to__isnull=True) | Q(valid_to__gte=date.today()))
+            .values_list('id', 'role_id')
+        )
+        scopes_by_user_role = {}
+        role_scopes = SecUserRoleScope.objects.filter(user_role_id__in=user_roles).values_list(
+            'user_role_id', 'scope__scope_type', 'scope__object_id'
+        )
+        for user_role_id, scope_type, object_id in role_scopes:
+            scopes_by_user_role.setdefault(user_role_id, []).append(f"{scope_type}:{object_id}")
+        return [
+            {'role_id': role_id, 'scopes': scopes_by_user_role.get(user_role_id, [])}
+            for user_role_id, role_id in user_roles.items()
+        ]
 
     @classmethod
-    def get_user_effective_permissions(cls, user):
-        """Resolves and caches a user's effective permissions and their scopes.
-        Returns a dict: { 'permission_code': set(scope_object_ids_or_wildcard) }"""
-        if not user.is_authenticated:
-            return {}
-
+    def _compile_permissions(cls, user):
+        """Build the ``{code: scopes}`` map of a user from the database (at most three queries)."""
         if user.is_superuser:
             # Superusers have all permissions globally
-            all_perms = SecPermission.objects.values_list('code', flat=True)
-            return {perm_code: {'*': True} for perm_code in all_perms} # Use a dict to indicate global scope
-
-        cache_key = f'user_perms:{user.id}'
-        effective_permissions = cache.get(cache_key)
-
-        if effective_permissions is None:
-            effective_permissions = {}
-            user_roles_data = cls._get_user_roles_and_scopes(user)
-
-            for role_data in user_roles_data:
-                role = role_data['role']
-                assigned_scopes = role_data['scopes']
+            return {code: {GLOBAL_SCOPE} for code in SecPermission.objects.values_list('code', flat=True)}
+
+        roles = cls._get_user_roles_and_scopes(user)
+        scopes_by_role = {}
+        for role_data in roles:
+            scopes_by_role.setdefault(role_data['role_id'], set()).update(role_data['scopes'])
+
+        effective_permissions = {}
+        role_permissions = SecRolePermission.objects.filter(role_id__in=scopes_by_role).values_list(
+            'role_id', 'permission__code', 'permission__scope_required'
+        )
+        for role_id, perm_code, scope_required in role_permissions:
+            allowed = effective_permissions.setdefault(perm_code, set())
+            if not scope_required:
+                # If permission doesn't require scope, it's global for this user
+                allowed.clear()
+                allowed.add(GLOBAL_SCOPE)
+            elif GLOBAL_SCOPE not in allowed:
+                allowed.update(scopes_by_role[role_id])
+        return effective_permissions
 
-                role_permissions = SecRolePermission.objects.filter(role=role).select_related('permission')
+    @classmethod
+    def get_compiled_permissions(cls, user):
+        """
+        Compiled permissions of a user, shared across workers through the cache.
 
-                for rp in role_permissions:
-                    perm_code = rp.permission.code
-                    if perm_code not in effective_permissions:
-                        effective_permissions[perm_code] = set()
+        The cache key carries the version stamp (see ``permission_cache``), so
+        role, scope and permission changes take effect on the next lookup.
+        """
+        if not user.is_authenticated:
+            return CompiledPermissions({})
 
-                    if not rp.permission.scope_required:
-                        # If permission doesn't require scope, it's global for this user
-                        effective_permissions[perm_code] = {'*'} # Use a set to indicate global scope
-                    elif '*' not in effective_permissions[perm_code]: # Not already global
-                        # Add specific scopes
-                        for scope in assigned_scopes:
-                            effective_permissions[perm_code].add(f"{scope['type']}:{scope['object_id']}")
-            
-            cache.set(cache_key, effective_permissions, cls.CACHE_TIMEOUT)
+        stamp = version_stamp(user.id)
+        cache_key = COMPILED_KEY.format(user_id=user.id, stamp=stamp)
+        payload = cache.get(cache_key)
+        if payload is None:
+            compiled = CompiledPermissions(cls._compile_permissions(user), stamp=stamp, is_superuser=user.is_superuser)
+            cache.set(cache_key, compiled.to_cache(), cls.CACHE_TIMEOUT)
+            return compiled
+        return CompiledPermissions.from_cache(payload, stamp=stamp)
 
-        return effective_permissions
+    @classmethod
+    def get_user_effective_permissions(cls, user):
+        """Resolves and caches a user's effective permissions and their scopes.
+        Returns a dict: { 'permission_code': set(scope_object_ids_or_wildcard) }"""
+        if not user.is_authenticated:
+            return {}
+        return cls.get_compiled_permissions(user).as_dict()
 
     @classmethod
     def user_has_permission(cls, user, perm_code, record_scope_str=None):
@@ -75,21 +94,7 @@ class PermissionService:
         if user.is_superuser:
             return True
 
-        effective_permissions = cls.get_user_effective_permissions(user)
-
-        if perm_code not in effective_permissions:
-            return False
-
-        allowed_scopes = effective_permissions[perm_code]
-
-        if '*' in allowed_scopes: # Global permission
-            return True
-
-        if record_scope_str is None:
-            # Permission requires scope, but no record_scope provided
-            return False
-
-        return record_scope_str in allowed_scopes
+        return cls.get_compiled_permissions(user).has(perm_code, record_scope_str)
 
     @staticmethod
     def resolve_record_scope(record):
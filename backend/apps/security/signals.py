@@ -1,4 +1,41 @@
 # backend/apps/security/signals.py
 
-# This file will contain Django signals related to the security app.
-# For example, signals to clear user permission cache on role/permission changes.
+# Django signals related to the security app: role, scope and permission
+# changes bump the version stamps of the compiled permission cache.
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.security.models import SecPermission, SecRole, SecRolePermission, SecUserRole, SecUserRoleScope
+from apps.security.services.permission_cache import bump_global_version, bump_user_version
+
+
+def _bump_now_and_on_commit(bump, *args):
+    bump(*args)
+    # Other workers may re-compile from the old rows until the change is committed
+    transaction.on_commit(lambda: bump(*args))
+
+
+@receiver(post_save, sender=SecUserRole)
+@receiver(post_delete, sender=SecUserRole)
+def invalidate_user_role_permissions(sender, instance, **kwargs):
+    _bump_now_and_on_commit(bump_user_version, instance.user_id)
+
+
+@receiver(post_save, sender=SecUserRoleScope)
+@receiver(post_delete, sender=SecUserRoleScope)
+def invalidate_user_role_scope_permissions(sender, instance, **kwargs):
+    user_id = SecUserRole.objects.filter(pk=instance.user_role_id).values_list('user_id', flat=True).first()
+    if user_id is None:
+        # The assignment itself is being deleted; its own signal covers the user
+        return
+    _bump_now_and_on_commit(bump_user_version, user_id)
+
+
+@receiver(post_save, sender=SecRolePermission)
+@receiver(post_delete, sender=SecRolePermission)
+@receiver(post_save, sender=SecPermission)
+@receiver(post_delete, sender=SecPermission)
+@receiver(post_delete, sender=SecRole)
+def invalidate_all_permissions(sender, instance, **kwargs):
+    _bump_now_and_on_commit(bump_global_version)
@@ -0,0 +1,91 @@
+from datetime import date
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+
+from apps.companies.models import CompanyGroup
+from apps.security.middleware.permission_context_middleware import PermissionContextMiddleware
+from apps.security.models import SecPermission, SecRole, SecRolePermission, SecScope, SecUserRole, SecUserRoleScope
+from apps.security.services.permission_service import PermissionService
+
+
+class CompiledPermissionCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.group = CompanyGroup.objects.create(name="Perm Group", db_name="cg_perm_cache")
+        self.user = get_user_model().objects.create_user(username="perm.cache", password="x")
+        self.scope = SecScope.objects.create(scope_type="company", object_id="7", name="Co 7", company_group=self.group)
+        self.view_perm = SecPermission.objects.create(code="pc_view", category="test")
+        self.post_perm = SecPermission.objects.create(code="pc_post", category="test", scope_required=True)
+        self.roles = []
+        for idx, permission in enumerate((self.view_perm, self.post_perm)):
+            role = SecRole.objects.create(name=f"PC role {idx}", code=f"pc_role_{idx}")
+            SecRolePermission.objects.create(role=role, permission=permission)
+            self.roles.append(role)
+        self.user_role = SecUserRole.objects.create(user=self.user, role=self.roles[1], valid_from=date(2020, 1, 1))
+        SecUserRoleScope.objects.create(user_role=self.user_role, scope=self.scope)
+
+    def test_compiles_once_and_serves_from_cache(self):
+        with self.assertNumQueries(3):
+            compiled = PermissionService.get_compiled_permissions(self.user)
+
+        self.assertTrue(compiled.has("pc_post", "company:7"))
+        self.assertFalse(compiled.has("pc_post", "company:8"))
+        self.assertFalse(compiled.has("pc_post"))
+        self.assertEqual(compiled.codes_for_company(7), frozenset({"pc_post"}))
+        with self.assertNumQueries(0):
+            self.assertTrue(PermissionService.user_has_permission(self.user, "pc_post", "company:7"))
+        self.assertEqual(PermissionService.get_user_effective_permissions(self.user), {"pc_post": {"company:7"}})
+
+    def test_query_count_does_not_grow_with_roles(self):
+        for idx in range(5):
+            role = SecRole.objects.create(name=f"PC extra {idx}", code=f"pc_extra_{idx}")
+            SecRolePermission.objects.create(role=role, permission=self.view_perm)
+            SecUserRole.objects.create(user=self.user, role=role, valid_from=date(2020, 1, 1))
+
+        with self.assertNumQueries(3):
+            self.assertTrue(PermissionService.user_has_permission(self.user, "pc_view"))
+
+    def test_role_assignment_changes_bump_the_version(self):
+        self.assertFalse(PermissionService.user_has_permission(self.user, "pc_view"))
+
+        SecUserRole.objects.create(user=self.user, role=self.roles[0], valid_from=date(2020, 1, 1))
+        self.assertTrue(PermissionService.user_has_permission(self.user, "pc_view"))
+
+        other = SecScope.objects.create(scope_type="company", object_id="8", name="Co 8", company_group=self.group)
+        SecUserRoleScope.objects.create(user_role=self.user_role, scope=other)
+        self.assertTrue(PermissionService.user_has_permission(self.user, "pc_post", "company:8"))
+
+    def test_role_permission_changes_bump_the_version(self):
+        self.assertTrue(PermissionService.user_has_permission(self.user, "pc_post", "company:7"))
+
+        SecRolePermission.objects.filter(role=self.roles[1]).delete()
+
+        self.assertFalse(PermissionService.user_has_permission(self.user, "pc_post", "company:7"))
+
+    def test_middleware_resolves_permissions_lazily(self):
+        seen = {}
+
+        def view(request):
+            seen["user"] = request.user
+            return HttpResponse()
+
+        request = RequestFactory().get("/")
+        request.user = self.user
+        with self.assertNumQueries(0):
+            PermissionContextMiddleware(view)(request)
+
+        self.assertEqual(dict(seen["user"].effective_permissions), {"pc_post": {"company:7"}})
+
+    def test_benchmark_command_reports_before_and_after(self):
+        out = StringIO()
+        call_command("benchmark_permission_middleware", roles=2, permissions_per_role=3, requests=5, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn("before: eager, cache miss", output)
+        self.assertIn("after: lazy, no check", output)
+        self.assertFalse(SecPermission.objects.filter(code__startswith="bench_perm_").exists())
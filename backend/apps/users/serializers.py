@@ -26,8 +26,9 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ('username', 'date_joined', 'last_login', 'is_staff', 'is_active', 'company')
 
     def get_effective_permissions(self, obj):
-        # effective_permissions is attached by PermissionContextMiddleware
-        return getattr(obj, 'effective_permissions', {})
+        # effective_permissions is attached (lazily) by PermissionContextMiddleware
+        permissions = getattr(obj, 'effective_permissions', {})
+        return {code: sorted(scopes) for code, scopes in permissions.items()}
 
 class UserProfileSerializer(serializers.ModelSerializer):
     company = CompanySerializer(read_only=True)
@@ -6,3 +6,46 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 app = Celery('core')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
+
+
+
+# Carry the active company group from the publishing context into the task so
+# company-aware models are routed to the same database inside the worker.
+# shared.db_routers is imported lazily: it needs the app registry to be ready.
+from celery.signals import before_task_publish, task_postrun, task_prerun  # noqa: E402
+
+
+@before_task_publish.connect
+def propagate_company_group(headers=None, **kwargs):
+    from shared.db_routers import get_current_company_group_id
+
+    company_group_id = get_current_company_group_id()
+    if headers is not None and company_group_id and 'company_group_id' not in headers:
+        headers['company_group_id'] = company_group_id
+
+
+@task_prerun.connect
+def enter_company_group(task=None, kwargs=None, **extra):
+    from shared.db_routers import set_current_company_group
+
+    request = task.request
+    company_group_id = (
+        getattr(request, 'company_group_id', None)
+        or (getattr(request, 'headers', None) or {}).get('company_group_id')
+        or (kwargs or {}).get('company_group_id')
+    )
+    request.company_group_token = set_current_company_group(company_group_id)
+
+
+@task_postrun.connect
+def exit_company_group(task=None, **extra):
+    from shared.db_routers import reset_current_company_group, set_current_company_group
+
+    token = getattr(task.request, 'company_group_token', None)
+    if token is None:
+        return
+    try:
+        reset_current_company_group(token)
+    except ValueError:
+        # Token created in another context (e.g. a different greenlet); just clear it
+        set_current_company_group(None)
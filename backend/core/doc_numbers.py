@@ -1,8 +1,16 @@
 from __future__ import annotations
 
-from django.db import transaction
+import os
+import threading
+
+from django.conf import settings
+from django.db import DatabaseError, connections, router, transaction
 from django.utils import timezone
 
+STRICT = "strict"
+BLOCK = "block"
+DEFAULT_BLOCK_SIZE = 50
+
 
 def _fy_value(fmt: str = "YYYY") -> str:
     now = timezone.now()
@@ -11,29 +19,194 @@ def _fy_value(fmt: str = "YYYY") -> str:
     return f"{now:%Y}"
 
 
-@transaction.atomic
-def get_next_doc_no(*, company, doc_type: str, prefix: str | None = None, fy_format: str = "YYYY", width: int = 5) -> str:
+def _sequence_model():
+    # Lazy import to avoid app loading cycles
+    from apps.metadata.models import DocumentSequence  # type: ignore
+
+    return DocumentSequence
+
+
+def allocation_mode(doc_type: str) -> str:
     """
-    Get the next sequential document number for a company and doc type.
+    Allocation mode for a doc type.
 
-    The format is: {prefix or doc_type}-{FY}-{SEQUENCE}
-    Example: PO-2025-00001
+    ``settings.DOC_NUMBER_ALLOCATION`` maps doc types to STRICT or BLOCK
+    (key ``"*"`` sets the default); anything not listed is STRICT.
     """
-    # Lazy import to avoid app loading cycles
-    from apps.metadata.models import DocumentSequence  # type: ignore
+    modes = getattr(settings, "DOC_NUMBER_ALLOCATION", {}) or {}
+    return modes.get(doc_type, modes.get("*", STRICT))
 
-    fy = _fy_value(fy_format)
-    seq, _ = (
-        DocumentSequence.objects.select_for_update().get_or_create(
-            company=company,
+
+def _advance(conn, *, company_id, doc_type: str, fiscal_year: str, count: int) -> int:
+    """
+    Add ``count`` to a sequence row and return its new value.
+
+    One ``UPDATE ... RETURNING`` statement (plus an ``INSERT ... ON CONFLICT
+    DO NOTHING`` the first time a row is used). The row lock lasts until the
+    transaction of ``conn`` ends.
+    """
+    DocumentSequence = _sequence_model()
+    opts = DocumentSequence._meta
+    qn = conn.ops.quote_name
+    table = qn(opts.db_table)
+    company_col = qn(opts.get_field("company").column)
+    update_sql = (
+        f"UPDATE {table} SET {qn('current_value')} = {qn('current_value')} + %s, {qn('updated_at')} = %s "
+        f"WHERE {company_col} = %s AND {qn('doc_type')} = %s AND {qn('fiscal_year')} = %s "
+        f"RETURNING {qn('current_value')}"
+    )
+    params = [count, timezone.now(), company_id, doc_type, fiscal_year]
+    with conn.cursor() as cursor:
+        cursor.execute(update_sql, params)
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute(
+                f"INSERT INTO {table} ({company_col}, {qn('doc_type')}, {qn('fiscal_year')}, "
+                f"{qn('current_value')}, {qn('updated_at')}) VALUES (%s, %s, %s, 0, %s) "
+                f"ON CONFLICT ({company_col}, {qn('doc_type')}, {qn('fiscal_year')}) DO NOTHING",
+                [company_id, doc_type, fiscal_year, timezone.now()],
+            )
+            cursor.execute(update_sql, params)
+            row = cursor.fetchone()
+    return row[0]
+
+
+def _advance_locked(alias: str, *, company_id, doc_type: str, fiscal_year: str, count: int) -> int:
+    """Portable fallback for backends without UPDATE ... RETURNING: lock the row, then update it."""
+    DocumentSequence = _sequence_model()
+    with transaction.atomic(using=alias):
+        seq, _ = DocumentSequence.objects.using(alias).select_for_update().get_or_create(
+            company_id=company_id,
             doc_type=doc_type,
-            fiscal_year=fy,
+            fiscal_year=fiscal_year,
             defaults={"current_value": 0},
         )
+        seq.current_value += count
+        seq.save(update_fields=["current_value", "updated_at"])
+    return seq.current_value
+
+
+def _supports_returning(conn) -> bool:
+    return conn.vendor in ("postgresql", "sqlite")
+
+
+def _allocate_in_transaction(alias: str, **kwargs) -> int:
+    """Advance the sequence inside the caller's transaction (or a short one of its own)."""
+    conn = connections[alias]
+    if not _supports_returning(conn):
+        return _advance_locked(alias, **kwargs)
+    with transaction.atomic(using=alias, savepoint=False):
+        return _advance(conn, **kwargs)
+
+
+def _reserve_autonomous(alias: str, **kwargs) -> int | None:
+    """
+    Advance the sequence in a transaction that commits immediately.
+
+    When the caller is inside a transaction a separate connection is used so
+    the sequence row is unlocked as soon as the statement returns. Returns
+    None when that is not possible: the backend lacks UPDATE ... RETURNING or
+    the side connection cannot see the company yet (created in the caller's
+    still-open transaction).
+    """
+    conn = connections[alias]
+    if not conn.in_atomic_block:
+        return _allocate_in_transaction(alias, **kwargs)
+    if not _supports_returning(conn):
+        return None
+    side = connections.create_connection(alias)
+    try:
+        return _advance(side, **kwargs)
+    except DatabaseError:
+        return None
+    finally:
+        side.close()
+
+
+class _BlockPool:
+    """Per-process pool of reserved number blocks, keyed by (alias, company, doc type, fiscal year)."""
+
+    def __init__(self):
+        self._blocks: dict[tuple, list[int]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: tuple, block_size: int) -> int:
+        with self._lock:
+            block = self._blocks.get(key)
+            if block and block[0] <= block[1]:
+                value = block[0]
+                block[0] += 1
+                return value
+
+            alias, company_id, doc_type, fiscal_year = key
+            sequence = dict(company_id=company_id, doc_type=doc_type, fiscal_year=fiscal_year)
+            last = _reserve_autonomous(alias, count=block_size, **sequence)
+            if last is None:
+                # A block reserved in the caller's transaction could be rolled back: take one number only
+                return _allocate_in_transaction(alias, count=1, **sequence)
+            first = last - block_size + 1
+            self._blocks[key] = [first + 1, last]
+            return first
+
+    def clear(self) -> None:
+        with self._lock:
+            self._blocks.clear()
+
+
+_block_pool = _BlockPool()
+# A forked worker must not hand out the numbers its parent reserved
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_block_pool.clear)
+
+
+def allocate_doc_value(
+    *, company, doc_type: str, fiscal_year: str, mode: str | None = None, block_size: int | None = None
+) -> int:
+    """
+    Allocate the next sequence value for a company, doc type and fiscal year.
+
+    STRICT: gapless. A single ``UPDATE ... RETURNING`` inside the caller's
+    transaction, so a rolled back document releases its number. The row lock
+    is held until the caller commits, so callers should allocate as late in
+    their transaction as possible.
+
+    BLOCK: every process reserves ``block_size`` numbers at a time in a short
+    transaction of its own and hands them out from memory. No lock is held
+    during the caller's transaction, at the cost of gaps (rolled back
+    documents, numbers left over at process exit) and numbers that are only
+    increasing per process.
+    """
+    mode = mode or allocation_mode(doc_type)
+    alias = router.db_for_write(_sequence_model())
+    company_id = getattr(company, "pk", company)
+    if mode == BLOCK:
+        size = block_size or getattr(settings, "DOC_NUMBER_BLOCK_SIZE", DEFAULT_BLOCK_SIZE)
+        return _block_pool.take((alias, company_id, doc_type, fiscal_year), size)
+    if mode != STRICT:
+        raise ValueError(f"Unknown document number allocation mode: {mode}")
+    return _allocate_in_transaction(
+        alias, company_id=company_id, doc_type=doc_type, fiscal_year=fiscal_year, count=1
     )
-    seq.current_value += 1
-    seq.save(update_fields=["current_value"])
-    value = seq.current_value
+
+
+def get_next_doc_no(
+    *,
+    company,
+    doc_type: str,
+    prefix: str | None = None,
+    fy_format: str = "YYYY",
+    width: int = 5,
+    mode: str | None = None,
+) -> str:
+    """
+    Get the next sequential document number for a company and doc type.
+
+    The format is: {prefix or doc_type}-{FY}-{SEQUENCE}
+    Example: PO-2025-00001
+
+    ``mode`` overrides the configured allocation mode (see ``allocate_doc_value``).
+    """
+    fy = _fy_value(fy_format)
+    value = allocate_doc_value(company=company, doc_type=doc_type, fiscal_year=fy, mode=mode)
     pre = prefix or doc_type
     return f"{pre}-{fy}-{value:0{width}d}"
-
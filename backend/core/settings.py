@@ -468,6 +468,19 @@ CELERY_TASK_ROUTES = {
     'apps.data_migration.tasks.migration_tasks.*': {'queue': 'data_migration'},
 }
 
+# Document numbering (core.doc_numbers)
+# 'strict' numbers are gapless; 'block' numbers are reserved in blocks per worker
+# process (no lock contention, but gaps). Key '*' sets the default mode.
+DOC_NUMBER_ALLOCATION = {
+    doc_type.strip(): 'block'
+    for doc_type in os.getenv('DOC_NUMBER_BLOCK_TYPES', '').split(',')
+    if doc_type.strip()
+}
+DOC_NUMBER_BLOCK_SIZE = env_int('DOC_NUMBER_BLOCK_SIZE', 50)
+
+# Companies synced concurrently by the analytics warehouse ETL
+ANALYTICS_ETL_WORKERS = env_int('ANALYTICS_ETL_WORKERS', 4)
+
 # File Upload Settings
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
@@ -483,6 +496,11 @@ AI_CONFIG = {
     'LLM_MODEL': os.getenv('AI_LLM_MODEL', 'mistralai/Mistral-7B-Instruct-v0.1'),
     'EMBEDDING_MODEL': os.getenv('AI_EMBEDDING_MODEL', 'sentence-transformers/all-MiniLM-L6-v2'),
     'VECTOR_DB_PATH': os.getenv('AI_VECTOR_DB_PATH', './chroma_db'),
+    # Embedding inference: batch size, torch threads (0 = torch default) and the
+    # content-hash vector cache (defaults to <VECTOR_DB_PATH>/embedding_cache; '' disables)
+    'EMBEDDING_BATCH_SIZE': env_int('AI_EMBEDDING_BATCH_SIZE', 32),
+    'EMBEDDING_THREADS': env_int('AI_EMBEDDING_THREADS', 0),
+    'EMBEDDING_CACHE_PATH': os.getenv('AI_EMBEDDING_CACHE_PATH'),
     'RASA_SERVER': os.getenv('AI_RASA_SERVER', 'http://localhost:5005'),
 }
 
@@ -492,7 +510,6 @@ BUDGETING_ITEM_CODE_SUGGESTIONS = {
     'use_embeddings': env_bool('BUDGETING_SUGGEST_USE_EMBEDDINGS', 'true'),
     'embedding_threshold': env_float('BUDGETING_SUGGEST_EMBED_THRESHOLD', 0.70),
     'fuzzy_threshold': env_float('BUDGETING_SUGGEST_FUZZY_THRESHOLD', 0.10),
-    'candidate_limit': env_int('BUDGETING_SUGGEST_CANDIDATE_LIMIT', 200),
     'results_limit': env_int('BUDGETING_SUGGEST_RESULTS_LIMIT', 5),
 }
 
@@ -523,10 +540,23 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'apps.hr.tasks.send_payroll_reminders',
         'schedule': crontab(day_of_month=25, hour=9),  # 25th of month
     },
+    'reconcile-budget-totals': {
+        'task': 'apps.budgeting.tasks.reconcile_budget_totals',
+        'schedule': crontab(hour=3, minute=30),  # Daily 03:30 AM, report only
+    },
+    'refresh-item-classifications': {
+        'task': 'apps.inventory.tasks.refresh_item_classifications',
+        'schedule': crontab(hour=2, minute=0),  # Daily 02:00 AM
+    },
     'populate-data-warehouse': {
         'task': 'apps.analytics.tasks.populate_data_warehouse',
         'schedule': crontab(hour=2, minute=30),  # Daily 02:30 AM
     },
+    'populate-data-warehouse-full': {
+        'task': 'apps.analytics.tasks.populate_data_warehouse',
+        'schedule': crontab(hour=3, minute=30, day_of_week=0),  # Weekly Sunday 03:30 AM
+        'kwargs': {'full': True},
+    },
     'ai-generate-proactive-suggestions': {
         'task': 'apps.ai_companion.tasks.generate_proactive_suggestions',
         'schedule': crontab(minute='*/30'),  # every 30 minutes
@@ -1,6 +1,112 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 from django.conf import settings
 from apps.companies.models import CompanyGroup
 
+# Company group routing context
+# ----------------------------
+# The active company group is held in a ContextVar rather than on the settings
+# module, so it is private to the current thread (WSGI), asyncio task (ASGI)
+# or Celery task. The value is a (company_group_id, db_name) pair; db_name is
+# filled in lazily and then memoized for the rest of the context.
+
+_UNRESOLVED = object()
+_current_company_group = ContextVar('current_company_group', default=(None, None))
+
+
+def get_current_company_group_id():
+    """Return the id of the company group active in the current context, or None."""
+    return _current_company_group.get()[0]
+
+
+def set_current_company_group(company_group):
+    """
+    Activate a company group (instance, id or None) for the current context.
+
+    Returns a token for ``reset_current_company_group``. Passing an instance
+    also memoizes its ``db_name`` so routing needs no lookup at all.
+    """
+    if company_group is None:
+        return _current_company_group.set((None, None))
+    if isinstance(company_group, CompanyGroup):
+        return _current_company_group.set((company_group.pk, company_group.db_name))
+    return _current_company_group.set((int(company_group), _UNRESOLVED))
+
+
+def reset_current_company_group(token):
+    _current_company_group.reset(token)
+
+
+@contextmanager
+def company_group_context(company_group):
+    """Route company-aware models to ``company_group``'s database inside the block."""
+    token = set_current_company_group(company_group)
+    try:
+        yield
+    finally:
+        reset_current_company_group(token)
+
+
+class CompanyGroupDatabaseCache:
+    """
+    Thread-safe, in-process LRU of company group id -> db_name.
+
+    Entries are dropped when a CompanyGroup is saved or deleted (see
+    apps.companies.signals); other processes pick the change up once the
+    entry is evicted or the process restarts.
+    """
+
+    def __init__(self, maxsize=None):
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def maxsize(self):
+        return self._maxsize or getattr(settings, 'COMPANY_GROUP_DB_CACHE_SIZE', 256)
+
+    def get(self, company_group_id):
+        with self._lock:
+            if company_group_id in self._entries:
+                self._entries.move_to_end(company_group_id)
+                return self._entries[company_group_id]
+
+        db_name = (
+            CompanyGroup.objects.filter(id=company_group_id).values_list('db_name', flat=True).first()
+        )
+        with self._lock:
+            self._entries[company_group_id] = db_name
+            self._entries.move_to_end(company_group_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return db_name
+
+    def invalidate(self, company_group_id=None):
+        """Drop one group's entry, or all entries when no id is given."""
+        with self._lock:
+            if company_group_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(company_group_id, None)
+
+
+company_group_db_cache = CompanyGroupDatabaseCache()
+
+
+def get_current_company_group_db():
+    """Return the db_name of the active company group, resolving it at most once per context."""
+    company_group_id, db_name = _current_company_group.get()
+    if company_group_id is None:
+        return None
+    if db_name is _UNRESOLVED:
+        db_name = company_group_db_cache.get(company_group_id)
+        _current_company_group.set((company_group_id, db_name))
+    return db_name
+
+
 class SystemDatabaseRouter:
     """
     A router to control all database operations for models that belong to the
@@ -47,14 +153,7 @@ class CompanyGroupDatabaseRouter:
     }
 
     def _get_db_for_company_group(self):
-        current_company_group_id = getattr(settings, 'CURRENT_COMPANY_GROUP_ID', None)
-        if current_company_group_id:
-            try:
-                company_group = CompanyGroup.objects.get(id=current_company_group_id)
-                return company_group.db_name
-            except CompanyGroup.DoesNotExist:
-                pass
-        return None
+        return get_current_company_group_db()
 
     def db_for_read(self, model, **hints):
         if model._meta.app_label in self.route_app_labels:
@@ -2,6 +2,7 @@ from django.utils.deprecation import MiddlewareMixin
 from django.conf import settings
 from django.core.exceptions import PermissionDenied
 from apps.companies.models import Company, CompanyGroup, Branch, Department
+from shared.db_routers import set_current_company_group
 
 
 def get_current_company(request):
@@ -80,8 +81,14 @@ class CompanyContextMiddleware(MiddlewareMixin):
             # Anonymous users get no organizational context
             self._clear_context(request)
 
+    def process_response(self, request, response):
+        # Don't leak database routing into whatever this thread handles next
+        set_current_company_group(None)
+        return response
+
     def _init_context(self, request):
         """Initialize all organizational context variables."""
+        set_current_company_group(None)
         settings.CURRENT_COMPANY_GROUP = None
         settings.CURRENT_COMPANY_GROUP_ID = None
         settings.CURRENT_COMPANY = None
@@ -98,6 +105,7 @@ class CompanyContextMiddleware(MiddlewareMixin):
         request.current_branch = None
         request.current_department = None
 
+        set_current_company_group(None)
         settings.CURRENT_COMPANY_GROUP = None
         settings.CURRENT_COMPANY_GROUP_ID = None
         settings.CURRENT_COMPANY = None
@@ -192,6 +200,7 @@ class CompanyContextMiddleware(MiddlewareMixin):
                     request.company_group = company_group
                     settings.CURRENT_COMPANY_GROUP = company_group
                     settings.CURRENT_COMPANY_GROUP_ID = company_group.id
+                    set_current_company_group(company_group)
                     request.session['active_company_group_id'] = str(company_group.id)
                     return company_group
             except CompanyGroup.DoesNotExist:
@@ -238,6 +247,7 @@ class CompanyContextMiddleware(MiddlewareMixin):
                     request.company_group = company.company_group
                     settings.CURRENT_COMPANY_GROUP = company.company_group
                     settings.CURRENT_COMPANY_GROUP_ID = company.company_group.id
+                    set_current_company_group(company.company_group)
                     request.session['active_company_group_id'] = str(company.company_group.id)
 
                 return company